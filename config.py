@@ -67,8 +67,10 @@ MODELS_DIR = os.path.join(program_dir, "ManhwaStudio_AI_Models")
 TORCH_MODELS_DIR = os.path.join(MODELS_DIR, "Torch")
 ONNX_MODELS_DIR = os.path.join(MODELS_DIR, "ONNX")
 LAMA_DIR = os.path.join(TORCH_MODELS_DIR, "LaMa")
+LAMA_ONNX_DIR = os.path.join(ONNX_MODELS_DIR, "LaMa")
 LAMA_MPE_DIR = os.path.join(TORCH_MODELS_DIR, "LaMa_MPE")
 AOT_DIR = os.path.join(TORCH_MODELS_DIR, "AOT")
+AOT_ONNX_DIR = os.path.join(ONNX_MODELS_DIR, "AOT")
 TEXT_DETECTOR_DIR = os.path.join(TORCH_MODELS_DIR, "ComicTextDetector")
 TEXT_DETECTOR_ONNX_DIR = os.path.join(ONNX_MODELS_DIR, "ComicTextDetector")
 PADDLEOCR_DIR = os.path.join(ONNX_MODELS_DIR, "PaddleOCR")
@@ -84,8 +86,10 @@ FLUX_FILL_COMPONENTS_DIR = os.path.join(FLUX_FILL_DIR, "components")
 folders = [
     LAMA_DIR,
     os.path.join(LAMA_DIR, "models"),
+    LAMA_ONNX_DIR,
     LAMA_MPE_DIR,
     AOT_DIR,
+    AOT_ONNX_DIR,
     TEXT_DETECTOR_DIR,
     TEXT_DETECTOR_ONNX_DIR,
     PADDLEOCR_DET_DIR,
@@ -7,7 +7,11 @@ AOT inpainting service adapter for the Python AI backend.
 Main responsibilities:
 - load AOT inpainting runtime lazily;
 - synchronize runtime device with backend AI device settings;
-- run inpainting requests and expose health/unload hooks.
+- run inpainting requests on padded mask ROI windows (`inpaint_roi.py`) and
+  expose health/unload hooks;
+- run the exported generator on ONNX Runtime instead of torch when the request
+  runtime (`torch_onnx_runtime.py`) resolves to `onnx`; pre/post-processing is
+  shared, only the network call differs.
 """
 
 from __future__ import annotations
@@ -16,17 +20,12 @@ import gc
 import io
 import threading
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable
 
 if TYPE_CHECKING:
     import numpy as np
     import torch as torch_mod
 
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
 try:
     from config import AOT_DIR
 except Exception:
@@ -34,12 +33,22 @@ except Exception:
         Path(__file__).resolve().parents[2] / "ManhwaStudio_AI_Models" / "Torch" / "AOT"
     )
 
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
-
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import check_inpaint_arrays
+from .inpaint_roi import inpaint_with_rois, normalize_roi_params
 from .model_manager import LoadedModelManager
+from .paddle_onnx_runtime import RuntimeFactory
+from .torch_onnx_runtime import (
+    RUNTIME_ONNX,
+    aot_onnx_forward,
+    aot_onnx_path,
+    configured_runtime,
+    normalize_runtime,
+    onnx_session,
+    require_onnx_model,
+    select_runtime,
+)
 
 
 # ============================================================================
@@ -49,9 +58,12 @@ from .model_manager import LoadedModelManager
 # - `AotInpaintService`: lazy-load обёртка AOT-модели для endpoint `/inpaint/aot`.
 # - Порт инференса из legacy `ui_new/tools/aot_inpaint_tool.py` (без Qt-слоя).
 # - Декодирование PNG-изображений (RGB image + mask) и кодирование raw PNG.
+# - Инпейнт только по ROI-окнам вокруг компонент маски (`inpaint_roi.py`).
 # - Нормализация параметров AOT (`inpaint_size`).
 # - Синхронизация устройства с backend-настройкой `General.ai_device`
-#   через `AIDevice`.
+#   через общий кэш `device_resolution.py`.
+# - Runtime `onnx`: экспортированный генератор через `RuntimeFactory`
+#   (`torch_onnx_runtime.py`), та же пре/постобработка.
 # ============================================================================
 
 
@@ -403,10 +415,22 @@ def load_aot_model(model_path: str, device: str) -> AOTGenerator:
     return model
 
 
+HEALTH_SOURCE = "inpaint.aot"
+
+
 class AotInpaintService:
-    def __init__(self, model_manager: LoadedModelManager) -> None:
+    _active_device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
+    def __init__(
+        self,
+        model_manager: LoadedModelManager,
+        runtime_factory: RuntimeFactory | None = None,
+    ) -> None:
         self._lock = threading.RLock()
         self._model_manager = model_manager
+        self._runtime_factory = runtime_factory or RuntimeFactory(model_manager)
+        self._runtime = configured_runtime()
         self._model: AOTGenerator | None = None
         self._active_device = "cpu"
         self._active_model_key: str | None = None
@@ -421,6 +445,9 @@ class AotInpaintService:
                 "device": self._active_device,
                 "model_path": str(self._model_path),
                 "model_exists": self._model_path.is_file(),
+                "runtime": self._runtime,
+                "onnx_model_path": str(aot_onnx_path()),
+                "onnx_model_exists": aot_onnx_path().is_file(),
                 "last_error": self._last_error,
             }
 
@@ -433,8 +460,47 @@ class AotInpaintService:
     ) -> dict[str, Any]:
         image_rgb = self._decode_image_rgb(image_bytes)
         mask_u8 = self._decode_mask(mask_bytes, expected_hw=image_rgb.shape[:2])
+        result = self.inpaint_image_array(image_rgb, mask_u8, params=params)
+        result["image_png"] = _encode_png_bytes_rgb(result.pop("image_rgb"))
+        return result
+
+    def inpaint_image_array(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        *,
+        params: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Same as `inpaint_image_bytes` for decoded `(H, W, 3)` / `(H, W)` uint8 arrays.
+
+        The inputs may be read-only views (e.g. shared memory); the result dict
+        carries the output as `image_rgb` instead of `image_png`.
+        """
+        image_rgb, mask_u8 = check_inpaint_arrays(image_rgb, mask_u8)
         normalized = self._normalize_params(params)
         device = _resolve_selected_backend_device(self._active_device)
+        runtime = select_runtime(normalized["runtime"], aot_onnx_path(), device)
+        if runtime == RUNTIME_ONNX:
+            out_rgb, windows = self._inpaint_onnx(image_rgb, mask_u8, normalized)
+        else:
+            out_rgb, windows = self._inpaint_torch(image_rgb, mask_u8, normalized, device)
+
+        return {
+            "image_rgb": out_rgb,
+            "source_size": [int(image_rgb.shape[1]), int(image_rgb.shape[0])],
+            "device": self._active_device,
+            "runtime": runtime,
+            "inpaint_size": int(normalized["inpaint_size"]),
+            "roi_windows": len(windows),
+        }
+
+    def _inpaint_torch(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        normalized: dict[str, Any],
+        device: str,
+    ) -> tuple[np.ndarray, list]:
         model_key = self._model_key_for(device)
         lease = self._model_manager.begin_model_use(
             model_key,
@@ -444,12 +510,8 @@ class AotInpaintService:
         with self._lock:
             try:
                 model = self._ensure_model_locked(device)
-                out_rgb = self._inpaint_locked(
-                    model,
-                    image_rgb=image_rgb,
-                    mask_u8=mask_u8,
-                    inpaint_size=normalized["inpaint_size"],
-                    device=device,
+                out_rgb, windows = self._inpaint_windows(
+                    _torch_forward(model, device), image_rgb, mask_u8, normalized
                 )
                 if lease.needs_load:
                     lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
@@ -461,13 +523,51 @@ class AotInpaintService:
                 raise
             finally:
                 lease.release()
+        return out_rgb, windows
 
-        return {
-            "image_png": _encode_png_bytes_rgb(out_rgb),
-            "source_size": [int(image_rgb.shape[1]), int(image_rgb.shape[0])],
-            "device": self._active_device,
-            "inpaint_size": int(normalized["inpaint_size"]),
-        }
+    def _inpaint_onnx(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        normalized: dict[str, Any],
+    ) -> tuple[np.ndarray, list]:
+        try:
+            model_path = require_onnx_model(aot_onnx_path(), "AOT")
+            with onnx_session(self._runtime_factory, model_path, "aot") as runner:
+                result = self._inpaint_windows(
+                    aot_onnx_forward(runner), image_rgb, mask_u8, normalized
+                )
+        except Exception as exc:
+            with self._lock:
+                self._last_error = str(exc)
+            raise
+        with self._lock:
+            self._last_error = None
+        return result
+
+    def _inpaint_windows(
+        self,
+        forward: Callable[[np.ndarray, np.ndarray], np.ndarray],
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        normalized: dict[str, Any],
+    ) -> tuple[np.ndarray, list]:
+        def _run(crop_rgb: np.ndarray, crop_mask: np.ndarray) -> np.ndarray:
+            return self._inpaint_locked(
+                forward,
+                image_rgb=crop_rgb,
+                mask_u8=crop_mask,
+                inpaint_size=normalized["inpaint_size"],
+            )
+
+        if normalized["roi_crop"]:
+            return inpaint_with_rois(
+                image_rgb,
+                mask_u8,
+                _run,
+                context_px=normalized["roi_context_px"],
+            )
+        return _run(image_rgb, mask_u8), []
 
     def unload(self) -> bool:
         with self._lock:
@@ -522,19 +622,26 @@ class AotInpaintService:
 
         inpaint_size = _to_int(merged.get("inpaint_size"), 2048)
         inpaint_size = max(256, min(4096, inpaint_size))
-        return {"inpaint_size": inpaint_size}
+        return {
+            "inpaint_size": inpaint_size,
+            "runtime": normalize_runtime(merged.get("runtime"), self._runtime),
+            **normalize_roi_params(merged),
+        }
 
     def _inpaint_locked(
         self,
-        model: AOTGenerator,
+        forward: Callable[[np.ndarray, np.ndarray], np.ndarray],
         *,
         image_rgb: np.ndarray,
         mask_u8: np.ndarray,
         inpaint_size: int,
-        device: str,
     ) -> np.ndarray:
+        """Resize/pad/normalize for the generator, `forward` it, undo the geometry, composite.
+
+        `forward(img, mask)` takes float32 NCHW arrays (`img` in [-1, 1] with the
+        hole zeroed, binary `mask`) and returns the NCHW generator output.
+        """
         np = _np()
-        torch = _torch()
         cv2 = _cv2_required()
 
         if image_rgb.ndim != 3 or image_rgb.shape[2] != 3:
@@ -566,27 +673,15 @@ class AotInpaintService:
             img = cv2.copyMakeBorder(img, 0, pad_bottom, 0, pad_right, cv2.BORDER_REFLECT)
             mask = cv2.copyMakeBorder(mask, 0, pad_bottom, 0, pad_right, cv2.BORDER_REFLECT)
 
-        img_t = torch.from_numpy(np.ascontiguousarray(img)).permute(2, 0, 1).unsqueeze(0).float()
-        img_t = img_t / 127.5 - 1.0
-        mask_t = (
-            torch.from_numpy(np.ascontiguousarray(mask))
-            .unsqueeze(0)
-            .unsqueeze(0)
-            .float()
-            / 255.0
-        )
-        mask_t = (mask_t >= 0.5).float()
+        img_in = np.ascontiguousarray(img).transpose(2, 0, 1)[None].astype(np.float32)
+        img_in = img_in / np.float32(127.5) - np.float32(1.0)
+        mask_in = np.ascontiguousarray(mask)[None, None].astype(np.float32) / np.float32(255.0)
+        mask_in = (mask_in >= 0.5).astype(np.float32)
+        img_in = np.ascontiguousarray(img_in * (1 - mask_in))
 
-        if device != "cpu":
-            img_t = img_t.to(device)
-            mask_t = mask_t.to(device)
-
-        img_t = img_t * (1 - mask_t)
+        out_nchw = forward(img_in, mask_in)
 
-        with torch.no_grad():
-            out_t = model(img_t, mask_t)
-
-        out = (out_t.detach().cpu().squeeze(0).permute(1, 2, 0).numpy() + 1.0) * 127.5
+        out = (np.asarray(out_nchw)[0].transpose(1, 2, 0) + 1.0) * 127.5
         out = np.clip(np.round(out), 0, 255).astype(np.uint8)
 
         if pad_bottom > 0:
@@ -710,57 +805,23 @@ def _to_int(value: Any, default: int) -> int:
 
 
 def _resolve_selected_backend_device(fallback: str) -> str:
-    fallback_norm = _normalize_backend_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-
-    normalized = _normalize_backend_device(configured, fallback_norm)
-    available = _safe_available_devices()
-
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    if "mps" in available:
-        return "mps"
-    return "cpu"
-
-
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    value = value.strip().lower()
-    if value == "not-selected":
-        return None
-    return value or None
+    return resolve_backend_device(fallback, accept_mps=True, mps_fallback=True)
 
 
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
+def _torch_forward(model: AOTGenerator, device: str) -> Callable[[np.ndarray, np.ndarray], np.ndarray]:
+    torch = _torch()
 
+    def forward(img: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        img_t = torch.from_numpy(img)
+        mask_t = torch.from_numpy(mask)
+        if device != "cpu":
+            img_t = img_t.to(device)
+            mask_t = mask_t.to(device)
+        with torch.no_grad():
+            out_t = model(img_t, mask_t)
+        return out_t.detach().cpu().numpy()
 
-def _normalize_backend_device(raw: str, fallback: str) -> str:
-    value = str(raw or "").strip().lower()
-    if value in {"cpu", "mps", "cuda"}:
-        return value
-    if value.startswith("cuda:"):
-        return value
-    return str(fallback or "cpu").strip().lower() or "cpu"
+    return forward
 
 
 def _clear_torch_cache() -> None:
@@ -0,0 +1,232 @@
+"""
+File: modules/ai_backend/benchmarks/bench_detect_postprocess.py
+
+Purpose:
+Microbenchmark for detector heatmap post-processing (`detect_postprocess.py`)
+on a dense, ultra-tall webtoon-like heatmap (default 1280x20000).
+
+Main responsibilities:
+- time the per-label Surya loop and the per-contour PaddleOCR DB loop used
+  before against the current shared, vectorized post-processing;
+- verify both produce identical boxes, scores and masks before reporting;
+- print label / contour counts, timings and speedups.
+
+Run:
+    python -m modules.ai_backend.benchmarks.bench_detect_postprocess [--width 1280] [--height 20000]
+
+Notes:
+Needs numpy, OpenCV and pyclipper only; Surya's dynamic thresholds are
+replaced by fixed `text_threshold` / `low_text` values.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+
+import cv2
+import numpy as np
+import pyclipper
+
+from modules.ai_backend.paddle_onnx_runtime import DBPostProcess
+from modules.ai_backend.surya_text_detector_service import _boxes_from_linemap
+
+SURYA_TEXT_THRESHOLD = 0.6
+SURYA_LOW_TEXT = 0.35
+
+
+def synthetic_heatmap(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Rows of word-like blobs with varied peak scores plus low background noise."""
+    rng = np.random.default_rng(seed)
+    heatmap = np.zeros((height, width), dtype=np.float32)
+    for top in range(10, height - 30, 40):
+        for left in range(20, width - 110, 130):
+            right = left + int(rng.integers(20, 110))
+            heatmap[top : top + 18, left:right] = rng.uniform(0.2, 0.95)
+    heatmap = cv2.GaussianBlur(heatmap, (7, 7), 2)
+    heatmap += rng.random((height, width), dtype=np.float32) * 0.37
+    np.clip(heatmap, 0.0, 1.0, out=heatmap)
+    return heatmap
+
+
+def _legacy_surya(linemap: np.ndarray, text_threshold: float, low_text: float):
+    """The per-label loop `_extract_mask_and_boxes` used before (thresholds fixed)."""
+    img_h, img_w = linemap.shape
+    text_score_comb = (linemap > low_text).astype(np.uint8)
+    label_count, labels, stats, _ = cv2.connectedComponentsWithStats(text_score_comb, connectivity=4)
+    det: list[np.ndarray] = []
+    confidences: list[float] = []
+    binary_mask = np.zeros((img_h, img_w), dtype=np.uint8)
+    for label_idx in range(1, label_count):
+        if int(stats[label_idx, cv2.CC_STAT_AREA]) < 10:
+            continue
+        x, y, width, height = [
+            int(value)
+            for value in stats[
+                label_idx,
+                [cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT],
+            ]
+        ]
+        niter = int(np.sqrt(min(width, height)))
+        sx = max(0, x - niter - 1)
+        sy = max(0, y - niter - 1)
+        ex = min(img_w, x + width + niter + 1)
+        ey = min(img_h, y + height + niter + 1)
+        component_mask = labels[sy:ey, sx:ex] == label_idx
+        selected_linemap = linemap[sy:ey, sx:ex][component_mask]
+        if selected_linemap.size == 0:
+            continue
+        line_max = float(np.max(selected_linemap))
+        if line_max < text_threshold:
+            continue
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(1, 1 + niter),) * 2)
+        selected_segmap = cv2.dilate(component_mask.astype(np.uint8), kernel)
+        binary_mask[sy:ey, sx:ex][selected_segmap > 0] = 255
+        y_inds, x_inds = np.nonzero(selected_segmap)
+        np_contours = np.column_stack((x_inds + sx, y_inds + sy))
+        box = cv2.boxPoints(cv2.minAreaRect(np_contours))
+        edge_w = np.linalg.norm(box[0] - box[1])
+        edge_h = np.linalg.norm(box[1] - box[2])
+        if abs(1 - max(edge_w, edge_h) / (min(edge_w, edge_h) + 1e-5)) <= 0.1:
+            left, top = np_contours.min(axis=0)
+            right, bottom = np_contours.max(axis=0)
+            box = np.array(
+                [[left, top], [right, top], [right, bottom], [left, bottom]], dtype=np.float32
+            )
+        box = np.roll(box, 4 - box.sum(axis=1).argmin(), 0)
+        det.append(box)
+        confidences.append(line_max)
+    return det, confidences, binary_mask, int(max(0, label_count - 1))
+
+
+def _legacy_mini_box(contour: np.ndarray) -> tuple[np.ndarray, float]:
+    bounding_box = cv2.minAreaRect(contour)
+    points = sorted(list(cv2.boxPoints(bounding_box)), key=lambda item: item[0])
+    index_1, index_4 = (0, 1) if points[1][1] > points[0][1] else (1, 0)
+    index_2, index_3 = (2, 3) if points[3][1] > points[2][1] else (3, 2)
+    box = [points[index_1], points[index_2], points[index_3], points[index_4]]
+    return np.array(box, dtype=np.float32), float(min(bounding_box[1]))
+
+
+def _legacy_box_score(bitmap: np.ndarray, box: np.ndarray) -> float:
+    h, w = bitmap.shape[:2]
+    xmin = max(0, min(math.floor(float(box[:, 0].min())), w - 1))
+    xmax = max(0, min(math.ceil(float(box[:, 0].max())), w - 1))
+    ymin = max(0, min(math.floor(float(box[:, 1].min())), h - 1))
+    ymax = max(0, min(math.ceil(float(box[:, 1].max())), h - 1))
+    mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype=np.uint8)
+    local = box.copy()
+    local[:, 0] -= xmin
+    local[:, 1] -= ymin
+    cv2.fillPoly(mask, local.reshape(1, -1, 2).astype(np.int32), 1)
+    return float(cv2.mean(bitmap[ymin : ymax + 1, xmin : xmax + 1], mask)[0])
+
+
+def _legacy_paddle(post: DBPostProcess, pred: np.ndarray):
+    """The per-contour loop `DBPostProcess._boxes_from_bitmap` used before (same size output)."""
+    bitmap = (pred > post.thresh).astype(np.uint8)
+    dest_h, dest_w = pred.shape
+    contours, _ = cv2.findContours(bitmap * 255, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    boxes: list[np.ndarray] = []
+    scores: list[float] = []
+    for contour in contours[: post.max_candidates]:
+        points_np, short_side = _legacy_mini_box(contour)
+        if short_side < post.min_size:
+            continue
+        score = _legacy_box_score(pred, points_np)
+        if score < post.box_thresh:
+            continue
+        area = float(cv2.contourArea(points_np))
+        length = float(cv2.arcLength(points_np, True))
+        if length < 1e-6:
+            continue
+        offset = pyclipper.PyclipperOffset()
+        offset.AddPath(points_np.tolist(), pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
+        expanded = offset.Execute(area * post.unclip_ratio / length)
+        if not expanded:
+            continue
+        box_np, short_side = _legacy_mini_box(np.array(expanded[0], dtype=np.float32).reshape(-1, 1, 2))
+        if short_side < post.min_size + 2:
+            continue
+        box_np[:, 0] = np.clip(np.round(box_np[:, 0]), 0, dest_w)
+        box_np[:, 1] = np.clip(np.round(box_np[:, 1]), 0, dest_h)
+        boxes.append(box_np)
+        scores.append(float(score))
+    return boxes, scores
+
+
+def _same_surya(a, b) -> bool:
+    return (
+        a[3] == b[3]
+        and a[1] == b[1]
+        and np.array_equal(a[2], b[2])
+        and len(a[0]) == len(b[0])
+        and all(np.array_equal(x, y) for x, y in zip(a[0], b[0]))
+    )
+
+
+def _same_paddle(a, b) -> bool:
+    return (
+        a[1] == b[1]
+        and len(a[0]) == len(b[0])
+        and all(np.array_equal(x, y) for x, y in zip(a[0], b[0]))
+    )
+
+
+def _best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    heatmap = synthetic_heatmap(args.width, args.height)
+    post = DBPostProcess(max_candidates=100_000_000)
+    h, w = heatmap.shape
+
+    def surya_new():
+        return _boxes_from_linemap(
+            cv2, heatmap, text_threshold=SURYA_TEXT_THRESHOLD, low_text=SURYA_LOW_TEXT
+        )
+
+    def surya_old():
+        return _legacy_surya(heatmap, SURYA_TEXT_THRESHOLD, SURYA_LOW_TEXT)
+
+    def paddle_new():
+        return post.process_single(heatmap, h, w)
+
+    def paddle_old():
+        return _legacy_paddle(post, heatmap)
+
+    surya_result = surya_new()
+    paddle_result = paddle_new()
+    if not _same_surya(surya_result, surya_old()):
+        raise SystemExit("Surya post-processing disagrees; refusing to report timings.")
+    if not _same_paddle(paddle_result, paddle_old()):
+        raise SystemExit("Paddle post-processing disagrees; refusing to report timings.")
+
+    print(f"heatmap: {w}x{h} float32")
+    for name, new_fn, old_fn, detail in (
+        ("surya ", surya_new, surya_old, f"labels={surya_result[3]} boxes={len(surya_result[0])}"),
+        ("paddle", paddle_new, paddle_old, f"boxes={len(paddle_result[0])}"),
+    ):
+        old_s = _best_of(old_fn, args.repeats)
+        new_s = _best_of(new_fn, args.repeats)
+        print(f"{name} {detail}")
+        print(f"  legacy loop: {old_s * 1e3:9.1f} ms")
+        print(f"  vectorized : {new_s * 1e3:9.1f} ms")
+        print(f"  speedup    : {old_s / new_s:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
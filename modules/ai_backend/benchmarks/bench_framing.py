@@ -0,0 +1,166 @@
+"""
+File: modules/ai_backend/benchmarks/bench_framing.py
+
+Purpose:
+Round-trip microbenchmark for the IPC frame codec (`ipc/framing.py`) over an
+AF_UNIX `socketpair`, comparing the join/chunk-list codec used before with the
+current scatter-gather write / `readinto` read path.
+
+Main responsibilities:
+- count blob-sized buffers each path allocates per frame (tracemalloc peak
+  divided by the blob size) for the write and the read side separately;
+- time a stream of frames through a real socket pair and report MiB/s;
+- verify both paths deliver identical frames before reporting.
+
+Run:
+    python -m modules.ai_backend.benchmarks.bench_framing [--blob-mib 32] [--frames 16]
+
+Notes:
+Standard library only. The read-side count includes the one buffer the
+handler receives, so the floor there is 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import socket
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from modules.ai_backend.ipc import framing
+
+HEADER = {"v": 2, "id": 1, "kind": "response", "status": "ok", "width": 4096, "height": 2048}
+
+
+def _legacy_write_frame(writer: Any, header: dict[str, Any], blob: bytes = b"", sock: Any = None) -> None:
+    """The write path used before: whole frame joined in memory, then write-all."""
+    framing._write_all(writer, framing.encode_frame(header, blob))
+    writer.flush()
+
+
+def _legacy_read_exactly(reader: Any, n: int) -> bytes:
+    chunks: list[bytes] = []
+    remaining = n
+    while remaining > 0:
+        chunk = reader.read(remaining)
+        if not chunk:
+            raise framing.FrameError("Unexpected EOF.")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+def _legacy_read_frame(reader: Any) -> tuple[dict[str, Any], bytes]:
+    """The read path used before: chunk list per segment, joined at the end."""
+    import json
+
+    (header_len,) = framing._LEN_STRUCT.unpack(_legacy_read_exactly(reader, 4))
+    header = json.loads(_legacy_read_exactly(reader, header_len).decode("utf-8"))
+    (blob_len,) = framing._LEN_STRUCT.unpack(_legacy_read_exactly(reader, 4))
+    return header, _legacy_read_exactly(reader, blob_len) if blob_len else b""
+
+
+PATHS: dict[str, tuple[Callable[..., None], Callable[[Any], tuple[dict[str, Any], Any]]]] = {
+    "legacy": (_legacy_write_frame, _legacy_read_frame),
+    "vectored": (framing.write_frame, framing.read_frame),
+}
+
+
+class _NullWriter:
+    def write(self, data: Any) -> int:
+        return memoryview(data).nbytes
+
+    def flush(self) -> None:
+        pass
+
+
+class _NullSocket:
+    def sendmsg(self, buffers: list[memoryview]) -> int:
+        return sum(buf.nbytes for buf in buffers)
+
+
+def _traced_peak(fn: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def write_copies(path: str, blob_size: int) -> float:
+    """Blob-sized buffers allocated while writing one frame (socket sink)."""
+    write, _read = PATHS[path]
+    blob = bytes(blob_size)
+    return _traced_peak(lambda: write(_NullWriter(), HEADER, blob, _NullSocket())) / blob_size
+
+
+def read_copies(path: str, blob_size: int) -> float:
+    """Blob-sized buffers allocated while reading one frame off a socket."""
+    _write, read = PATHS[path]
+    frame = framing.encode_frame(HEADER, bytes(blob_size))
+    srv, cli = socket.socketpair()
+    feeder = threading.Thread(target=srv.sendall, args=(frame,), daemon=True)
+    try:
+        reader = cli.makefile("rb", buffering=0)
+        feeder.start()
+        peak = _traced_peak(lambda: read(reader))
+        feeder.join()
+        return peak / blob_size
+    finally:
+        srv.close()
+        cli.close()
+
+
+def round_trip(path: str, blob_size: int, frames: int) -> tuple[float, list[int]]:
+    """Streams `frames` frames through a socketpair; returns `(seconds, blob lengths)`."""
+    write, read = PATHS[path]
+    blob = bytes(range(256)) * (blob_size // 256) + bytes(blob_size % 256)
+    srv, cli = socket.socketpair()
+    writer = srv.makefile("wb", buffering=0)
+    reader = cli.makefile("rb", buffering=0)
+    received: list[int] = []
+
+    def produce() -> None:
+        for idx in range(frames):
+            write(writer, {**HEADER, "id": idx}, blob, srv)
+
+    try:
+        started = time.perf_counter()
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        for idx in range(frames):
+            header, got = read(reader)
+            if header["id"] != idx or got != blob:
+                raise SystemExit(f"{path}: frame {idx} corrupted; refusing to report timings.")
+            received.append(len(got))
+        producer.join()
+        return time.perf_counter() - started, received
+    finally:
+        srv.close()
+        cli.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--blob-mib", type=int, default=32)
+    parser.add_argument("--frames", type=int, default=16)
+    args = parser.parse_args()
+
+    blob_size = args.blob_mib << 20
+    print(f"blob: {args.blob_mib} MiB x {args.frames} frames over AF_UNIX socketpair")
+    for path in PATHS:
+        seconds, _ = round_trip(path, blob_size, args.frames)
+        mib_s = args.blob_mib * args.frames / seconds
+        print(
+            f"{path:9s} write buffers/frame: {write_copies(path, blob_size):4.2f}  "
+            f"read buffers/frame: {read_copies(path, blob_size):4.2f}  "
+            f"throughput: {mib_s:8.1f} MiB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
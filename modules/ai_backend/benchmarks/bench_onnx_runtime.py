@@ -0,0 +1,110 @@
+"""
+File: modules/ai_backend/benchmarks/bench_onnx_runtime.py
+
+Purpose:
+CPU latency and output parity of the AOT generator on torch vs ONNX Runtime
+(`onnx_export.py` + `torch_onnx_runtime.py`).
+
+Main responsibilities:
+- build a seeded `AOTGenerator` (random weights, so no checkpoint is needed),
+  export it with dynamic spatial axes and open it with `OnnxSessionRunner` on
+  `CPUExecutionProvider`;
+- run both through the service's shared pre/post-processing
+  (`AotInpaintService._inpaint_locked`) on the same synthetic page;
+- report median latency per runtime and the max / mean absolute uint8 difference.
+
+Run:
+    python -m modules.ai_backend.benchmarks.bench_onnx_runtime [--size 512] [--repeats 5]
+
+Notes:
+Needs torch (export and the torch side) and onnxruntime.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from modules.ai_backend.aot_inpaint_service import AOTGenerator, AotInpaintService, _torch_forward
+from modules.ai_backend.model_manager import LoadedModelManager
+from modules.ai_backend.onnx_export import export_inpaint_module
+from modules.ai_backend.paddle_onnx_runtime import OnnxSessionRunner, ProviderSettings
+from modules.ai_backend.torch_onnx_runtime import aot_onnx_forward
+
+CPU = ProviderSettings(provider="CPUExecutionProvider")
+
+
+def synthetic_case(size: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """A textured RGB page with two rectangular holes."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:size, 0:size]
+    base = np.stack([(xx * 255) // size, (yy * 255) // size, ((xx + yy) * 127) // size], axis=-1)
+    image = np.clip(base + rng.integers(-20, 20, base.shape), 0, 255).astype(np.uint8)
+    mask = np.zeros((size, size), dtype=np.uint8)
+    mask[size // 8 : size // 3, size // 6 : size // 2] = 255
+    mask[size // 2 : size * 3 // 4, size // 2 : size * 7 // 8] = 255
+    return image, mask
+
+
+def build_aot_pair(tmp_dir: Path, seed: int = 0) -> tuple[Any, OnnxSessionRunner]:
+    import torch
+
+    torch.manual_seed(seed)
+    model = AOTGenerator(in_ch=4, out_ch=3, ch=32).eval()
+    onnx_path = export_inpaint_module(model, Path(tmp_dir) / "aot.onnx")
+    return model, OnnxSessionRunner(onnx_path, CPU)
+
+
+def median_ms(fn: Callable[[], Any], repeats: int) -> float:
+    fn()  # warm-up: first-call allocations / graph setup
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+def compare(size: int = 512, repeats: int = 5) -> dict[str, float]:
+    image, mask = synthetic_case(size)
+    service = AotInpaintService(LoadedModelManager())
+    with tempfile.TemporaryDirectory() as tmp:
+        model, runner = build_aot_pair(Path(tmp))
+
+        def run(forward: Callable[[np.ndarray, np.ndarray], np.ndarray]) -> np.ndarray:
+            return service._inpaint_locked(forward, image_rgb=image, mask_u8=mask, inpaint_size=2048)
+
+        torch_forward = _torch_forward(model, "cpu")
+        onnx_forward = aot_onnx_forward(runner)
+        torch_out = run(torch_forward)
+        onnx_out = run(onnx_forward)
+        diff = np.abs(torch_out.astype(np.int16) - onnx_out.astype(np.int16))
+        return {
+            "torch_ms": median_ms(lambda: run(torch_forward), repeats),
+            "onnx_ms": median_ms(lambda: run(onnx_forward), repeats),
+            "max_abs_diff": float(diff.max()),
+            "mean_abs_diff": float(diff.mean()),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    result = compare(args.size, args.repeats)
+    print(f"AOT {args.size}x{args.size} on CPU, median of {args.repeats}:")
+    print(f"  torch        {result['torch_ms']:9.1f} ms")
+    print(f"  onnxruntime  {result['onnx_ms']:9.1f} ms  ({result['torch_ms'] / result['onnx_ms']:.2f}x)")
+    print(f"  |diff| max {result['max_abs_diff']:.0f}, mean {result['mean_abs_diff']:.4f} (uint8)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+File: modules/ai_backend/benchmarks/bench_ort_session.py
+
+Purpose:
+Session start-up time and first-inference latency of one ONNX model with the
+previous default `SessionOptions` vs a `SessionProfile` with a cold and a warm
+optimized-model cache (`onnx_session_profiles.py`).
+
+Main responsibilities:
+- `before`: `SessionOptions` with only `ORT_ENABLE_ALL`, as `OnnxSessionRunner`
+  used to build them;
+- `after_cold`: the profile on an empty cache (optimizes and writes the graph);
+- `after_warm`: the profile again, loading the persisted optimized graph, i.e.
+  what every later process start pays;
+- feed random inputs built from the model's input metadata (dynamic dims take
+  `--dim`) and report median session / first-run milliseconds per variant.
+
+Run:
+    python -m modules.ai_backend.benchmarks.bench_ort_session [--model path.onnx] [--profile lama] [--dim 512] [--repeats 3]
+
+Notes:
+Without `--model` the ONNX Runtime example `sigmoid.onnx` is used, which only
+checks the plumbing; pass an exported LaMa / AOT / PaddleOCR model for real numbers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from modules.ai_backend.onnx_session_profiles import OptimizedModelCache, resolve_profile
+from modules.ai_backend.paddle_onnx_runtime import OnnxSessionRunner, ProviderSettings, ort
+
+CPU = ProviderSettings(provider="CPUExecutionProvider")
+VARIANTS = ("before", "after_cold", "after_warm")
+
+_ORT_DTYPES = {"tensor(float)": np.float32, "tensor(float16)": np.float16, "tensor(int64)": np.int64}
+
+
+def default_model() -> Path:
+    from onnxruntime import datasets
+
+    return Path(datasets.get_example("sigmoid.onnx"))
+
+
+def random_feeds(session: Any, dim: int, seed: int = 0) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    feeds = {}
+    for meta in session.get_inputs():
+        shape = [value if isinstance(value, int) and value > 0 else (1 if index == 0 else dim)
+                 for index, value in enumerate(meta.shape)]
+        dtype = _ORT_DTYPES.get(meta.type, np.float32)
+        feeds[meta.name] = rng.random(shape).astype(dtype)
+    return feeds
+
+
+def _measure_before(model_path: Path, dim: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(str(model_path), sess_options=options, providers=[CPU.provider])
+    session_ms = (time.perf_counter() - started) * 1000.0
+    feeds = random_feeds(session, dim)
+    started = time.perf_counter()
+    session.run(None, feeds)
+    return session_ms, (time.perf_counter() - started) * 1000.0
+
+
+def _measure_profile(model_path: Path, profile: str, cache: OptimizedModelCache, dim: int) -> tuple[float, float, str]:
+    runner = OnnxSessionRunner(model_path, CPU, profile=resolve_profile(profile), optimized_cache=cache)
+    runner.run_feeds(random_feeds(runner._session, dim))
+    return runner.session_ms, float(runner.first_run_ms or 0.0), runner.optimized_cache_status
+
+
+def compare(model_path: Path | None = None, profile: str = "default", dim: int = 64, repeats: int = 3) -> dict[str, Any]:
+    model_path = Path(model_path) if model_path is not None else default_model()
+    samples: dict[str, list[tuple[float, float]]] = {name: [] for name in VARIANTS}
+    statuses: dict[str, set[str]] = {name: set() for name in VARIANTS[1:]}
+    for _ in range(repeats):
+        samples["before"].append(_measure_before(model_path, dim))
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in VARIANTS[1:]:
+                # A fresh cache object per variant: the warm run reads the digest
+                # index and the optimized graph from disk like a restarted backend.
+                *timings, status = _measure_profile(model_path, profile, OptimizedModelCache(Path(tmp)), dim)
+                samples[name].append(tuple(timings))
+                statuses[name].add(status)
+    result: dict[str, Any] = {"model": str(model_path), "profile": profile}
+    for name, values in samples.items():
+        result[f"{name}_session_ms"] = statistics.median(value[0] for value in values)
+        result[f"{name}_first_run_ms"] = statistics.median(value[1] for value in values)
+    result["cache_status"] = {name: sorted(values) for name, values in statuses.items()}
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--model", type=Path, default=None)
+    parser.add_argument("--profile", default="default")
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    result = compare(args.model, args.profile, args.dim, args.repeats)
+    print(f"{result['model']} (profile {result['profile']}), median of {args.repeats}:")
+    print(f"  {'variant':<12} {'session':>10} {'first run':>10}")
+    for name in VARIANTS:
+        print(f"  {name:<12} {result[f'{name}_session_ms']:8.1f}ms {result[f'{name}_first_run_ms']:8.1f}ms")
+    print(f"  optimized cache: {result['cache_status']}")
+
+
+if __name__ == "__main__":
+    main()
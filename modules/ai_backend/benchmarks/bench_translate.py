@@ -0,0 +1,155 @@
+"""
+File: modules/ai_backend/benchmarks/bench_translate.py
+
+Purpose:
+Benchmark for batch machine translation (`translation_executor.py`) against a
+local HTTP translator stub with artificial per-request latency.
+
+Main responsibilities:
+- time the path used before (a new translator instance per line, one request
+  per line, strictly sequential) against `TranslationExecutor` (pooled
+  instances, line joining, bounded concurrency under a rate limit);
+- verify both return the same translations before reporting;
+- print wall time, requests sent and translator instances built.
+
+Run:
+    python -m modules.ai_backend.benchmarks.bench_translate [--lines 60] [--latency-ms 80]
+
+Notes:
+Standard library only; the stub "translates" a line by wrapping it in
+brackets and keeps newlines, like the web translators do.
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules.ai_backend.translation_executor import ProviderLimits, TranslationExecutor
+
+# Google-like limits, but a higher rate so the benchmark measures latency, not the bucket.
+BENCH_LIMITS = ProviderLimits(requests_per_s=50.0, burst=10, concurrency=4, join_chars=1800)
+
+
+class StubServer:
+    """ThreadingHTTPServer on 127.0.0.1 that answers `POST /` after `latency_s`."""
+
+    def __init__(self, latency_s: float) -> None:
+        latency = latency_s
+        counter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802 - http.server API
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+                time.sleep(latency)
+                with counter.lock:
+                    counter.requests += 1
+                reply = "\n".join(f"[{line}]" for line in body.split("\n")).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class HttpStubTranslator:
+    """deep_translator-shaped client for `StubServer`; counts constructed instances."""
+
+    instances = 0
+    url = ""
+
+    def __init__(self, source: str = "auto", target: str = "ru") -> None:
+        type(self).instances += 1
+        self.target = target
+
+    def translate(self, text: str) -> str:
+        request = urllib.request.Request(self.url, data=text.encode("utf-8"), method="POST")
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.read().decode("utf-8")
+
+
+def synthetic_lines(count: int) -> list[str]:
+    """Short bubble-like lines, as a chapter's OCR output looks after dedup."""
+    return [f"line {idx}: {'word ' * (idx % 7 + 1)}".strip() for idx in range(count)]
+
+
+def run_sequential(texts: list[str]) -> list[str]:
+    """The previous path: one fresh translator and one request per line."""
+    return [HttpStubTranslator(target="ru").translate(text) for text in texts]
+
+
+def run_executor(texts: list[str], *, join_lines: bool = True) -> list[str]:
+    executor = TranslationExecutor({"stub": BENCH_LIMITS}, backoff_s=0.0)
+    try:
+        outcomes = executor.translate(
+            "stub", "stub", lambda: HttpStubTranslator(target="ru"), texts, join_lines=join_lines
+        )
+    finally:
+        executor.shutdown()
+    failed = [text for ok, text in outcomes if not ok]
+    if failed:
+        raise SystemExit(f"executor: {len(failed)} lines failed: {failed[0]}")
+    return [text for _, text in outcomes]
+
+
+def measure(fn, server: StubServer) -> tuple[float, int, int, list[str]]:
+    """Runs `fn`; returns `(seconds, requests, instances, translations)`."""
+    HttpStubTranslator.instances = 0
+    with server.lock:
+        server.requests = 0
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    return seconds, server.requests, HttpStubTranslator.instances, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--lines", type=int, default=60)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    args = parser.parse_args()
+
+    texts = synthetic_lines(args.lines)
+    server = StubServer(args.latency_ms / 1000.0)
+    HttpStubTranslator.url = server.url
+    try:
+        runs = {
+            "sequential": lambda: run_sequential(texts),
+            "concurrent": lambda: run_executor(texts, join_lines=False),
+            "joined": lambda: run_executor(texts),
+        }
+        print(f"{args.lines} lines, {args.latency_ms:.0f} ms per request")
+        baseline = None
+        for name, fn in runs.items():
+            seconds, requests, instances, result = measure(fn, server)
+            if baseline is None:
+                baseline = (seconds, result)
+            elif result != baseline[1]:
+                raise SystemExit(f"{name}: translations differ; refusing to report timings.")
+            print(
+                f"{name:10s} {seconds * 1000:8.1f} ms  requests: {requests:4d}  "
+                f"translators: {instances:4d}  speedup: {baseline[0] / seconds:5.1f}x"
+            )
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
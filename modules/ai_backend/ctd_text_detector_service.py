@@ -7,7 +7,11 @@ Comic Text Detector service adapter for the Python AI backend.
 Main responsibilities:
 - load CTD models lazily;
 - synchronize model device with backend AI device settings;
-- run detection and return masks/blocks to Rust.
+- run detection and return masks/blocks to Rust;
+- `detect_image_array` for in-process callers holding a decoded RGB array
+  (the mask comes back as an array, not PNG);
+- run the exported detector on ONNX Runtime (`CTDModel(net=CtdOnnxNet)`) when
+  the request runtime (`torch_onnx_runtime.py`) resolves to `onnx`.
 """
 
 from __future__ import annotations
@@ -19,18 +23,24 @@ from typing import Any
 
 import numpy as np
 
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
 from config import TEXT_DETECTOR_DIR
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
 
+from .detect_tiling import detect_strip, normalize_tile_params, should_tile
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import check_rgb_array
 from .model_manager import LoadedModelManager
+from .paddle_onnx_runtime import RuntimeFactory
+from .torch_onnx_runtime import (
+    RUNTIME_ONNX,
+    CtdOnnxNet,
+    configured_runtime,
+    ctd_onnx_path,
+    normalize_runtime,
+    onnx_session,
+    require_onnx_model,
+    select_runtime,
+)
 
 MODEL_FILENAME = "comictextdetector.pt"
 
@@ -42,6 +52,9 @@ MODEL_FILENAME = "comictextdetector.pt"
 # - запуск детекции страницы с постобработкой bbox и mask.
 # - нормализация runtime-параметров детектора.
 # - синхронизация `device` с backend-настройкой `General.ai_device`.
+# - потоковая детекция сверхвысоких полос окнами (`detect_tiling.py`).
+# - runtime `onnx`: экспортированный детектор через `RuntimeFactory`
+#   (`torch_onnx_runtime.py`), та же пре/постобработка `CTDModel`.
 # ============================================================================
 
 
@@ -59,19 +72,6 @@ def _to_float(value: Any, default: float) -> float:
         return default
 
 
-def _normalize_device(raw: Any, fallback: str) -> str:
-    if raw is None:
-        return fallback
-    value = str(raw).strip().lower()
-    if not value:
-        return fallback
-    if value == "cpu" or value.startswith("cuda"):
-        return value
-    if fallback == "cpu" or str(fallback).startswith("cuda"):
-        return str(fallback)
-    return "cpu"
-
-
 def _default_device() -> str:
     try:
         import torch  # type: ignore
@@ -104,10 +104,21 @@ def _clear_torch_cache() -> None:
         pass
 
 
+HEALTH_SOURCE = "text_detector.ctd"
+
+
 class CtdTextDetectorService:
-    def __init__(self, model_manager: LoadedModelManager) -> None:
+    _active_params = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
+    def __init__(
+        self,
+        model_manager: LoadedModelManager,
+        runtime_factory: RuntimeFactory | None = None,
+    ) -> None:
         self._lock = threading.RLock()
         self._model_manager = model_manager
+        self._runtime_factory = runtime_factory or RuntimeFactory(model_manager)
         self._detector = None
         self._detector_model_key: str | None = None
         self._cv2 = None
@@ -122,6 +133,8 @@ class CtdTextDetectorService:
             "font size max": -1.0,
             "font size min": -1.0,
             "mask dilate size": 2,
+            "runtime": configured_runtime(),
+            **normalize_tile_params(None),
         }
 
     def health(self) -> dict[str, Any]:
@@ -131,6 +144,8 @@ class CtdTextDetectorService:
                 "model": "ctd",
                 "model_path": str(self._model_path),
                 "model_exists": self._model_path.exists(),
+                "onnx_model_path": str(ctd_onnx_path()),
+                "onnx_model_exists": ctd_onnx_path().is_file(),
                 "params": dict(self._active_params),
                 "last_error": self._last_error,
             }
@@ -138,35 +153,44 @@ class CtdTextDetectorService:
     def detect_page(
         self, page_path: str, *, params: dict[str, Any] | None = None
     ) -> dict[str, Any]:
-        normalized = self._normalize_params(params)
-        model_key = self._model_key_for(normalized)
-        lease = self._model_manager.begin_model_use(
-            model_key,
-            unload_callback=lambda: self._unload_key(model_key),
-        )
-        with self._lock:
-            try:
-                detector = self._ensure_detector_locked(normalized)
-                # cv2.imread на Windows не поддерживает не-ASCII пути (кириллица и т.д.),
-                # поэтому читаем байты через pathlib и декодируем через imdecode.
-                raw = Path(page_path).read_bytes()
-                payload = self._detect_from_encoded_image_bytes(raw, detector, normalized)
-                if lease.needs_load:
-                    lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
-                self._last_error = None
-                return payload
-            except Exception as exc:
-                if lease.needs_load:
-                    lease.mark_load_failed()
-                self._last_error = str(exc)
-                raise
-            finally:
-                lease.release()
+        # cv2.imread на Windows не поддерживает не-ASCII пути (кириллица и т.д.),
+        # поэтому читаем байты через pathlib и декодируем через imdecode.
+        return self.detect_image_bytes(Path(page_path).read_bytes(), params=params)
 
     def detect_image_bytes(
         self, image_bytes: bytes, *, params: dict[str, Any] | None = None
     ) -> dict[str, Any]:
+        cv2 = self._ensure_cv2()
+        image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise FileNotFoundError("Не удалось открыть изображение.")
+        payload = self._detect_bgr(image, params)
+        payload["mask_png"] = self._encode_mask_png_bytes(payload.pop("mask_u8"))
+        return payload
+
+    def detect_image_array(
+        self, image_rgb: np.ndarray, *, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """Same as `detect_image_bytes` for a decoded `(H, W, 3)` uint8 RGB array.
+
+        The result carries the binary text mask as `mask_u8` (`(H, W)` 0/255,
+        or None when the model produced no mask) instead of `mask_png`.
+        """
+        check_rgb_array(image_rgb)
+        cv2 = self._ensure_cv2()
+        return self._detect_bgr(cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR), params)
+
+    def _detect_bgr(self, image_bgr: np.ndarray, params: dict[str, Any] | None) -> dict[str, Any]:
         normalized = self._normalize_params(params)
+        runtime = select_runtime(normalized["runtime"], ctd_onnx_path(), normalized["device"])
+        if runtime == RUNTIME_ONNX:
+            payload = self._detect_bgr_onnx(image_bgr, normalized)
+        else:
+            payload = self._detect_bgr_torch(image_bgr, normalized)
+        payload["runtime"] = runtime
+        return payload
+
+    def _detect_bgr_torch(self, image_bgr: np.ndarray, normalized: dict[str, Any]) -> dict[str, Any]:
         model_key = self._model_key_for(normalized)
         lease = self._model_manager.begin_model_use(
             model_key,
@@ -175,9 +199,7 @@ class CtdTextDetectorService:
         with self._lock:
             try:
                 detector = self._ensure_detector_locked(normalized)
-                payload = self._detect_from_encoded_image_bytes(
-                    image_bytes, detector, normalized
-                )
+                payload = self._detect_image(image_bgr, detector, normalized)
                 if lease.needs_load:
                     lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
                 self._last_error = None
@@ -190,6 +212,31 @@ class CtdTextDetectorService:
             finally:
                 lease.release()
 
+    def _detect_bgr_onnx(self, image_bgr: np.ndarray, normalized: dict[str, Any]) -> dict[str, Any]:
+        try:
+            from .textdetector.ctd import CTDModel  # heavy import; keep lazy
+
+            model_path = require_onnx_model(ctd_onnx_path(), "CTD")
+            with onnx_session(self._runtime_factory, model_path, "ctd") as runner:
+                # Cheap to build: the session is cached by the factory, and a
+                # per-request detector never holds a runner past its lease.
+                detector = CTDModel(
+                    str(model_path),
+                    detect_size=int(normalized["detect_size"]),
+                    device=str(normalized["device"]),
+                    det_rearrange_max_batches=int(normalized["det_rearrange_max_batches"]),
+                    net=CtdOnnxNet(runner),
+                )
+                payload = self._detect_image(image_bgr, detector, normalized)
+        except Exception as exc:
+            with self._lock:
+                self._last_error = str(exc)
+            raise
+        with self._lock:
+            self._active_params = dict(normalized)
+            self._last_error = None
+        return payload
+
     def _normalize_params(self, params: dict[str, Any] | None) -> dict[str, Any]:
         merged = dict(self._active_params)
         if isinstance(params, dict):
@@ -215,9 +262,11 @@ class CtdTextDetectorService:
         merged["font size min"] = max(-1.0, min(500.0, merged["font size min"]))
         merged["mask dilate size"] = _to_int(merged.get("mask dilate size"), 2)
         merged["mask dilate size"] = max(0, min(30, merged["mask dilate size"]))
+        merged["runtime"] = normalize_runtime(merged.get("runtime"), configured_runtime())
+        merged.update(normalize_tile_params(merged))
         return merged
 
-    def _ensure_cv2_locked(self):
+    def _ensure_cv2(self):
         if self._cv2 is None:
             import cv2  # type: ignore
 
@@ -353,26 +402,40 @@ class CtdTextDetectorService:
             out = out[:2500]
         return out
 
-    def _detect_from_encoded_image_bytes(self, raw_bytes: bytes, detector, params: dict[str, Any]):
-        cv2 = self._ensure_cv2_locked()
-        raw = np.frombuffer(raw_bytes, dtype=np.uint8)
-        image = cv2.imdecode(raw, cv2.IMREAD_COLOR)
-        if image is None:
-            raise FileNotFoundError("Не удалось открыть изображение.")
-
-        _, mask_refined, blocks = detector(image)
-        self._apply_font_params(blocks, params)
+    def _detect_image(self, image, detector, params: dict[str, Any]):
+        h, w = image.shape[:2]
+        if should_tile(int(w), int(h), params):
+            # Detection, refinement and block grouping run per window, so the
+            # model and its float maps never see more than `tile_height` rows.
+            mask_refined, blocks, windows = detect_strip(
+                image,
+                lambda crop: self._detect_window(detector, crop, params),
+                tile_height=int(params["tile_height"]),
+                overlap=int(params["tile_overlap"]),
+            )
+            tiles = len(windows)
+        else:
+            _, mask_refined, blocks = detector(image)
+            self._apply_font_params(blocks, params)
+            tiles = 1
         mask_refined = self._apply_mask_dilate(mask_refined, params)
 
-        h, w = image.shape[:2]
         return {
             "source_size": [int(w), int(h)],
             "blocks": self._collect_blocks(blocks, int(w), int(h)),
-            "mask_png": self._encode_mask_png_bytes(mask_refined),
+            "mask_u8": self._binarize_mask(mask_refined),
+            "tiles": tiles,
         }
 
+    def _detect_window(self, detector, crop, params: dict[str, Any]):
+        _, mask_refined, blocks = detector(crop)
+        self._apply_font_params(blocks, params)
+        if mask_refined is not None:
+            mask_refined = self._ensure_cv2().convertScaleAbs(mask_refined)
+        return mask_refined, [(block.xyxy, block) for block in blocks or []]
+
     def _apply_mask_dilate(self, mask, params: dict[str, Any]):
-        cv2 = self._ensure_cv2_locked()
+        cv2 = self._ensure_cv2()
         if mask is None:
             return None
         try:
@@ -391,14 +454,23 @@ class CtdTextDetectorService:
         )
         return cv2.dilate(mask, element)
 
-    def _encode_mask_png_bytes(self, mask) -> bytes:
+    def _binarize_mask(self, mask):
         if mask is None:
-            return b""
-        cv2 = self._ensure_cv2_locked()
+            return None
+        cv2 = self._ensure_cv2()
         try:
             binary = cv2.convertScaleAbs(mask)
             _, binary = cv2.threshold(binary, 30, 255, cv2.THRESH_BINARY)
-            ok, encoded = cv2.imencode(".png", binary)
+            return binary
+        except Exception:
+            return None
+
+    def _encode_mask_png_bytes(self, mask) -> bytes:
+        if mask is None:
+            return b""
+        cv2 = self._ensure_cv2()
+        try:
+            ok, encoded = cv2.imencode(".png", mask)
             if not ok:
                 return b""
             return encoded.tobytes()
@@ -407,43 +479,4 @@ class CtdTextDetectorService:
 
 
 def _resolve_selected_backend_device(fallback: str) -> str:
-    fallback_norm = _normalize_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-
-    normalized = _normalize_device(configured, fallback_norm)
-    available = _safe_available_devices()
-
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    return "cpu"
-
-
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    value = value.strip().lower()
-    if value == "not-selected":
-        return None
-    return value or None
-
-
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
+    return resolve_backend_device(fallback)
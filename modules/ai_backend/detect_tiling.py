@@ -0,0 +1,308 @@
+"""
+File: modules/ai_backend/detect_tiling.py
+
+Purpose:
+Shared streaming (tiled) text-detection engine for ultra-tall webtoon strips,
+used by the CTD, Paddle and Surya text detector services.
+
+Main responsibilities:
+- decide whether a page should be detected in horizontal strip windows;
+- plan overlapping full-width windows down the strip, each owning a "core"
+  band of rows so every page row belongs to exactly one window;
+- run the service's per-window detection (detection, refinement and block
+  grouping all happen inside the window) and paste each window's core mask
+  rows into the page mask;
+- keep blocks that reach into the window core (or were cut by a window edge)
+  and merge them with their duplicate or counterpart from the neighbouring
+  window.
+
+Key structures:
+- `StripWindow`
+- `TileBlock`
+
+Key functions:
+- `normalize_tile_params()`
+- `should_tile()`
+- `plan_strip_windows()`
+- `detect_strip()`
+
+Notes:
+- Peak memory of the model and its float maps depends on the window size only;
+  the page-sized buffers left are the decoded input image and the uint8
+  output mask that is PNG-encoded for the response.
+- A block seen by two adjacent windows is merged when both copies were cut by
+  the seam between them, or when one copy covers at least half of the other
+  (a duplicate, or a cut piece of a block the other window saw whole).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# ============================================================================
+# STREAMING STRIP DETECTION
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `normalize_tile_params`: общие параметры `tiled_detection`/`tile_height`/
+#   `tile_overlap` для payload всех детекторов текста.
+# - `plan_strip_windows`: перекрывающиеся окна по высоте страницы с "ядрами".
+# - `detect_strip`: детекция по окнам, сборка маски из ядер окон и склейка
+#   блоков, разрезанных границей окна.
+# ============================================================================
+
+TILE_MODE_AUTO = "auto"
+TILE_MODE_ON = "on"
+TILE_MODE_OFF = "off"
+
+DEFAULT_TILE_HEIGHT = 2048
+DEFAULT_TILE_OVERLAP = 256
+MIN_TILE_HEIGHT = 512
+MAX_TILE_HEIGHT = 8192
+MIN_TILE_OVERLAP = 32
+# `auto` only tiles strips that are both tall and narrow; ordinary pages keep
+# the single-pass path (and CTD its own rearrangement for moderate strips).
+AUTO_TILE_MIN_HEIGHT = 3 * DEFAULT_TILE_HEIGHT
+AUTO_TILE_MIN_ASPECT = 3.0
+# Blocks ending this close to an inner window edge count as cut by it.
+SEAM_EDGE_TOLERANCE_PX = 4
+
+Xyxy = tuple[int, int, int, int]
+WindowDetectFn = Callable[["np.ndarray"], tuple["np.ndarray | None", list[tuple[Xyxy, Any]]]]
+
+
+@dataclass(frozen=True)
+class StripWindow:
+    """Rows `[top, bottom)` fed to the detector; rows `[core_top, core_bottom)` are owned."""
+
+    top: int
+    bottom: int
+    core_top: int
+    core_bottom: int
+
+    @property
+    def height(self) -> int:
+        return self.bottom - self.top
+
+
+@dataclass
+class TileBlock:
+    """A detected block in page coordinates with the window payload(s) behind it.
+
+    `payloads` holds one service-specific object per window detection that was
+    merged into this block (in top-to-bottom order); `payload_tops[i]` is the
+    page row of the window `payloads[i]` came from, for shifting window
+    coordinates kept inside a payload.
+    """
+
+    xyxy: list[int]
+    payloads: list[Any] = field(default_factory=list)
+    payload_tops: list[int] = field(default_factory=list)
+
+    @property
+    def merged(self) -> bool:
+        return len(self.payloads) > 1
+
+
+def normalize_tile_params(params: dict[str, Any] | None) -> dict[str, Any]:
+    """Reads the shared `tiled_detection` / `tile_height` / `tile_overlap` payload fields.
+
+    `tiled_detection` accepts `"auto"` (default), `true`/`"on"` or
+    `false`/`"off"`.
+    """
+    merged: dict[str, Any] = params if isinstance(params, dict) else {}
+    mode = _to_tile_mode(merged.get("tiled_detection"))
+    tile_height = _to_int(merged.get("tile_height"), DEFAULT_TILE_HEIGHT)
+    tile_height = max(MIN_TILE_HEIGHT, min(MAX_TILE_HEIGHT, tile_height))
+    overlap = _to_int(merged.get("tile_overlap"), DEFAULT_TILE_OVERLAP)
+    overlap = max(MIN_TILE_OVERLAP, min(tile_height // 2, overlap))
+    return {"tiled_detection": mode, "tile_height": tile_height, "tile_overlap": overlap}
+
+
+def should_tile(width: int, height: int, tile_params: dict[str, Any]) -> bool:
+    """True when a `width x height` page should go through `detect_strip`."""
+    mode = tile_params.get("tiled_detection", TILE_MODE_AUTO)
+    tile_height = int(tile_params.get("tile_height", DEFAULT_TILE_HEIGHT))
+    if mode == TILE_MODE_OFF or height <= tile_height:
+        return False
+    if mode == TILE_MODE_ON:
+        return True
+    return height >= AUTO_TILE_MIN_HEIGHT and height >= AUTO_TILE_MIN_ASPECT * max(1, width)
+
+
+def plan_strip_windows(height: int, tile_height: int, overlap: int) -> list[StripWindow]:
+    """Plans full-width windows of `tile_height` rows overlapping by at least `overlap`.
+
+    Windows are spread evenly so the last one ends exactly at `height`; a page
+    not taller than `tile_height` yields a single window.
+    """
+    if height <= 0:
+        return []
+    tile_height = max(1, int(tile_height))
+    overlap = max(0, min(int(overlap), tile_height - 1))
+    if height <= tile_height:
+        return [StripWindow(0, height, 0, height)]
+
+    stride = tile_height - overlap
+    count = -(-(height - overlap) // stride)
+    last_top = height - tile_height
+    tops = [round(index * last_top / (count - 1)) for index in range(count)]
+
+    windows: list[StripWindow] = []
+    for index, top in enumerate(tops):
+        bottom = top + tile_height
+        core_top = 0 if index == 0 else (tops[index - 1] + tile_height + top) // 2
+        core_bottom = height if index == count - 1 else (bottom + tops[index + 1]) // 2
+        windows.append(StripWindow(top, bottom, core_top, core_bottom))
+    return windows
+
+
+def detect_strip(
+    image: np.ndarray,
+    detect_fn: WindowDetectFn,
+    *,
+    tile_height: int = DEFAULT_TILE_HEIGHT,
+    overlap: int = DEFAULT_TILE_OVERLAP,
+    edge_tolerance: int = SEAM_EDGE_TOLERANCE_PX,
+) -> tuple[np.ndarray, list[TileBlock], list[StripWindow]]:
+    """Runs `detect_fn(window_image)` per strip window and stitches the results.
+
+    `detect_fn` receives a contiguous `(rows, W, ...)` slice of `image` and
+    returns `(mask_u8 | None, [(xyxy, payload), ...])` with `xyxy` in window
+    coordinates; the mask (if any) must match the window size. Returns
+    `(page_mask_u8, blocks, windows)` with blocks sorted top-to-bottom.
+    """
+    np = _np()
+    height, width = int(image.shape[0]), int(image.shape[1])
+    windows = plan_strip_windows(height, tile_height, overlap)
+    page_mask = np.zeros((height, width), dtype=np.uint8)
+
+    # (block, window index, cut at window top, cut at window bottom)
+    kept: list[tuple[TileBlock, int, bool, bool]] = []
+    for index, window in enumerate(windows):
+        crop = np.ascontiguousarray(image[window.top : window.bottom])
+        mask, detections = detect_fn(crop)
+        if mask is not None:
+            if tuple(mask.shape[:2]) != (window.height, width):
+                raise RuntimeError(
+                    "Детектор окна вернул маску неверного размера: "
+                    f"{mask.shape[1]}x{mask.shape[0]} вместо {width}x{window.height}"
+                )
+            page_mask[window.core_top : window.core_bottom] = mask[
+                window.core_top - window.top : window.core_bottom - window.top
+            ]
+        for xyxy, payload in detections:
+            x1, y1, x2, y2 = (int(round(float(v))) for v in xyxy[:4])
+            y1 += window.top
+            y2 += window.top
+            if x2 <= x1 or y2 <= y1:
+                continue
+            cut_top = window.top > 0 and y1 <= window.top + edge_tolerance
+            cut_bottom = window.bottom < height and y2 >= window.bottom - edge_tolerance
+            in_core = y1 < window.core_bottom and y2 > window.core_top
+            if not (in_core or cut_top or cut_bottom):
+                continue
+            kept.append(
+                (TileBlock([x1, y1, x2, y2], [payload], [window.top]), index, cut_top, cut_bottom)
+            )
+
+    blocks = _merge_seam_blocks(kept, edge_tolerance)
+    blocks.sort(key=lambda block: (block.xyxy[1], block.xyxy[0], block.xyxy[3], block.xyxy[2]))
+    return page_mask, blocks, windows
+
+
+def _merge_seam_blocks(
+    kept: list[tuple[TileBlock, int, bool, bool]], edge_tolerance: int
+) -> list[TileBlock]:
+    """Unions duplicate and seam-cut copies of one block from adjacent windows."""
+    parent = list(range(len(kept)))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for a in range(len(kept)):
+        block_a, window_a, cut_top_a, cut_bottom_a = kept[a]
+        for b in range(a + 1, len(kept)):
+            block_b, window_b, cut_top_b, cut_bottom_b = kept[b]
+            if abs(window_a - window_b) != 1:
+                continue
+            if window_a < window_b:
+                both_cut = cut_bottom_a and cut_top_b
+            else:
+                both_cut = cut_top_a and cut_bottom_b
+            if _same_seam_block(block_a.xyxy, block_b.xyxy, both_cut, edge_tolerance):
+                parent[find(b)] = find(a)
+
+    groups: dict[int, list[int]] = {}
+    for index in range(len(kept)):
+        groups.setdefault(find(index), []).append(index)
+
+    out: list[TileBlock] = []
+    for members in groups.values():
+        members.sort(key=lambda index: (kept[index][1], kept[index][0].xyxy[1]))
+        boxes = [kept[index][0].xyxy for index in members]
+        out.append(
+            TileBlock(
+                [
+                    min(box[0] for box in boxes),
+                    min(box[1] for box in boxes),
+                    max(box[2] for box in boxes),
+                    max(box[3] for box in boxes),
+                ],
+                [payload for index in members for payload in kept[index][0].payloads],
+                [top for index in members for top in kept[index][0].payload_tops],
+            )
+        )
+    return out
+
+
+def _same_seam_block(a: list[int], b: list[int], both_cut: bool, edge_tolerance: int) -> bool:
+    overlap_x = min(a[2], b[2]) - max(a[0], b[0])
+    if overlap_x <= 0 or overlap_x < 0.5 * min(a[2] - a[0], b[2] - b[0]):
+        return False
+    overlap_y = min(a[3], b[3]) - max(a[1], b[1])
+    if both_cut:
+        return overlap_y >= -edge_tolerance
+    if overlap_y <= 0:
+        return False
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return overlap_x * overlap_y >= 0.5 * smaller
+
+
+def _to_tile_mode(value: Any) -> str:
+    if isinstance(value, bool):
+        return TILE_MODE_ON if value else TILE_MODE_OFF
+    if value is None:
+        return TILE_MODE_AUTO
+    text = str(value).strip().lower()
+    if text in {"1", "true", "yes", "on"}:
+        return TILE_MODE_ON
+    if text in {"0", "false", "no", "off"}:
+        return TILE_MODE_OFF
+    return TILE_MODE_AUTO
+
+
+def _to_int(value: Any, default: int) -> int:
+    try:
+        if isinstance(value, bool):
+            return default
+        return int(value)
+    except Exception:
+        return default
+
+
+def _np():
+    try:
+        import numpy as np  # type: ignore
+
+        return np
+    except Exception as exc:
+        raise RuntimeError(
+            "Для потоковой детекции текста требуется пакет numpy. Установите зависимости backend."
+        ) from exc
@@ -0,0 +1,266 @@
+"""
+File: modules/ai_backend/device_resolution.py
+
+Purpose:
+One process-wide cache of the torch device resolution that every service does
+before a request. Each service used to call `AIDevice.detect_available_devices()`
+(torch import + CUDA/MPS queries) on every request; this probes once and
+re-probes only after an explicit invalidation.
+
+Main responsibilities:
+- `DeviceResolution.resolve(fallback, ...)`: configured `General.ai_device` +
+  cached available devices -> the device a service should run on (same rules
+  the per-service `_resolve_selected_backend_device` copies used);
+- `invalidate(reason, available=...)`: called by `AiDeviceService.set_device`
+  (`device.set`), optionally with the device list it has just probed;
+- notify listeners (the server publishes them as `device` events) when the
+  configured device or the available devices change;
+- count resolutions, probes, and probes avoided (with the estimated time saved).
+
+Key structures:
+- `DeviceResolution`, `DEVICE_RESOLUTION` (process-wide instance)
+- `resolve_backend_device`
+
+Notes:
+- The configured device is re-read on every call: it is a dict lookup in the
+  in-memory `UserConfig`, so a config change is seen on the next request
+  without any probe. Only the hardware probe is cached.
+- Listeners run outside the cache lock; a raising listener is logged and
+  ignored.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import traceback
+from typing import Any, Callable
+
+try:
+    from ai_device import AIDevice
+except Exception:
+    from modules.ai_device import AIDevice
+
+try:
+    from config import UserConfig
+except Exception:
+    UserConfig = None
+
+# ============================================================================
+# DEVICE RESOLUTION CACHE
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `DeviceResolution`: кэш доступных torch-устройств + выбор устройства для
+#   сервисов; инвалидация через `device.set`, события `device` при изменении.
+# - `resolve_backend_device`: общий вход для `_resolve_selected_backend_device`
+#   в сервисах.
+# ============================================================================
+
+DeviceListener = Callable[[dict[str, Any]], None]
+
+
+def read_configured_device(user_config: Any = None) -> str | None:
+    """`General.ai_device` from the in-memory config; None when unset or `not-selected`."""
+    config_root = getattr(UserConfig if user_config is None else user_config, "config", None)
+    if not isinstance(config_root, dict):
+        return None
+    general = config_root.get("General")
+    if not isinstance(general, dict):
+        return None
+    value = general.get("ai_device")
+    if not isinstance(value, str):
+        return None
+    normalized = value.strip().lower()
+    if normalized == "not-selected":
+        return None
+    return normalized or None
+
+
+def _probe_available_devices() -> list[str]:
+    try:
+        return list(AIDevice.detect_available_devices())
+    except Exception:
+        return ["cpu"]
+
+
+def normalize_backend_device(raw: Any, fallback: str, *, accept_mps: bool = False) -> str:
+    normalized = str(raw or "").strip().lower()
+    if normalized == "cpu" or normalized == "cuda" or normalized.startswith("cuda:"):
+        return normalized
+    if accept_mps and normalized == "mps":
+        return normalized
+    return str(fallback or "cpu").strip().lower() or "cpu"
+
+
+def _pick_device(
+    configured: str | None,
+    fallback: str,
+    available: frozenset[str],
+    *,
+    accept_mps: bool,
+    mps_fallback: bool,
+) -> str:
+    fallback_norm = normalize_backend_device(fallback, "cpu", accept_mps=accept_mps)
+    normalized = normalize_backend_device(
+        fallback_norm if configured is None else configured, fallback_norm, accept_mps=accept_mps
+    )
+    if normalized in available:
+        return normalized
+    if normalized.startswith("cuda") and "cuda" in available:
+        return "cuda"
+    if fallback_norm in available:
+        return fallback_norm
+    if "cuda" in available:
+        return "cuda"
+    if mps_fallback and "mps" in available:
+        return "mps"
+    return "cpu"
+
+
+class DeviceResolution:
+    """Cached device probe + per-(config, fallback) resolution with change listeners."""
+
+    def __init__(
+        self,
+        probe: Callable[[], list[str]] | None = None,
+        read_configured: Callable[[], str | None] | None = None,
+    ) -> None:
+        self._probe = probe or _probe_available_devices
+        self._read_configured = read_configured or read_configured_device
+        self._lock = threading.Lock()
+        self._available: tuple[str, ...] | None = None
+        self._configured: str | None = None
+        self._memo: dict[tuple[str | None, str, bool, bool], str] = {}
+        self._published: tuple[str | None, tuple[str, ...]] | None = None
+        self._pending_reason = "startup"
+        self._listeners: list[DeviceListener] = []
+        self._generation = 0
+        self._resolutions = 0
+        self._probes = 0
+        self._probe_s_total = 0.0
+
+    def add_listener(self, listener: DeviceListener) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: DeviceListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def resolve(self, fallback: str, *, accept_mps: bool = False, mps_fallback: bool = False) -> str:
+        """Device for a service whose own default/current device is `fallback`."""
+        configured = self._read_configured()
+        with self._lock:
+            self._resolutions += 1
+            if self._available is None:
+                self._available = tuple(self._timed_probe_locked())
+            if configured != self._configured:
+                self._configured = configured
+                self._memo.clear()
+                if self._published is not None:
+                    self._pending_reason = "config"
+            key = (configured, str(fallback or ""), accept_mps, mps_fallback)
+            device = self._memo.get(key)
+            if device is None:
+                device = self._memo[key] = _pick_device(
+                    configured,
+                    str(fallback or ""),
+                    frozenset(self._available),
+                    accept_mps=accept_mps,
+                    mps_fallback=mps_fallback,
+                )
+            event, listeners = self._change_event_locked()
+        self._emit(event, listeners)
+        return device
+
+    def available_devices(self) -> list[str]:
+        with self._lock:
+            if self._available is None:
+                self._available = tuple(self._timed_probe_locked())
+            return list(self._available)
+
+    def invalidate(self, reason: str, *, available: list[str] | None = None) -> None:
+        """Drops cached results; `available` (a fresh probe by the caller) avoids a re-probe."""
+        configured = self._read_configured()
+        with self._lock:
+            self._memo.clear()
+            self._configured = configured
+            self._pending_reason = reason
+            if available is None:
+                self._available = None
+                return
+            self._available = tuple(available) or ("cpu",)
+            event, listeners = self._change_event_locked()
+        self._emit(event, listeners)
+
+    def stats(self) -> dict[str, Any]:
+        return {**self.state(), **self.counters()}
+
+    def state(self) -> dict[str, Any]:
+        """Selected / available devices; changes only when the selection changes."""
+        with self._lock:
+            return {
+                "configured_device": self._configured,
+                "available_devices": None if self._available is None else list(self._available),
+                "generation": self._generation,
+            }
+
+    def counters(self) -> dict[str, Any]:
+        """Cache counters; `resolutions` grows with every service request."""
+        with self._lock:
+            avoided = self._resolutions - min(self._resolutions, self._probes)
+            mean_probe_s = self._probe_s_total / self._probes if self._probes else 0.0
+            return {
+                "resolutions": self._resolutions,
+                "probes": self._probes,
+                "probes_avoided": avoided,
+                "probe_ms_total": round(self._probe_s_total * 1000.0, 3),
+                "estimated_saved_ms": round(avoided * mean_probe_s * 1000.0, 3),
+            }
+
+    def _timed_probe_locked(self) -> list[str]:
+        started = time.perf_counter()
+        try:
+            return self._probe() or ["cpu"]
+        finally:
+            self._probe_s_total += time.perf_counter() - started
+            self._probes += 1
+
+    def _change_event_locked(self) -> tuple[dict[str, Any] | None, list[DeviceListener]]:
+        state = (self._configured, self._available or ())
+        if state == self._published:
+            return None, []
+        self._published = state
+        self._generation += 1
+        event = {
+            "configured_device": self._configured,
+            "selected_device": _pick_device(
+                self._configured,
+                "cpu",
+                frozenset(state[1]),
+                accept_mps=True,
+                mps_fallback=True,
+            ),
+            "available_devices": list(state[1]),
+            "reason": self._pending_reason,
+            "generation": self._generation,
+        }
+        return event, list(self._listeners)
+
+    def _emit(self, event: dict[str, Any] | None, listeners: list[DeviceListener]) -> None:
+        if event is None:
+            return
+        for listener in listeners:
+            try:
+                listener(dict(event))
+            except Exception:
+                traceback.print_exc()
+
+
+DEVICE_RESOLUTION = DeviceResolution()
+
+
+def resolve_backend_device(fallback: str, *, accept_mps: bool = False, mps_fallback: bool = False) -> str:
+    """Resolves through the process-wide `DEVICE_RESOLUTION` cache."""
+    return DEVICE_RESOLUTION.resolve(fallback, accept_mps=accept_mps, mps_fallback=mps_fallback)
@@ -6,6 +6,8 @@ Main responsibilities:
 - Expose current PyTorch backend device and ONNX provider/device state.
 - Expose and persist the loaded-model limit used by backend runtimes.
 - Persist user selections in `UserConfig` when available.
+- Invalidate the shared device-resolution cache (`device_resolution.py`) on
+  `set_device`, handing it the device list probed for the response.
 - Detect human-readable device names for CUDA, DirectML, and MiGraphX.
 - Provide CUDA/ROCm diagnostics for the Rust settings tab.
 """
@@ -29,7 +31,8 @@ try:
 except Exception:
     UserConfig = None
 
-from .model_manager import LoadedModelManager, clamp_max_loaded_models
+from .device_resolution import DEVICE_RESOLUTION
+from .model_manager import LoadedModelManager, budget_bytes_from_mb, clamp_max_loaded_models
 
 
 # ============================================================================
@@ -602,6 +605,9 @@ class _OnnxDeviceSelector:
 
 class AiDeviceService:
     MAX_LOADED_MODELS_CONFIG_PATH = ("General", "ai_max_loaded_models")
+    # Optional byte budgets (MiB); when set they replace the count limit.
+    HOST_BUDGET_CONFIG_PATH = ("General", "ai_model_host_budget_mb")
+    DEVICE_BUDGET_CONFIG_PATH = ("General", "ai_model_vram_budget_mb")
 
     def __init__(self, model_manager: LoadedModelManager) -> None:
         self._lock = threading.RLock()
@@ -687,6 +693,9 @@ class AiDeviceService:
                 _device_log(f"set_max_loaded_models_saved value={max_loaded_models}")
 
             available = self._available_devices_locked()
+            # Services resolve through the shared cache; reuse this probe instead of
+            # letting the next request re-probe.
+            DEVICE_RESOLUTION.invalidate("device.set", available=available)
             options = self._build_device_options_locked(available)
             payload = {
                 "selected_device": self._resolve_selected_locked(available),
@@ -792,6 +801,13 @@ class AiDeviceService:
         )
         self._set_config_value(self.MAX_LOADED_MODELS_CONFIG_PATH, str(normalized))
         self._model_manager.set_max_loaded_models(normalized)
+        host_budget = self._get_config_value(self.HOST_BUDGET_CONFIG_PATH)
+        device_budget = self._get_config_value(self.DEVICE_BUDGET_CONFIG_PATH)
+        if host_budget is not None or device_budget is not None:
+            self._model_manager.set_memory_budgets(
+                host_bytes=None if host_budget is None else budget_bytes_from_mb(host_budget),
+                device_bytes=None if device_budget is None else budget_bytes_from_mb(device_budget),
+            )
 
     def _get_config_value(self, path: tuple[str, ...]) -> Optional[str]:
         node = getattr(self._user_config, "config", None)
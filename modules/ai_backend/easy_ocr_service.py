@@ -7,7 +7,10 @@ Lazy EasyOCR backend service used by the Rust translation tab.
 Main responsibilities:
 - load EasyOCR readers on demand;
 - synchronize the reader device with backend AI device settings;
-- run OCR requests and return normalized text payloads.
+- run OCR requests and return normalized text payloads;
+- run batch OCR requests (`recognize_images_bytes`) under one model lease;
+- `recognize_image_array` / `recognize_images_array` for in-process callers
+  holding decoded RGB arrays (the `*_bytes` methods decode and delegate).
 """
 
 from __future__ import annotations
@@ -19,18 +22,11 @@ import ssl
 import sys
 import threading
 import traceback
-from typing import Any
-
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
+from typing import Any, Callable, Sequence
 
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import check_rgb_array
 from .model_manager import LoadedModelManager
 
 # ============================================================================
@@ -38,7 +34,7 @@ from .model_manager import LoadedModelManager
 # ----------------------------------------------------------------------------
 # Что в файле:
 # - lazy init и health для `easyocr.Reader`.
-# - OCR распознавание из image bytes.
+# - OCR распознавание из image bytes или готовых RGB-массивов.
 # - Нормализация языковых кодов.
 # - Синхронизация устройства с backend-настройкой `General.ai_device`.
 # - SSL fallback для standalone Python на Windows:
@@ -76,7 +72,14 @@ def _clear_torch_cache() -> None:
         pass
 
 
+HEALTH_SOURCE = "ocr.easyocr"
+
+
 class EasyOcrService:
+    _langs = HealthField(HEALTH_SOURCE)
+    _device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(self, model_manager: LoadedModelManager) -> None:
         self._lock = threading.Lock()
         self._model_manager = model_manager
@@ -129,7 +132,23 @@ class EasyOcrService:
         reflect_strings: bool = False,
         langs: str = "ko",
     ) -> dict[str, Any]:
-        rgb_arr = self._decode_image_rgb(image_bytes)
+        return self.recognize_image_array(
+            self._decode_image_rgb(image_bytes),
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            langs=langs,
+        )
+
+    def recognize_image_array(
+        self,
+        image_rgb: Any,
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        langs: str = "ko",
+    ) -> dict[str, Any]:
+        """Same as `recognize_image_bytes` for a decoded `(H, W, 3)` uint8 RGB array."""
+        rgb_arr = check_rgb_array(image_rgb)
         selected_device = _resolve_selected_backend_device(self._device)
         model_key = self._model_key_for(langs, selected_device)
         lease = self._model_manager.begin_model_use(
@@ -153,7 +172,99 @@ class EasyOcrService:
         finally:
             lease.release()
 
-        lines = self._extract_lines(result)
+        return self._format_result(result, join_newlines=join_newlines, reflect_strings=reflect_strings)
+
+    def recognize_images_bytes(
+        self,
+        images_bytes: Sequence[bytes],
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        langs: str = "ko",
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `recognize_image_bytes` under one model lease.
+
+        Crops with identical shape go through `Reader.readtext_batched` together
+        (one batched CRAFT pass); the rest use `readtext`. `on_result(index,
+        result)` is called in input order once the crop's group is done.
+        """
+        return self.recognize_images_array(
+            [self._decode_image_rgb(image_bytes) for image_bytes in images_bytes],
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            langs=langs,
+            on_result=on_result,
+        )
+
+    def recognize_images_array(
+        self,
+        images_rgb: Sequence[Any],
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        langs: str = "ko",
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `recognize_image_array` (see `recognize_images_bytes`)."""
+        rgb_arrays = [check_rgb_array(image_rgb) for image_rgb in images_rgb]
+        if not rgb_arrays:
+            return []
+        groups: dict[tuple[int, ...], list[int]] = {}
+        for index, rgb_arr in enumerate(rgb_arrays):
+            groups.setdefault(tuple(rgb_arr.shape), []).append(index)
+
+        selected_device = _resolve_selected_backend_device(self._device)
+        model_key = self._model_key_for(langs, selected_device)
+        lease = self._model_manager.begin_model_use(
+            model_key,
+            unload_callback=lambda: self._unload_key(model_key),
+        )
+        raw_results: dict[int, Any] = {}
+        results: list[dict[str, Any]] = []
+        try:
+            for indices in sorted(groups.values(), key=lambda group: group[0]):
+                with self._lock:
+                    reader = self._ensure_loaded_locked(langs)
+                    if len(indices) > 1 and hasattr(reader, "readtext_batched"):
+                        batch_results = reader.readtext_batched(
+                            [rgb_arrays[index] for index in indices],
+                            detail=self._detail,
+                            paragraph=self._paragraph,
+                        )
+                    else:
+                        batch_results = [
+                            reader.readtext(
+                                rgb_arrays[index],
+                                detail=self._detail,
+                                paragraph=self._paragraph,
+                            )
+                            for index in indices
+                        ]
+                if lease.needs_load:
+                    lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
+                raw_results.update(zip(indices, batch_results))
+                while len(results) in raw_results:
+                    index = len(results)
+                    result = self._format_result(
+                        raw_results.pop(index),
+                        join_newlines=join_newlines,
+                        reflect_strings=reflect_strings,
+                    )
+                    results.append(result)
+                    if on_result is not None:
+                        on_result(index, result)
+        except Exception:
+            if lease.needs_load:
+                lease.mark_load_failed()
+            raise
+        finally:
+            lease.release()
+        return results
+
+    @classmethod
+    def _format_result(cls, result: Any, *, join_newlines: bool, reflect_strings: bool) -> dict[str, Any]:
+        lines = cls._extract_lines(result)
         if reflect_strings:
             lines.reverse()
 
@@ -501,50 +612,4 @@ def _ensure_stdio_unicode_safe() -> None:
 
 
 def _resolve_selected_backend_device(fallback: str) -> str:
-    fallback_norm = _normalize_backend_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-
-    normalized = _normalize_backend_device(configured, fallback_norm)
-    available = _safe_available_devices()
-
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    return "cpu"
-
-
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    value = value.strip().lower()
-    if value == "not-selected":
-        return None
-    return value or None
-
-
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
-
-
-def _normalize_backend_device(raw: str, fallback: str) -> str:
-    val = str(raw or "").strip().lower()
-    if val == "cpu" or val == "cuda" or val.startswith("cuda:"):
-        return val
-    return str(fallback or "cpu").strip().lower() or "cpu"
+    return resolve_backend_device(fallback)
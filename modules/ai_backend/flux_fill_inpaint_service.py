@@ -23,7 +23,9 @@ Main responsibilities:
   back over the original outside the mask;
 - progress streamed as `progress_callback(phase, step, total, label)` where phase
   is "download" or "generate";
-- health / unload hooks; reuse of the shared resident-model manager.
+- health / unload hooks; reuse of the shared resident-model manager;
+- `inpaint_image_array` for in-process callers that already hold decoded
+  arrays (`inpaint_image_bytes` is a PNG codec wrapper around it).
 
 Notes:
 The heavy packages (torch/diffusers/transformers) are imported lazily. Missing
@@ -46,6 +48,9 @@ try:
 except Exception:  # pragma: no cover - config is always importable in-app
     _config = None
 
+from .health_feed import HealthField, notify_health_changed
+from .image_arrays import check_inpaint_arrays
+from .model_download import DownloadItem, download_files
 from .model_manager import LoadedModelManager
 
 # --- Repos / quants -------------------------------------------------------
@@ -152,12 +157,19 @@ def normalize_flux_fill_params(params: dict[str, Any] | None) -> dict[str, Any]:
     }
 
 
+HEALTH_SOURCE = "inpaint.flux_fill"
+
+
 # =====================================================================
 #  Service
 # =====================================================================
 class FluxFillInpaintService:
     """Lazy-loading FLUX.1-Fill-dev inpaint pipeline for `inpaint.flux_fill`."""
 
+    _active_key = HealthField(HEALTH_SOURCE)
+    _device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(self, model_manager: LoadedModelManager) -> None:
         self._lock = threading.RLock()
         self._model_manager = model_manager
@@ -165,20 +177,33 @@ class FluxFillInpaintService:
         self._active_key: str | None = None
         self._device: Any = None
         self._last_error: str | None = None
+        # Which quants / components are on disk, as reported by `health()`.
+        # Refreshed by `status()` and after downloads, so the health snapshot
+        # does not stat every GGUF file on each rebuild.
+        self._disk_state: dict[str, Any] | None = None
 
     # ---- status / health ----
     def status(self) -> dict[str, Any]:
         """Quant catalog + which quants and components are already on disk."""
-        downloaded = [q for q in AVAILABLE_QUANTS if _is_nonempty_file(gguf_path(q))]
         return {
             "quants": list(AVAILABLE_QUANTS),
             "default_quant": DEFAULT_QUANT,
-            "downloaded_quants": downloaded,
-            "components_ready": _components_present(),
+            **self._refresh_disk_state(),
             "gguf_repo": GGUF_REPO,
             "components_repo": COMPONENTS_REPO,
         }
 
+    def _refresh_disk_state(self) -> dict[str, Any]:
+        previous = self._disk_state
+        state = {
+            "downloaded_quants": [q for q in AVAILABLE_QUANTS if _is_nonempty_file(gguf_path(q))],
+            "components_ready": _components_present(),
+        }
+        self._disk_state = state
+        if previous is not None and previous != state:
+            notify_health_changed(HEALTH_SOURCE)
+        return dict(state)
+
     def health(self) -> dict[str, Any]:
         with self._lock:
             return {
@@ -186,8 +211,7 @@ class FluxFillInpaintService:
                 "model": "flux_fill",
                 "device": str(self._device) if self._device is not None else "cpu",
                 "active_key": self._active_key,
-                "downloaded_quants": [q for q in AVAILABLE_QUANTS if _is_nonempty_file(gguf_path(q))],
-                "components_ready": _components_present(),
+                **(dict(self._disk_state) if self._disk_state is not None else self._refresh_disk_state()),
                 "last_error": self._last_error,
             }
 
@@ -212,9 +236,28 @@ class FluxFillInpaintService:
         params: dict[str, Any] | None = None,
         progress_callback: ProgressCb | None = None,
     ) -> dict[str, Any]:
-        normalized = normalize_flux_fill_params(params)
         image_rgb = _decode_image_rgb(image_bytes)
         mask_u8 = _decode_mask(mask_bytes, expected_hw=image_rgb.shape[:2])
+        result = self.inpaint_image_array(
+            image_rgb, mask_u8, params=params, progress_callback=progress_callback
+        )
+        result["image_png"] = _encode_png_bytes_rgb(result.pop("image_rgb"))
+        return result
+
+    def inpaint_image_array(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        *,
+        params: dict[str, Any] | None = None,
+        progress_callback: ProgressCb | None = None,
+    ) -> dict[str, Any]:
+        """Same as `inpaint_image_bytes` for decoded `(H, W, 3)` / `(H, W)` uint8 arrays.
+
+        The result dict carries the output as `image_rgb` instead of `image_png`.
+        """
+        normalized = normalize_flux_fill_params(params)
+        image_rgb, mask_u8 = check_inpaint_arrays(image_rgb, mask_u8)
 
         # 1) Make sure the weights are on disk (streams download progress).
         self.ensure_model(normalized["quant"], progress_callback)
@@ -242,7 +285,7 @@ class FluxFillInpaintService:
                 lease.release()
 
         return {
-            "image_png": _encode_png_bytes_rgb(out_rgb),
+            "image_rgb": out_rgb,
             "source_size": [int(image_rgb.shape[1]), int(image_rgb.shape[0])],
             "device": str(self._device) if self._device is not None else "cpu",
             "mode": normalized["mode"],
@@ -253,8 +296,10 @@ class FluxFillInpaintService:
     def ensure_model(self, quant: str, progress_callback: ProgressCb | None) -> None:
         """Download the selected GGUF quant + diffusers components into side_models.
 
-        Files already present (non-empty) are skipped. Progress is reported in
-        bytes via `progress_callback("download", done, total, label)`.
+        Files already present (non-empty) are skipped; interrupted ones resume
+        from their `.part`, large ones are fetched in parallel segments and LFS
+        files are sha256-verified (`model_download.py`). Progress is reported
+        in bytes via `progress_callback("download", done, total, label)`.
         """
         quant = normalize_quant(quant)
         os.makedirs(_flux_dir(), exist_ok=True)
@@ -266,30 +311,37 @@ class FluxFillInpaintService:
         if not missing:
             return
 
-        total_bytes = sum(int(item.get("size") or 0) for item in missing)
-        done_bytes = 0
         cb = progress_callback
 
-        def report(label: str) -> None:
+        def report(done: int, total: int, label: str) -> None:
             if cb is not None:
                 try:
-                    cb("download", int(done_bytes), int(max(total_bytes, 1)), label)
+                    cb("download", int(done), int(max(total, 1)), label)
                 except Exception:
                     pass
 
-        report("Подготовка загрузки модели…")
-        for item in missing:
-            name = os.path.basename(item["dest"])
-            base = done_bytes
+        report(0, sum(int(item.get("size") or 0) for item in missing), "Подготовка загрузки модели…")
 
-            def on_chunk(n: int) -> None:
-                nonlocal done_bytes
-                done_bytes = base + n
-                report(f"Скачивание {name}")
-
-            _download_file_streaming(item["url"], item["dest"], on_chunk)
-            done_bytes = base + int(item.get("size") or 0)
-            report(f"Скачано {name}")
+        headers = {}
+        token = os.environ.get("HF_TOKEN") or os.environ.get("HUGGING_FACE_HUB_TOKEN")
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        try:
+            download_files(
+                [
+                    DownloadItem(
+                        url=item["url"],
+                        dest=item["dest"],
+                        size=int(item.get("size") or 0),
+                        sha256=item.get("sha256"),
+                    )
+                    for item in missing
+                ],
+                progress=report,
+                headers=headers,
+            )
+        finally:
+            self._refresh_disk_state()
 
     # ---- pipeline ----
     def _ensure_pipeline_locked(self, normalized: dict[str, Any], model_key: str) -> Any:
@@ -456,7 +508,11 @@ class FluxFillInpaintService:
 #  Download plumbing
 # =====================================================================
 def _build_download_plan(quant: str) -> list[dict[str, Any]]:
-    """Returns [{url, dest, size}] for the GGUF quant + all component files."""
+    """Returns [{url, dest, size, sha256}] for the GGUF quant + all component files.
+
+    `sha256` is the LFS object hash from the Hub metadata (`None` for small
+    non-LFS files, which are then only size-checked).
+    """
     from huggingface_hub import HfApi, hf_hub_url
 
     token = os.environ.get("HF_TOKEN") or os.environ.get("HUGGING_FACE_HUB_TOKEN")
@@ -466,11 +522,13 @@ def _build_download_plan(quant: str) -> list[dict[str, Any]]:
     # GGUF transformer (single file).
     gname = gguf_filename(quant)
     gsize = 0
+    gsha = None
     try:
         info = api.model_info(GGUF_REPO, files_metadata=True)
         for sib in info.siblings or []:
             if sib.rfilename == gname:
                 gsize = int(sib.size or 0)
+                gsha = _lfs_sha256(sib)
                 break
     except Exception:
         gsize = 0
@@ -478,6 +536,7 @@ def _build_download_plan(quant: str) -> list[dict[str, Any]]:
         "url": hf_hub_url(GGUF_REPO, gname),
         "dest": gguf_path(quant),
         "size": gsize,
+        "sha256": gsha,
     })
 
     # diffusers components from the open Flex.1-alpha repo.
@@ -494,31 +553,16 @@ def _build_download_plan(quant: str) -> list[dict[str, Any]]:
             "url": hf_hub_url(COMPONENTS_REPO, path),
             "dest": os.path.join(_components_dir(), *path.split("/")),
             "size": int(sib.size or 0),
+            "sha256": _lfs_sha256(sib),
         })
     return plan
 
 
-def _download_file_streaming(url: str, dest: str, on_chunk: Callable[[int], None]) -> None:
-    """Stream `url` to `dest` (atomic via .part), reporting cumulative bytes."""
-    import requests
-
-    os.makedirs(os.path.dirname(dest), exist_ok=True)
-    tmp = dest + ".part"
-    headers = {}
-    token = os.environ.get("HF_TOKEN") or os.environ.get("HUGGING_FACE_HUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    done = 0
-    with requests.get(url, stream=True, allow_redirects=True, headers=headers, timeout=60) as r:
-        r.raise_for_status()
-        with open(tmp, "wb") as f:
-            for chunk in r.iter_content(chunk_size=1 << 20):
-                if not chunk:
-                    continue
-                f.write(chunk)
-                done += len(chunk)
-                on_chunk(done)
-    os.replace(tmp, dest)
+def _lfs_sha256(sibling: Any) -> str | None:
+    lfs = getattr(sibling, "lfs", None)
+    if isinstance(lfs, dict):
+        return lfs.get("sha256")
+    return getattr(lfs, "sha256", None)
 
 
 def _components_present() -> bool:
@@ -0,0 +1,194 @@
+"""
+File: modules/ai_backend/health_feed.py
+
+Purpose:
+Change notifications and delta encoding for the backend health snapshot, so the
+health worker in `server.py` rebuilds and publishes health only when something
+changed (plus a slow heartbeat) instead of on a fixed 1 s poll.
+
+Main responsibilities:
+- `HealthFeed`: a versioned change signal. Services and `LoadedModelManager`
+  call `notify_health_changed(source)`; the health worker blocks in
+  `wait_for_change` until a notification arrives or the heartbeat expires;
+- `HealthField`: a service attribute (`_last_error`, active device/provider,
+  ...) that calls `notify_health_changed(source)` whenever it is assigned a
+  different value, so services need no explicit notify at each assignment;
+- `diff_health(old, new)`: JSON-patch style (RFC 6902 subset) operations that
+  turn one snapshot into the next;
+- `apply_health_patch(doc, ops)`: the client-side inverse, used by tests and as
+  the reference for IPC clients that negotiate `health_delta`.
+
+Key structures:
+- `HealthFeed`, `HEALTH_FEED` (process-wide instance)
+- `HealthField`
+
+Notes:
+- Paths are JSON Pointers (`/ocr/mangaocr/loaded`, `~0`/`~1` escaped). Only
+  `add` / `remove` / `replace` are emitted; lists are replaced as a whole.
+- Keys listed in `VOLATILE_KEYS` (the snapshot timestamp and the per-request
+  `activity` counters) never produce a patch op; the delta event carries them
+  as plain fields instead, so a busy request queue alone publishes nothing.
+- `notify_health_changed` is cheap (one lock, no I/O) and safe to call while
+  holding other locks: the feed's own lock is never held across a callback.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+from typing import Any
+
+# ============================================================================
+# HEALTH CHANGE FEED
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `HealthFeed`: счётчик версий + Condition; `notify` будит health-воркер.
+# - `HealthField`: атрибут сервиса, который сам сообщает об изменении.
+# - `diff_health` / `apply_health_patch`: JSON-patch дельты между снимками.
+# ============================================================================
+
+VOLATILE_KEYS = frozenset({"snapshot_unix_s", "activity"})
+
+
+class HealthFeed:
+    """Versioned "health may have changed" signal with a set of pending sources."""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._version = 0
+        self._sources: set[str] = set()
+
+    @property
+    def version(self) -> int:
+        with self._condition:
+            return self._version
+
+    def notify(self, source: str = "") -> None:
+        """Marks health as changed by `source` and wakes every waiter."""
+        with self._condition:
+            self._version += 1
+            if source:
+                self._sources.add(source)
+            self._condition.notify_all()
+
+    def wait_for_change(self, seen_version: int, timeout: float | None) -> bool:
+        """Blocks until the version moves past `seen_version`; False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._version != seen_version, timeout=timeout
+            )
+
+    def take_sources(self) -> set[str]:
+        """Returns and clears the sources notified since the last call."""
+        with self._condition:
+            sources, self._sources = self._sources, set()
+            return sources
+
+
+HEALTH_FEED = HealthFeed()
+
+
+def notify_health_changed(source: str = "") -> None:
+    """Signals the process-wide `HEALTH_FEED` that health changed (`source` is diagnostic)."""
+    HEALTH_FEED.notify(source)
+
+
+class HealthField:
+    """Instance attribute that notifies the feed when its value changes.
+
+    Declared on the service class (`_last_error = HealthField("ocr.paddleocr")`);
+    assignments in the service code stay plain `self._last_error = ...`.
+    Re-assigning an equal value (e.g. clearing an already clear error after
+    every successful request) does not notify.
+    """
+
+    def __init__(self, source: str, default: Any = None) -> None:
+        self._source = source
+        self._default = default
+        self._name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+
+    def __get__(self, obj: Any, objtype: type | None = None) -> Any:
+        if obj is None:
+            return self
+        return obj.__dict__.get(self._name, self._default)
+
+    def __set__(self, obj: Any, value: Any) -> None:
+        previous = obj.__dict__.get(self._name, self._default)
+        obj.__dict__[self._name] = value
+        if previous != value:
+            notify_health_changed(self._source)
+
+
+def _escape(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff_health(old: dict[str, Any], new: dict[str, Any]) -> list[dict[str, Any]]:
+    """JSON-patch operations turning `old` into `new` (top-level `VOLATILE_KEYS` ignored)."""
+    ops: list[dict[str, Any]] = []
+    _diff_into(ops, "", old, new, top_level=True)
+    return ops
+
+
+def _diff_into(
+    ops: list[dict[str, Any]], path: str, old: Any, new: Any, *, top_level: bool = False
+) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if top_level and key in VOLATILE_KEYS:
+                continue
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if top_level and key in VOLATILE_KEYS:
+                continue
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": copy.deepcopy(value)})
+            else:
+                _diff_into(ops, child, old[key], value)
+        return
+    if type(old) is not type(new) or old != new:
+        ops.append({"op": "replace", "path": path, "value": copy.deepcopy(new)})
+
+
+def apply_health_patch(doc: dict[str, Any], ops: list[dict[str, Any]]) -> dict[str, Any]:
+    """Returns a copy of `doc` with `ops` (from `diff_health`) applied.
+
+    Raises ValueError on an unknown op or a path that does not exist.
+    """
+    result = copy.deepcopy(doc)
+    for op in ops:
+        kind = op.get("op")
+        tokens = [_unescape(token) for token in str(op.get("path", "")).split("/")[1:]]
+        if not tokens:
+            if kind != "replace" or not isinstance(op.get("value"), dict):
+                raise ValueError(f"Unsupported health patch op at document root: {op!r}")
+            result = copy.deepcopy(op["value"])
+            continue
+        parent = result
+        for token in tokens[:-1]:
+            if not isinstance(parent, dict) or token not in parent:
+                raise ValueError(f"Health patch path does not exist: {op.get('path')!r}")
+            parent = parent[token]
+        if not isinstance(parent, dict):
+            raise ValueError(f"Health patch path does not exist: {op.get('path')!r}")
+        last = tokens[-1]
+        if kind in ("add", "replace"):
+            if kind == "replace" and last not in parent:
+                raise ValueError(f"Health patch path does not exist: {op.get('path')!r}")
+            parent[last] = copy.deepcopy(op.get("value"))
+        elif kind == "remove":
+            if last not in parent:
+                raise ValueError(f"Health patch path does not exist: {op.get('path')!r}")
+            del parent[last]
+        else:
+            raise ValueError(f"Unsupported health patch op: {kind!r}")
+    return result
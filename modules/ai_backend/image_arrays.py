@@ -0,0 +1,87 @@
+"""
+File: modules/ai_backend/image_arrays.py
+
+Purpose:
+Shared input checks and conversions for the in-process `*_array` entry points
+of the OCR, text-detection and inpaint services (arrays that arrive through
+shared memory or from another service instead of encoded PNG bytes).
+
+Key functions:
+- `check_rgb_array()`, `image_from_array()`, `at_least_2px()`
+- `check_inpaint_arrays()`
+
+Notes:
+- Error messages are user-facing and stay in Russian like the services' own.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# ============================================================================
+# IMAGE ARRAY CHECKS
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `check_rgb_array`: проверка RGB-изображения `(H, W, 3)` uint8;
+# - `image_from_array`: PIL RGB поверх проверенного массива (без кодека);
+# - `at_least_2px`: добивка до 2x2 для моделей, не принимающих 1px сторону;
+# - `check_inpaint_arrays`: проверка RGB-изображения и маски для
+#   `inpaint_image_array`, бинаризация маски в 0/255.
+# ============================================================================
+
+
+def check_rgb_array(image_rgb: np.ndarray) -> np.ndarray:
+    """Validates a decoded `(H, W, 3)` uint8 RGB array and returns it unchanged."""
+    np = _np()
+    if image_rgb.ndim != 3 or image_rgb.shape[2] != 3 or image_rgb.dtype != np.uint8:
+        raise ValueError("Ожидается RGB изображение uint8 (H, W, 3)")
+    return image_rgb
+
+
+def image_from_array(image_rgb: np.ndarray) -> Any:
+    """PIL RGB image over a validated `(H, W, 3)` uint8 array (no codec)."""
+    from PIL import Image
+
+    np = _np()
+    check_rgb_array(image_rgb)
+    return Image.fromarray(np.ascontiguousarray(image_rgb), mode="RGB")
+
+
+def at_least_2px(rgb: Any) -> Any:
+    """Returns the PIL image grown to at least 2x2 (nearest neighbour)."""
+    width, height = rgb.size
+    if width >= 2 and height >= 2:
+        return rgb
+
+    from PIL import Image
+
+    resampling = getattr(getattr(Image, "Resampling", Image), "NEAREST")
+    return rgb.resize((max(2, width), max(2, height)), resample=resampling)
+
+
+def check_inpaint_arrays(image_rgb: np.ndarray, mask_u8: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Validates `inpaint_image_array` inputs and binarizes the mask to 0/255."""
+    np = _np()
+    check_rgb_array(image_rgb)
+    if mask_u8.ndim != 2:
+        raise ValueError("Некорректная маска: ожидается 2D массив")
+    if tuple(mask_u8.shape) != tuple(image_rgb.shape[:2]):
+        raise ValueError(
+            f"Размер маски {mask_u8.shape[1]}x{mask_u8.shape[0]} не совпадает с изображением "
+            f"{image_rgb.shape[1]}x{image_rgb.shape[0]}"
+        )
+    return image_rgb, np.where(mask_u8 > 0, 255, 0).astype(np.uint8)
+
+
+def _np():
+    try:
+        import numpy as np  # type: ignore
+
+        return np
+    except Exception as exc:
+        raise RuntimeError(
+            "Для обработки изображений требуется пакет numpy. Установите зависимости backend."
+        ) from exc
@@ -0,0 +1,331 @@
+"""
+File: modules/ai_backend/inpaint_roi.py
+
+Purpose:
+Shared mask-ROI cropping engine for the inpaint services (LaMa-v2, LaMa-MPE,
+AOT, SDXL).
+
+Main responsibilities:
+- find connected components of the inpaint mask;
+- grow each component into a padded context window and merge windows that are
+  close to each other;
+- run the service's inpaint function on each window crop only and paste the
+  results back into a copy of the full page.
+
+Key structures:
+- `RoiWindow`
+
+Key functions:
+- `normalize_roi_params()`
+- `plan_roi_windows()`
+- `inpaint_with_rois()`
+- `split_window()` / `fit_window_aspect()` (window geometry for services that
+  resize windows to fixed model buckets)
+
+Notes:
+- When the planned windows cover most of the page (`full_frame_ratio`), the
+  engine returns a single full-page window and the inpaint function is called
+  once on the untouched inputs, so small pages behave exactly as before.
+- Windows never overlap after merging, so paste order does not matter.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# ============================================================================
+# MASK ROI ENGINE
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `plan_roi_windows`: компоненты связности маски -> окна с контекстом,
+#   слияние близких окон, fallback на целую страницу.
+# - `inpaint_with_rois`: инпейнт только по окнам и вклейка результата обратно.
+# - `normalize_roi_params`: общие параметры `roi_crop`/`roi_context_px`
+#   для payload всех inpaint-сервисов.
+# - `split_window` / `fit_window_aspect`: нарезка слишком вытянутых окон и
+#   расширение окна под соотношение сторон бакета модели.
+# ============================================================================
+
+DEFAULT_ROI_CONTEXT_PX = 96
+DEFAULT_ROI_MERGE_GAP_PX = 48
+DEFAULT_ROI_FULL_FRAME_RATIO = 0.6
+MIN_ROI_CONTEXT_PX = 16
+MAX_ROI_CONTEXT_PX = 1024
+
+InpaintFn = Callable[["np.ndarray", "np.ndarray"], "np.ndarray"]
+
+
+@dataclass(frozen=True)
+class RoiWindow:
+    """Half-open pixel window `[x0, x1) x [y0, y1)` on the source page."""
+
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+
+    @property
+    def width(self) -> int:
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> int:
+        return self.y1 - self.y0
+
+    @property
+    def area(self) -> int:
+        return self.width * self.height
+
+    def as_list(self) -> list[int]:
+        return [self.x0, self.y0, self.x1, self.y1]
+
+
+def normalize_roi_params(
+    params: dict[str, Any] | None,
+    *,
+    default_context_px: int = DEFAULT_ROI_CONTEXT_PX,
+) -> dict[str, Any]:
+    """Reads the shared `roi_crop` / `roi_context_px` payload fields."""
+    merged: dict[str, Any] = params if isinstance(params, dict) else {}
+    roi_crop = _to_bool(merged.get("roi_crop"), True)
+    context_px = _to_int(merged.get("roi_context_px"), default_context_px)
+    context_px = max(MIN_ROI_CONTEXT_PX, min(MAX_ROI_CONTEXT_PX, context_px))
+    return {"roi_crop": roi_crop, "roi_context_px": context_px}
+
+
+def plan_roi_windows(
+    mask_u8: np.ndarray,
+    *,
+    context_px: int = DEFAULT_ROI_CONTEXT_PX,
+    merge_gap_px: int = DEFAULT_ROI_MERGE_GAP_PX,
+    min_window_px: int = 0,
+    full_frame_ratio: float = DEFAULT_ROI_FULL_FRAME_RATIO,
+) -> list[RoiWindow]:
+    """Plans non-overlapping context windows around the mask components.
+
+    Returns an empty list for an empty mask and a single full-page window when
+    cropping would not pay off (no OpenCV, or windows cover at least
+    `full_frame_ratio` of the page).
+    """
+    np = _np()
+    if mask_u8.ndim != 2:
+        raise ValueError("Ожидается маска (H, W)")
+    height, width = int(mask_u8.shape[0]), int(mask_u8.shape[1])
+    full = RoiWindow(0, 0, width, height)
+    binary = np.ascontiguousarray((mask_u8 > 0).astype(np.uint8))
+    if not binary.any():
+        return []
+
+    cv2 = _maybe_cv2()
+    if cv2 is None:
+        return [full]
+
+    count, _labels, stats, _centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    context = max(0, int(context_px))
+    boxes: list[list[int]] = []
+    for label in range(1, int(count)):
+        x, y, w, h = (int(v) for v in stats[label, :4])
+        box = [
+            max(0, x - context),
+            max(0, y - context),
+            min(width, x + w + context),
+            min(height, y + h + context),
+        ]
+        boxes.append(_grow_to_min_size(box, int(min_window_px), width, height))
+
+    windows = [RoiWindow(*box) for box in _merge_boxes(boxes, max(0, int(merge_gap_px)))]
+    covered = sum(window.area for window in windows)
+    if covered >= float(full_frame_ratio) * full.area:
+        return [full]
+    return windows
+
+
+def inpaint_with_rois(
+    image_rgb: np.ndarray,
+    mask_u8: np.ndarray,
+    inpaint_fn: InpaintFn,
+    *,
+    context_px: int = DEFAULT_ROI_CONTEXT_PX,
+    merge_gap_px: int = DEFAULT_ROI_MERGE_GAP_PX,
+    min_window_px: int = 0,
+    full_frame_ratio: float = DEFAULT_ROI_FULL_FRAME_RATIO,
+    composite_mask: bool = True,
+) -> tuple[np.ndarray, list[RoiWindow]]:
+    """Runs `inpaint_fn(image_crop, mask_crop)` per ROI window and pastes back.
+
+    `inpaint_fn` must return an RGB crop of the same size as its input. With
+    `composite_mask=True` only masked pixels of each crop are pasted; services
+    that already blend their own (feathered) mask pass `False` so the whole
+    window is pasted. Returns `(result_rgb, windows)`.
+    """
+    np = _np()
+    if image_rgb.ndim != 3 or image_rgb.shape[2] != 3:
+        raise ValueError("Ожидается RGB изображение (H, W, 3)")
+    if tuple(mask_u8.shape[:2]) != tuple(image_rgb.shape[:2]):
+        raise ValueError("Размер маски не совпадает с изображением")
+
+    windows = plan_roi_windows(
+        mask_u8,
+        context_px=context_px,
+        merge_gap_px=merge_gap_px,
+        min_window_px=min_window_px,
+        full_frame_ratio=full_frame_ratio,
+    )
+    if not windows:
+        return image_rgb.copy(), windows
+    if len(windows) == 1 and windows[0].area == image_rgb.shape[0] * image_rgb.shape[1]:
+        return inpaint_fn(image_rgb, mask_u8), windows
+
+    out = image_rgb.copy()
+    for window in windows:
+        rows = slice(window.y0, window.y1)
+        cols = slice(window.x0, window.x1)
+        image_crop = np.ascontiguousarray(image_rgb[rows, cols])
+        mask_crop = np.ascontiguousarray(mask_u8[rows, cols])
+        result = inpaint_fn(image_crop, mask_crop)
+        if tuple(result.shape[:2]) != tuple(image_crop.shape[:2]):
+            raise RuntimeError(
+                "Инпейнт ROI вернул кроп неверного размера: "
+                f"{result.shape[1]}x{result.shape[0]} вместо {window.width}x{window.height}"
+            )
+        if composite_mask:
+            keep = mask_crop > 0
+            out[rows, cols][keep] = result[keep]
+        else:
+            out[rows, cols] = result
+    return out, windows
+
+
+def split_window(window: RoiWindow, *, max_aspect: float, overlap: int) -> list[RoiWindow]:
+    """Cuts a window longer than `max_aspect` x its short side into overlapping pieces.
+
+    Pieces run along the long axis, share the short side, have equal length
+    (`short * max_aspect`) and overlap by at least `overlap` pixels. A window
+    within the aspect limit is returned unchanged.
+    """
+    vertical = window.height >= window.width
+    short = window.width if vertical else window.height
+    start = window.y0 if vertical else window.x0
+    length = window.height if vertical else window.width
+    piece = max(1, int(short * float(max_aspect)))
+    if length <= piece:
+        return [window]
+    overlap = max(0, min(int(overlap), piece // 2))
+    count = -(-(length - overlap) // (piece - overlap))
+    offsets = [start + round(i * (length - piece) / (count - 1)) for i in range(count)]
+    if vertical:
+        return [RoiWindow(window.x0, y, window.x1, y + piece) for y in offsets]
+    return [RoiWindow(x, window.y0, x + piece, window.y1) for x in offsets]
+
+
+def fit_window_aspect(window: RoiWindow, aspect: float, width: int, height: int) -> RoiWindow:
+    """Grows the short side of `window` toward `aspect` (w / h) within a `width x height` page.
+
+    The window is only ever enlarged, and stays unchanged along an axis the
+    page is too small for, so a later resize to the bucket is as close to
+    uniform as the page allows.
+    """
+    x0, y0, x1, y1 = window.as_list()
+    if window.width < window.height * aspect:
+        x0, x1 = _grow_span(x0, x1, min(width, round(window.height * aspect)), width)
+    else:
+        y0, y1 = _grow_span(y0, y1, min(height, round(window.width / aspect)), height)
+    return RoiWindow(x0, y0, x1, y1)
+
+
+def _grow_to_min_size(box: list[int], min_size: int, width: int, height: int) -> list[int]:
+    if min_size <= 0:
+        return box
+    x0, y0, x1, y1 = box
+    x0, x1 = _grow_span(x0, x1, min(min_size, width), width)
+    y0, y1 = _grow_span(y0, y1, min(min_size, height), height)
+    return [x0, y0, x1, y1]
+
+
+def _grow_span(start: int, end: int, size: int, limit: int) -> tuple[int, int]:
+    missing = size - (end - start)
+    if missing <= 0:
+        return start, end
+    start -= missing // 2
+    end = start + size
+    if start < 0:
+        start, end = 0, size
+    if end > limit:
+        start, end = limit - size, limit
+    return start, end
+
+
+def _merge_boxes(boxes: list[list[int]], gap: int) -> list[list[int]]:
+    """Merges boxes that overlap or are closer than `gap` until none remain."""
+    merged = [list(box) for box in boxes]
+    changed = True
+    while changed:
+        changed = False
+        merged.sort(key=lambda box: (box[1], box[0]))
+        out: list[list[int]] = []
+        for box in merged:
+            for existing in out:
+                if (
+                    box[0] < existing[2] + gap
+                    and existing[0] < box[2] + gap
+                    and box[1] < existing[3] + gap
+                    and existing[1] < box[3] + gap
+                ):
+                    existing[0] = min(existing[0], box[0])
+                    existing[1] = min(existing[1], box[1])
+                    existing[2] = max(existing[2], box[2])
+                    existing[3] = max(existing[3], box[3])
+                    changed = True
+                    break
+            else:
+                out.append(box)
+        merged = out
+    return merged
+
+
+def _to_int(value: Any, default: int) -> int:
+    try:
+        if isinstance(value, bool):
+            return default
+        return int(value)
+    except Exception:
+        return default
+
+
+def _to_bool(value: Any, default: bool) -> bool:
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in {"1", "true", "yes", "y", "on"}:
+        return True
+    if text in {"0", "false", "no", "n", "off"}:
+        return False
+    return default
+
+
+def _maybe_cv2():
+    try:
+        import cv2  # type: ignore
+
+        return cv2
+    except Exception:
+        return None
+
+
+def _np():
+    try:
+        import numpy as np  # type: ignore
+
+        return np
+    except Exception as exc:
+        raise RuntimeError(
+            "Для ROI-инпейнта требуется пакет numpy. Установите зависимости backend."
+        ) from exc
@@ -7,7 +7,8 @@ Package for the framed, multiplexed Rust <-> Python IPC protocol (v2).
 This package contains the complete framed IPC implementation:
 - `PROTOCOL.md`: authoritative wire specification.
 - `protocol.py`: shared constants (method names, header keys, size guards).
-- `framing.py`: pure wire codec — `read_frame`/`write_frame`/`encode_frame`.
+- `framing.py`: pure wire codec — `read_frame`/`write_frame`/`encode_frame`
+  (zero-copy `encode_frame_parts`/`write_frame_parts`).
 - `dispatcher.py`: per-connection read loop, request routing, cancellation.
 - `frame_server.py`: AF_UNIX server binding/lifecycle (`run_frame_server`).
 - `events.py`: thread-safe event bus for server-initiated `event` frames.
@@ -9,7 +9,9 @@ worker threads, tracks per-id cancellation, and serializes all outbound frames
 
 Main responsibilities:
 - handshake: read the client `hello`, validate `v` == PROTOCOL_VERSION, reply
-  `hello{v, backend_version}` or an `error` frame + close on mismatch;
+  `hello{v, backend_version, caps}` or an `error` frame + close on mismatch;
+  `caps` is the subset of the client's offered transport capabilities the
+  server supports, and is what handlers see as `ctx.transport_caps`;
 - per `request{id, method}`: register a cancel `threading.Event` for that id,
   submit the handler to a thread pool, let it emit `progress{id}` frames, then
   emit the terminal `response{id, status, ...}` (+ blob) or an `error` frame;
@@ -37,6 +39,7 @@ from .events import EventBus, EventSink
 from .framing import FrameError, FrameWriteLock, StreamClosed, read_frame, write_frame
 from .protocol import (
     HEADER_BACKEND_VERSION,
+    HEADER_CAPS,
     HEADER_ERROR,
     HEADER_ID,
     HEADER_KIND,
@@ -53,6 +56,7 @@ from .protocol import (
     STATUS_ERROR,
     STATUS_INTERRUPTED,
     STATUS_OK,
+    SUPPORTED_CAPS,
 )
 from .registry import HandlerContext, Interrupted, get_handler
 
@@ -107,12 +111,16 @@ class Dispatcher:
         self._events = events
         self._backend_version = backend_version
 
+        # The connection socket (when known) lets frames go out as one
+        # scatter-gather `sendmsg` without copying the blob.
+        self._sock = sock
         self._write_lock = FrameWriteLock()
         # `sock` (when supplied) lets the event bus bound how long a single event
         # write may block on this connection, so a slow/dead client cannot stall
         # the publisher for everyone else (FIX-4).
         self._sink = EventSink(writer, self._write_lock, sock)
         self._handshake_done = False
+        self._transport_caps: frozenset[str] = frozenset()
 
         # Per-id cancellation registry. Guarded by `_cancels_lock`.
         self._cancels_lock = threading.Lock()
@@ -123,7 +131,7 @@ class Dispatcher:
     def _write(self, header: dict[str, Any], blob: bytes = b"") -> None:
         """Write one whole frame under the connection write lock (atomic)."""
         with self._write_lock:
-            write_frame(self._writer, header, blob)
+            write_frame(self._writer, header, blob, self._sock)
 
     def _send_error_frame(self, request_id: int, message: str) -> None:
         """Send a protocol-level `kind:"error"` frame (§6). Best-effort."""
@@ -189,11 +197,18 @@ class Dispatcher:
             )
             return False
 
+        offered = header.get(HEADER_CAPS)
+        if isinstance(offered, list):
+            self._transport_caps = frozenset(
+                cap for cap in offered if isinstance(cap, str) and cap in SUPPORTED_CAPS
+            )
+
         reply = {
             HEADER_VERSION: PROTOCOL_VERSION,
             HEADER_ID: 0,
             HEADER_KIND: KIND_HELLO,
             HEADER_BACKEND_VERSION: self._backend_version,
+            HEADER_CAPS: sorted(self._transport_caps),
         }
         try:
             self._write(reply)
@@ -201,7 +216,9 @@ class Dispatcher:
             return False
 
         self._handshake_done = True
-        # Now that the client is ready, subscribe it to server events.
+        # Now that the client is ready, subscribe it to server events (with its
+        # granted caps, e.g. `health_delta`).
+        self._sink.caps = self._transport_caps
         self._events.register(self._sink)
         return True
 
@@ -294,11 +311,14 @@ class Dispatcher:
         # SHALLOW COPY of the shared connection context (never mutate `self._ctx`).
         # `dataclasses.replace` copies the field references (`state`, `events`,
         # `get_health_snapshot`) verbatim, so everything else a handler reads
-        # still resolves; only `progress_emitter` differs per request. Because
+        # still resolves; only `progress_emitter` differs per request (plus the
+        # connection's negotiated `transport_caps`). Because
         # each worker thread sees its own copy, two concurrent requests on this
         # connection can never observe each other's emitter (no misrouted ids).
         request_ctx = dataclasses.replace(
-            self._ctx, progress_emitter=ProgressEmitter(self, request_id)
+            self._ctx,
+            progress_emitter=ProgressEmitter(self, request_id),
+            transport_caps=self._transport_caps,
         )
         try:
             try:
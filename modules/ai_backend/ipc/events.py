@@ -4,8 +4,8 @@ File: modules/ai_backend/ipc/events.py
 Purpose:
 Publish/subscribe event bus for the v2 IPC protocol. Server-initiated `event`
 frames (id=0) are fanned out to every live connection. The health worker
-publishes `TOPIC_HEALTH` snapshots; later phases publish `TOPIC_DEVICE` /
-`TOPIC_MODEL_LOAD` / `TOPIC_LOG`.
+publishes `TOPIC_HEALTH` snapshots, `DEVICE_RESOLUTION` publishes `TOPIC_DEVICE`
+changes and `ModelPreloader` publishes `TOPIC_MODEL_LOAD`; `TOPIC_LOG` is reserved.
 
 Main responsibilities:
 - track the set of live connections (register on connect, unregister on close);
@@ -37,7 +37,7 @@ from __future__ import annotations
 import threading
 from typing import Any
 
-from .framing import FrameWriteLock, _write_all, encode_frame
+from .framing import FrameParts, FrameWriteLock, encode_frame_parts, write_frame_parts
 from .protocol import (
     HEADER_ID,
     HEADER_KIND,
@@ -64,19 +64,26 @@ class EventSink:
     `sock` is the underlying connection socket, supplied so the event bus can
     bound how long a single event write may block (FIX-4). It is optional: when
     absent (e.g. a `BytesIO`-backed test sink) the timeout guard is skipped.
+
+    `caps` are the connection's negotiated hello capabilities; `synced_topics`
+    records the topics for which a delta-capable sink has already received a
+    full payload (see `EventBus.publish`).
     """
 
-    __slots__ = ("writer", "write_lock", "sock")
+    __slots__ = ("writer", "write_lock", "sock", "caps", "synced_topics")
 
     def __init__(
         self,
         writer: Any,
         write_lock: FrameWriteLock,
         sock: Any = None,
+        caps: frozenset[str] = frozenset(),
     ) -> None:
         self.writer = writer
         self.write_lock = write_lock
         self.sock = sock
+        self.caps = caps
+        self.synced_topics: set[str] = set()
 
 
 class EventBus:
@@ -100,7 +107,15 @@ class EventBus:
         with self._lock:
             return len(self._sinks)
 
-    def publish(self, topic: str, payload: dict[str, Any], blob: bytes = b"") -> None:
+    def publish(
+        self,
+        topic: str,
+        payload: dict[str, Any],
+        blob: bytes = b"",
+        *,
+        delta: dict[str, Any] | None = None,
+        delta_cap: str | None = None,
+    ) -> None:
         """Fan a single `event{id:0, topic, ...payload}` frame out to all sinks.
 
         Best-effort: a sink whose socket is broken/closed -- or whose write
@@ -109,29 +124,36 @@ class EventBus:
         the publisher (and thus every other client; FIX-4). `payload` fields are
         merged inline into the event header; the reserved frame fields
         (`v`/`id`/`kind`/`topic`) always win.
+
+        With `delta` + `delta_cap`, sinks that negotiated `delta_cap` and have
+        already received one full `payload` for this topic get the (smaller)
+        `delta` header instead; every other sink gets the full `payload`. Each
+        variant is encoded once.
         """
         if topic not in VALID_TOPICS:
             raise ValueError(f"Unknown event topic: {topic!r}")
 
-        header: dict[str, Any] = dict(payload)
-        header[HEADER_VERSION] = PROTOCOL_VERSION
-        header[HEADER_ID] = 0
-        header[HEADER_KIND] = KIND_EVENT
-        header[HEADER_TOPIC] = topic
-
-        # Encode once; the same bytes go to every subscriber.
-        frame = encode_frame(header, blob)
+        # Encode once; the same head + (uncopied) blob go to every subscriber.
+        frame = encode_frame_parts(_event_header(topic, payload), blob)
+        delta_frame = None
+        if delta is not None and delta_cap is not None:
+            delta_frame = encode_frame_parts(_event_header(topic, delta))
 
         with self._lock:
             sinks = list(self._sinks)
 
         dead: list[EventSink] = []
         for sink in sinks:
+            capable = delta_cap is not None and delta_cap in sink.caps
+            use_delta = delta_frame is not None and capable and topic in sink.synced_topics
             try:
                 with sink.write_lock:
-                    self._write_to_sink(sink, frame)
+                    self._write_to_sink(sink, delta_frame if use_delta else frame)
             except Exception:  # noqa: BLE001 - broken/stuck socket -> drop sink
                 dead.append(sink)
+                continue
+            if capable and not use_delta:
+                sink.synced_topics.add(topic)
 
         if dead:
             with self._lock:
@@ -139,7 +161,7 @@ class EventBus:
                     self._sinks.discard(sink)
 
     @staticmethod
-    def _write_to_sink(sink: EventSink, frame: bytes) -> None:
+    def _write_to_sink(sink: EventSink, frame: FrameParts) -> None:
         """Write one pre-encoded event frame to `sink`, bounded by a timeout.
 
         When the sink carries its socket, a non-blocking-with-deadline send
@@ -150,18 +172,25 @@ class EventBus:
         test sink) are written directly.
         """
         if sink.sock is None:
-            _write_all(sink.writer, frame)
-            sink.writer.flush()
+            write_frame_parts(sink.writer, frame)
             return
 
         previous_timeout = sink.sock.gettimeout()
         try:
             sink.sock.settimeout(_PUBLISH_WRITE_TIMEOUT_S)
-            _write_all(sink.writer, frame)
-            sink.writer.flush()
+            write_frame_parts(sink.writer, frame, sink.sock)
         finally:
             try:
                 sink.sock.settimeout(previous_timeout)
             except OSError:
                 # Socket already closed mid-write; nothing to restore.
                 pass
+
+
+def _event_header(topic: str, payload: dict[str, Any]) -> dict[str, Any]:
+    header: dict[str, Any] = dict(payload)
+    header[HEADER_VERSION] = PROTOCOL_VERSION
+    header[HEADER_ID] = 0
+    header[HEADER_KIND] = KIND_EVENT
+    header[HEADER_TOPIC] = topic
+    return header
@@ -28,8 +28,8 @@ Wire contract (shared with the Rust client, do not deviate):
 Key structures:
 - `FrameWsServer`: `ThreadingMixIn + TCPServer` bound to `(ws_host, ws_port)`.
 - `_WsStreamAdapter`: per-connection byte-stream adapter exposing the duck-typed
-  `read(n)` / `write(data)` / `flush()` interface `framing.py` needs, backed by
-  a `wsproto.WSConnection` over the accepted TCP socket.
+  `read(n)` / `write(data)` / `writev(parts)` / `flush()` interface `framing.py`
+  needs, backed by a `wsproto.WSConnection` over the accepted TCP socket.
 
 Outbound writer thread (concurrency contract):
 Each connection runs ONE dedicated outbound writer thread. It is the ONLY place
@@ -363,9 +363,9 @@ class _WsStreamAdapter:
     def write(self, data: bytes) -> int:
         """Enqueue `data` as one outbound WS BINARY message; return its length.
 
-        Called by `write_frame` on pool/publisher threads. The frame codec builds
-        a whole frame in memory and hands it here in one call, so one `write`
-        maps to exactly one binary message (one full frame per message, per the
+        Called through `writev` by the frame codec on pool/publisher threads,
+        always with a whole frame, so one `write` maps to exactly one binary
+        message (one full frame per message, per the
         wire contract). The bytes are NOT sent here: they are enqueued for the
         single writer thread, so producers never touch the shared encoder/socket.
         Always reports the full length so the codec's write-all loop completes in
@@ -387,6 +387,16 @@ class _WsStreamAdapter:
         self._enqueue_outbound((_OUT_DATA, payload), "data", payload_bytes=len(payload))
         return len(payload)
 
+    def writev(self, parts: list[memoryview]) -> int:
+        """Enqueue the frame `parts` (head, blob) as ONE outbound WS BINARY message.
+
+        Called by `framing.write_frame_parts`, which hands a frame over as its
+        encoded head plus the uncopied blob. Joining them here (the message
+        payload needs one contiguous buffer anyway) keeps the one frame per
+        message contract that sequential `write` calls would break.
+        """
+        return self.write(b"".join(parts))
+
     def flush(self) -> None:
         """No-op: the FIFO queue preserves order and the writer thread sends.
 
@@ -8,15 +8,24 @@ module reads and writes that exact layout over any blocking byte stream (an
 AF_UNIX socket's `makefile()` object, a `BytesIO`, or a test fake).
 
 Main responsibilities:
-- `read_frame(reader)` -> `(header: dict, blob: bytes)`, reassembling partial
-  reads and treating EOF in the middle of a frame as a fatal `FrameError`;
-- `write_frame(writer, header, blob)` -> serialize one frame atomically;
+- `read_frame(reader)` -> `(header: dict, blob)`, reassembling partial reads
+  with `readinto` straight into one preallocated `bytearray` per segment and
+  treating EOF in the middle of a frame as a fatal `FrameError`;
+- `write_frame(writer, header, blob, sock=None)` -> write one frame without
+  copying the blob: a scatter-gather `socket.sendmsg` of `[prefixes+header,
+  blob]` when the connection socket is known, a `writer.writev(parts)` when
+  the writer provides one, otherwise sequential write-all calls;
+- `encode_frame_parts` / `write_frame_parts` so the event bus encodes a frame
+  once and fans the same parts out to every subscriber;
 - enforce the `MAX_HEADER_BYTES` / `MAX_BLOB_BYTES` size guards before
   allocating or reading either segment;
 - `FrameWriteLock`, a per-connection lock so multiple worker threads can write
   whole frames to one socket without interleaving.
 
 Notes:
+Blobs come back as `bytearray` (equal to, and usable wherever, `bytes`); a
+writer with a `writev(parts)` method receives the whole frame in one call (the
+WS adapter relies on this to keep one frame per message).
 This module is transport-agnostic and has no knowledge of kinds, methods, or
 dispatch. It only moves bytes. The authoritative wire spec lives in
 `PROTOCOL.md`; the shared constants live in `protocol.py`.
@@ -55,7 +64,11 @@ class _Writer(Protocol):
     def flush(self) -> Any: ...
 
 
-def _write_all(writer: _Writer, data: bytes) -> None:
+# `(head, blob)`: the two length prefixes + header JSON, and the untouched blob.
+FrameParts = tuple[bytes, "bytes | bytearray | memoryview"]
+
+
+def _write_all(writer: _Writer, data: bytes | bytearray | memoryview) -> None:
     """Write *all* of `data` to `writer`, looping over short writes.
 
     A stream `write()` may legally consume fewer bytes than offered and return
@@ -82,30 +95,37 @@ def _write_all(writer: _Writer, data: bytes) -> None:
         sent += written
 
 
-def _read_exactly(reader: _Reader, n: int) -> bytes:
-    """Read exactly `n` bytes from `reader`, looping over partial reads.
+def _read_exactly(reader: _Reader, n: int) -> bytearray:
+    """Read exactly `n` bytes from `reader` into one preallocated buffer.
 
-    A blocking stream's `read(n)` may legally return fewer than `n` bytes; we
-    loop until the buffer is full. An empty read means EOF: zero bytes at a
-    frame boundary is a clean stream close, but a short read mid-frame is fatal.
+    A blocking stream's `read(n)`/`readinto(b)` may legally return fewer than
+    `n` bytes; we loop until the buffer is full. Readers with `readinto`
+    (socket/file objects) fill the buffer in place with no intermediate chunk
+    objects; plain `read(n)` readers (test fakes, the WS adapter) have each
+    chunk copied into it once. An empty read means EOF: zero bytes at a frame
+    boundary is a clean stream close, but a short read mid-frame is fatal.
     The two cases are distinguished by the caller, so here we simply raise
     `FrameError` whenever the stream ends before `n` bytes arrive.
     """
+    buf = bytearray(n)
     if n == 0:
-        return b""
-    chunks: list[bytes] = []
-    remaining = n
-    while remaining > 0:
-        chunk = reader.read(remaining)
-        if not chunk:
+        return buf
+    view = memoryview(buf)
+    readinto = getattr(reader, "readinto", None)
+    filled = 0
+    while filled < n:
+        if readinto is not None:
+            got = readinto(view[filled:]) or 0
+        else:
+            chunk = reader.read(n - filled)
+            got = len(chunk)
+            view[filled : filled + got] = chunk
+        if not got:
             raise FrameError(
-                f"Unexpected EOF: wanted {n} bytes, got {n - remaining} before close."
+                f"Unexpected EOF: wanted {n} bytes, got {filled} before close."
             )
-        chunks.append(chunk)
-        remaining -= len(chunk)
-    if len(chunks) == 1:
-        return chunks[0]
-    return b"".join(chunks)
+        filled += got
+    return buf
 
 
 class StreamClosed(FrameError):
@@ -117,12 +137,15 @@ class StreamClosed(FrameError):
     """
 
 
-def read_frame(reader: _Reader) -> tuple[dict[str, Any], bytes]:
-    """Read one frame from `reader` and return `(header_dict, blob_bytes)`.
+def read_frame(reader: _Reader) -> tuple[dict[str, Any], bytes | bytearray]:
+    """Read one frame from `reader` and return `(header_dict, blob)`.
 
     Layout (big-endian u32 length prefixes):
         [header_len][header_json][blob_len][blob]
 
+    A non-empty blob is a freshly allocated `bytearray` owned by the caller
+    (read in place, never joined from chunks); an empty blob is `b""`.
+
     Raises:
         StreamClosed: the stream ended cleanly at the start of a frame (the peer
             disconnected between frames). The caller drops the connection.
@@ -163,11 +186,11 @@ def read_frame(reader: _Reader) -> tuple[dict[str, Any], bytes]:
     return header, blob
 
 
-def encode_frame(header: dict[str, Any], blob: bytes = b"") -> bytes:
-    """Serialize one frame to a single bytes object (no I/O).
+def encode_frame_parts(header: dict[str, Any], blob: bytes | bytearray | memoryview = b"") -> FrameParts:
+    """Serialize one frame as `(head, blob)` without copying the blob (no I/O).
 
-    Useful for the event bus, which encodes a frame once and fans the same bytes
-    out to every subscriber. Enforces the same size guards as `write_frame`.
+    `head` is `[header_len][header_json][blob_len]`; `blob` is returned as
+    given. Enforces the `MAX_HEADER_BYTES` / `MAX_BLOB_BYTES` guards.
     """
     header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
     if len(header_bytes) > MAX_HEADER_BYTES:
@@ -175,36 +198,89 @@ def encode_frame(header: dict[str, Any], blob: bytes = b"") -> bytes:
             f"Encoded header {len(header_bytes)} bytes exceeds MAX_HEADER_BYTES "
             f"{MAX_HEADER_BYTES}."
         )
-    if len(blob) > MAX_BLOB_BYTES:
+    blob_len = memoryview(blob).nbytes
+    if blob_len > MAX_BLOB_BYTES:
         raise FrameError(
-            f"Blob {len(blob)} bytes exceeds MAX_BLOB_BYTES {MAX_BLOB_BYTES}."
+            f"Blob {blob_len} bytes exceeds MAX_BLOB_BYTES {MAX_BLOB_BYTES}."
         )
-    return b"".join(
+    head = b"".join(
         (
             _LEN_STRUCT.pack(len(header_bytes)),
             header_bytes,
-            _LEN_STRUCT.pack(len(blob)),
-            blob,
+            _LEN_STRUCT.pack(blob_len),
         )
     )
+    return head, blob
 
 
-def write_frame(writer: _Writer, header: dict[str, Any], blob: bytes = b"") -> None:
+def encode_frame(header: dict[str, Any], blob: bytes = b"") -> bytes:
+    """Serialize one frame to a single bytes object (no I/O).
+
+    Copies the blob once; the write paths use `encode_frame_parts` instead.
+    Enforces the same size guards as `write_frame`.
+    """
+    head, body = encode_frame_parts(header, blob)
+    return head + bytes(body) if body else head
+
+
+def _sendmsg_all(sock: Any, buffers: list[memoryview]) -> None:
+    """Scatter-gather `buffers` onto `sock`, looping over partial `sendmsg`."""
+    pending = [buf for buf in buffers if buf.nbytes]
+    while pending:
+        sent = sock.sendmsg(pending)
+        if sent <= 0:
+            raise FrameError(f"Socket sendmsg accepted {sent} bytes.")
+        while sent:
+            first = pending[0]
+            if sent >= first.nbytes:
+                sent -= first.nbytes
+                pending.pop(0)
+            else:
+                pending[0] = first[sent:]
+                sent = 0
+
+
+def write_frame_parts(writer: _Writer, parts: FrameParts, sock: Any = None) -> None:
+    """Write pre-encoded frame `parts` (from `encode_frame_parts`), then flush.
+
+    With `sock` (the connection socket behind `writer`) the head and blob go
+    out in one `sendmsg` scatter-gather call; a writer with `writev(parts)`
+    gets the whole frame in one call; any other writer gets sequential
+    write-all calls. The blob is never copied or joined on this path.
+    """
+    buffers = [memoryview(part).cast("B") for part in parts]
+    if sock is not None and hasattr(sock, "sendmsg"):
+        _sendmsg_all(sock, buffers)
+    else:
+        writev = getattr(writer, "writev", None)
+        if callable(writev):
+            writev(buffers)
+        else:
+            for buf in buffers:
+                if buf.nbytes:
+                    _write_all(writer, buf)
+    writer.flush()
+
+
+def write_frame(
+    writer: _Writer,
+    header: dict[str, Any],
+    blob: bytes | bytearray | memoryview = b"",
+    sock: Any = None,
+) -> None:
     """Encode and write one whole frame to `writer`, then flush.
 
-    The whole frame is built in memory and written with a true write-all loop
-    (`_write_all`) so a short write never truncates the frame, then flushed so
-    buffered writers actually push the bytes out. A frame is never split across
-    worker threads at the byte level (callers must still serialize concurrent
+    The blob is written as-is next to the encoded head (`write_frame_parts`):
+    a `sendmsg` on `sock` when given, otherwise write-all loops so a short
+    write never truncates the frame. A frame is never split across worker
+    threads at the byte level (callers must still serialize concurrent
     writers with a `FrameWriteLock`).
 
     Raises FrameError on a size-guard breach. A broken/closed socket surfaces as
     the underlying OSError (BrokenPipeError/ConnectionResetError); the caller
     treats that as a dropped connection.
     """
-    data = encode_frame(header, blob)
-    _write_all(writer, data)
-    writer.flush()
+    write_frame_parts(writer, encode_frame_parts(header, blob), sock)
 
 
 class FrameWriteLock:
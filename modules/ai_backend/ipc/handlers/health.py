@@ -40,8 +40,10 @@ def _handle_health(
 ) -> tuple[dict[str, Any], bytes]:
     """`health`: return the current health snapshot as inline response fields.
 
-    Mirrors ``GET /health``: the snapshot dict (already maintained by the health
-    worker) is returned verbatim as the response header fields.  No blob.
+    Mirrors ``GET /health``: the snapshot dict is returned verbatim as the
+    response header fields.  No blob.  In the server ``get_health_snapshot``
+    rebuilds the snapshot on each pull (``server._refresh_health_snapshot``),
+    so it never lags behind the health worker's coalesced rebuilds.
     """
     snapshot = ctx.get_health_snapshot()
     return dict(snapshot), b""
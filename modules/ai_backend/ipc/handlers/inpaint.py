@@ -14,6 +14,12 @@ Two-image blob convention (shared by all inpaint methods):
     header carries ``image_len: int`` and ``mask_len: int`` to split the blob.
 The result image PNG goes in the response blob (raw bytes, NOT base64).
 
+Shared-memory variant (connections that negotiated ``shm_image`` in hello):
+    header carries ``image_shm`` / ``mask_shm`` descriptors instead of the
+    lengths and the request blob is empty (see ``ipc/shm.py``). An optional
+    ``result_shm`` descriptor receives the raw result pixels, in which case the
+    response blob is empty; without it the result PNG is returned as usual.
+
 The underlying ``AppState`` inpaint services return the result PNG as raw bytes
 in the ``image_png`` result key (see e.g. ``lama_inpaint_service.inpaint_image_bytes``);
 these handlers put those bytes straight into the response blob.
@@ -33,6 +39,7 @@ from ..protocol import (
     METHOD_INPAINT_LAMA_V2_UNLOAD,
 )
 from ..registry import HandlerContext, Interrupted, register
+from ..shm import inpaint_from_shm
 
 
 def _read_int_field(header: dict[str, Any], name: str) -> int:
@@ -79,6 +86,27 @@ def _split_image_mask(
     return image_bytes, mask_bytes
 
 
+def _run_inpaint(
+    ctx: HandlerContext,
+    service: Any,
+    header: dict[str, Any],
+    blob: bytes,
+) -> dict[str, Any]:
+    """Run ``service`` on the blob pair or, when present, the shm descriptors."""
+    params = _read_params(header)
+    if header.get("image_shm") is not None:
+        return inpaint_from_shm(
+            ctx.transport_caps,
+            header,
+            blob,
+            lambda image_rgb, mask_u8: service.inpaint_image_array(
+                image_rgb, mask_u8, params=params
+            ),
+        )
+    image_bytes, mask_bytes = _split_image_mask(header, blob)
+    return service.inpaint_image_bytes(image_bytes, mask_bytes, params=params)
+
+
 def _result_png_bytes(result: dict[str, Any]) -> bytes:
     """Return the service's raw ``image_png`` result for the response blob.
 
@@ -100,7 +128,8 @@ def _handle_inpaint_lama_v2(
 ) -> tuple[dict[str, Any], bytes]:
     """`inpaint.lama_v2`: LaMa-v2 inpaint of (image, mask) from the request blob.
 
-    Request blob = image_png ++ mask_png, split by ``image_len``/``mask_len``.
+    Request blob = image_png ++ mask_png, split by ``image_len``/``mask_len``
+    (or ``image_shm``/``mask_shm`` descriptors, see the module docstring).
     ``params`` (refine, n_iters, max_scales, px_budget, model_name) is inline in
     the header.  The result PNG is returned as the response blob; the metadata
     (engine/source_size/device/refine/model_name) is the response header.
@@ -108,14 +137,7 @@ def _handle_inpaint_lama_v2(
     if cancel_event.is_set():
         raise Interrupted("inpaint.lama_v2 canceled before start.")
 
-    image_bytes, mask_bytes = _split_image_mask(header, blob)
-    params = _read_params(header)
-
-    result = ctx.state.lama_inpaint.inpaint_image_bytes(
-        image_bytes,
-        mask_bytes,
-        params=params,
-    )
+    result = _run_inpaint(ctx, ctx.state.lama_inpaint, header, blob)
 
     if cancel_event.is_set():
         raise Interrupted("inpaint.lama_v2 canceled.")
@@ -156,21 +178,15 @@ def _handle_inpaint_lama_mpe(
 ) -> tuple[dict[str, Any], bytes]:
     """`inpaint.lama_mpe`: LaMa-MPE inpaint of (image, mask) from the request blob.
 
-    Request blob = image_png ++ mask_png, split by ``image_len``/``mask_len``.
+    Request blob = image_png ++ mask_png, split by ``image_len``/``mask_len``
+    (or ``image_shm``/``mask_shm`` descriptors, see the module docstring).
     ``params`` (inpaint_size) is inline in the header.  The result PNG is the
     response blob; engine/source_size/device/inpaint_size are the header.
     """
     if cancel_event.is_set():
         raise Interrupted("inpaint.lama_mpe canceled before start.")
 
-    image_bytes, mask_bytes = _split_image_mask(header, blob)
-    params = _read_params(header)
-
-    result = ctx.state.lama_mpe_inpaint.inpaint_image_bytes(
-        image_bytes,
-        mask_bytes,
-        params=params,
-    )
+    result = _run_inpaint(ctx, ctx.state.lama_mpe_inpaint, header, blob)
 
     if cancel_event.is_set():
         raise Interrupted("inpaint.lama_mpe canceled.")
@@ -210,21 +226,15 @@ def _handle_inpaint_aot(
 ) -> tuple[dict[str, Any], bytes]:
     """`inpaint.aot`: AOT-GAN inpaint of (image, mask) from the request blob.
 
-    Request blob = image_png ++ mask_png, split by ``image_len``/``mask_len``.
+    Request blob = image_png ++ mask_png, split by ``image_len``/``mask_len``
+    (or ``image_shm``/``mask_shm`` descriptors, see the module docstring).
     ``params`` (inpaint_size) is inline in the header.  The result PNG is the
     response blob; engine/source_size/device/inpaint_size are the header.
     """
     if cancel_event.is_set():
         raise Interrupted("inpaint.aot canceled before start.")
 
-    image_bytes, mask_bytes = _split_image_mask(header, blob)
-    params = _read_params(header)
-
-    result = ctx.state.aot_inpaint.inpaint_image_bytes(
-        image_bytes,
-        mask_bytes,
-        params=params,
-    )
+    result = _run_inpaint(ctx, ctx.state.aot_inpaint, header, blob)
 
     if cancel_event.is_set():
         raise Interrupted("inpaint.aot canceled.")
@@ -0,0 +1,74 @@
+"""
+File: modules/ai_backend/ipc/handlers/models.py
+
+Methods hosted here:
+    models.preload — queue background model warmups (METHOD_MODELS_PRELOAD)
+
+Request fields:
+    models:     list of stage keys, each a method name string (``"ocr.manga"``)
+                or ``{"model": "<key>", "params": {...}}`` with the params the
+                real request will use (checkpoint, device, langs, ...).
+    next_stage: optional single entry of the same shape: the stage the client
+                will run after the current one. It is queued like ``models`` so
+                its model loads while the current stage still runs.
+
+The handler returns immediately; warmups run one at a time in the background
+(``model_preload.ModelPreloader``) and report ``model_load`` events
+``{model, phase, loaded, total, message}`` with ``phase`` in
+``queued`` / ``loading`` / ``loaded`` / ``failed``.
+
+Response fields (status=ok):
+    queued:          string[] — keys accepted for loading
+    already_pending: string[] — keys already queued or loading with the same
+                     params; the same key with different params is queued
+    unknown:         string[] — keys that are not preload targets
+    targets:         string[] — every supported key
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+from ..protocol import METHOD_MODELS_PRELOAD
+from ..registry import HandlerContext, register
+
+
+def _parse_entry(entry: Any) -> tuple[str, dict[str, Any]]:
+    if isinstance(entry, str) and entry.strip():
+        return entry.strip(), {}
+    if isinstance(entry, dict):
+        model = entry.get("model")
+        params = entry.get("params") or {}
+        if isinstance(model, str) and model.strip() and isinstance(params, dict):
+            return model.strip(), params
+    raise ValueError(
+        f"Preload entry must be a model key or {{'model': str, 'params': dict}}; got {entry!r}."
+    )
+
+
+def _handle_models_preload(
+    ctx: HandlerContext,
+    header: dict[str, Any],
+    blob: bytes,
+    cancel_event: threading.Event,
+) -> tuple[dict[str, Any], bytes]:
+    """`models.preload`: queue warmups for ``models`` (+ ``next_stage``) and return at once."""
+    preloader = getattr(ctx.state, "model_preloader", None)
+    if preloader is None:
+        raise RuntimeError("Model preloading is not available in this backend.")
+
+    entries = header.get("models") or []
+    if not isinstance(entries, list):
+        raise ValueError("Field 'models' must be a list.")
+    next_stage = header.get("next_stage")
+    if next_stage is not None:
+        entries = [*entries, next_stage]
+    if not entries:
+        raise ValueError("Nothing to preload: 'models' and 'next_stage' are both empty.")
+
+    result = preloader.preload([_parse_entry(entry) for entry in entries])
+    return {**result, "targets": preloader.targets}, b""
+
+
+register(METHOD_MODELS_PRELOAD, _handle_models_preload)
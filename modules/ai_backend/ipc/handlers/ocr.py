@@ -8,6 +8,16 @@ Methods hosted here:
     ocr.paddle_vl    — PaddleOCR-VL recognition (METHOD_OCR_PADDLE_VL)
     ocr.surya        — Surya OCR recognition (METHOD_OCR_SURYA)
     ocr.paddle_onnx  — PaddleOCR-ONNX recognition (METHOD_OCR_PADDLE_ONNX)
+    ocr.manga.batch / ocr.easy.batch / ocr.paddle.batch / ocr.surya.batch
+                     — many crops per request (METHOD_OCR_*_BATCH), streaming
+
+Batch blob convention:
+    request blob = crop_png_0 ++ crop_png_1 ++ ... ++ crop_png_{N-1}
+    header carries ``crop_lens: [int, ...]`` (the offset table: crop ``i``
+    starts at ``sum(crop_lens[:i])``); the lengths must add up to the blob.
+    Every recognized crop is pushed as one ``progress{id}`` frame
+    ``{index, total, lines, text}``; the terminal ``response`` repeats all
+    results in input order as ``results: [{lines, text}, ...]``.
 
 Registration pattern — add a new OCR method handler here like this:
 
@@ -29,19 +39,27 @@ The ``register`` function is both a plain callable and a decorator:
 from __future__ import annotations
 
 import threading
-from typing import Any
+from typing import Any, Callable
 
 from ..protocol import (
     METHOD_OCR_EASY,
+    METHOD_OCR_EASY_BATCH,
     METHOD_OCR_MANGA,
+    METHOD_OCR_MANGA_BATCH,
     METHOD_OCR_PADDLE,
+    METHOD_OCR_PADDLE_BATCH,
     METHOD_OCR_PADDLE_ONNX,
     METHOD_OCR_PADDLE_VL,
     METHOD_OCR_SURYA,
+    METHOD_OCR_SURYA_BATCH,
 )
 from ..registry import HandlerContext, Interrupted, register
 
 
+# Upper bound on crops per batch request; a chapter page set stays well below it.
+MAX_BATCH_CROPS = 1024
+
+
 def _decode_optional_positive_int(header: dict[str, Any], field: str) -> int | None:
     """Mirror of ``server._decode_optional_positive_int``.
 
@@ -59,6 +77,131 @@ def _decode_optional_positive_int(header: dict[str, Any], field: str) -> int | N
     return raw
 
 
+def _decode_easy_langs(header: dict[str, Any]) -> str:
+    """``easy_langs`` (default ``"ko"``); a non-string is a ``ValueError``."""
+    easy_langs_raw = header.get("easy_langs", "ko")
+    if easy_langs_raw is None:
+        easy_langs_raw = "ko"
+    if not isinstance(easy_langs_raw, str):
+        raise ValueError("Field 'easy_langs' must be a string.")
+    return easy_langs_raw.strip() or "ko"
+
+
+def _decode_paddle_lang(header: dict[str, Any]) -> str:
+    """``paddle_lang`` (default ``"korean_v5"``); a non-string is a ``ValueError``."""
+    paddle_lang_raw = header.get("paddle_lang", "korean_v5")
+    if paddle_lang_raw is None:
+        paddle_lang_raw = "korean_v5"
+    if not isinstance(paddle_lang_raw, str):
+        raise ValueError("Field 'paddle_lang' must be a string.")
+    return paddle_lang_raw.strip() or "korean_v5"
+
+
+def _decode_surya_kwargs(header: dict[str, Any]) -> dict[str, Any]:
+    """Surya service kwargs from the ``surya_*`` header fields."""
+    task_name_raw = header.get("surya_task_name", "ocr_without_boxes")
+    if task_name_raw is None:
+        task_name_raw = "ocr_without_boxes"
+    if not isinstance(task_name_raw, str):
+        raise ValueError("Field 'surya_task_name' must be a string.")
+    return {
+        "task_name": task_name_raw.strip().lower() or "ocr_without_boxes",
+        "recognize_math": bool(header.get("surya_recognize_math", False)),
+        "sort_lines": bool(header.get("surya_sort_lines", False)),
+        "drop_repeated_text": bool(header.get("surya_drop_repeated_text", False)),
+        "max_sliding_window": _decode_optional_positive_int(header, "surya_max_sliding_window"),
+        "max_tokens": _decode_optional_positive_int(header, "surya_max_tokens"),
+    }
+
+
+def _split_crops(method: str, header: dict[str, Any], blob: bytes) -> list[bytes]:
+    """Split the batch blob by the ``crop_lens`` offset table.
+
+    Every length must be a positive int and the lengths must add up to the
+    blob length exactly; anything else is a request error (``ValueError``).
+    """
+    crop_lens = header.get("crop_lens")
+    if not isinstance(crop_lens, list) or not crop_lens:
+        raise ValueError("Field 'crop_lens' must be a non-empty list of positive integers.")
+    if len(crop_lens) > MAX_BATCH_CROPS:
+        raise ValueError(f"{method} accepts at most {MAX_BATCH_CROPS} crops per request.")
+    for length in crop_lens:
+        if isinstance(length, bool) or not isinstance(length, int) or length <= 0:
+            raise ValueError("Field 'crop_lens' must be a non-empty list of positive integers.")
+    expected = sum(crop_lens)
+    if expected != len(blob):
+        raise ValueError(
+            f"{method} blob length mismatch: sum(crop_lens) ({expected}) "
+            f"!= blob length ({len(blob)})."
+        )
+    view = memoryview(blob)
+    crops: list[bytes] = []
+    offset = 0
+    for length in crop_lens:
+        crops.append(bytes(view[offset : offset + length]))
+        offset += length
+    return crops
+
+
+def _run_ocr_batch(
+    ctx: HandlerContext,
+    method: str,
+    engine: str,
+    recognize_batch: Callable[..., list[dict[str, Any]]],
+    header: dict[str, Any],
+    blob: bytes,
+    cancel_event: threading.Event,
+    **service_kwargs: Any,
+) -> tuple[dict[str, Any], bytes]:
+    """Shared body of the ``ocr.*.batch`` handlers.
+
+    Calls ``recognize_batch(crops, ..., on_result=...)`` once; every result is
+    pushed as a ``progress{id}`` frame (best-effort, no-op without an emitter).
+    A set ``cancel_event`` stops the batch at the next finished crop.
+    """
+    if cancel_event.is_set():
+        raise Interrupted(f"{method} canceled before start.")
+    crops = _split_crops(method, header, blob)
+    total = len(crops)
+    emitter = getattr(ctx, "progress_emitter", None)
+
+    def on_result(index: int, result: dict[str, Any]) -> None:
+        if emitter is not None:
+            try:
+                emitter.emit(
+                    {
+                        "index": int(index),
+                        "total": total,
+                        "lines": result["lines"],
+                        "text": result["text"],
+                    }
+                )
+            except Exception:  # noqa: BLE001 - peer gone; finish the batch, ignored
+                pass
+        if cancel_event.is_set():
+            raise Interrupted(f"{method} canceled.")
+
+    results = recognize_batch(
+        crops,
+        join_newlines=bool(header.get("join_newlines", True)),
+        reflect_strings=bool(header.get("reflect_strings", False)),
+        on_result=on_result,
+        **service_kwargs,
+    )
+
+    if cancel_event.is_set():
+        raise Interrupted(f"{method} canceled.")
+
+    return (
+        {
+            "engine": engine,
+            "count": len(results),
+            "results": [{"lines": item["lines"], "text": item["text"]} for item in results],
+        },
+        b"",
+    )
+
+
 def _handle_ocr_manga(
     ctx: HandlerContext,
     header: dict[str, Any],
@@ -118,18 +261,11 @@ def _handle_ocr_easy(
     if cancel_event.is_set():
         raise Interrupted("ocr.easy canceled before start.")
 
-    easy_langs_raw = header.get("easy_langs", "ko")
-    if easy_langs_raw is None:
-        easy_langs_raw = "ko"
-    if not isinstance(easy_langs_raw, str):
-        raise ValueError("Field 'easy_langs' must be a string.")
-    easy_langs = easy_langs_raw.strip() or "ko"
-
     result = ctx.state.easy_ocr.recognize_image_bytes(
         blob,
         join_newlines=bool(header.get("join_newlines", True)),
         reflect_strings=bool(header.get("reflect_strings", False)),
-        langs=easy_langs,
+        langs=_decode_easy_langs(header),
     )
 
     if cancel_event.is_set():
@@ -165,18 +301,11 @@ def _handle_ocr_paddle(
     if cancel_event.is_set():
         raise Interrupted("ocr.paddle canceled before start.")
 
-    paddle_lang_raw = header.get("paddle_lang", "korean_v5")
-    if paddle_lang_raw is None:
-        paddle_lang_raw = "korean_v5"
-    if not isinstance(paddle_lang_raw, str):
-        raise ValueError("Field 'paddle_lang' must be a string.")
-    paddle_lang = paddle_lang_raw.strip() or "korean_v5"
-
     result = ctx.state.paddle_ocr.recognize_image_bytes(
         blob,
         join_newlines=bool(header.get("join_newlines", True)),
         reflect_strings=bool(header.get("reflect_strings", False)),
-        lang=paddle_lang,
+        lang=_decode_paddle_lang(header),
     )
 
     if cancel_event.is_set():
@@ -261,26 +390,14 @@ def _handle_ocr_surya(
     if cancel_event.is_set():
         raise Interrupted("ocr.surya canceled before start.")
 
-    task_name_raw = header.get("surya_task_name", "ocr_without_boxes")
-    if task_name_raw is None:
-        task_name_raw = "ocr_without_boxes"
-    if not isinstance(task_name_raw, str):
-        raise ValueError("Field 'surya_task_name' must be a string.")
-    task_name = task_name_raw.strip().lower() or "ocr_without_boxes"
-
-    max_sliding_window = _decode_optional_positive_int(header, "surya_max_sliding_window")
-    max_tokens = _decode_optional_positive_int(header, "surya_max_tokens")
+    surya_kwargs = _decode_surya_kwargs(header)
+    task_name = surya_kwargs["task_name"]
 
     result = ctx.state.surya_ocr.recognize_image_bytes(
         blob,
         join_newlines=bool(header.get("join_newlines", True)),
         reflect_strings=bool(header.get("reflect_strings", False)),
-        task_name=task_name,
-        recognize_math=bool(header.get("surya_recognize_math", False)),
-        sort_lines=bool(header.get("surya_sort_lines", False)),
-        drop_repeated_text=bool(header.get("surya_drop_repeated_text", False)),
-        max_sliding_window=max_sliding_window,
-        max_tokens=max_tokens,
+        **surya_kwargs,
     )
 
     if cancel_event.is_set():
@@ -356,3 +473,107 @@ def _handle_ocr_paddle_onnx(
 
 
 register(METHOD_OCR_PADDLE_ONNX, _handle_ocr_paddle_onnx)
+
+
+def _handle_ocr_manga_batch(
+    ctx: HandlerContext,
+    header: dict[str, Any],
+    blob: bytes,
+    cancel_event: threading.Event,
+) -> tuple[dict[str, Any], bytes]:
+    """`ocr.manga.batch`: Manga-OCR over many crops (batched encoder).
+
+    Request fields as in ``ocr.manga`` plus ``crop_lens``.
+    """
+    return _run_ocr_batch(
+        ctx,
+        METHOD_OCR_MANGA_BATCH,
+        "mangaocr",
+        ctx.state.manga_ocr.recognize_images_bytes,
+        header,
+        blob,
+        cancel_event,
+        manga_model=header.get("manga_model"),
+    )
+
+
+register(METHOD_OCR_MANGA_BATCH, _handle_ocr_manga_batch)
+
+
+def _handle_ocr_easy_batch(
+    ctx: HandlerContext,
+    header: dict[str, Any],
+    blob: bytes,
+    cancel_event: threading.Event,
+) -> tuple[dict[str, Any], bytes]:
+    """`ocr.easy.batch`: EasyOCR over many crops under one model lease.
+
+    Request fields as in ``ocr.easy`` plus ``crop_lens``.
+    """
+    return _run_ocr_batch(
+        ctx,
+        METHOD_OCR_EASY_BATCH,
+        "easyocr",
+        ctx.state.easy_ocr.recognize_images_bytes,
+        header,
+        blob,
+        cancel_event,
+        langs=_decode_easy_langs(header),
+    )
+
+
+register(METHOD_OCR_EASY_BATCH, _handle_ocr_easy_batch)
+
+
+def _handle_ocr_paddle_batch(
+    ctx: HandlerContext,
+    header: dict[str, Any],
+    blob: bytes,
+    cancel_event: threading.Event,
+) -> tuple[dict[str, Any], bytes]:
+    """`ocr.paddle.batch`: PaddleOCR over many crops with pooled recognizer batches.
+
+    Request fields as in ``ocr.paddle`` plus ``crop_lens``.
+    """
+    return _run_ocr_batch(
+        ctx,
+        METHOD_OCR_PADDLE_BATCH,
+        "paddleocr",
+        ctx.state.paddle_ocr.recognize_images_bytes,
+        header,
+        blob,
+        cancel_event,
+        lang=_decode_paddle_lang(header),
+    )
+
+
+register(METHOD_OCR_PADDLE_BATCH, _handle_ocr_paddle_batch)
+
+
+def _handle_ocr_surya_batch(
+    ctx: HandlerContext,
+    header: dict[str, Any],
+    blob: bytes,
+    cancel_event: threading.Event,
+) -> tuple[dict[str, Any], bytes]:
+    """`ocr.surya.batch`: Surya OCR over many crops in one predictor call.
+
+    Request fields as in ``ocr.surya`` plus ``crop_lens``; the response also
+    carries ``task_name``.
+    """
+    surya_kwargs = _decode_surya_kwargs(header)
+    fields, result_blob = _run_ocr_batch(
+        ctx,
+        METHOD_OCR_SURYA_BATCH,
+        "suryaocr",
+        ctx.state.surya_ocr.recognize_images_bytes,
+        header,
+        blob,
+        cancel_event,
+        **surya_kwargs,
+    )
+    fields["task_name"] = surya_kwargs["task_name"]
+    return fields, result_blob
+
+
+register(METHOD_OCR_SURYA_BATCH, _handle_ocr_surya_batch)
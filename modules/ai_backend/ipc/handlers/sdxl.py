@@ -26,11 +26,19 @@ redesign):
       ``progress_callback(step, total, preview_rgb)`` into one ``progress`` frame
       carrying ``{step, total}`` in the header and, when a preview is available,
       the raw preview PNG bytes in the frame BLOB (NOT base64).
+    - With ``params.roi_mode == "bucket"`` the service diffuses one window (or a
+      batch of windows) per pipeline call and passes a fourth
+      ``window_info`` argument; the frame header then also carries ``window``
+      (index of the first window in the call), ``windows`` (total) and
+      ``batch`` (windows in the call), and ``step`` restarts for every call.
 
 Blob convention (same as the other inpaint methods):
     request blob = image_png ++ mask_png
     header carries ``image_len: int`` and ``mask_len: int`` to split the blob.
 The final result PNG goes in the response blob (raw bytes, not base64).
+Connections that negotiated ``shm_image`` may send ``image_shm``/``mask_shm``
+(and optionally ``result_shm``) descriptors with an empty blob instead, exactly
+as for the other inpaint methods (``ipc/shm.py``).
 """
 
 from __future__ import annotations
@@ -44,6 +52,7 @@ from ..protocol import (
     METHOD_INPAINT_SDXL_UNLOAD,
 )
 from ..registry import HandlerContext, Interrupted, register
+from ..shm import inpaint_from_shm
 
 # Attribute name under which the dispatcher attaches the per-request
 # ``ProgressEmitter`` to the (otherwise shared) ``HandlerContext``. Looked up
@@ -107,8 +116,6 @@ def _handle_inpaint_sdxl(
     if cancel_event.is_set():
         raise Interrupted("inpaint.sdxl canceled before start.")
 
-    image_png, mask_png = _split_image_mask(header, blob)
-
     params_raw = header.get("params", {})
     if params_raw is None:
         params_raw = {}
@@ -117,12 +124,15 @@ def _handle_inpaint_sdxl(
 
     emitter = getattr(ctx, _PROGRESS_EMITTER_ATTR, None)
 
-    def on_progress(step: int, total: int, preview_rgb: Any) -> None:
+    def on_progress(
+        step: int, total: int, preview_rgb: Any, window_info: dict[str, int] | None = None
+    ) -> None:
         """Per-step diffusion callback -> one ``progress{id}`` frame.
 
-        Header carries ``{step, total}``; the optional latent preview PNG goes in
-        the progress frame BLOB as raw bytes. A missing emitter or a
-        preview-encode failure never aborts generation.
+        Header carries ``{step, total}`` (plus ``window``/``windows``/``batch`` in
+        bucket ROI mode); the optional latent preview PNG goes in the progress
+        frame BLOB as raw bytes. A missing emitter or a preview-encode failure
+        never aborts generation.
         """
         if emitter is None:
             return
@@ -135,18 +145,38 @@ def _handle_inpaint_sdxl(
                 preview_blob = _encode_png_bytes_rgb(preview_rgb)
             except Exception:  # noqa: BLE001 - preview is best-effort
                 preview_blob = b""
+        fields: dict[str, Any] = {"step": int(step), "total": int(total)}
+        if window_info:
+            for key in ("window", "windows", "batch"):
+                if key in window_info:
+                    fields[key] = int(window_info[key])
         try:
-            emitter.emit({"step": int(step), "total": int(total)}, preview_blob)
+            emitter.emit(fields, preview_blob)
         except Exception:  # noqa: BLE001 - peer gone; generation continues, ignored
             pass
 
+    service = ctx.state.sdxl_inpaint
     try:
-        result = ctx.state.sdxl_inpaint.inpaint_image_bytes(
-            image_png,
-            mask_png,
-            params=params_raw,
-            progress_callback=on_progress,
-        )
+        if header.get("image_shm") is not None:
+            result = inpaint_from_shm(
+                ctx.transport_caps,
+                header,
+                blob,
+                lambda image_rgb, mask_u8: service.inpaint_image_array(
+                    image_rgb,
+                    mask_u8,
+                    params=params_raw,
+                    progress_callback=on_progress,
+                ),
+            )
+        else:
+            image_png, mask_png = _split_image_mask(header, blob)
+            result = service.inpaint_image_bytes(
+                image_png,
+                mask_png,
+                params=params_raw,
+                progress_callback=on_progress,
+            )
     except (ValueError, FileNotFoundError):
         # Invalid input / missing model file: surfaced as response{status:error}.
         raise
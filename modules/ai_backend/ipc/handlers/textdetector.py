@@ -5,12 +5,29 @@ Methods hosted here:
     textdetector.ctd    — CTD text detector (METHOD_TEXTDETECTOR_CTD)
     textdetector.paddle — Paddle text detector (METHOD_TEXTDETECTOR_PADDLE)
     textdetector.surya  — Surya text detector (METHOD_TEXTDETECTOR_SURYA)
+    textdetector.surya.batch
+                        — Surya over many pages (METHOD_TEXTDETECTOR_SURYA_BATCH),
+                          streaming one ``progress`` frame per page
 
 All text-detection methods accept either an on-disk ``page_path`` header
 field (alias ``path``) OR inline image bytes in the request blob (exactly one
 must be supplied).  They all return a mask PNG in the response blob; the
 service produces it as raw bytes in the ``mask_png`` result key.
 
+All three accept the shared streaming-detection params (``tiled_detection``,
+``tile_height``, ``tile_overlap``; see ``detect_tiling.py``) inside
+``params``; the response then carries ``tiles`` (number of strip windows).
+
+Batch convention (``textdetector.surya.batch``):
+    pages come either as ``page_paths: [str, ...]`` or as one request blob
+    ``page_png_0 ++ ... ++ page_png_{N-1}`` split by ``page_lens: [int, ...]``.
+    Every page is pushed as a ``progress{id}`` frame ``{index, total,
+    source_size, blocks, lines, tiles}`` with its mask PNG as the frame blob;
+    those frames are the only delivery of page results, so the request needs
+    a progress stream. The terminal ``response`` carries only ``{engine,
+    count, pages}``, one ``{index, streamed, block_count, line_count}`` status
+    per page, and an empty blob (unlike the single-page methods above).
+
 Handler signature::
 
     (ctx, header, blob, cancel_event) -> (resp_header_fields, resp_blob)
@@ -37,8 +54,13 @@ from ..protocol import (
     METHOD_TEXTDETECTOR_CTD,
     METHOD_TEXTDETECTOR_PADDLE,
     METHOD_TEXTDETECTOR_SURYA,
+    METHOD_TEXTDETECTOR_SURYA_BATCH,
 )
-from ..registry import HandlerContext, register
+from ..registry import HandlerContext, Interrupted, register
+
+
+# Upper bound on pages per batch request; a chapter stays well below it.
+MAX_BATCH_PAGES = 1024
 
 
 def _resolve_path(header: dict[str, Any]) -> str | None:
@@ -54,6 +76,26 @@ def _resolve_path(header: dict[str, Any]) -> str | None:
     return None
 
 
+def _optional_params(header: dict[str, Any]) -> dict[str, Any]:
+    """Return ``{"params": {...}}`` kwargs when the header carries params, else ``{}``.
+
+    Paddle and Surya detection used to take no params; they are only forwarded
+    when the client sends them.
+    """
+    params_raw = header.get("params")
+    if params_raw is None:
+        return {}
+    if not isinstance(params_raw, dict):
+        raise ValueError("Field 'params' must be an object.")
+    return {"params": params_raw}
+
+
+def _with_tiles(resp: dict[str, Any], result: dict[str, Any]) -> dict[str, Any]:
+    if "tiles" in result:
+        resp["tiles"] = result["tiles"]
+    return resp
+
+
 def _mask_png_bytes(result: dict[str, Any]) -> bytes:
     """Return the service's raw ``mask_png`` result for the response blob.
 
@@ -84,6 +126,7 @@ def _handle_textdetector_ctd(
         engine      : "ctd"
         source_size : [w, h]
         blocks      : object[]
+        tiles       : int (when reported) — strip windows used
 
     blob(resp): mask PNG (raw bytes, NOT base64).
     """
@@ -120,7 +163,7 @@ def _handle_textdetector_ctd(
         "source_size": result.get("source_size", [0, 0]),
         "blocks": result.get("blocks", []),
     }
-    return resp, mask_png
+    return _with_tiles(resp, result), mask_png
 
 
 register(METHOD_TEXTDETECTOR_CTD, _handle_textdetector_ctd)
@@ -140,6 +183,7 @@ def _handle_textdetector_paddle(
 
     Request fields (inline in header):
         page_path / path : string | null — on-disk page path (exclusive with blob)
+        params           : object | null — streaming-detection params (optional)
 
     blob(req): input image PNG bytes when no page_path is given.
 
@@ -148,16 +192,18 @@ def _handle_textdetector_paddle(
         source_size : [w, h]
         blocks      : object[]
         polys       : array[]
+        tiles       : int (when reported) — strip windows used
 
     blob(resp): mask PNG (raw bytes, NOT base64).
     """
     page_path = _resolve_path(header)
+    kwargs = _optional_params(header)
 
     try:
         if page_path is not None:
-            result = ctx.state.text_detector_paddle.detect_page(page_path)
+            result = ctx.state.text_detector_paddle.detect_page(page_path, **kwargs)
         elif blob:
-            result = ctx.state.text_detector_paddle.detect_image_bytes(blob)
+            result = ctx.state.text_detector_paddle.detect_image_bytes(blob, **kwargs)
         else:
             raise ValueError(
                 "Either 'page_path'/'path' must be set in the header, or the"
@@ -179,7 +225,7 @@ def _handle_textdetector_paddle(
         "blocks": result.get("blocks", []),
         "polys": result.get("polys", []),
     }
-    return resp, mask_png
+    return _with_tiles(resp, result), mask_png
 
 
 register(METHOD_TEXTDETECTOR_PADDLE, _handle_textdetector_paddle)
@@ -199,6 +245,7 @@ def _handle_textdetector_surya(
 
     Request fields (inline in header):
         page_path / path : string | null — on-disk page path (exclusive with blob)
+        params           : object | null — streaming-detection params (optional)
 
     blob(req): input image PNG bytes when no page_path is given.
 
@@ -207,16 +254,18 @@ def _handle_textdetector_surya(
         source_size : [w, h]
         blocks      : object[]
         lines       : array[]
+        tiles       : int (when reported) — strip windows used
 
     blob(resp): mask PNG (raw bytes, NOT base64).
     """
     page_path = _resolve_path(header)
+    kwargs = _optional_params(header)
 
     try:
         if page_path is not None:
-            result = ctx.state.text_detector_surya.detect_page(page_path)
+            result = ctx.state.text_detector_surya.detect_page(page_path, **kwargs)
         elif blob:
-            result = ctx.state.text_detector_surya.detect_image_bytes(blob)
+            result = ctx.state.text_detector_surya.detect_image_bytes(blob, **kwargs)
         else:
             raise ValueError(
                 "Either 'page_path'/'path' must be set in the header, or the"
@@ -238,7 +287,160 @@ def _handle_textdetector_surya(
         "blocks": result.get("blocks", []),
         "lines": result.get("lines", []),
     }
-    return resp, mask_png
+    return _with_tiles(resp, result), mask_png
 
 
 register(METHOD_TEXTDETECTOR_SURYA, _handle_textdetector_surya)
+
+
+# ---------------------------------------------------------------------------
+# textdetector.surya.batch
+# ---------------------------------------------------------------------------
+
+def _decode_batch_pages(header: dict[str, Any], blob: bytes) -> tuple[str, list[Any]]:
+    """Return ``("paths", [...])`` or ``("bytes", [...])`` for a batch request.
+
+    Exactly one of ``page_paths`` and a ``page_lens``-split blob must be given.
+    """
+    page_paths = header.get("page_paths")
+    page_lens = header.get("page_lens")
+    if page_paths is not None:
+        if page_lens is not None or blob:
+            raise ValueError("Set either 'page_paths' or 'page_lens' with a blob, not both.")
+        if (
+            not isinstance(page_paths, list)
+            or not page_paths
+            or not all(isinstance(path, str) and path.strip() for path in page_paths)
+        ):
+            raise ValueError("Field 'page_paths' must be a non-empty list of strings.")
+        if len(page_paths) > MAX_BATCH_PAGES:
+            raise ValueError(f"At most {MAX_BATCH_PAGES} pages per batch request.")
+        return "paths", [path.strip() for path in page_paths]
+
+    if not isinstance(page_lens, list) or not page_lens:
+        raise ValueError(
+            "Either 'page_paths' or 'page_lens' (with the page bytes in the blob) must be set."
+        )
+    if len(page_lens) > MAX_BATCH_PAGES:
+        raise ValueError(f"At most {MAX_BATCH_PAGES} pages per batch request.")
+    for length in page_lens:
+        if isinstance(length, bool) or not isinstance(length, int) or length <= 0:
+            raise ValueError("Field 'page_lens' must be a non-empty list of positive integers.")
+    expected = sum(page_lens)
+    if expected != len(blob):
+        raise ValueError(
+            f"Blob length mismatch: sum(page_lens) ({expected}) != blob length ({len(blob)})."
+        )
+    view = memoryview(blob)
+    pages: list[bytes] = []
+    offset = 0
+    for length in page_lens:
+        pages.append(bytes(view[offset : offset + length]))
+        offset += length
+    return "bytes", pages
+
+
+def _decode_batch_size(header: dict[str, Any]) -> int | None:
+    raw = header.get("batch_size")
+    if raw is None:
+        return None
+    if isinstance(raw, bool) or not isinstance(raw, int) or raw <= 0:
+        raise ValueError("Field 'batch_size' must be a positive integer.")
+    return raw
+
+
+def _page_fields(result: dict[str, Any]) -> dict[str, Any]:
+    fields = {
+        "source_size": result.get("source_size", [0, 0]),
+        "blocks": result.get("blocks", []),
+        "lines": result.get("lines", []),
+    }
+    return _with_tiles(fields, result)
+
+
+def _handle_textdetector_surya_batch(
+    ctx: HandlerContext,
+    header: dict[str, Any],
+    blob: bytes,
+    cancel_event: threading.Event,
+) -> tuple[dict[str, Any], bytes]:
+    """`textdetector.surya.batch`: Surya detection over a chapter's pages.
+
+    Request fields (inline in header):
+        page_paths : string[] | null — on-disk pages (exclusive with page_lens)
+        page_lens  : int[] | null    — byte length of every page PNG in the blob
+        batch_size : int | null      — pages per predictor call (service default)
+        params     : object | null   — streaming-detection params (optional)
+
+    blob(req): concatenated page PNG bytes when ``page_lens`` is given.
+
+    Progress frames: ``{index, total, source_size, blocks, lines, tiles}`` with
+    the page's mask PNG as the frame blob. These frames are the only place the
+    per-page results are delivered, so the request needs a progress stream.
+
+    Response fields (inline in header):
+        engine : "surya"
+        count  : int
+        pages  : object[] — ``{index, streamed, block_count, line_count}`` per
+                 page; ``streamed`` is false when its progress frame could not
+                 be sent (peer gone)
+
+    blob(resp): empty. Resending every mask here would not fit one frame for a
+    long chapter (``MAX_BLOB_BYTES`` / ``MAX_HEADER_BYTES``).
+    """
+    if cancel_event.is_set():
+        raise Interrupted(f"{METHOD_TEXTDETECTOR_SURYA_BATCH} canceled before start.")
+    emitter = getattr(ctx, "progress_emitter", None)
+    if emitter is None:
+        raise ValueError(
+            f"{METHOD_TEXTDETECTOR_SURYA_BATCH} streams page results as progress frames; "
+            "a progress stream is required."
+        )
+    source_kind, pages = _decode_batch_pages(header, blob)
+    kwargs = _optional_params(header)
+    batch_size = _decode_batch_size(header)
+    total = len(pages)
+    statuses: list[dict[str, Any]] = []
+
+    def on_result(index: int, result: dict[str, Any]) -> None:
+        fields = _page_fields(result)
+        try:
+            emitter.emit({"index": int(index), "total": total, **fields}, _mask_png_bytes(result))
+            streamed = True
+        except Exception:  # noqa: BLE001 - peer gone; finish the batch, ignored
+            streamed = False
+        statuses.append(
+            {
+                "index": int(index),
+                "streamed": streamed,
+                "block_count": len(fields["blocks"]),
+                "line_count": len(fields["lines"]),
+            }
+        )
+        if cancel_event.is_set():
+            raise Interrupted(f"{METHOD_TEXTDETECTOR_SURYA_BATCH} canceled.")
+
+    service = ctx.state.text_detector_surya
+    detect = service.detect_pages if source_kind == "paths" else service.detect_images_bytes
+    try:
+        detect(pages, batch_size=batch_size, on_result=on_result, keep_results=False, **kwargs)
+    except (FileNotFoundError, ValueError, Interrupted):
+        raise
+    except Exception as exc:
+        traceback.print_exc()
+        raise RuntimeError(str(exc)) from exc
+
+    if cancel_event.is_set():
+        raise Interrupted(f"{METHOD_TEXTDETECTOR_SURYA_BATCH} canceled.")
+
+    return (
+        {
+            "engine": "surya",
+            "count": len(statuses),
+            "pages": statuses,
+        },
+        b"",
+    )
+
+
+register(METHOD_TEXTDETECTOR_SURYA_BATCH, _handle_textdetector_surya_batch)
@@ -10,6 +10,9 @@ Request fields (inline in header):
     target:  str = "ru"       (defaults to "ru" when absent/null)
     params:  object = {}      (defaults to {} when absent/null)
     texts:   str[]            (required, non-empty; each item coerced to str)
+    join_lines: bool = false  (true = send several short lines as one provider
+                               request where the provider supports it; results
+                               are cached apart from per-line ones)
 
 Response fields (status=ok):
     service:    str    (normalized: stripped + lowercased, defaulting to "google")
@@ -79,6 +82,13 @@ def _handle_translate_deep(
         raise ValueError("Field 'texts' must not be empty.")
     texts = [str(text or "") for text in texts_raw]
 
+    # --- join_lines ---
+    join_lines = header.get("join_lines", False)
+    if join_lines is None:
+        join_lines = False
+    if not isinstance(join_lines, bool):
+        raise ValueError("Field 'join_lines' must be a boolean.")
+
     try:
         results = ctx.state.machine_translation.translate_batch(
             service=service_raw,
@@ -86,6 +96,7 @@ def _handle_translate_deep(
             target=target_raw,
             params=params_raw,
             texts=texts,
+            join_lines=join_lines,
         )
     except ValueError as exc:
         raise ValueError(str(exc)) from exc
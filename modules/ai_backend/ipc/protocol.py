@@ -38,6 +38,20 @@ PROTOCOL_VERSION = 1
 MAX_HEADER_BYTES = 1 * 1024 * 1024   # 1 MiB cap on the header_json segment.
 MAX_BLOB_BYTES = 32 * 1024 * 1024    # 32 MiB cap on the binary blob segment.
 
+# ============================================================================
+# TRANSPORT CAPABILITIES
+# ----------------------------------------------------------------------------
+# Optional transport features negotiated in `hello`: the client lists what it
+# supports in `caps`, the server replies with the subset it also supports, and
+# only granted capabilities may be used on that connection.
+# ============================================================================
+CAP_SHM_IMAGE = "shm_image"  # Raw pixels via named shared memory (ipc/shm.py).
+# `health` events after the first full snapshot arrive as JSON-patch deltas
+# (`health_patch` against `health_base_seq`); without it every push is full.
+CAP_HEALTH_DELTA = "health_delta"
+
+SUPPORTED_CAPS = frozenset({CAP_SHM_IMAGE, CAP_HEALTH_DELTA})
+
 # ============================================================================
 # FRAME KINDS
 # ----------------------------------------------------------------------------
@@ -80,9 +94,9 @@ VALID_STATUSES = frozenset({STATUS_OK, STATUS_ERROR, STATUS_INTERRUPTED})
 # The `topic` header field on an `event` frame (id=0). See PROTOCOL.md
 # "Event topics" for each payload shape.
 # ============================================================================
-TOPIC_HEALTH = "health"          # Periodic health snapshot push.
+TOPIC_HEALTH = "health"          # Health snapshot push (on change + heartbeat).
 TOPIC_DEVICE = "device"          # Device/provider selection state changed.
-TOPIC_MODEL_LOAD = "model_load"  # Model load/unload progress.
+TOPIC_MODEL_LOAD = "model_load"  # Model preload progress (`models.preload`).
 TOPIC_LOG = "log"                # Optional backend log line stream.
 
 VALID_TOPICS = frozenset(
@@ -109,6 +123,12 @@ METHOD_OCR_PADDLE = "ocr.paddle"            # POST /ocr/paddle
 METHOD_OCR_PADDLE_VL = "ocr.paddle_vl"      # POST /ocr/paddle_vl
 METHOD_OCR_SURYA = "ocr.surya"              # POST /ocr/surya
 METHOD_OCR_PADDLE_ONNX = "ocr.paddle_onnx"  # POST /ocr/paddle_onnx
+# Batch variants: N crops in one blob split by the `crop_lens` header table;
+# one `progress` frame per recognized crop, then a terminal `response`.
+METHOD_OCR_MANGA_BATCH = "ocr.manga.batch"
+METHOD_OCR_EASY_BATCH = "ocr.easy.batch"
+METHOD_OCR_PADDLE_BATCH = "ocr.paddle.batch"
+METHOD_OCR_SURYA_BATCH = "ocr.surya.batch"
 
 # --- Machine translation ---
 METHOD_TRANSLATE_DEEP = "translate.deep"    # POST /translate/deep
@@ -130,6 +150,9 @@ METHOD_INPAINT_FLUX_FILL_STATUS = "inpaint.flux_fill.status"  # quant catalog +
 METHOD_TEXTDETECTOR_CTD = "textdetector.ctd"        # POST /textdetector/ctd/detect
 METHOD_TEXTDETECTOR_PADDLE = "textdetector.paddle"  # POST /textdetector/paddle/detect
 METHOD_TEXTDETECTOR_SURYA = "textdetector.surya"    # POST /textdetector/surya/detect
+# Batch variant: N pages (`page_paths`, or one blob split by `page_lens`); one
+# `progress` frame (+ mask PNG blob) per page, then a terminal `response`.
+METHOD_TEXTDETECTOR_SURYA_BATCH = "textdetector.surya.batch"
 
 # --- Device ---
 METHOD_DEVICE_GET = "device.get"                          # GET /device
@@ -148,6 +171,11 @@ METHOD_RELINE_PROCESS = "reline.process"  # POST /reline/process
 # and the daemon's terminal event dict is returned as the response header.
 METHOD_BROWSER_COMMAND = "browser.command"  # was: adv_fetch_cli.py / adv_fetch_cloak_cli.py stdio
 
+# --- Model preloading ---
+# Queues background warmups for the listed stage keys (method names such as
+# `ocr.manga`, `inpaint.lama_v2`); progress is pushed on TOPIC_MODEL_LOAD.
+METHOD_MODELS_PRELOAD = "models.preload"
+
 # --- Health ---
 # Health is primarily pushed via TOPIC_HEALTH events, but a request/response
 # form is kept so a freshly connected client can pull the current snapshot.
@@ -161,6 +189,10 @@ ALL_METHODS = frozenset(
         METHOD_OCR_PADDLE_VL,
         METHOD_OCR_SURYA,
         METHOD_OCR_PADDLE_ONNX,
+        METHOD_OCR_MANGA_BATCH,
+        METHOD_OCR_EASY_BATCH,
+        METHOD_OCR_PADDLE_BATCH,
+        METHOD_OCR_SURYA_BATCH,
         METHOD_TRANSLATE_DEEP,
         METHOD_INPAINT_LAMA_V2,
         METHOD_INPAINT_LAMA_V2_UNLOAD,
@@ -176,12 +208,14 @@ ALL_METHODS = frozenset(
         METHOD_TEXTDETECTOR_CTD,
         METHOD_TEXTDETECTOR_PADDLE,
         METHOD_TEXTDETECTOR_SURYA,
+        METHOD_TEXTDETECTOR_SURYA_BATCH,
         METHOD_DEVICE_GET,
         METHOD_DEVICE_SET,
         METHOD_DEVICE_CUDA_DIAGNOSTICS,
         METHOD_RELINE_MODELS,
         METHOD_RELINE_PROCESS,
         METHOD_BROWSER_COMMAND,
+        METHOD_MODELS_PRELOAD,
         METHOD_HEALTH,
     }
 )
@@ -199,3 +233,7 @@ HEADER_TOPIC = "topic"      # str: event topic (VALID_TOPICS).
 HEADER_STATUS = "status"    # str: response status (VALID_STATUSES).
 HEADER_ERROR = "error"      # str: error message.
 HEADER_BACKEND_VERSION = "backend_version"  # str: hello reply backend version.
+HEADER_CAPS = "caps"        # list[str]: hello capabilities (client offer / server grant).
+HEADER_HEALTH_SEQ = "health_seq"            # int: health snapshot sequence number.
+HEADER_HEALTH_BASE_SEQ = "health_base_seq"  # int: snapshot a delta applies to.
+HEADER_HEALTH_PATCH = "health_patch"        # list[dict]: JSON-patch ops of a delta.
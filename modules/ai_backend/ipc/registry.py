@@ -52,9 +52,9 @@ class HandlerContext:
             this module does not import ``server.py`` (avoids a heavy/circular
             import; the real ``AppState`` is passed at runtime).
         events: the ``EventBus`` for publishing server-initiated events.
-        get_health_snapshot: returns the current health snapshot dict (mirrors
-            ``server._get_health_snapshot``), injected so this module needs no
-            ``server.py`` import.
+        get_health_snapshot: returns the current health snapshot dict (in the
+            server ``server._refresh_health_snapshot``, which rebuilds it on each
+            call), injected so this module needs no ``server.py`` import.
         progress_emitter: optional per-REQUEST streaming hook. The dispatcher
             builds a fresh ``ProgressEmitter`` bound to one request's ``id`` and
             attaches it to a per-request *copy* of this context (never the shared
@@ -62,12 +62,17 @@ class HandlerContext:
             ``progress{id}`` frames without two concurrent requests on the same
             connection clobbering each other's emitter. ``None`` for
             non-streaming handlers, which never read it.
+        transport_caps: optional transport capabilities granted to this
+            connection in the ``hello`` handshake (``protocol.SUPPORTED_CAPS``
+            intersected with the client's ``caps``). Set on the per-request copy
+            like ``progress_emitter``; empty for plain blob-only clients.
     """
 
     state: Any
     events: Any
     get_health_snapshot: _HealthSnapshotProvider
     progress_emitter: Any = None
+    transport_caps: frozenset[str] = frozenset()
 
 
 # A handler runs one request.  It receives the request header, the request
@@ -0,0 +1,310 @@
+"""
+File: modules/ai_backend/ipc/shm.py
+
+Purpose:
+Shared-memory raw-pixel transport for the framed IPC protocol (v2). Lets a
+client that negotiated the `shm_image` capability in `hello` pass page images
+and masks as descriptors of an already-filled shared-memory segment instead of
+PNG-encoding them into the request blob, and optionally receive the result
+pixels written back into a segment it owns.
+
+Main responsibilities:
+- `parse_descriptor(value, field)`: validate a `{shm_name, offset, w, h,
+  stride, format}` header object into an `ShmImageDescriptor`;
+- `attach_image(desc)`: map the named segment and expose the described pixels
+  as a zero-copy, read-only numpy view (context manager, closes the mapping);
+- `to_rgb` / `to_mask`: canonicalize a raw view into the `(H, W, 3)` RGB and
+  `(H, W)` uint8 arrays the inpaint services consume (copies only when the
+  pixel format differs from the target);
+- `write_image(desc, rgb)`: copy result pixels into a client-owned segment in
+  the descriptor's format;
+- `inpaint_from_shm(...)`: the shared `image_shm`/`mask_shm`/`result_shm`
+  request path of the inpaint handlers.
+
+Key structures:
+- `SHM_CAPABILITY`: capability token advertised in the `hello` `caps` list;
+- `ShmImageDescriptor`: frozen dataclass mirroring the wire descriptor.
+
+Notes:
+Segments are named POSIX/Windows shared memory (`multiprocessing.shared_memory`)
+created and unlinked by the client; the backend only attaches and never takes
+ownership (it is unregistered from the resource tracker on attach so the
+backend exit never unlinks a client segment). Named segments work over both the
+AF_UNIX and the WebSocket listener, which is why this is preferred over memfd,
+whose fd would need SCM_RIGHTS passing on the Unix socket only.
+"""
+
+from __future__ import annotations
+
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+if TYPE_CHECKING:
+    import numpy as np
+
+from .protocol import CAP_SHM_IMAGE
+
+# Capability token a client lists in `hello.caps` to enable descriptor fields.
+SHM_CAPABILITY = CAP_SHM_IMAGE
+
+# Channel count per supported pixel format.
+SHM_FORMATS: dict[str, int] = {
+    "rgb": 3,
+    "bgr": 3,
+    "rgba": 4,
+    "bgra": 4,
+    "gray": 1,
+}
+
+# Upper bound on one side of a described image (matches the tallest webtoon
+# strips the services accept; keeps a bogus descriptor from mapping gigabytes).
+MAX_SHM_SIDE = 65535
+
+
+@dataclass(frozen=True)
+class ShmImageDescriptor:
+    """One image living in a named shared-memory segment.
+
+    Attributes:
+        shm_name: segment name as passed to `SharedMemory(name=...)`.
+        offset: byte offset of the first row inside the segment.
+        w, h: image size in pixels.
+        stride: bytes between the starts of two consecutive rows
+            (>= ``w * channels``).
+        format: one of `SHM_FORMATS`.
+    """
+
+    shm_name: str
+    offset: int
+    w: int
+    h: int
+    stride: int
+    format: str
+
+    @property
+    def channels(self) -> int:
+        return SHM_FORMATS[self.format]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes spanned from `offset` to the end of the last row."""
+        return self.stride * (self.h - 1) + self.w * self.channels
+
+
+def _read_desc_int(value: dict[str, Any], field: str, name: str, *, minimum: int) -> int:
+    raw = value.get(name)
+    if isinstance(raw, bool) or not isinstance(raw, int):
+        raise ValueError(f"Field '{field}.{name}' must be an integer.")
+    if raw < minimum:
+        raise ValueError(f"Field '{field}.{name}' must be >= {minimum}.")
+    return raw
+
+
+def parse_descriptor(value: Any, field: str) -> ShmImageDescriptor:
+    """Validate the header object `value` (named `field` in errors)."""
+    if not isinstance(value, dict):
+        raise ValueError(f"Field '{field}' must be an object.")
+    shm_name = value.get("shm_name")
+    if not isinstance(shm_name, str) or not shm_name.strip():
+        raise ValueError(f"Field '{field}.shm_name' must be a non-empty string.")
+    pixel_format = value.get("format")
+    if pixel_format not in SHM_FORMATS:
+        raise ValueError(
+            f"Field '{field}.format' must be one of {sorted(SHM_FORMATS)}, got {pixel_format!r}."
+        )
+    offset = _read_desc_int(value, field, "offset", minimum=0)
+    width = _read_desc_int(value, field, "w", minimum=1)
+    height = _read_desc_int(value, field, "h", minimum=1)
+    if width > MAX_SHM_SIDE or height > MAX_SHM_SIDE:
+        raise ValueError(f"Field '{field}': image side exceeds {MAX_SHM_SIDE} px.")
+    stride = _read_desc_int(value, field, "stride", minimum=width * SHM_FORMATS[pixel_format])
+    return ShmImageDescriptor(
+        shm_name=shm_name,
+        offset=offset,
+        w=width,
+        h=height,
+        stride=stride,
+        format=pixel_format,
+    )
+
+
+def _open_segment(name: str) -> Any:
+    """Attach to an existing client segment without taking ownership of it."""
+    from multiprocessing import shared_memory
+
+    try:
+        if sys.version_info >= (3, 13):
+            return shared_memory.SharedMemory(name=name, create=False, track=False)
+        shm = shared_memory.SharedMemory(name=name, create=False)
+    except FileNotFoundError as exc:
+        raise ValueError(f"Shared memory segment {name!r} does not exist.") from exc
+    if sys.platform != "win32":
+        # Pre-3.13 attach registers the segment with the resource tracker, which
+        # would unlink the client's segment when the backend exits.
+        try:
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        except Exception:  # noqa: BLE001 - tracker bookkeeping is best-effort
+            pass
+    return shm
+
+
+def _close_segment(shm: Any) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        # A caller still holds a view; the mapping is released with the last
+        # reference instead.
+        pass
+
+
+def _view(shm: Any, desc: ShmImageDescriptor, *, writable: bool) -> "np.ndarray":
+    import numpy as np
+
+    if desc.offset + desc.nbytes > shm.size:
+        raise ValueError(
+            f"Shared memory segment {desc.shm_name!r} is too small: "
+            f"{desc.offset + desc.nbytes} bytes described, {shm.size} mapped."
+        )
+    channels = desc.channels
+    view = np.ndarray(
+        shape=(desc.h, desc.w, channels),
+        dtype=np.uint8,
+        buffer=shm.buf,
+        offset=desc.offset,
+        strides=(desc.stride, channels, 1),
+    )
+    if not writable:
+        view.flags.writeable = False
+    return view
+
+
+@contextmanager
+def attach_image(desc: ShmImageDescriptor) -> Iterator["np.ndarray"]:
+    """Yield a zero-copy read-only `(h, w, channels)` view of `desc`.
+
+    The view is only valid inside the `with` block; callers must copy (or
+    canonicalize via `to_rgb`/`to_mask`) anything they keep.
+    """
+    shm = _open_segment(desc.shm_name)
+    try:
+        view = _view(shm, desc, writable=False)
+        try:
+            yield view
+        finally:
+            del view
+    finally:
+        _close_segment(shm)
+
+
+def to_rgb(view: "np.ndarray", pixel_format: str) -> "np.ndarray":
+    """Return `view` as an `(H, W, 3)` uint8 RGB array (alpha is dropped)."""
+    import numpy as np
+
+    if pixel_format == "gray":
+        return np.repeat(view, 3, axis=2)
+    if pixel_format in ("bgr", "bgra"):
+        return np.ascontiguousarray(view[:, :, 2::-1])
+    return np.ascontiguousarray(view[:, :, :3])
+
+
+def to_mask(view: "np.ndarray", pixel_format: str) -> "np.ndarray":
+    """Return `view` as an `(H, W)` uint8 mask.
+
+    Gray masks are used as-is, RGBA/BGRA masks use alpha (matching how PNG masks
+    with transparency are decoded), and RGB/BGR masks use the channel maximum.
+    """
+    import numpy as np
+
+    if pixel_format == "gray":
+        return np.ascontiguousarray(view[:, :, 0])
+    if pixel_format in ("rgba", "bgra"):
+        return np.ascontiguousarray(view[:, :, 3])
+    return view.max(axis=2)
+
+
+def write_image(desc: ShmImageDescriptor, image_rgb: "np.ndarray") -> None:
+    """Copy `(H, W, 3)` RGB pixels into the client segment described by `desc`."""
+    import numpy as np
+
+    height, width = int(image_rgb.shape[0]), int(image_rgb.shape[1])
+    if (width, height) != (desc.w, desc.h):
+        raise ValueError(
+            f"Result size {width}x{height} does not match result_shm {desc.w}x{desc.h}."
+        )
+    shm = _open_segment(desc.shm_name)
+    try:
+        view = _view(shm, desc, writable=True)
+        if desc.format == "gray":
+            luma = image_rgb.astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+            view[:, :, 0] = np.clip(np.rint(luma), 0, 255).astype(np.uint8)
+        elif desc.format in ("bgr", "bgra"):
+            view[:, :, 2::-1] = image_rgb
+        else:
+            view[:, :, :3] = image_rgb
+        if desc.format in ("rgba", "bgra"):
+            view[:, :, 3] = np.uint8(255)
+        del view
+    finally:
+        _close_segment(shm)
+
+
+def encode_png_rgb(image_rgb: "np.ndarray") -> bytes:
+    """Encode `(H, W, 3)` uint8 RGB pixels as PNG bytes (blob fallback)."""
+    import io
+
+    import numpy as np
+    from PIL import Image
+
+    with io.BytesIO() as buffer:
+        Image.fromarray(np.ascontiguousarray(image_rgb, dtype=np.uint8), mode="RGB").save(
+            buffer, format="PNG"
+        )
+        return buffer.getvalue()
+
+
+def inpaint_from_shm(
+    transport_caps: frozenset[str],
+    header: dict[str, Any],
+    blob: bytes,
+    inpaint_array: Callable[["np.ndarray", "np.ndarray"], dict[str, Any]],
+) -> dict[str, Any]:
+    """Run an `inpaint_image_array`-style call on `image_shm`/`mask_shm` inputs.
+
+    `inpaint_array(image_rgb, mask_u8)` must return a result dict carrying the
+    output as `image_rgb`. With a `result_shm` descriptor the pixels are
+    written into the client segment and `image_png` is `b""`; otherwise they
+    are PNG-encoded into `image_png`, so callers build the response exactly as
+    for the blob path.
+    """
+    if SHM_CAPABILITY not in transport_caps:
+        raise ValueError(
+            f"Shared-memory image fields require the {SHM_CAPABILITY!r} hello capability."
+        )
+    if blob:
+        raise ValueError("The request blob must be empty when 'image_shm' is used.")
+    image_desc = parse_descriptor(header.get("image_shm"), "image_shm")
+    mask_desc = parse_descriptor(header.get("mask_shm"), "mask_shm")
+    if (image_desc.w, image_desc.h) != (mask_desc.w, mask_desc.h):
+        raise ValueError(
+            f"mask_shm size {mask_desc.w}x{mask_desc.h} does not match "
+            f"image_shm size {image_desc.w}x{image_desc.h}."
+        )
+    result_raw = header.get("result_shm")
+    result_desc = parse_descriptor(result_raw, "result_shm") if result_raw is not None else None
+
+    with attach_image(image_desc) as image_view, attach_image(mask_desc) as mask_view:
+        result = inpaint_array(
+            to_rgb(image_view, image_desc.format),
+            to_mask(mask_view, mask_desc.format),
+        )
+    out_rgb = result.pop("image_rgb")
+    if result_desc is not None:
+        write_image(result_desc, out_rgb)
+        result["image_png"] = b""
+    else:
+        result["image_png"] = encode_png_rgb(out_rgb)
+    return result
@@ -8,7 +8,11 @@ Main responsibilities:
 - lazy-load `InpainterV2` and keep one active checkpoint/device pair in memory;
 - decode input image + mask from PNG bytes and return raw PNG bytes result;
 - normalize refine parameters and requested checkpoint name from the HTTP payload;
-- expose health information about available and currently active LaMa checkpoints.
+- inpaint only the padded mask ROI windows (`inpaint_roi.py`) instead of the
+  whole page;
+- expose health information about available and currently active LaMa checkpoints;
+- run the exported checkpoint on ONNX Runtime (`LamaOnnxInpainter`) when the
+  request runtime (`torch_onnx_runtime.py`) resolves to `onnx`.
 
 Key structures:
 - `LamaInpaintService`
@@ -22,6 +26,8 @@ Notes:
 - Checkpoints are discovered from `ManhwaStudio_AI_Models/Torch/LaMa/models`
   (`.ckpt` and `.pt`).
 - Switching checkpoint or device triggers inpainter reload under the service lock.
+- The ONNX export of `<name>` is `ManhwaStudio_AI_Models/ONNX/LaMa/<name>.onnx`;
+  the torch checkpoint still names the model. Refine mode is torch-only.
 """
 
 from __future__ import annotations
@@ -37,11 +43,6 @@ from typing import TYPE_CHECKING, Any
 if TYPE_CHECKING:
     import numpy as np
 
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
 try:
     from config import LAMA_DIR
 except Exception:
@@ -49,17 +50,28 @@ except Exception:
         Path(__file__).resolve().parents[2] / "ManhwaStudio_AI_Models" / "Torch" / "LaMa"
     )
 
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
-
 try:
     from config import program_dir as _PROGRAM_DIR
 except Exception:
     _PROGRAM_DIR = Path(__file__).resolve().parents[2]
 
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import check_inpaint_arrays
+from .inpaint_roi import inpaint_with_rois, normalize_roi_params
 from .model_manager import LoadedModelManager
+from .paddle_onnx_runtime import RuntimeFactory
+from .torch_onnx_runtime import (
+    RUNTIME_ONNX,
+    RUNTIME_TORCH,
+    LamaOnnxInpainter,
+    configured_runtime,
+    lama_onnx_path,
+    normalize_runtime,
+    onnx_session,
+    require_onnx_model,
+    select_runtime,
+)
 
 
 # ============================================================================
@@ -69,12 +81,15 @@ from .model_manager import LoadedModelManager
 # - `LamaInpaintService`: lazy-load обёртка для `InpainterV2` (модель как в
 #   `ui_new/tools/region_edit_ai.py`) с HTTP-friendly API.
 # - Декодирование PNG-изображений (RGB image + mask) и кодирование raw PNG.
+# - Инпейнт только по ROI-окнам вокруг компонент маски (`inpaint_roi.py`).
 # - Нормализация параметров `refine` (`n_iters`, `max_scales`, `px_budget`).
 # - Синхронизация устройства с backend-настройкой `General.ai_device`
-#   через `AIDevice`.
+#   через общий кэш `device_resolution.py`.
 # - Динамический импорт локального runtime-модуля
 #   `modules/ai_backend/lama_v2_runtime_inpainter.py` через путь к файлу
 #   (без зависимости от `lama_files/inpainter_v2.py` и `lama_modernised/*`).
+# - Runtime `onnx`: экспортированный checkpoint через `RuntimeFactory`
+#   (`torch_onnx_runtime.py`); refine доступен только в torch.
 # ============================================================================
 
 _INPAINTER_MODULE_NAME = "mf_lama_inpainter_v2_runtime"
@@ -102,10 +117,23 @@ def _to_bool(value: Any, default: bool) -> bool:
     return default
 
 
+HEALTH_SOURCE = "inpaint.lama_v2"
+
+
 class LamaInpaintService:
-    def __init__(self, model_manager: LoadedModelManager) -> None:
+    _active_checkpoint_name = HealthField(HEALTH_SOURCE)
+    _active_device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
+    def __init__(
+        self,
+        model_manager: LoadedModelManager,
+        runtime_factory: RuntimeFactory | None = None,
+    ) -> None:
         self._lock = threading.RLock()
         self._model_manager = model_manager
+        self._runtime_factory = runtime_factory or RuntimeFactory(model_manager)
+        self._runtime = configured_runtime()
         self._inpainter: Any = None
         self._inpainter_cls: type | None = None
         self._active_device = "cpu"
@@ -131,6 +159,8 @@ class LamaInpaintService:
                 "selected_model": self._active_checkpoint_name or default_checkpoint,
                 "loaded_model": self._active_checkpoint_name,
                 "module_source_path": str(self._module_source_path) if self._module_source_path else None,
+                "runtime": self._runtime,
+                "onnx_models": [name for name in checkpoint_names if lama_onnx_path(name).is_file()],
                 "last_error": self._last_error,
                 "memory": self._safe_memory_stats_locked(),
             }
@@ -144,9 +174,59 @@ class LamaInpaintService:
     ) -> dict[str, Any]:
         image_rgb = self._decode_image_rgb(image_bytes)
         mask_u8 = self._decode_mask(mask_bytes, expected_hw=image_rgb.shape[:2])
+        result = self.inpaint_image_array(image_rgb, mask_u8, params=params)
+        result["image_png"] = _encode_png_bytes_rgb(result.pop("image_rgb"))
+        return result
+
+    def inpaint_image_array(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        *,
+        params: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Same as `inpaint_image_bytes` for decoded `(H, W, 3)` / `(H, W)` uint8 arrays.
+
+        The inputs may be read-only views (e.g. shared memory); the result dict
+        carries the output as `image_rgb` instead of `image_png`.
+        """
+        image_rgb, mask_u8 = check_inpaint_arrays(image_rgb, mask_u8)
         normalized = self._normalize_params(params)
         device = _resolve_selected_backend_device(self._active_device)
         checkpoint_name = self._resolve_checkpoint_name(normalized.get("model_name"))
+        runtime = self._select_runtime(normalized, device, checkpoint_name)
+        if runtime == RUNTIME_ONNX:
+            out_rgb, windows = self._inpaint_onnx(image_rgb, mask_u8, normalized, checkpoint_name)
+        else:
+            out_rgb, windows = self._inpaint_torch(
+                image_rgb, mask_u8, normalized, device, checkpoint_name
+            )
+
+        return {
+            "image_rgb": out_rgb,
+            "source_size": [int(image_rgb.shape[1]), int(image_rgb.shape[0])],
+            "device": self._active_device,
+            "runtime": runtime,
+            "refine": bool(normalized["refine"]),
+            "model_name": checkpoint_name,
+            "roi_windows": len(windows),
+        }
+
+    def _select_runtime(self, normalized: dict[str, Any], device: str, checkpoint_name: str) -> str:
+        if not normalized["refine"]:
+            return select_runtime(normalized["runtime"], lama_onnx_path(checkpoint_name), device)
+        if normalized["runtime"] == RUNTIME_ONNX:
+            raise ValueError("Refine-режим LaMa доступен только в runtime torch")
+        return RUNTIME_TORCH
+
+    def _inpaint_torch(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        normalized: dict[str, Any],
+        device: str,
+        checkpoint_name: str,
+    ) -> tuple[np.ndarray, list]:
         model_key = self._model_key_for(device, checkpoint_name)
         lease = self._model_manager.begin_model_use(
             model_key,
@@ -162,7 +242,7 @@ class LamaInpaintService:
                     max_scales=normalized["max_scales"],
                     px_budget=normalized["px_budget"],
                 )
-                out_rgb = inpainter(image_rgb, mask_u8)
+                out_rgb, windows = _inpaint_windows(inpainter, image_rgb, mask_u8, normalized)
                 if lease.needs_load:
                     lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
                 self._last_error = None
@@ -173,14 +253,26 @@ class LamaInpaintService:
                 raise
             finally:
                 lease.release()
+        return out_rgb, windows
 
-        return {
-            "image_png": _encode_png_bytes_rgb(out_rgb),
-            "source_size": [int(image_rgb.shape[1]), int(image_rgb.shape[0])],
-            "device": self._active_device,
-            "refine": bool(normalized["refine"]),
-            "model_name": checkpoint_name,
-        }
+    def _inpaint_onnx(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        normalized: dict[str, Any],
+        checkpoint_name: str,
+    ) -> tuple[np.ndarray, list]:
+        try:
+            model_path = require_onnx_model(lama_onnx_path(checkpoint_name), "LaMa")
+            with onnx_session(self._runtime_factory, model_path, "lama") as runner:
+                result = _inpaint_windows(LamaOnnxInpainter(runner), image_rgb, mask_u8, normalized)
+        except Exception as exc:
+            with self._lock:
+                self._last_error = str(exc)
+            raise
+        with self._lock:
+            self._last_error = None
+        return result
 
     def unload(self) -> bool:
         with self._lock:
@@ -364,6 +456,8 @@ class LamaInpaintService:
             min(4_000_000, _to_int(merged.get("px_budget"), 1_000_000)),
         )
         out["model_name"] = _normalize_optional_model_name(merged.get("model_name"))
+        out["runtime"] = normalize_runtime(merged.get("runtime"), self._runtime)
+        out.update(normalize_roi_params(merged))
         return out
 
     def _decode_image_rgb(self, image_bytes: bytes) -> np.ndarray:
@@ -474,58 +568,24 @@ def _encode_png_bytes_rgb(image_rgb: np.ndarray) -> bytes:
         return buffer.getvalue()
 
 
-def _resolve_selected_backend_device(fallback: str) -> str:
-    fallback_norm = _normalize_backend_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-
-    normalized = _normalize_backend_device(configured, fallback_norm)
-    available = _safe_available_devices()
-
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    if "mps" in available:
-        return "mps"
-    return "cpu"
-
-
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    value = value.strip().lower()
-    if value == "not-selected":
-        return None
-    return value or None
-
-
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
+def _inpaint_windows(
+    inpainter: Any,
+    image_rgb: np.ndarray,
+    mask_u8: np.ndarray,
+    normalized: dict[str, Any],
+) -> tuple[np.ndarray, list]:
+    if normalized["roi_crop"]:
+        return inpaint_with_rois(
+            image_rgb,
+            mask_u8,
+            inpainter,
+            context_px=normalized["roi_context_px"],
+        )
+    return inpainter(image_rgb, mask_u8), []
 
 
-def _normalize_backend_device(raw: str, fallback: str) -> str:
-    value = str(raw or "").strip().lower()
-    if value in {"cpu", "mps", "cuda"}:
-        return value
-    if value.startswith("cuda:"):
-        return value
-    return str(fallback or "cpu").strip().lower() or "cpu"
+def _resolve_selected_backend_device(fallback: str) -> str:
+    return resolve_backend_device(fallback, accept_mps=True, mps_fallback=True)
 
 
 def _np():
@@ -7,7 +7,8 @@ LaMa MPE inpainting service adapter for the Python AI backend.
 Main responsibilities:
 - load the LaMa MPE runtime lazily;
 - synchronize model device with backend AI device settings;
-- run inpainting requests and unload idle models through the model manager.
+- run inpainting requests on padded mask ROI windows (`inpaint_roi.py`) and
+  unload idle models through the model manager.
 """
 
 from __future__ import annotations
@@ -16,7 +17,6 @@ import gc
 import hashlib
 import io
 import threading
-import urllib.request
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
@@ -24,11 +24,6 @@ if TYPE_CHECKING:
     import numpy as np
     import torch as torch_mod
 
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
 try:
     from config import LAMA_MPE_DIR
 except Exception:
@@ -39,16 +34,16 @@ except Exception:
         / "LaMa_MPE"
     )
 
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
-
 try:
     from config import program_dir as _PROGRAM_DIR
 except Exception:
     _PROGRAM_DIR = Path(__file__).resolve().parents[2]
 
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import check_inpaint_arrays
+from .inpaint_roi import inpaint_with_rois, normalize_roi_params
+from .model_download import ChecksumError, download_file
 from .model_manager import LoadedModelManager
 
 
@@ -64,9 +59,10 @@ from .model_manager import LoadedModelManager
 #   SHA256-проверка, при отсутствии/порче скачивание в
 #   `ManhwaStudio_AI_Models/Torch/LaMa_MPE`.
 # - Декодирование PNG-изображений (RGB image + mask) и кодирование raw PNG.
+# - Инпейнт только по ROI-окнам вокруг компонент маски (`inpaint_roi.py`).
 # - Нормализация параметров endpoint (`inpaint_size`).
 # - Синхронизация устройства с backend-настройкой `General.ai_device`
-#   через `AIDevice`.
+#   через общий кэш `device_resolution.py`.
 # ============================================================================
 
 _LAMA_MPE_URL = (
@@ -155,16 +151,9 @@ def _sha256(path: Path) -> str:
     return digest.hexdigest()
 
 
-def _download_file(url: str, dst: Path) -> None:
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    tmp = dst.with_suffix(dst.suffix + ".part")
-    with urllib.request.urlopen(url) as response, tmp.open("wb") as out:
-        while True:
-            chunk = response.read(8192)
-            if not chunk:
-                break
-            out.write(chunk)
-    tmp.replace(dst)
+def _download_file(url: str, dst: Path, sha256: str | None = None) -> None:
+    """Downloads `url` to `dst` (resumable `.part`, verified against `sha256` when given)."""
+    download_file(url, dst, sha256=sha256)
 
 
 def _decode_image_any(image_bytes: bytes) -> np.ndarray:
@@ -209,57 +198,7 @@ def _encode_png_bytes_rgb(image_rgb: np.ndarray) -> bytes:
 
 
 def _resolve_selected_backend_device(fallback: str) -> str:
-    fallback_norm = _normalize_backend_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-
-    normalized = _normalize_backend_device(configured, fallback_norm)
-    available = _safe_available_devices()
-
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    if "mps" in available:
-        return "mps"
-    return "cpu"
-
-
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    value = value.strip().lower()
-    if value == "not-selected":
-        return None
-    return value or None
-
-
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
-
-
-def _normalize_backend_device(raw: str, fallback: str) -> str:
-    value = str(raw or "").strip().lower()
-    if value in {"cpu", "mps", "cuda"}:
-        return value
-    if value.startswith("cuda:"):
-        return value
-    return str(fallback or "cpu").strip().lower() or "cpu"
+    return resolve_backend_device(fallback, accept_mps=True, mps_fallback=True)
 
 
 def _clear_torch_cache() -> None:
@@ -317,7 +256,13 @@ def _resize_keepasp(
     return im
 
 
+HEALTH_SOURCE = "inpaint.lama_mpe"
+
+
 class LamaMpeInpaintService:
+    _active_device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(self, model_manager: LoadedModelManager) -> None:
         self._lock = threading.RLock()
         self._model_manager = model_manager
@@ -348,6 +293,23 @@ class LamaMpeInpaintService:
     ) -> dict[str, Any]:
         image_rgb = self._decode_image_rgb(image_bytes)
         mask_u8 = self._decode_mask(mask_bytes, expected_hw=image_rgb.shape[:2])
+        result = self.inpaint_image_array(image_rgb, mask_u8, params=params)
+        result["image_png"] = _encode_png_bytes_rgb(result.pop("image_rgb"))
+        return result
+
+    def inpaint_image_array(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        *,
+        params: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """Same as `inpaint_image_bytes` for decoded `(H, W, 3)` / `(H, W)` uint8 arrays.
+
+        The inputs may be read-only views (e.g. shared memory); the result dict
+        carries the output as `image_rgb` instead of `image_png`.
+        """
+        image_rgb, mask_u8 = check_inpaint_arrays(image_rgb, mask_u8)
         normalized = self._normalize_params(params)
         device = _resolve_selected_backend_device(self._active_device)
         model_key = self._model_key_for(device)
@@ -359,13 +321,26 @@ class LamaMpeInpaintService:
         with self._lock:
             try:
                 model = self._ensure_model_locked(device)
-                out_rgb = self._inpaint_locked(
-                    model,
-                    image_rgb=image_rgb,
-                    mask_u8=mask_u8,
-                    inpaint_size=normalized["inpaint_size"],
-                    device=device,
-                )
+
+                def _run(crop_rgb: np.ndarray, crop_mask: np.ndarray) -> np.ndarray:
+                    return self._inpaint_locked(
+                        model,
+                        image_rgb=crop_rgb,
+                        mask_u8=crop_mask,
+                        inpaint_size=normalized["inpaint_size"],
+                        device=device,
+                    )
+
+                if normalized["roi_crop"]:
+                    out_rgb, windows = inpaint_with_rois(
+                        image_rgb,
+                        mask_u8,
+                        _run,
+                        context_px=normalized["roi_context_px"],
+                    )
+                else:
+                    out_rgb = _run(image_rgb, mask_u8)
+                    windows = []
                 if lease.needs_load:
                     lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
                 self._last_error = None
@@ -378,10 +353,11 @@ class LamaMpeInpaintService:
                 lease.release()
 
         return {
-            "image_png": _encode_png_bytes_rgb(out_rgb),
+            "image_rgb": out_rgb,
             "source_size": [int(image_rgb.shape[1]), int(image_rgb.shape[0])],
             "device": self._active_device,
             "inpaint_size": int(normalized["inpaint_size"]),
+            "roi_windows": len(windows),
         }
 
     def unload(self) -> bool:
@@ -451,9 +427,10 @@ class LamaMpeInpaintService:
             except Exception:
                 pass
 
-        _download_file(_LAMA_MPE_URL, self._model_path)
-        if _sha256(self._model_path) != _LAMA_MPE_SHA256:
-            raise RuntimeError("Повреждена скачанная lama_mpe.ckpt (SHA256 mismatch)")
+        try:
+            _download_file(_LAMA_MPE_URL, self._model_path, sha256=_LAMA_MPE_SHA256)
+        except ChecksumError as exc:
+            raise RuntimeError("Повреждена скачанная lama_mpe.ckpt (SHA256 mismatch)") from exc
         return self._model_path
 
     def _normalize_params(self, params: dict[str, Any] | None) -> dict[str, Any]:
@@ -463,7 +440,7 @@ class LamaMpeInpaintService:
 
         inpaint_size = _to_int(merged.get("inpaint_size"), 2048)
         inpaint_size = max(512, min(4096, inpaint_size))
-        return {"inpaint_size": inpaint_size}
+        return {"inpaint_size": inpaint_size, **normalize_roi_params(merged)}
 
     def _inpaint_locked(
         self,
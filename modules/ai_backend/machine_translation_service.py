@@ -1,7 +1,38 @@
+"""
+File: modules/ai_backend/machine_translation_service.py
+
+Purpose:
+Batch machine translation through `deep_translator` for the `translate.deep`
+IPC method.
+
+Main responsibilities:
+- validate the service name and its required params (API keys, region);
+- answer repeated lines from the persistent `TranslationCache` and translate
+  each distinct remaining line once per batch, concurrently and rate-limited
+  through `TranslationExecutor` with pooled translator instances;
+- report cache hit/miss/dedup counters in `health()`.
+
+Key structures:
+- `MachineTranslationService`
+
+Notes:
+- A translator instance is only built when a batch has cache misses, so a
+  fully cached batch never touches the network; instances are then reused
+  across batches with the same service and params.
+- Failed lines are returned as `{"ok": False, "error": ...}` and never cached.
+- Line joining (`join_lines=True`) is opt-in. Lines translated in that mode
+  are cached under their own keys, so a result split out of a joined request
+  never answers a later per-line request.
+"""
+
 from __future__ import annotations
 
 import inspect
-from typing import Any
+import json
+from typing import Any, Callable
+
+from .translation_cache import TranslationCache, cache_key, default_cache_path
+from .translation_executor import TranslationExecutor
 
 
 _SERVICE_REQUIRED_FIELDS: dict[str, tuple[str, ...]] = {
@@ -32,15 +63,31 @@ def _deep_translator_classes() -> dict[str, type[Any]]:
 
 
 class MachineTranslationService:
+    def __init__(
+        self,
+        cache: TranslationCache | None = None,
+        translator_classes: Callable[[], dict[str, type[Any]]] | None = None,
+        executor: TranslationExecutor | None = None,
+    ) -> None:
+        self._cache = cache if cache is not None else TranslationCache(default_cache_path())
+        self._translator_classes = translator_classes or _deep_translator_classes
+        self._executor = executor if executor is not None else TranslationExecutor()
+
     def health(self) -> dict[str, Any]:
         try:
-            _deep_translator_classes()
+            self._translator_classes()
         except Exception as exc:
             return {
                 "available": False,
                 "error": f"deep_translator is not available: {exc}",
+                "cache": self._cache.stats(),
             }
-        return {"available": True}
+        return {
+            "available": True,
+            "cache": self._cache.stats(),
+            "requests_sent": self._executor.requests_sent,
+            "translators_created": self._executor.pool.created,
+        }
 
     def translate_batch(
         self,
@@ -50,12 +97,13 @@ class MachineTranslationService:
         target: str,
         params: dict[str, Any] | None,
         texts: list[str],
+        join_lines: bool = False,
     ) -> list[dict[str, Any]]:
         service_key = str(service or "google").strip().lower() or "google"
         if not isinstance(texts, list) or not texts:
             raise ValueError("Field 'texts' must be a non-empty list.")
 
-        classes = _deep_translator_classes()
+        classes = self._translator_classes()
         translator_cls = classes.get(service_key)
         if translator_cls is None:
             raise ValueError(f"Unknown translation service: {service_key}")
@@ -99,21 +147,53 @@ class MachineTranslationService:
                 "Required translator constructor params are missing: " f"{missing_csv}"
             )
 
-        try:
-            translator = translator_cls(**filtered_kwargs)
-        except Exception as exc:
-            raise RuntimeError(f"Failed to initialize translator: {exc}") from exc
-
-        results: list[dict[str, Any]] = []
+        # Identical lines share one key: each distinct line is looked up, and
+        # translated at most once per batch. Joined-mode results get their own
+        # key space: a line split out of a joined request was translated with
+        # its neighbours as context.
+        key_params = {**kwargs, "join_lines": True} if join_lines else kwargs
+        keys: list[str | None] = []
+        first_text: dict[str, str] = {}
         for text in texts:
             source_text = str(text or "")
             if not source_text.strip():
-                results.append({"ok": True, "text": ""})
+                keys.append(None)
                 continue
+            key = cache_key(service_key, kwargs["source"], kwargs["target"], key_params, source_text)
+            keys.append(key)
+            first_text.setdefault(key, source_text)
+        self._cache.count_deduplicated(sum(key is not None for key in keys) - len(first_text))
+
+        outcomes: dict[str, dict[str, Any]] = {
+            key: {"ok": True, "text": text}
+            for key, text in self._cache.get_many(first_text).items()
+        }
+        to_translate = [key for key in first_text if key not in outcomes]
+        if to_translate:
+            pool_key = (service_key, json.dumps(filtered_kwargs, sort_keys=True, default=str))
+
+            def factory() -> Any:
+                return translator_cls(**filtered_kwargs)
+
             try:
-                translated = translator.translate(source_text)
+                self._executor.pool.ensure(pool_key, factory)
             except Exception as exc:
-                results.append({"ok": False, "error": str(exc)})
-                continue
-            results.append({"ok": True, "text": "" if translated is None else str(translated)})
-        return results
+                raise RuntimeError(f"Failed to initialize translator: {exc}") from exc
+            translated = self._executor.translate(
+                service_key,
+                pool_key,
+                factory,
+                [first_text[key] for key in to_translate],
+                join_lines=join_lines,
+            )
+            fresh: dict[str, str] = {}
+            for key, (ok, text) in zip(to_translate, translated):
+                if not ok:
+                    outcomes[key] = {"ok": False, "error": text}
+                    continue
+                outcomes[key] = {"ok": True, "text": text}
+                if text:
+                    fresh[key] = text
+            self._cache.put_many(fresh)
+
+        return [{"ok": True, "text": ""} if key is None else dict(outcomes[key]) for key in keys]
@@ -5,19 +5,29 @@ Hybrid MangaOCR service with ONNX and optional PyTorch backends.
 Main responsibilities:
 - Resolve local MangaOCR ONNX weights from `ManhwaStudio_AI_Models/ONNX/MangaOCR/*`.
 - Build and reuse encoder/decoder ONNX Runtime sessions for the selected provider.
+- Run beam search with all live beams batched into one decoder call per step, reusing the
+  exported past-key-values decoder when present (full-prefix decoding otherwise).
 - Lazily load the original `manga_ocr` PyTorch package only when the PyTorch variant is selected.
 - Keep MangaOCR preprocessing and text postprocessing compatible with the original package.
 - Integrate with the shared loaded-model manager used by the Python AI backend.
+- Coalesce concurrent single-crop requests into batched runs (`micro_batch.py`).
+- `recognize_image_array` / `recognize_images_array` for in-process callers holding
+  decoded RGB arrays; the `*_bytes` methods only decode and delegate.
 
 Key structures:
 - `MangaOcrService`
 - `_OnnxMangaOcrRuntime`
 - `_TorchMangaOcrRuntime`
 - `_BeamCandidate`
+- `_FullPrefixDecoderState`, `_CachedDecoderState`
 
 Notes:
 - ONNX weights are loaded exclusively through `onnxruntime`.
 - Absence of `manga_ocr` must not break ONNX variants.
+- Optimum-style exports are detected by file name: `decoder_model_merged.onnx`
+  (with `use_cache_branch`) or `decoder_with_past_model.onnx` next to a
+  `decoder_model.onnx` that also returns `present.*`. Exports without a KV cache
+  keep working through the full-prefix path.
 """
 
 from __future__ import annotations
@@ -28,14 +38,18 @@ import logging
 import math
 import re
 import threading
+from contextlib import nullcontext
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Sequence
 
 import jaconv
 import numpy as np
 
 from .device_service import AiDeviceService
+from .health_feed import HealthField
+from .image_arrays import image_from_array
+from .micro_batch import MicroBatcher
 from .model_manager import LoadedModelManager
 from .paddle_onnx_runtime import (
     ProviderSettings,
@@ -63,6 +77,30 @@ MANGA_OCR_MODEL_DIRS: dict[str, str] = {
 }
 ENCODER_FILE_NAME = "encoder_model.onnx"
 DECODER_FILE_NAME = "decoder_model.onnx"
+DECODER_WITH_PAST_FILE_NAME = "decoder_with_past_model.onnx"
+DECODER_MERGED_FILE_NAME = "decoder_model_merged.onnx"
+
+DECODER_MODE_FULL = "full_prefix"
+DECODER_MODE_WITH_PAST = "with_past"
+DECODER_MODE_MERGED = "merged"
+
+# Crops per encoder call in batch recognition; bounds the pixel_values tensor
+# (`[N, 3, 224, 224]` float32 ~ 600 KiB per crop).
+ENCODER_BATCH_SIZE = 16
+
+TextCallback = Callable[[int, str], None]
+
+# DirectML sessions do not support concurrent `Run` calls; every other provider
+# is thread-safe, so decoding of independent requests is not serialized there.
+_SERIALIZED_RUN_PROVIDERS = frozenset({"DmlExecutionProvider"})
+
+_PAST_INPUT_PREFIX = "past_key_values"
+_PRESENT_OUTPUT_PREFIX = "present"
+_ORT_TYPE_TO_NUMPY: dict[str, Any] = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+}
 
 
 def _clear_runtime_cache() -> None:
@@ -121,15 +159,13 @@ class _OnnxMangaOcrRuntime:
 
         self._model_dir = model_dir
         self._settings = settings
-        self._encoder_lock = threading.Lock()
-        self._decoder_lock = threading.Lock()
+        serialized = settings.provider in _SERIALIZED_RUN_PROVIDERS
+        self._encoder_lock = threading.Lock() if serialized else nullcontext()
+        self._decoder_lock = threading.Lock() if serialized else nullcontext()
         self._encoder_session = self._build_session(model_dir / ENCODER_FILE_NAME, settings)
-        self._decoder_session = self._build_session(model_dir / DECODER_FILE_NAME, settings)
         self._encoder_input_name = self._encoder_session.get_inputs()[0].name
         self._encoder_output_name = self._encoder_session.get_outputs()[0].name
-        self._decoder_input_ids_name = self._decoder_session.get_inputs()[0].name
-        self._decoder_encoder_states_name = self._decoder_session.get_inputs()[1].name
-        self._decoder_output_name = self._decoder_session.get_outputs()[0].name
+        self._init_decoder_sessions(model_dir, settings)
 
         try:
             from transformers import AutoTokenizer, GenerationConfig, ViTImageProcessor
@@ -154,6 +190,45 @@ class _OnnxMangaOcrRuntime:
         self.selected_encoder_provider = encoder_providers[0] if encoder_providers else "unknown"
         self.selected_decoder_provider = decoder_providers[0] if decoder_providers else "unknown"
 
+    def _init_decoder_sessions(self, model_dir: Path, settings: ProviderSettings) -> None:
+        """Picks the cheapest decoder export available in `model_dir`.
+
+        `_decoder_session` always runs the first step (full prefix); in
+        `with_past` mode `_decoder_past_session` runs the following single-token
+        steps, in `merged` mode both roles share one session.
+        """
+        self._decoder_past_session = None
+        self._decoder_past_io: _DecoderIoNames | None = None
+        self._decoder_empty_past: dict[str, tuple[tuple[int, ...], Any]] = {}
+        merged_path = model_dir / DECODER_MERGED_FILE_NAME
+        with_past_path = model_dir / DECODER_WITH_PAST_FILE_NAME
+        if merged_path.is_file():
+            session = self._build_session(merged_path, settings)
+            io_names = _DecoderIoNames.from_session(session)
+            empty_past = _empty_past_shapes(session)
+            if io_names.use_cache_branch and io_names.past_inputs and empty_past:
+                self._decoder_empty_past = empty_past
+                self._decoder_session = session
+                self._decoder_past_session = session
+                self._decoder_io = io_names
+                self.decoder_mode = DECODER_MODE_MERGED
+                return
+            log.warning("MangaOCR merged decoder has no usable KV-cache inputs: %s", merged_path)
+            del session
+
+        self._decoder_session = self._build_session(model_dir / DECODER_FILE_NAME, settings)
+        self._decoder_io = _DecoderIoNames.from_session(self._decoder_session)
+        self.decoder_mode = DECODER_MODE_FULL
+        if with_past_path.is_file() and self._decoder_io.present_outputs:
+            past_session = self._build_session(with_past_path, settings)
+            past_io = _DecoderIoNames.from_session(past_session)
+            if past_io.past_inputs:
+                self._decoder_past_session = past_session
+                self._decoder_past_io = past_io
+                self.decoder_mode = DECODER_MODE_WITH_PAST
+            else:
+                del past_session
+
     @staticmethod
     def _resolve_tokenizer_dir(model_dir: Path) -> Path:
         if any((model_dir / file_name).is_file() for file_name in ("tokenizer.json", "vocab.txt")):
@@ -195,6 +270,28 @@ class _OnnxMangaOcrRuntime:
     def recognize(self, image) -> str:
         prepared = MangaOcrService._prepare_ocr_image(image)
         encoder_hidden_states = self._run_encoder(prepared)
+        return self._decode_text(encoder_hidden_states)
+
+    def recognize_batch(self, images: Sequence[Any], on_text: TextCallback | None = None) -> list[str]:
+        """Encodes the crops in batches of `ENCODER_BATCH_SIZE`, then decodes each one.
+
+        `on_text(index, text)` is called as soon as a crop is decoded.
+        """
+        texts: list[str] = []
+        for start in range(0, len(images), ENCODER_BATCH_SIZE):
+            chunk = [
+                MangaOcrService._prepare_ocr_image(image)
+                for image in images[start : start + ENCODER_BATCH_SIZE]
+            ]
+            encoder_hidden_states = self._run_encoder(chunk)
+            for offset in range(len(chunk)):
+                text = self._decode_text(encoder_hidden_states[offset : offset + 1])
+                texts.append(text)
+                if on_text is not None:
+                    on_text(start + offset, text)
+        return texts
+
+    def _decode_text(self, encoder_hidden_states: np.ndarray) -> str:
         token_ids = self._generate_token_ids(encoder_hidden_states)
         decoded = self.tokenizer.decode(list(token_ids), skip_special_tokens=True)
         return MangaOcrService._post_process(decoded)
@@ -202,12 +299,16 @@ class _OnnxMangaOcrRuntime:
     def close(self) -> None:
         encoder_session = self._encoder_session
         decoder_session = self._decoder_session
+        decoder_past_session = self._decoder_past_session
         self._encoder_session = None
         self._decoder_session = None
+        self._decoder_past_session = None
         if encoder_session is not None:
             del encoder_session
         if decoder_session is not None:
             del decoder_session
+        if decoder_past_session is not None:
+            del decoder_past_session
 
     def _run_encoder(self, image) -> np.ndarray:
         pixel_values = self.processor(image, return_tensors="np")["pixel_values"]
@@ -219,16 +320,22 @@ class _OnnxMangaOcrRuntime:
             )
         return np.asarray(outputs[0], dtype=np.float32)
 
-    def _run_decoder(self, input_ids: np.ndarray, encoder_hidden_states: np.ndarray) -> np.ndarray:
+    def _run_decoder_session(
+        self,
+        session: Any,
+        output_names: list[str],
+        feeds: dict[str, np.ndarray],
+    ) -> list[np.ndarray]:
         with self._decoder_lock:
-            outputs = self._decoder_session.run(
-                [self._decoder_output_name],
-                {
-                    self._decoder_input_ids_name: input_ids,
-                    self._decoder_encoder_states_name: encoder_hidden_states,
-                },
-            )
-        return np.asarray(outputs[0], dtype=np.float32)
+            return session.run(output_names, feeds)
+
+    def _start_decoder_state(
+        self,
+        encoder_hidden_states: np.ndarray,
+    ) -> _FullPrefixDecoderState | _CachedDecoderState:
+        if self.decoder_mode == DECODER_MODE_FULL:
+            return _FullPrefixDecoderState(self, encoder_hidden_states)
+        return _CachedDecoderState(self, encoder_hidden_states)
 
     def _generate_token_ids(self, encoder_hidden_states: np.ndarray) -> tuple[int, ...]:
         config = self.generation_config
@@ -243,51 +350,59 @@ class _OnnxMangaOcrRuntime:
         length_penalty = float(config.length_penalty or 1.0)
         early_stopping = bool(config.early_stopping)
 
-        beams = [_BeamCandidate(token_ids=(decoder_start_token_id,), sum_logprob=0.0, finished=False)]
+        # All live beams always share one length, so they are decoded as a single
+        # `[beams, length]` batch: one decoder `run` per step regardless of width.
+        beam_tokens = np.asarray([[decoder_start_token_id]], dtype=np.int64)
+        beam_scores: list[float] = [0.0]
         completed: list[_BeamCandidate] = []
+        decoder_state = self._start_decoder_state(encoder_hidden_states)
 
         for _ in range(max_length - 1):
-            candidates: list[_BeamCandidate] = []
-
-            for beam in beams:
-                decoder_input_ids = np.asarray([beam.token_ids], dtype=np.int64)
-                logits = self._run_decoder(decoder_input_ids, encoder_hidden_states)
-                next_token_logits = np.asarray(logits[0, -1], dtype=np.float32)
-                next_token_logprobs = _log_softmax(next_token_logits)
-                banned = _no_repeat_ngram_banned_tokens(beam.token_ids, no_repeat_ngram_size)
-                if banned:
-                    next_token_logprobs[list(banned)] = -np.inf
-
-                top_indices = _top_k_indices(next_token_logprobs, num_beams * 2)
-                for index in top_indices:
+            step_logits = decoder_state.step(beam_tokens)
+            step_logprobs = _log_softmax_rows(step_logits)
+            _ban_repeated_ngrams(step_logprobs, beam_tokens, no_repeat_ngram_size)
+            top_indices = _top_k_indices_rows(step_logprobs, num_beams * 2)
+
+            candidates: list[tuple[float, int, int]] = []
+            for row in range(beam_tokens.shape[0]):
+                for index in top_indices[row]:
                     token_id = int(index)
-                    token_logprob = float(next_token_logprobs[token_id])
+                    token_logprob = float(step_logprobs[row, token_id])
                     if not math.isfinite(token_logprob):
                         continue
-                    next_ids = beam.token_ids + (token_id,)
-                    next_candidate = _BeamCandidate(
-                        token_ids=next_ids,
-                        sum_logprob=beam.sum_logprob + token_logprob,
-                        finished=token_id == eos_token_id,
-                    )
-                    if next_candidate.finished:
-                        completed.append(next_candidate)
+                    sum_logprob = beam_scores[row] + token_logprob
+                    if token_id == eos_token_id:
+                        completed.append(
+                            _BeamCandidate(
+                                token_ids=tuple(int(t) for t in beam_tokens[row]) + (token_id,),
+                                sum_logprob=sum_logprob,
+                                finished=True,
+                            )
+                        )
                     else:
-                        candidates.append(next_candidate)
+                        candidates.append((sum_logprob, row, token_id))
 
             if not candidates:
                 break
 
-            beams = sorted(
-                candidates,
-                key=lambda item: item.sum_logprob,
-                reverse=True,
-            )[:num_beams]
+            selected = sorted(candidates, key=lambda item: item[0], reverse=True)[:num_beams]
+            parents = np.asarray([item[1] for item in selected], dtype=np.int64)
+            next_tokens = np.asarray([[item[2]] for item in selected], dtype=np.int64)
+            beam_tokens = np.concatenate([beam_tokens[parents], next_tokens], axis=1)
+            beam_scores = [item[0] for item in selected]
+            decoder_state.reorder(parents)
 
             if early_stopping and len(completed) >= num_beams:
                 break
 
-        best_pool = completed or beams
+        best_pool = completed or [
+            _BeamCandidate(
+                token_ids=tuple(int(t) for t in beam_tokens[row]),
+                sum_logprob=beam_scores[row],
+                finished=False,
+            )
+            for row in range(beam_tokens.shape[0])
+        ]
         if not best_pool:
             return (decoder_start_token_id,)
         best = max(best_pool, key=lambda item: item.normalized_score(length_penalty))
@@ -300,6 +415,165 @@ class _OnnxMangaOcrRuntime:
         return int(value)
 
 
+@dataclass(frozen=True)
+class _DecoderIoNames:
+    """Input/output names of one exported MangaOCR decoder graph."""
+
+    input_ids: str
+    encoder_hidden_states: str | None
+    encoder_attention_mask: str | None
+    use_cache_branch: str | None
+    logits: str
+    past_inputs: tuple[str, ...]
+    present_outputs: tuple[str, ...]
+
+    @classmethod
+    def from_session(cls, session: Any) -> "_DecoderIoNames":
+        inputs = [meta.name for meta in session.get_inputs()]
+        outputs = [meta.name for meta in session.get_outputs()]
+        past_inputs = tuple(name for name in inputs if name.startswith(_PAST_INPUT_PREFIX))
+        present_outputs = tuple(name for name in outputs if name.startswith(_PRESENT_OUTPUT_PREFIX))
+        plain_inputs = [name for name in inputs if name not in past_inputs]
+        input_ids = "input_ids" if "input_ids" in plain_inputs else plain_inputs[0]
+        encoder_states = None
+        if "encoder_hidden_states" in plain_inputs:
+            encoder_states = "encoder_hidden_states"
+        elif len(plain_inputs) > 1 and not past_inputs:
+            # Legacy two-input export: `(input_ids, encoder_hidden_states)` by position.
+            encoder_states = plain_inputs[1]
+        logits = "logits" if "logits" in outputs else outputs[0]
+        return cls(
+            input_ids=input_ids,
+            encoder_hidden_states=encoder_states,
+            encoder_attention_mask=(
+                "encoder_attention_mask" if "encoder_attention_mask" in plain_inputs else None
+            ),
+            use_cache_branch="use_cache_branch" if "use_cache_branch" in plain_inputs else None,
+            logits=logits,
+            past_inputs=past_inputs,
+            present_outputs=present_outputs,
+        )
+
+
+def _past_name_for(present_name: str) -> str:
+    return _PAST_INPUT_PREFIX + present_name[len(_PRESENT_OUTPUT_PREFIX) :]
+
+
+def _empty_past_shapes(session: Any) -> dict[str, tuple[tuple[int, ...], Any]] | None:
+    """Zero-length past tensors for the first step of a merged decoder.
+
+    Returns `None` when a non-batch, non-sequence dimension is symbolic, because
+    the head count/size cannot be guessed then.
+    """
+    shapes: dict[str, tuple[tuple[int, ...], Any]] = {}
+    for meta in session.get_inputs():
+        if not meta.name.startswith(_PAST_INPUT_PREFIX):
+            continue
+        dims = list(meta.shape)
+        if len(dims) != 4:
+            return None
+        shape: list[int] = []
+        for axis, dim in enumerate(dims):
+            if axis == 0:
+                shape.append(1)
+            elif axis == 2:
+                shape.append(0)
+            elif isinstance(dim, int) and dim > 0:
+                shape.append(dim)
+            else:
+                return None
+        shapes[meta.name] = (tuple(shape), _ORT_TYPE_TO_NUMPY.get(meta.type, np.float32))
+    return shapes
+
+
+class _FullPrefixDecoderState:
+    """Decoder without KV cache: re-feeds the whole `[beams, length]` prefix."""
+
+    def __init__(self, runtime: _OnnxMangaOcrRuntime, encoder_hidden_states: np.ndarray) -> None:
+        self._runtime = runtime
+        self._io = runtime._decoder_io
+        self._encoder_hidden_states = encoder_hidden_states
+        self._tiled_states = encoder_hidden_states
+
+    def step(self, beam_tokens: np.ndarray) -> np.ndarray:
+        batch = int(beam_tokens.shape[0])
+        if self._tiled_states.shape[0] != batch:
+            self._tiled_states = np.repeat(self._encoder_hidden_states, batch, axis=0)
+        feeds = {self._io.input_ids: beam_tokens}
+        if self._io.encoder_hidden_states is not None:
+            feeds[self._io.encoder_hidden_states] = self._tiled_states
+        if self._io.encoder_attention_mask is not None:
+            feeds[self._io.encoder_attention_mask] = np.ones(
+                (batch, int(self._encoder_hidden_states.shape[1])),
+                dtype=np.int64,
+            )
+        logits = self._runtime._run_decoder_session(
+            self._runtime._decoder_session,
+            [self._io.logits],
+            feeds,
+        )[0]
+        return np.asarray(logits[:, -1], dtype=np.float32)
+
+    def reorder(self, parents: np.ndarray) -> None:
+        return
+
+
+class _CachedDecoderState:
+    """Decoder with past key/values: feeds only the newest token per step."""
+
+    def __init__(self, runtime: _OnnxMangaOcrRuntime, encoder_hidden_states: np.ndarray) -> None:
+        self._runtime = runtime
+        self._encoder_hidden_states = encoder_hidden_states
+        self._tiled_states = encoder_hidden_states
+        self._past: dict[str, np.ndarray] = {}
+        self._started = False
+
+    def step(self, beam_tokens: np.ndarray) -> np.ndarray:
+        runtime = self._runtime
+        if not self._started:
+            session = runtime._decoder_session
+            io_names = runtime._decoder_io
+            input_ids = beam_tokens
+            feeds: dict[str, np.ndarray] = {}
+            if io_names.use_cache_branch is not None:
+                feeds[io_names.use_cache_branch] = np.asarray([False])
+                for name, (shape, dtype) in runtime._decoder_empty_past.items():
+                    feeds[name] = np.zeros(shape, dtype=dtype)
+        else:
+            session = runtime._decoder_past_session
+            io_names = runtime._decoder_past_io or runtime._decoder_io
+            input_ids = np.ascontiguousarray(beam_tokens[:, -1:])
+            feeds = {name: self._past[name] for name in io_names.past_inputs}
+            if io_names.use_cache_branch is not None:
+                feeds[io_names.use_cache_branch] = np.asarray([True])
+
+        batch = int(beam_tokens.shape[0])
+        feeds[io_names.input_ids] = input_ids
+        if io_names.encoder_hidden_states is not None:
+            if self._tiled_states.shape[0] != batch:
+                self._tiled_states = np.repeat(self._encoder_hidden_states, batch, axis=0)
+            feeds[io_names.encoder_hidden_states] = self._tiled_states
+        if io_names.encoder_attention_mask is not None:
+            feeds[io_names.encoder_attention_mask] = np.ones(
+                (batch, int(self._encoder_hidden_states.shape[1])),
+                dtype=np.int64,
+            )
+
+        output_names = [io_names.logits, *io_names.present_outputs]
+        outputs = runtime._run_decoder_session(session, output_names, feeds)
+        for name, value in zip(io_names.present_outputs, outputs[1:]):
+            self._past[_past_name_for(name)] = value
+        self._started = True
+        return np.asarray(outputs[0][:, -1], dtype=np.float32)
+
+    def reorder(self, parents: np.ndarray) -> None:
+        # Encoder cross-attention keys are only returned by the first step; they
+        # are reordered together with the self-attention cache so the batch size
+        # always follows the surviving beams.
+        for name, value in self._past.items():
+            self._past[name] = np.ascontiguousarray(value[parents])
+
+
 class _TorchMangaOcrRuntime:
     def __init__(self, force_cpu: bool) -> None:
         try:
@@ -350,6 +624,32 @@ class _TorchMangaOcrRuntime:
         except Exception as exc:
             raise RuntimeError(f"MangaOCR PyTorch inference failed: {exc}") from exc
 
+    def recognize_batch(self, images: Sequence[Any], on_text: TextCallback | None = None) -> list[str]:
+        texts: list[str] = []
+        for start in range(0, len(images), ENCODER_BATCH_SIZE):
+            chunk = [
+                MangaOcrService._prepare_ocr_image(image)
+                for image in images[start : start + ENCODER_BATCH_SIZE]
+            ]
+            try:
+                pixel_values = self._processor(chunk, return_tensors="pt").pixel_values
+                with self._torch.no_grad():
+                    tokens_batch = self._model.generate(
+                        pixel_values.to(self._model.device),
+                        max_length=300,
+                    ).cpu()
+                decoded_batch = [
+                    str(self._post_process(self._tokenizer.decode(tokens, skip_special_tokens=True)) or "")
+                    for tokens in tokens_batch
+                ]
+            except Exception as exc:
+                raise RuntimeError(f"MangaOCR PyTorch inference failed: {exc}") from exc
+            for offset, text in enumerate(decoded_batch):
+                texts.append(text)
+                if on_text is not None:
+                    on_text(start + offset, text)
+        return texts
+
     def close(self) -> None:
         self._processor = None
         self._tokenizer = None
@@ -358,9 +658,15 @@ class _TorchMangaOcrRuntime:
         self._torch = None
 
 
+HEALTH_SOURCE = "ocr.mangaocr"
+
+
 class MangaOcrService:
     MODEL_KEY_PREFIX = "mangaocr"
 
+    _runtime_key = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(
         self,
         model_manager: LoadedModelManager,
@@ -372,6 +678,7 @@ class MangaOcrService:
         self._runtime: _OnnxMangaOcrRuntime | _TorchMangaOcrRuntime | None = None
         self._runtime_key: str | None = None
         self._last_error: str | None = None
+        self._micro_batcher = MicroBatcher("mangaocr", self._run_micro_batch)
 
     def health(self) -> dict[str, Any]:
         with self._lock:
@@ -380,6 +687,7 @@ class MangaOcrService:
                 "backend": self._runtime_backend_name(self._runtime_key),
                 "runtime_key": self._runtime_key,
                 "last_error": self._last_error,
+                "micro_batch": self._micro_batcher.metrics(),
             }
 
     def warmup(self) -> None:
@@ -410,6 +718,102 @@ class MangaOcrService:
         reflect_strings: bool = False,
         manga_model: Any = None,
     ) -> dict[str, Any]:
+        """Recognize one crop; concurrent calls with the same options share a batch."""
+        return self._submit(_decode_image(image_bytes), manga_model, join_newlines, reflect_strings)
+
+    def recognize_image_array(
+        self,
+        image_rgb: np.ndarray,
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        manga_model: Any = None,
+    ) -> dict[str, Any]:
+        """Same as `recognize_image_bytes` for a decoded `(H, W, 3)` uint8 RGB array."""
+        return self._submit(image_from_array(image_rgb), manga_model, join_newlines, reflect_strings)
+
+    def _submit(
+        self, image: Any, manga_model: Any, join_newlines: bool, reflect_strings: bool
+    ) -> dict[str, Any]:
+        # Crops are decoded on the caller's thread; the batch only sees PIL images.
+        key = (self._normalize_model_name(manga_model), bool(join_newlines), bool(reflect_strings))
+        return self._micro_batcher.submit(key, image)
+
+    def _run_micro_batch(
+        self, key: tuple[str, bool, bool], images: list[Any]
+    ) -> list[dict[str, Any]]:
+        manga_model, join_newlines, reflect_strings = key
+        return self._recognize_images(
+            images,
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            manga_model=manga_model,
+            on_result=None,
+        )
+
+    def recognize_images_bytes(
+        self,
+        images_bytes: Sequence[bytes],
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        manga_model: Any = None,
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `recognize_image_bytes`: one lease, batched encoder.
+
+        `on_result(index, result)` is called for every crop as soon as it is
+        decoded, in input order.
+        """
+        return self._recognize_images(
+            [_decode_image(image_bytes) for image_bytes in images_bytes],
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            manga_model=manga_model,
+            on_result=on_result,
+        )
+
+    def recognize_images_array(
+        self,
+        images_rgb: Sequence[np.ndarray],
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        manga_model: Any = None,
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `recognize_image_array` (see `recognize_images_bytes`)."""
+        return self._recognize_images(
+            [image_from_array(image_rgb) for image_rgb in images_rgb],
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            manga_model=manga_model,
+            on_result=on_result,
+        )
+
+    def _recognize_images(
+        self,
+        images: list[Any],
+        *,
+        join_newlines: bool,
+        reflect_strings: bool,
+        manga_model: Any,
+        on_result: Callable[[int, dict[str, Any]], None] | None,
+    ) -> list[dict[str, Any]]:
+        results: list[dict[str, Any]] = []
+
+        def _on_text(index: int, text_raw: str) -> None:
+            result = self._format_result(
+                text_raw,
+                join_newlines=join_newlines,
+                reflect_strings=reflect_strings,
+            )
+            results.append(result)
+            if on_result is not None:
+                on_result(index, result)
+
+        if not images:
+            return results
         lease_ctx = self._begin_model_use(manga_model)
         try:
             with self._lock:
@@ -418,18 +822,17 @@ class MangaOcrService:
                 lease_ctx.mark_loaded(
                     unload_callback=lambda: self._unload_key(lease_ctx.model_key)
                 )
-
-            from PIL import Image
-
-            with Image.open(io.BytesIO(image_bytes)) as img:
-                text_raw = runtime.recognize(img)
+            runtime.recognize_batch(images, on_text=_on_text)
         except Exception:
             if lease_ctx.needs_load:
                 lease_ctx.mark_load_failed()
             raise
         finally:
             lease_ctx.release()
+        return results
 
+    @staticmethod
+    def _format_result(text_raw: Any, *, join_newlines: bool, reflect_strings: bool) -> dict[str, Any]:
         text = str(text_raw or "")
         lines = [line.strip() for line in text.splitlines() if line.strip()]
         if not lines and text.strip():
@@ -591,38 +994,54 @@ class MangaOcrService:
         return True
 
 
-def _log_softmax(logits: np.ndarray) -> np.ndarray:
+def _decode_image(image_bytes: bytes) -> Any:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.load()
+        return img.copy()
+
+
+def _log_softmax_rows(logits: np.ndarray) -> np.ndarray:
     logits_float = np.asarray(logits, dtype=np.float32)
-    max_logit = float(np.max(logits_float))
-    stabilized = logits_float - max_logit
-    exp_values = np.exp(stabilized)
-    exp_sum = float(np.sum(exp_values))
-    if exp_sum <= 0.0 or not math.isfinite(exp_sum):
-        return np.full_like(logits_float, -np.inf)
-    return stabilized - math.log(exp_sum)
-
-
-def _top_k_indices(values: np.ndarray, limit: int) -> list[int]:
-    if limit <= 0:
-        return []
+    stabilized = logits_float - np.max(logits_float, axis=-1, keepdims=True)
+    exp_sum = np.sum(np.exp(stabilized), axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_sum = np.log(exp_sum.astype(np.float64)).astype(np.float32)
+    out = stabilized - log_sum
+    invalid = ~np.isfinite(exp_sum[:, 0]) | (exp_sum[:, 0] <= 0.0)
+    if invalid.any():
+        out[invalid] = -np.inf
+    return out
+
+
+def _top_k_indices_rows(values: np.ndarray, limit: int) -> np.ndarray:
+    """Per-row indices of the `limit` largest values, ordered best first."""
     normalized = np.asarray(values, dtype=np.float32)
-    k = min(limit, int(normalized.shape[0]))
+    k = min(max(limit, 0), int(normalized.shape[-1]))
     if k <= 0:
-        return []
-    partition = np.argpartition(normalized, -k)[-k:]
-    ordered = partition[np.argsort(normalized[partition])[::-1]]
-    return [int(index) for index in ordered]
-
-
-def _no_repeat_ngram_banned_tokens(token_ids: tuple[int, ...], ngram_size: int) -> set[int]:
-    if ngram_size <= 0 or len(token_ids) < ngram_size - 1:
-        return set()
-
-    prefix = token_ids[-(ngram_size - 1) :] if ngram_size > 1 else tuple()
-    banned: set[int] = set()
-    max_start = len(token_ids) - ngram_size + 1
-    for start in range(max_start):
-        ngram = token_ids[start : start + ngram_size]
-        if ngram_size == 1 or ngram[:-1] == prefix:
-            banned.add(int(ngram[-1]))
-    return banned
+        return np.zeros((normalized.shape[0], 0), dtype=np.int64)
+    partition = np.argpartition(normalized, -k, axis=-1)[:, -k:]
+    part_values = np.take_along_axis(normalized, partition, axis=-1)
+    order = np.argsort(part_values, axis=-1)[:, ::-1]
+    return np.take_along_axis(partition, order, axis=-1)
+
+
+def _ban_repeated_ngrams(logprobs: np.ndarray, beam_tokens: np.ndarray, ngram_size: int) -> None:
+    """Sets `-inf` on every token that would repeat an n-gram of its beam.
+
+    Matches HF `no_repeat_ngram_size`: a token is banned when the last
+    `ngram_size - 1` tokens of the beam already occurred followed by it.
+    """
+    length = int(beam_tokens.shape[1])
+    if ngram_size <= 0 or length < ngram_size:
+        return
+    windows = np.lib.stride_tricks.sliding_window_view(beam_tokens, ngram_size, axis=1)
+    if ngram_size > 1:
+        prefix = beam_tokens[:, length - ngram_size + 1 :]
+        matches = np.all(windows[:, :, :-1] == prefix[:, None, :], axis=-1)
+    else:
+        matches = np.ones(windows.shape[:2], dtype=bool)
+    rows, starts = np.nonzero(matches)
+    if rows.size:
+        logprobs[rows, windows[rows, starts, -1]] = -np.inf
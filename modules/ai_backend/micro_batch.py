@@ -0,0 +1,218 @@
+"""
+File: modules/ai_backend/micro_batch.py
+
+Purpose:
+Cross-request dynamic micro-batching for inference services. Concurrent IPC
+requests each arrive on their own dispatcher worker thread and used to
+serialize on the service lock at batch size 1; a `MicroBatcher` gathers the
+compatible ones into a single batched call instead.
+
+Main responsibilities:
+- group `submit(key, item)` calls that share a `key` (same model and options)
+  and arrive within `window_ms` of the first one, up to `max_batch` items;
+- run the group with one `run_batch(key, items)` call on the first caller's
+  thread and hand each caller its own result (or exception);
+- expose queue depth and batch-size counters for the health snapshot.
+
+Key structures:
+- `MicroBatcher`
+
+Notes:
+- No scheduler thread: the first caller of a group ("leader") waits out the
+  window and runs the batch; the others block on their future. While a batch
+  for a key is running, the next group keeps filling until it can run, so a
+  burst of requests naturally coalesces into a few large batches.
+- If a batch of several items fails with an input error (`input_errors`,
+  `ValueError` by default: the services' validation errors), every item is
+  retried on its own, so one broken input only fails its own request. Any other
+  failure (model load, missing weights, OOM, lease) goes to every waiting
+  caller at once instead of repeating the load once per request.
+- `window_ms <= 0` disables batching: `submit` calls `run_batch` directly.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+# ============================================================================
+# MICRO-BATCHING SCHEDULER
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `MicroBatcher.submit`: сбор совместимых запросов (одинаковый `key`) за
+#   короткое окно в один батч и раздача результатов по future.
+# - `MicroBatcher.metrics`: глубина очереди и размеры батчей для health.
+# ============================================================================
+
+WINDOW_MS_ENV = "MS_MICRO_BATCH_WINDOW_MS"
+MAX_BATCH_ENV = "MS_MICRO_BATCH_MAX"
+DEFAULT_WINDOW_MS = 4.0
+DEFAULT_MAX_BATCH = 16
+
+# Errors tied to one input of the batch; anything else fails the whole group.
+DEFAULT_INPUT_ERRORS: tuple[type[Exception], ...] = (ValueError,)
+
+RunBatchFn = Callable[[Hashable, list[Any]], list[Any]]
+
+
+@dataclass
+class _Group:
+    items: list[Any] = field(default_factory=list)
+    futures: list[Future] = field(default_factory=list)
+    full: threading.Event = field(default_factory=threading.Event)
+
+
+class MicroBatcher:
+    """Coalesces concurrent `submit` calls with the same key into batched calls.
+
+    `run_batch(key, items)` must return one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: RunBatchFn,
+        *,
+        window_ms: float | None = None,
+        max_batch: int | None = None,
+        input_errors: tuple[type[Exception], ...] = DEFAULT_INPUT_ERRORS,
+    ) -> None:
+        self.name = name
+        self._run_batch = run_batch
+        self._input_errors = input_errors
+        if window_ms is None:
+            window_ms = _env_float(WINDOW_MS_ENV, DEFAULT_WINDOW_MS)
+        if max_batch is None:
+            max_batch = _env_int(MAX_BATCH_ENV, DEFAULT_MAX_BATCH)
+        self.window_ms = max(0.0, float(window_ms))
+        self.max_batch = max(1, int(max_batch))
+        self._lock = threading.Lock()
+        self._open: dict[Hashable, _Group] = {}
+        self._run_locks: dict[Hashable, threading.Lock] = {}
+        self._queued = 0
+        self._running = 0
+        self._batches = 0
+        self._requests = 0
+        self._last_batch_size = 0
+        self._max_batch_size = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0 and self.max_batch > 1
+
+    def submit(self, key: Hashable, item: Any) -> Any:
+        """Runs `item` (possibly batched with others under `key`) and returns its result."""
+        if not self.enabled:
+            return self._run_direct(key, item)
+
+        future: Future = Future()
+        with self._lock:
+            group = self._open.get(key)
+            leader = group is None
+            if leader:
+                group = _Group()
+                self._open[key] = group
+                run_lock = self._run_locks.setdefault(key, threading.Lock())
+            group.items.append(item)
+            group.futures.append(future)
+            self._queued += 1
+            if len(group.items) >= self.max_batch:
+                # Full: later arrivals start the next group.
+                self._open.pop(key, None)
+                group.full.set()
+
+        if leader:
+            group.full.wait(self.window_ms / 1000.0)
+            # Waiting for the previous batch of this key keeps the group open,
+            # so it grows instead of queueing on the service lock at size 1.
+            with run_lock:
+                with self._lock:
+                    if self._open.get(key) is group:
+                        del self._open[key]
+                    items = list(group.items)
+                    futures = list(group.futures)
+                    self._queued -= len(items)
+                    self._running += len(items)
+                try:
+                    self._run_group(key, items, futures)
+                finally:
+                    with self._lock:
+                        self._running -= len(items)
+        return future.result()
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "window_ms": self.window_ms,
+                "max_batch": self.max_batch,
+                "queue_depth": self._queued,
+                "in_flight": self._running,
+                "batches": self._batches,
+                "requests": self._requests,
+                "avg_batch_size": (self._requests / self._batches) if self._batches else 0.0,
+                "last_batch_size": self._last_batch_size,
+                "max_batch_size": self._max_batch_size,
+            }
+
+    def _run_direct(self, key: Hashable, item: Any) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            result = self._checked_batch(key, [item])[0]
+        finally:
+            with self._lock:
+                self._running -= 1
+        self._record(1)
+        return result
+
+    def _run_group(self, key: Hashable, items: list[Any], futures: list[Future]) -> None:
+        self._record(len(items))
+        try:
+            results = self._checked_batch(key, items)
+        except BaseException as exc:  # noqa: BLE001 - delivered to the waiting callers
+            if len(items) == 1 or not isinstance(exc, self._input_errors):
+                for future in futures:
+                    future.set_exception(exc)
+                return
+            # Isolate the failing input: every request gets its own outcome.
+            for item, future in zip(items, futures):
+                try:
+                    future.set_result(self._checked_batch(key, [item])[0])
+                except Exception as item_exc:  # noqa: BLE001 - per-request error
+                    future.set_exception(item_exc)
+            return
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    def _checked_batch(self, key: Hashable, items: list[Any]) -> list[Any]:
+        results = list(self._run_batch(key, items))
+        if len(results) != len(items):
+            raise RuntimeError(
+                f"Микробатч {self.name}: получено {len(results)} результатов на {len(items)} запросов."
+            )
+        return results
+
+    def _record(self, size: int) -> None:
+        with self._lock:
+            self._batches += 1
+            self._requests += size
+            self._last_batch_size = size
+            self._max_batch_size = max(self._max_batch_size, size)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
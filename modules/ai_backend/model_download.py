@@ -0,0 +1,582 @@
+"""
+File: modules/ai_backend/model_download.py
+
+Purpose:
+Shared model-weight download engine for the AI backend (FLUX.1-Fill GGUF and
+components, Reline upscalers, the LaMa-MPE checkpoint).
+
+Main responsibilities:
+- resume an interrupted download from its `.part` file with HTTP `Range`
+  requests instead of starting over;
+- fetch large files as several concurrent segments and several files at once;
+- retry dropped connections from the last written byte (the retry budget
+  counts consecutive failures: any attempt that wrote bytes resets it);
+- verify the finished file against the expected sha256 before it atomically
+  replaces the destination;
+- report aggregate byte progress for the whole plan through one callback.
+
+Key structures:
+- `DownloadItem`
+- `DownloadError`, `ChecksumError`
+
+Key functions:
+- `download_files()`
+- `download_file()`
+
+Notes:
+- A segmented download preallocates `<dest>.part` and keeps per-segment
+  progress in `<dest>.part.json`; a single-stream download resumes from the
+  `.part` size. Both survive a process restart.
+- `<dest>.part.json` also records the server's `ETag` / `Last-Modified` from
+  the probe. A `.part` is only resumed while the validator is unchanged, and
+  every resumed `Range` request carries `If-Range`, so a file replaced on the
+  server is downloaded again instead of being spliced onto stale bytes.
+- Servers that ignore `Range` (reply `200`) are downloaded in one stream from
+  the start, and so is a resource that answers the probe with `416` (empty).
+- Only the standard library is used (`urllib`), so the engine works in every
+  backend environment and against `http.server` in tests.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Sequence
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+# ============================================================================
+# DOWNLOAD ENGINE
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `download_files`: параллельная загрузка плана файлов с общим прогрессом.
+# - `_FileDownload`: один файл — проба размера/Range/валидатора, докачка
+#   `.part` одним потоком или сегментами (с `If-Range`), повторы с последнего
+#   записанного байта, sha256.
+# - `_Progress`: потокобезопасный счётчик байт для колбэка прогресса.
+# ============================================================================
+
+DEFAULT_FILE_WORKERS = 2
+DEFAULT_SEGMENT_WORKERS = 4
+DEFAULT_SEGMENT_SIZE = 32 << 20
+DEFAULT_RETRIES = 4
+DEFAULT_TIMEOUT_S = 60.0
+CHUNK_SIZE = 1 << 20
+USER_AGENT = "ManhwaStudio/AI-Backend"
+# How often segment progress is written to `<dest>.part.json`.
+STATE_FLUSH_INTERVAL_S = 1.0
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+class DownloadError(RuntimeError):
+    """A download failed after all retries (or for a non-retryable reason)."""
+
+
+class ChecksumError(DownloadError):
+    """The downloaded file does not match the expected sha256."""
+
+
+class _ShortRead(DownloadError):
+    """The connection closed before the requested bytes arrived (retried)."""
+
+
+@dataclass(frozen=True)
+class DownloadItem:
+    """One file of a download plan.
+
+    `size` (bytes, `0` = unknown) and `sha256` come from the plan; the server's
+    own size wins when they disagree. `label` is the name shown in progress
+    messages (defaults to the destination file name).
+    """
+
+    url: str
+    dest: str | os.PathLike[str]
+    size: int = 0
+    sha256: str | None = None
+    label: str = ""
+
+
+class _Aborted(Exception):
+    pass
+
+
+class _RedirectHandler(HTTPRedirectHandler):
+    """Keeps `Range` across redirects but drops `Authorization` on a host change.
+
+    Hugging Face `resolve` URLs redirect to a CDN with a signed URL; forwarding
+    the bearer token there is both a leak and rejected by some storage backends
+    (the same rule `requests` applies).
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if new is not None and urlsplit(newurl).netloc != urlsplit(req.full_url).netloc:
+            new.headers.pop("Authorization", None)
+            new.unredirected_hdrs.pop("Authorization", None)
+        return new
+
+
+_OPENER = build_opener(_RedirectHandler)
+
+
+class _Progress:
+    def __init__(self, total: int, callback: ProgressCallback | None) -> None:
+        self._lock = threading.Lock()
+        self._callback = callback
+        self.done = 0
+        self.total = max(0, int(total))
+
+    def resize(self, delta: int) -> None:
+        with self._lock:
+            self.total = max(0, self.total + int(delta))
+
+    def advance(self, nbytes: int, label: str) -> None:
+        with self._lock:
+            self.done += int(nbytes)
+            self._emit(label)
+
+    def report(self, label: str) -> None:
+        with self._lock:
+            self._emit(label)
+
+    def _emit(self, label: str) -> None:
+        if self._callback is None:
+            return
+        try:
+            self._callback(self.done, max(self.total, self.done, 1), label)
+        except Exception:
+            pass
+
+
+def download_files(
+    items: Sequence[DownloadItem],
+    *,
+    progress: ProgressCallback | None = None,
+    headers: dict[str, str] | None = None,
+    file_workers: int = DEFAULT_FILE_WORKERS,
+    segment_workers: int = DEFAULT_SEGMENT_WORKERS,
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+    retries: int = DEFAULT_RETRIES,
+    retry_delay_s: float = 1.0,
+    timeout_s: float = DEFAULT_TIMEOUT_S,
+) -> None:
+    """Downloads every item to its `dest`; `progress(done, total, label)` counts bytes of the whole plan.
+
+    Up to `file_workers` files are fetched at once; a file of at least two
+    `segment_size` segments on a `Range`-capable server is split across
+    `segment_workers` connections. The first failure stops the remaining work
+    and is re-raised once every worker has returned; finished files stay in
+    place and unfinished ones keep their `.part` for the next call.
+    """
+    items = list(items)
+    if not items:
+        return
+    tracker = _Progress(sum(max(0, int(item.size or 0)) for item in items), progress)
+    abort = threading.Event()
+    downloads = [
+        _FileDownload(
+            item,
+            tracker=tracker,
+            abort=abort,
+            headers=dict(headers or {}),
+            segment_workers=max(1, int(segment_workers)),
+            segment_size=max(CHUNK_SIZE, int(segment_size)),
+            retries=max(0, int(retries)),
+            retry_delay_s=max(0.0, float(retry_delay_s)),
+            timeout_s=float(timeout_s),
+        )
+        for item in items
+    ]
+    _run_all([download.run for download in downloads], max(1, int(file_workers)), abort)
+
+
+def download_file(
+    url: str,
+    dest: str | os.PathLike[str],
+    *,
+    sha256: str | None = None,
+    size: int = 0,
+    progress: ProgressCallback | None = None,
+    **options,
+) -> Path:
+    """Single-file `download_files`; returns `dest` as a `Path`."""
+    download_files(
+        [DownloadItem(url=url, dest=dest, size=size, sha256=sha256)], progress=progress, **options
+    )
+    return Path(dest)
+
+
+def _run_all(tasks: list[Callable[[], None]], workers: int, abort: threading.Event) -> None:
+    if workers <= 1 or len(tasks) <= 1:
+        try:
+            for task in tasks:
+                task()
+        except Exception:
+            abort.set()
+            raise
+        return
+
+    errors: list[BaseException] = []
+
+    def guarded(task: Callable[[], None]) -> None:
+        try:
+            task()
+        except _Aborted:
+            pass
+        except BaseException as exc:
+            errors.append(exc)
+            abort.set()
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        for task in tasks:
+            pool.submit(guarded, task)
+    if errors:
+        raise errors[0]
+    if abort.is_set():
+        raise _Aborted()
+
+
+class _FileDownload:
+    def __init__(
+        self,
+        item: DownloadItem,
+        *,
+        tracker: _Progress,
+        abort: threading.Event,
+        headers: dict[str, str],
+        segment_workers: int,
+        segment_size: int,
+        retries: int,
+        retry_delay_s: float,
+        timeout_s: float,
+    ) -> None:
+        self.item = item
+        self.dest = Path(item.dest)
+        self.part = self.dest.with_name(self.dest.name + ".part")
+        self.state_path = self.dest.with_name(self.dest.name + ".part.json")
+        self.label = item.label or self.dest.name
+        self.tracker = tracker
+        self.abort = abort
+        self.headers = headers
+        self.segment_workers = segment_workers
+        self.segment_size = segment_size
+        self.retries = retries
+        self.retry_delay_s = retry_delay_s
+        self.timeout_s = timeout_s
+        # `ETag` / `Last-Modified` of the remote file, from the probe.
+        self.validator: dict[str, str] = {"etag": "", "last_modified": ""}
+
+    # ---- entry ----
+    def run(self) -> None:
+        self.dest.parent.mkdir(parents=True, exist_ok=True)
+        planned = max(0, int(self.item.size or 0))
+        size, ranges, self.validator = self._probe()
+        if size and size != planned:
+            self.tracker.resize(size - planned)
+        if ranges and size >= 2 * self.segment_size and self.segment_workers > 1:
+            self._download_segmented(size)
+        else:
+            self._download_stream(size, ranges)
+        self._verify(size)
+        os.replace(self.part, self.dest)
+        self.state_path.unlink(missing_ok=True)
+        self.tracker.report(f"Скачано {self.label}")
+
+    # ---- probing ----
+    def _probe(self) -> tuple[int, bool, dict[str, str]]:
+        """`(size, supports_range, validator)` from a one-byte range request (`size` 0 when unknown)."""
+        response = self._with_retries(self._open_probe)
+        if response is None:
+            return 0, False, _validator_of({})
+        with response:
+            validator = _validator_of(response.headers)
+            if response.status == 206:
+                total = str(response.headers.get("Content-Range", "")).rpartition("/")[2]
+                return (int(total) if total.isdigit() else 0), True, validator
+            length = response.headers.get("Content-Length")
+            return (int(length) if str(length or "").isdigit() else 0), False, validator
+
+    def _open_probe(self):
+        try:
+            return self._open({"Range": "bytes=0-0"})
+        except HTTPError as exc:
+            if exc.code != 416:
+                raise
+            # Nothing satisfies `bytes=0-0` on an empty resource: fall back to
+            # a plain GET without Range support.
+            exc.close()
+            return None
+
+    # ---- single stream ----
+    def _download_stream(self, size: int, ranges: bool) -> None:
+        resumable = ranges and self.part.is_file() and self._stream_resumable(size)
+        offset = self.part.stat().st_size if resumable else 0
+        if size and offset > size:
+            offset = 0
+        if offset == 0:
+            self.part.write_bytes(b"")
+        elif offset:
+            self.tracker.advance(offset, f"Продолжение {self.label}")
+        self._save_state(size, None)
+        attempt = 0
+        while not size or offset < size:
+            self._check_abort()
+            started_at = offset
+            try:
+                extra = self._range_headers(f"bytes={offset}-") if offset else {}
+                with self._open(extra) as response:
+                    if response.status != 206:
+                        # A full body: either a fresh start or the server restarted
+                        # from byte 0 (no Range support, or `If-Range` saw a new
+                        # version). Drop what we had and track the served version.
+                        if offset:
+                            self.tracker.advance(-offset, f"Скачивание {self.label}")
+                            offset = 0
+                            self.part.write_bytes(b"")
+                        self.validator = _validator_of(response.headers)
+                        self._save_state(size, None)
+                    with self.part.open("r+b") as out:
+                        out.seek(offset)
+                        for chunk in self._chunks(response):
+                            out.write(chunk)
+                            offset += len(chunk)
+                            self.tracker.advance(len(chunk), f"Скачивание {self.label}")
+                if not size:
+                    return
+                if offset < size:
+                    raise _ShortRead(
+                        f"Соединение оборвалось на {offset} из {size} байт: {self.item.url}"
+                    )
+            except _Aborted:
+                raise
+            except Exception as exc:
+                if offset > started_at:
+                    attempt = 0
+                attempt = self._retry_or_raise(exc, attempt)
+
+    # ---- segmented ----
+    def _download_segmented(self, size: int) -> None:
+        segments = [
+            (start, min(size, start + self.segment_size))
+            for start in range(0, size, self.segment_size)
+        ]
+        done = self._load_state(size, len(segments))
+        if done is None:
+            done = [0] * len(segments)
+            with self.part.open("wb") as out:
+                out.truncate(size)
+        resumed = sum(done)
+        if resumed:
+            self.tracker.advance(resumed, f"Продолжение {self.label}")
+
+        state_lock = threading.Lock()
+        last_flush = [time.monotonic()]
+
+        def record(index: int, nbytes: int) -> None:
+            with state_lock:
+                done[index] += nbytes
+                now = time.monotonic()
+                if now - last_flush[0] >= STATE_FLUSH_INTERVAL_S:
+                    last_flush[0] = now
+                    self._save_state(size, done)
+            self.tracker.advance(nbytes, f"Скачивание {self.label}")
+
+        pending = [
+            index for index, (start, end) in enumerate(segments) if done[index] < end - start
+        ]
+        try:
+            _run_all(
+                [
+                    lambda index=index: self._download_segment(index, segments[index], done, record)
+                    for index in pending
+                ],
+                self.segment_workers,
+                self.abort,
+            )
+        finally:
+            with state_lock:
+                self._save_state(size, done)
+
+    def _download_segment(
+        self,
+        index: int,
+        segment: tuple[int, int],
+        done: list[int],
+        record: Callable[[int, int], None],
+    ) -> None:
+        start, end = segment
+        attempt = 0
+        with self.part.open("r+b") as out:
+            while start + done[index] < end:
+                self._check_abort()
+                offset = start + done[index]
+                try:
+                    with self._open(self._range_headers(f"bytes={offset}-{end - 1}")) as response:
+                        if response.status != 206:
+                            # The saved state keeps the probed validator, so the
+                            # next call sees the new version and starts over.
+                            raise DownloadError(
+                                f"Файл на сервере изменился или сервер перестал поддерживать "
+                                f"Range-запросы: {self.item.url}"
+                            )
+                        out.seek(offset)
+                        for chunk in self._chunks(response, limit=end - offset):
+                            out.write(chunk)
+                            out.flush()
+                            record(index, len(chunk))
+                    if start + done[index] < end:
+                        raise _ShortRead(
+                            f"Соединение оборвалось на {start + done[index]} из {end} байт: {self.item.url}"
+                        )
+                except _Aborted:
+                    raise
+                except Exception as exc:
+                    if start + done[index] > offset:
+                        attempt = 0
+                    attempt = self._retry_or_raise(exc, attempt)
+
+    def _read_state(self, size: int) -> dict | None:
+        """Saved `.part.json` if it belongs to this URL, size and server validator."""
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            if (
+                state.get("url") == self.item.url
+                and int(state.get("size", -1)) == size
+                and state.get("validator") == self.validator
+            ):
+                return state
+        except Exception:
+            pass
+        return None
+
+    def _stream_resumable(self, size: int) -> bool:
+        state = self._read_state(size)
+        if state is not None:
+            return state.get("done") is None
+        # Without saved state a bare `.part` can only be trusted when the server
+        # offers no validator to compare against (the pre-validator behavior).
+        return not self.state_path.exists() and not any(self.validator.values())
+
+    def _load_state(self, size: int, count: int) -> list[int] | None:
+        try:
+            state = self._read_state(size)
+            done = [int(value) for value in state["done"]]
+            if (
+                int(state.get("segment_size", -1)) == self.segment_size
+                and len(done) == count
+                and self.part.is_file()
+                and self.part.stat().st_size == size
+            ):
+                return done
+        except Exception:
+            pass
+        return None
+
+    def _save_state(self, size: int, done: list[int] | None) -> None:
+        """Writes `.part.json`; `done` is per-segment progress, `None` for a single stream."""
+        payload = {
+            "url": self.item.url,
+            "size": size,
+            "validator": dict(self.validator),
+            "segment_size": self.segment_size,
+            "done": None if done is None else list(done),
+        }
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+    # ---- verification ----
+    def _verify(self, size: int) -> None:
+        actual_size = self.part.stat().st_size
+        if size and actual_size != size:
+            raise DownloadError(
+                f"Размер скачанного файла {self.label} {actual_size} != {size} байт."
+            )
+        expected = (self.item.sha256 or "").strip().lower()
+        if not expected:
+            return
+        self.tracker.report(f"Проверка {self.label}")
+        digest = hashlib.sha256()
+        with self.part.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        if digest.hexdigest() != expected:
+            self.part.unlink(missing_ok=True)
+            self.state_path.unlink(missing_ok=True)
+            self.tracker.advance(-actual_size, f"Ошибка проверки {self.label}")
+            raise ChecksumError(f"Повреждён скачанный файл {self.label} (SHA256 mismatch).")
+
+    # ---- HTTP helpers ----
+    def _range_headers(self, byte_range: str) -> dict[str, str]:
+        """`Range` plus `If-Range` with a strong `ETag` or, failing that, `Last-Modified`."""
+        etag = self.validator.get("etag", "")
+        if_range = etag if etag and not etag.startswith("W/") else self.validator.get("last_modified", "")
+        return {"Range": byte_range, **({"If-Range": if_range} if if_range else {})}
+
+    def _open(self, extra_headers: dict[str, str]):
+        request = Request(
+            self.item.url,
+            headers={"User-Agent": USER_AGENT, **self.headers, **extra_headers},
+        )
+        return _OPENER.open(request, timeout=self.timeout_s)
+
+    def _chunks(self, response, limit: int | None = None):
+        remaining = limit
+        while remaining is None or remaining > 0:
+            self._check_abort()
+            size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+            chunk = response.read(size)
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+    def _with_retries(self, call: Callable[[], object]):
+        attempt = 0
+        while True:
+            self._check_abort()
+            try:
+                return call()
+            except Exception as exc:
+                attempt = self._retry_or_raise(exc, attempt)
+
+    def _retry_or_raise(self, exc: Exception, attempt: int) -> int:
+        """Sleeps and returns the next attempt number, or raises once `retries` consecutive tries failed."""
+        if not _is_retryable(exc) or attempt >= self.retries:
+            if isinstance(exc, DownloadError):
+                raise exc
+            raise DownloadError(f"Не удалось скачать {self.item.url}: {exc}") from exc
+        self._check_abort()
+        time.sleep(self.retry_delay_s * (2**attempt))
+        return attempt + 1
+
+    def _check_abort(self) -> None:
+        if self.abort.is_set():
+            raise _Aborted()
+
+
+def _validator_of(headers) -> dict[str, str]:
+    return {
+        "etag": str(headers.get("ETag") or "").strip(),
+        "last_modified": str(headers.get("Last-Modified") or "").strip(),
+    }
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, HTTPError):
+        return exc.code in (408, 429) or exc.code >= 500
+    if isinstance(exc, DownloadError):
+        # Short reads are retried; checksum and protocol problems (no Range
+        # support, file changed on the server) are not.
+        return isinstance(exc, _ShortRead)
+    return isinstance(exc, (URLError, http.client.HTTPException, ConnectionError, TimeoutError, OSError))
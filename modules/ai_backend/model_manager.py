@@ -4,33 +4,62 @@ Shared loaded-model manager for Python AI backend runtimes.
 
 Main responsibilities:
 - Track loaded model/session entries across PyTorch and ONNX services.
-- Enforce a configurable upper bound for simultaneously resident models.
-- Evict least recently used idle models before loading a new one.
+- Record each resident model's footprint (host RSS bytes, device bytes), either
+  reported by the service or measured around the load.
+- Enforce either a count limit (default) or host / device byte budgets.
+- Evict idle models before loading a new one: least recently used under the
+  count limit, size-aware LRU (idle time x bytes) under byte budgets, limited
+  to models that hold bytes of the exceeded resource (or have no known
+  footprint).
 - Prevent unloading models that are currently used by active requests.
 
 Key structures:
 - `LoadedModelManager`
 - `ModelUsageLease`
+- `ModelFootprint`
 
 Notes:
 - The manager does not perform model loading itself; services keep ownership of
   their concrete runtime objects and report load/unload lifecycle transitions.
 - Eviction callbacks are always executed outside the manager lock to avoid
   deadlocks with service-local locks.
+- Every residency transition (load start/finish/abort, unload, eviction,
+  limit change) calls `notify_health_changed`, which wakes the event-driven
+  health worker. Taking or releasing a lease on a resident model does not:
+  per-request state is reported by `activity()`, which the health snapshot
+  keeps out of its deltas.
+- Byte budgets come from `MS_MODEL_HOST_BUDGET_MB` / `MS_MODEL_DEVICE_BUDGET_MB`
+  or `set_memory_budgets` (0 = no budget). While any budget is set, the count
+  limit is not applied, so many small models can stay resident.
+- A measured footprint is the process RSS / `torch.cuda.memory_allocated`
+  growth between the lease and `mark_loaded`; concurrent loads make it an
+  estimate. Device memory is only read when torch is already imported.
+  The last footprint per key is kept after unload and used as the estimate
+  for the next load of that key.
 """
 
 from __future__ import annotations
 
+import os
+import sys
 import threading
 import time
-from dataclasses import dataclass
-from typing import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from .health_feed import notify_health_changed
 
 UnloadCallback = Callable[[], bool]
 
+# `HealthFeed` source name for load/unload/use transitions.
+HEALTH_SOURCE = "model_manager"
 DEFAULT_MAX_LOADED_MODELS = 3
 MIN_MAX_LOADED_MODELS = 1
 MAX_MAX_LOADED_MODELS = 10
+HOST_BUDGET_ENV = "MS_MODEL_HOST_BUDGET_MB"
+DEVICE_BUDGET_ENV = "MS_MODEL_DEVICE_BUDGET_MB"
+_MIB = 1024 * 1024
 
 
 def clamp_max_loaded_models(value: object) -> int:
@@ -41,6 +70,73 @@ def clamp_max_loaded_models(value: object) -> int:
     return max(MIN_MAX_LOADED_MODELS, min(MAX_MAX_LOADED_MODELS, normalized))
 
 
+def budget_bytes_from_mb(value: object) -> int:
+    """Normalizes a MiB budget (config / env text) to bytes; invalid or <= 0 means no budget."""
+    try:
+        megabytes = float(str(value).strip())
+    except Exception:
+        return 0
+    return int(megabytes * _MIB) if megabytes > 0 else 0
+
+
+@dataclass(frozen=True)
+class ModelFootprint:
+    host_bytes: int = 0
+    device_bytes: int = 0
+
+    def __add__(self, other: "ModelFootprint") -> "ModelFootprint":
+        return ModelFootprint(self.host_bytes + other.host_bytes, self.device_bytes + other.device_bytes)
+
+    def growth_since(self, baseline: "ModelFootprint") -> "ModelFootprint":
+        return ModelFootprint(
+            max(0, self.host_bytes - baseline.host_bytes),
+            max(0, self.device_bytes - baseline.device_bytes),
+        )
+
+
+def measure_process_footprint() -> ModelFootprint:
+    """Current process RSS and torch device allocation (0 where unavailable)."""
+    return ModelFootprint(_host_rss_bytes(), _torch_device_allocated_bytes())
+
+
+def file_footprint(paths: Iterable[str | Path], *, on_device: bool) -> ModelFootprint:
+    """Footprint estimate from model file sizes (ONNX weights are resident roughly 1:1)."""
+    total = 0
+    for path in paths:
+        try:
+            total += Path(path).stat().st_size
+        except OSError:
+            continue
+    return ModelFootprint(0, total) if on_device else ModelFootprint(total, 0)
+
+
+def _host_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        pass
+    try:
+        import psutil  # type: ignore
+
+        return int(psutil.Process().memory_info().rss)
+    except Exception:
+        return 0
+
+
+def _torch_device_allocated_bytes() -> int:
+    # Never import torch just to measure: ONNX-only sessions must stay torch-free.
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return 0
+    try:
+        if not torch.cuda.is_available():
+            return 0
+        return sum(int(torch.cuda.memory_allocated(idx)) for idx in range(torch.cuda.device_count()))
+    except Exception:
+        return 0
+
+
 @dataclass
 class _ModelEntry:
     resident: bool = False
@@ -49,6 +145,7 @@ class _ModelEntry:
     in_use_count: int = 0
     last_used_at: float = 0.0
     unload_callback: UnloadCallback | None = None
+    footprint: ModelFootprint = field(default_factory=ModelFootprint)
 
 
 class ModelUsageLease:
@@ -58,11 +155,20 @@ class ModelUsageLease:
         self.needs_load = needs_load
         self._load_finished = not needs_load
         self._released = False
+        self._baseline = measure_process_footprint() if needs_load else ModelFootprint()
 
-    def mark_loaded(self, unload_callback: UnloadCallback | None = None) -> None:
+    def mark_loaded(
+        self,
+        unload_callback: UnloadCallback | None = None,
+        *,
+        footprint: ModelFootprint | None = None,
+    ) -> None:
+        """Marks the model resident; without `footprint` the growth since the lease is recorded."""
         if self._load_finished:
             return
-        self._manager.finish_load(self._model_key, unload_callback)
+        if footprint is None:
+            footprint = measure_process_footprint().growth_since(self._baseline)
+        self._manager.finish_load(self._model_key, unload_callback, footprint)
         self._load_finished = True
 
     def mark_load_failed(self) -> None:
@@ -79,15 +185,31 @@ class ModelUsageLease:
 
 
 class LoadedModelManager:
-    def __init__(self, max_loaded_models: int = DEFAULT_MAX_LOADED_MODELS) -> None:
+    def __init__(
+        self,
+        max_loaded_models: int = DEFAULT_MAX_LOADED_MODELS,
+        *,
+        host_budget_bytes: int | None = None,
+        device_budget_bytes: int | None = None,
+    ) -> None:
         self._condition = threading.Condition()
         self._entries: dict[str, _ModelEntry] = {}
         self._max_loaded_models = clamp_max_loaded_models(max_loaded_models)
+        if host_budget_bytes is None:
+            host_budget_bytes = budget_bytes_from_mb(os.environ.get(HOST_BUDGET_ENV, 0))
+        if device_budget_bytes is None:
+            device_budget_bytes = budget_bytes_from_mb(os.environ.get(DEVICE_BUDGET_ENV, 0))
+        self._host_budget_bytes = max(0, int(host_budget_bytes))
+        self._device_budget_bytes = max(0, int(device_budget_bytes))
+        # Last known footprint per key, kept across unloads as the next load's estimate.
+        self._known_footprints: dict[str, ModelFootprint] = {}
 
     def begin_model_use(
         self,
         model_key: str,
         unload_callback: UnloadCallback | None = None,
+        *,
+        estimated_footprint: ModelFootprint | None = None,
     ) -> ModelUsageLease:
         normalized_key = str(model_key).strip()
         if not normalized_key:
@@ -111,10 +233,13 @@ class LoadedModelManager:
                 entry.loading = True
                 entry.in_use_count += 1
                 entry.last_used_at = time.monotonic()
+                notify_health_changed(HEALTH_SOURCE)
                 break
 
+        with self._condition:
+            pending = self._known_footprints.get(normalized_key, estimated_footprint or ModelFootprint())
         try:
-            self._ensure_capacity_for_new_load(normalized_key)
+            self._ensure_capacity_for_new_load(normalized_key, pending)
         except Exception:
             self.abort_load(normalized_key)
             self.release(normalized_key)
@@ -126,6 +251,7 @@ class LoadedModelManager:
         self,
         model_key: str,
         unload_callback: UnloadCallback | None = None,
+        footprint: ModelFootprint | None = None,
     ) -> None:
         with self._condition:
             entry = self._entries.setdefault(model_key, _ModelEntry())
@@ -135,7 +261,14 @@ class LoadedModelManager:
             entry.last_used_at = time.monotonic()
             if unload_callback is not None:
                 entry.unload_callback = unload_callback
-            self._condition.notify_all()
+            if footprint is not None:
+                entry.footprint = footprint
+                self._known_footprints[model_key] = footprint
+            budgeted = self._uses_byte_budgets_locked()
+            self._notify_changed_locked()
+        if budgeted:
+            # The pre-load estimate may have been missing or low.
+            self._evict_idle_until_within_limit()
 
     def abort_load(self, model_key: str) -> None:
         with self._condition:
@@ -145,7 +278,7 @@ class LoadedModelManager:
             entry.loading = False
             entry.evicting = False
             self._cleanup_entry_if_unused_locked(model_key, entry)
-            self._condition.notify_all()
+            self._notify_changed_locked()
 
     def release(self, model_key: str) -> None:
         with self._condition:
@@ -156,6 +289,7 @@ class LoadedModelManager:
                 entry.in_use_count -= 1
             entry.last_used_at = time.monotonic()
             self._cleanup_entry_if_unused_locked(model_key, entry)
+            # Residency is unchanged: wake lease waiters, not the health feed.
             self._condition.notify_all()
 
     def mark_unloaded(self, model_key: str) -> None:
@@ -168,7 +302,7 @@ class LoadedModelManager:
             entry.evicting = False
             entry.last_used_at = time.monotonic()
             self._cleanup_entry_if_unused_locked(model_key, entry)
-            self._condition.notify_all()
+            self._notify_changed_locked()
 
     def get_max_loaded_models(self) -> int:
         with self._condition:
@@ -178,36 +312,75 @@ class LoadedModelManager:
         normalized = clamp_max_loaded_models(value)
         with self._condition:
             self._max_loaded_models = normalized
+            notify_health_changed(HEALTH_SOURCE)
         self._evict_idle_until_within_limit()
         return normalized
 
-    def health(self) -> dict[str, int]:
+    def get_memory_budgets(self) -> tuple[int, int]:
+        with self._condition:
+            return self._host_budget_bytes, self._device_budget_bytes
+
+    def set_memory_budgets(self, host_bytes: int | None = None, device_bytes: int | None = None) -> None:
+        """Sets the host / device byte budgets (None keeps, 0 removes) and evicts down to them."""
+        with self._condition:
+            if host_bytes is not None:
+                self._host_budget_bytes = max(0, int(host_bytes))
+            if device_bytes is not None:
+                self._device_budget_bytes = max(0, int(device_bytes))
+            notify_health_changed(HEALTH_SOURCE)
+        self._evict_idle_until_within_limit()
+
+    def health(self) -> dict[str, Any]:
+        """Residency state: changes only on load, unload, eviction and limit changes."""
         with self._condition:
             resident = 0
-            in_use = 0
             loading = 0
-            for entry in self._entries.values():
+            models: dict[str, dict[str, Any]] = {}
+            for key, entry in self._entries.items():
                 if entry.resident:
                     resident += 1
                 if entry.loading:
                     loading += 1
-                if entry.in_use_count > 0:
-                    in_use += 1
+                if entry.resident or entry.loading:
+                    models[key] = {
+                        "host_bytes": entry.footprint.host_bytes,
+                        "device_bytes": entry.footprint.device_bytes,
+                        "loading": entry.loading,
+                    }
+            used = self._resident_footprint_locked()
             return {
                 "max_loaded_models": self._max_loaded_models,
                 "resident_model_count": resident,
-                "active_model_count": in_use,
                 "loading_model_count": loading,
+                "limit_mode": "bytes" if self._uses_byte_budgets_locked() else "count",
+                "host_budget_bytes": self._host_budget_bytes,
+                "device_budget_bytes": self._device_budget_bytes,
+                "resident_host_bytes": used.host_bytes,
+                "resident_device_bytes": used.device_bytes,
+                "models": models,
             }
 
-    def _ensure_capacity_for_new_load(self, exclude_key: str) -> None:
+    def activity(self) -> dict[str, Any]:
+        """Per-request state (models with an active lease); changes on every request."""
+        with self._condition:
+            in_use = sorted(key for key, entry in self._entries.items() if entry.in_use_count > 0)
+            return {"active_model_count": len(in_use), "in_use_models": in_use}
+
+    def _ensure_capacity_for_new_load(
+        self, exclude_key: str, pending: ModelFootprint = ModelFootprint()
+    ) -> None:
         skipped: set[str] = set()
         while True:
             with self._condition:
-                if self._resident_count_locked() < self._max_loaded_models:
+                resource = self._over_limit_locked(pending, for_new_load=True)
+                if resource is None:
                     return
-                victim = self._pick_evictable_key_locked(exclude_key, skipped)
+                victim = self._pick_evictable_key_locked(exclude_key, skipped, resource)
                 if victim is None:
+                    if resource != "count":
+                        # Byte budgets are advisory for the model being loaded:
+                        # everything idle is already gone, so let it load.
+                        return
                     raise RuntimeError(
                         "Не удалось загрузить новую модель: достигнут лимит загруженных моделей, "
                         "а свободных кандидатов для выгрузки нет."
@@ -232,15 +405,16 @@ class LoadedModelManager:
                         self._cleanup_entry_if_unused_locked(victim, entry)
                     else:
                         skipped.add(victim)
-                    self._condition.notify_all()
+                    self._notify_changed_locked()
 
     def _evict_idle_until_within_limit(self) -> None:
         skipped: set[str] = set()
         while True:
             with self._condition:
-                if self._resident_count_locked() <= self._max_loaded_models:
+                resource = self._over_limit_locked(ModelFootprint(), for_new_load=False)
+                if resource is None:
                     return
-                victim = self._pick_evictable_key_locked(None, skipped)
+                victim = self._pick_evictable_key_locked(None, skipped, resource)
                 if victim is None:
                     return
                 entry = self._entries[victim]
@@ -263,17 +437,53 @@ class LoadedModelManager:
                         self._cleanup_entry_if_unused_locked(victim, entry)
                     else:
                         skipped.add(victim)
-                    self._condition.notify_all()
+                    self._notify_changed_locked()
+
+    def _notify_changed_locked(self) -> None:
+        self._condition.notify_all()
+        notify_health_changed(HEALTH_SOURCE)
 
     def _resident_count_locked(self) -> int:
         return sum(1 for entry in self._entries.values() if entry.resident)
 
+    def _resident_footprint_locked(self) -> ModelFootprint:
+        total = ModelFootprint()
+        for entry in self._entries.values():
+            if entry.resident:
+                total = total + entry.footprint
+        return total
+
+    def _uses_byte_budgets_locked(self) -> bool:
+        return self._host_budget_bytes > 0 or self._device_budget_bytes > 0
+
+    def _over_limit_locked(self, pending: ModelFootprint, *, for_new_load: bool) -> str | None:
+        """Returns the exceeded limit (`"count"`, `"host"`, `"device"`) or None."""
+        if not self._uses_byte_budgets_locked():
+            resident = self._resident_count_locked() + (1 if for_new_load else 0)
+            return "count" if resident > self._max_loaded_models else None
+        projected = self._resident_footprint_locked() + pending
+        if self._host_budget_bytes and projected.host_bytes > self._host_budget_bytes:
+            return "host"
+        if self._device_budget_bytes and projected.device_bytes > self._device_budget_bytes:
+            return "device"
+        return None
+
     def _pick_evictable_key_locked(
         self,
         exclude_key: str | None,
         skipped: set[str],
+        resource: str = "count",
     ) -> str | None:
+        """Idle entry to evict for the exceeded `resource`, or None.
+
+        Under a byte budget only entries that hold bytes of that resource are
+        candidates (size-aware LRU), then entries with no recorded footprint at
+        all (plain LRU); evicting a model that frees nothing of the exceeded
+        resource is never useful.
+        """
         candidates: list[tuple[float, str]] = []
+        sized: list[tuple[float, str]] = []
+        now = time.monotonic()
         for key, entry in self._entries.items():
             if key == exclude_key or key in skipped:
                 continue
@@ -283,7 +493,17 @@ class LoadedModelManager:
                 continue
             if entry.unload_callback is None:
                 continue
-            candidates.append((entry.last_used_at, key))
+            if resource == "count":
+                candidates.append((entry.last_used_at, key))
+                continue
+            size = entry.footprint.host_bytes if resource == "host" else entry.footprint.device_bytes
+            if size > 0:
+                # Size-aware LRU: evict the entry whose idle time x bytes is largest.
+                sized.append((-(now - entry.last_used_at + 1.0) * size, key))
+            elif entry.footprint == ModelFootprint():
+                candidates.append((entry.last_used_at, key))
+        if sized:
+            return min(sized)[1]
         if not candidates:
             return None
         candidates.sort(key=lambda item: item[0])
@@ -0,0 +1,221 @@
+"""
+File: modules/ai_backend/model_preload.py
+
+Purpose:
+Background model preloading for the `models.preload` IPC method. Models are
+normally loaded lazily inside the first request that needs them; a client that
+knows what comes next (e.g. "OCR now, inpaint next") can ask the backend to
+load the next stage's model while the current stage still runs.
+
+Main responsibilities:
+- map preload keys (the IPC method names of the stages, e.g. `ocr.manga`,
+  `inpaint.lama_v2`) to a warmup that goes through the service's normal
+  lease path, so the model ends up resident in `LoadedModelManager`;
+- run queued warmups one at a time on a background worker, skipping requests
+  whose key and params are already queued or loading;
+- publish `model_load` events (`model`, `phase`, `loaded`, `total`, `message`).
+
+Key structures:
+- `ModelPreloader`
+- `PRELOAD_TARGETS`
+
+Notes:
+- A warmup is a tiny dummy call (`warmup()` where the service has one, else a
+  64x64 detect/inpaint) with the caller's `params`, so the same model variant
+  the real request will use gets loaded.
+- Diffusion inpainters (SDXL, FLUX.1-Fill) and Reline are not preload targets:
+  their dummy call would run a full sampling / upscale pass.
+- Phases: `queued` -> `loading` -> `loaded` | `failed`; `loaded`/`total` count
+  finished warmups of the current batch.
+- Pending requests are deduplicated by key *and* params (`_params_signature`):
+  the same key with different params (another device, checkpoint, langs) is a
+  different model variant and is queued after the first, not dropped.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import numpy as np
+
+from .ipc.protocol import (
+    METHOD_INPAINT_AOT,
+    METHOD_INPAINT_LAMA_MPE,
+    METHOD_INPAINT_LAMA_V2,
+    METHOD_OCR_EASY,
+    METHOD_OCR_MANGA,
+    METHOD_OCR_PADDLE,
+    METHOD_OCR_PADDLE_VL,
+    METHOD_OCR_SURYA,
+    METHOD_TEXTDETECTOR_CTD,
+    METHOD_TEXTDETECTOR_PADDLE,
+    METHOD_TEXTDETECTOR_SURYA,
+    TOPIC_MODEL_LOAD,
+)
+
+# ============================================================================
+# MODEL PRELOADING
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `PRELOAD_TARGETS`: ключ стадии (имя IPC-метода) -> прогрев сервиса.
+# - `ModelPreloader`: фоновая очередь прогрева с событиями `model_load`.
+# ============================================================================
+
+PHASE_QUEUED = "queued"
+PHASE_LOADING = "loading"
+PHASE_LOADED = "loaded"
+PHASE_FAILED = "failed"
+
+_DUMMY_SIZE = 64
+
+WarmupFn = Callable[[Any, dict[str, Any]], None]
+
+
+def _params_signature(params: dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _dummy_page() -> np.ndarray:
+    return np.full((_DUMMY_SIZE, _DUMMY_SIZE, 3), 255, dtype=np.uint8)
+
+
+def _dummy_mask() -> np.ndarray:
+    mask = np.zeros((_DUMMY_SIZE, _DUMMY_SIZE), dtype=np.uint8)
+    mask[24:40, 24:40] = 255
+    return mask
+
+
+def _detect(attr: str) -> WarmupFn:
+    def warmup(state: Any, params: dict[str, Any]) -> None:
+        getattr(state, attr).detect_image_array(_dummy_page(), params=params or None)
+
+    return warmup
+
+
+def _inpaint(attr: str) -> WarmupFn:
+    def warmup(state: Any, params: dict[str, Any]) -> None:
+        getattr(state, attr).inpaint_image_array(_dummy_page(), _dummy_mask(), params=params or None)
+
+    return warmup
+
+
+def _ocr(attr: str, *option_names: str) -> WarmupFn:
+    def warmup(state: Any, params: dict[str, Any]) -> None:
+        options = {name: params[name] for name in option_names if name in params}
+        getattr(state, attr).warmup(**options)
+
+    return warmup
+
+
+PRELOAD_TARGETS: dict[str, WarmupFn] = {
+    METHOD_OCR_MANGA: _ocr("manga_ocr"),
+    METHOD_OCR_EASY: _ocr("easy_ocr", "langs"),
+    METHOD_OCR_PADDLE: _ocr("paddle_ocr", "lang", "device"),
+    METHOD_OCR_PADDLE_VL: _ocr("paddle_vl_ocr"),
+    METHOD_OCR_SURYA: _ocr("surya_ocr", "task_name", "recognize_math"),
+    METHOD_TEXTDETECTOR_CTD: _detect("text_detector_ctd"),
+    METHOD_TEXTDETECTOR_PADDLE: _detect("text_detector_paddle"),
+    METHOD_TEXTDETECTOR_SURYA: _detect("text_detector_surya"),
+    METHOD_INPAINT_LAMA_V2: _inpaint("lama_inpaint"),
+    METHOD_INPAINT_LAMA_MPE: _inpaint("lama_mpe_inpaint"),
+    METHOD_INPAINT_AOT: _inpaint("aot_inpaint"),
+}
+
+
+class ModelPreloader:
+    """Loads models in the background and reports progress on `TOPIC_MODEL_LOAD`."""
+
+    def __init__(
+        self,
+        state: Any,
+        events: Any | None = None,
+        targets: dict[str, WarmupFn] | None = None,
+    ) -> None:
+        self._state = state
+        self._events = events
+        self._targets = PRELOAD_TARGETS if targets is None else targets
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-preload")
+        self._lock = threading.Lock()
+        self._pending: set[tuple[str, str]] = set()
+        self._batch_total = 0
+        self._batch_done = 0
+        self._last_error: dict[str, str] = {}
+
+    @property
+    def targets(self) -> list[str]:
+        return sorted(self._targets)
+
+    def preload(self, requests: list[tuple[str, dict[str, Any]]]) -> dict[str, list[str]]:
+        """Queues `(key, params)` warmups; returns `queued`, `already_pending`, `unknown` keys.
+
+        A request is `already_pending` only if the same key with the same params
+        is queued or loading; different params queue another warmup.
+        """
+        result: dict[str, list[str]] = {"queued": [], "already_pending": [], "unknown": []}
+        to_submit: list[tuple[str, dict[str, Any], tuple[str, str]]] = []
+        with self._lock:
+            for key, params in requests:
+                pending_key = (key, _params_signature(params))
+                if key not in self._targets:
+                    result["unknown"].append(key)
+                elif pending_key in self._pending:
+                    result["already_pending"].append(key)
+                else:
+                    if not self._pending:
+                        # Idle before this call: start a new progress batch.
+                        self._batch_total = self._batch_done = 0
+                    self._pending.add(pending_key)
+                    self._batch_total += 1
+                    to_submit.append((key, params, pending_key))
+                    result["queued"].append(key)
+            total = self._batch_total
+            done = self._batch_done
+        for key, params, pending_key in to_submit:
+            self._publish(key, PHASE_QUEUED, done, total)
+            self._executor.submit(self._run, key, params, pending_key)
+        return result
+
+    def health(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": sorted({key for key, _ in self._pending}),
+                "last_error": dict(self._last_error),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, key: str, params: dict[str, Any], pending_key: tuple[str, str]) -> None:
+        with self._lock:
+            done, total = self._batch_done, self._batch_total
+        self._publish(key, PHASE_LOADING, done, total)
+        phase, message = PHASE_LOADED, ""
+        try:
+            self._targets[key](self._state, params)
+        except Exception as exc:  # noqa: BLE001 - one failed warmup must not stop the queue
+            traceback.print_exc()
+            phase, message = PHASE_FAILED, str(exc) or type(exc).__name__
+        with self._lock:
+            self._pending.discard(pending_key)
+            self._batch_done += 1
+            done, total = self._batch_done, self._batch_total
+            if message:
+                self._last_error[key] = message
+            else:
+                self._last_error.pop(key, None)
+        self._publish(key, phase, done, total, message)
+
+    def _publish(self, key: str, phase: str, loaded: int, total: int, message: str = "") -> None:
+        if self._events is None:
+            return
+        try:
+            self._events.publish(
+                TOPIC_MODEL_LOAD,
+                {"model": key, "phase": phase, "loaded": loaded, "total": total, "message": message},
+            )
+        except Exception:
+            traceback.print_exc()
@@ -0,0 +1,225 @@
+"""
+File: modules/ai_backend/onnx_export.py
+
+Purpose:
+Export tool for the torch-only models (LaMa-v2, AOT, Comic Text Detector) to
+ONNX files that `torch_onnx_runtime.py` runs through the shared `RuntimeFactory`.
+
+Main responsibilities:
+- load each model exactly as its service does (`InpainterV2`, `load_aot_model`,
+  `TextDetBase`) and wrap it in the graph signature the ONNX runtime path feeds;
+- export with dynamic spatial axes (and a dynamic batch for CTD) to
+  `ManhwaStudio_AI_Models/ONNX/{LaMa,AOT,ComicTextDetector}`;
+- write through a temporary file so a failed export never leaves a partial model.
+
+Run:
+    python -m modules.ai_backend.onnx_export {lama,aot,ctd,all} [--checkpoint best.ckpt] [--opset 17]
+
+Notes:
+- Needs torch (and the LaMa runtime bundle for LaMa); the backend itself only
+  needs onnxruntime to run the exported files.
+- The LaMa graph binarizes the mask and returns the composited `inpainted`
+  image, like `InpainterV2` standard mode. The CTD graph returns the text mask
+  and the DB line map only; YOLO block boxes are not used by the detector.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+from typing import Any, Sequence
+
+from .torch_onnx_runtime import (
+    CTD_INPUT_NAME,
+    CTD_OUTPUT_NAMES,
+    INPAINT_INPUT_NAMES,
+    INPAINT_OUTPUT_NAME,
+    aot_onnx_path,
+    ctd_onnx_path,
+    lama_onnx_path,
+)
+
+DEFAULT_OPSET = 17
+INPAINT_SAMPLE_SIZE = 256
+CTD_SAMPLE_SIZE = 640
+
+_SPATIAL_AXES = {2: "height", 3: "width"}
+_BATCH_SPATIAL_AXES = {0: "batch", 2: "height", 3: "width"}
+
+
+def _torch():
+    try:
+        import torch  # type: ignore
+
+        return torch
+    except Exception as exc:
+        raise RuntimeError(
+            "Для экспорта моделей в ONNX требуется пакет torch. Установите зависимости backend."
+        ) from exc
+
+
+def export_module(
+    module: Any,
+    sample_inputs: Sequence[Any],
+    out_path: Path,
+    *,
+    input_names: Sequence[str],
+    output_names: Sequence[str],
+    dynamic_axes: dict[str, dict[int, str]],
+    opset: int = DEFAULT_OPSET,
+) -> Path:
+    """Traces `module` on `sample_inputs` and writes the ONNX graph to `out_path`."""
+    torch = _torch()
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    module.eval()
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                module,
+                tuple(sample_inputs),
+                str(tmp_path),
+                input_names=list(input_names),
+                output_names=list(output_names),
+                dynamic_axes=dynamic_axes,
+                opset_version=opset,
+                do_constant_folding=True,
+            )
+        os.replace(tmp_path, out_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return out_path
+
+
+def _inpaint_sample(size: int = INPAINT_SAMPLE_SIZE) -> tuple[Any, Any]:
+    torch = _torch()
+    generator = torch.Generator().manual_seed(0)
+    image = torch.rand((1, 3, size, size), generator=generator)
+    mask = torch.zeros((1, 1, size, size))
+    mask[..., size // 4 : size // 2, size // 3 : size * 2 // 3] = 1.0
+    return image, mask
+
+
+def export_inpaint_module(module: Any, out_path: Path, *, opset: int = DEFAULT_OPSET) -> Path:
+    """Exports an `(image, mask) -> output` NCHW module with dynamic height/width."""
+    return export_module(
+        module,
+        _inpaint_sample(),
+        out_path,
+        input_names=INPAINT_INPUT_NAMES,
+        output_names=(INPAINT_OUTPUT_NAME,),
+        dynamic_axes={name: _SPATIAL_AXES for name in (*INPAINT_INPUT_NAMES, INPAINT_OUTPUT_NAME)},
+        opset=opset,
+    )
+
+
+def lama_export_module(model: Any, model_format: str) -> Any:
+    """Wraps a loaded `InpainterV2.model` into `(image, mask) -> inpainted`."""
+    torch = _torch()
+
+    class LamaExport(torch.nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.model = model
+
+        def forward(self, image, mask):
+            mask = (mask > 0).to(image.dtype)
+            if model_format == "torchscript":
+                return self.model(image, mask)
+            return self.model({"image": image, "mask": mask})["inpainted"]
+
+    return LamaExport()
+
+
+def ctd_export_module(base: Any) -> Any:
+    """Wraps `TextDetBase` into `image -> (mask, lines)` (no YOLO block head output)."""
+    torch = _torch()
+    from .textdetector.ctd.basemodel import TEXTDET_INFERENCE
+
+    class CtdExport(torch.nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.base = base
+
+        def forward(self, image):
+            _, features = self.base.blk_det(image, detect=True)
+            mask, features = self.base.text_seg(*features, forward_mode=TEXTDET_INFERENCE)
+            lines = self.base.text_det(*features, step_eval=False)
+            return mask, lines
+
+    return CtdExport()
+
+
+def export_ctd_module(base: Any, out_path: Path, *, opset: int = DEFAULT_OPSET) -> Path:
+    torch = _torch()
+    sample = torch.rand((1, 3, CTD_SAMPLE_SIZE, CTD_SAMPLE_SIZE), generator=torch.Generator().manual_seed(0))
+    return export_module(
+        ctd_export_module(base),
+        (sample,),
+        out_path,
+        input_names=(CTD_INPUT_NAME,),
+        output_names=CTD_OUTPUT_NAMES,
+        dynamic_axes={name: _BATCH_SPATIAL_AXES for name in (CTD_INPUT_NAME, *CTD_OUTPUT_NAMES)},
+        opset=opset,
+    )
+
+
+def export_lama(checkpoint_name: str | None = None, *, opset: int = DEFAULT_OPSET) -> Path:
+    from .lama_inpaint_service import LamaInpaintService
+    from .model_manager import LoadedModelManager
+
+    service = LamaInpaintService(LoadedModelManager())
+    checkpoint_name = service._resolve_checkpoint_name(checkpoint_name)
+    inpainter = service._load_inpainter_class_locked()(
+        checkpoint_dir=str(service._model_dir),
+        checkpoint_name=checkpoint_name,
+        device="cpu",
+        refine=False,
+        verbose=False,
+    )
+    module = lama_export_module(inpainter.model, inpainter.model_format)
+    return export_inpaint_module(module, lama_onnx_path(checkpoint_name), opset=opset)
+
+
+def export_aot(*, opset: int = DEFAULT_OPSET) -> Path:
+    from .aot_inpaint_service import AOT_DIR, load_aot_model
+
+    model_path = Path(str(AOT_DIR)) / "inpainting.ckpt"
+    if not model_path.is_file():
+        raise FileNotFoundError(f"Не найден checkpoint AOT: {model_path}")
+    return export_inpaint_module(load_aot_model(str(model_path), "cpu"), aot_onnx_path(), opset=opset)
+
+
+def export_ctd(*, opset: int = DEFAULT_OPSET) -> Path:
+    from .ctd_text_detector_service import MODEL_FILENAME, TEXT_DETECTOR_DIR
+    from .textdetector.ctd.basemodel import TextDetBase
+
+    model_path = Path(TEXT_DETECTOR_DIR) / MODEL_FILENAME
+    if not model_path.is_file():
+        raise FileNotFoundError(f"CTD model not found: {model_path}")
+    return export_ctd_module(TextDetBase(str(model_path), device="cpu"), ctd_onnx_path(), opset=opset)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export LaMa / AOT / CTD to ONNX for the ONNX Runtime path.")
+    parser.add_argument("model", choices=("lama", "aot", "ctd", "all"))
+    parser.add_argument("--checkpoint", default=None, help="LaMa checkpoint name (default: the service default)")
+    parser.add_argument("--opset", type=int, default=DEFAULT_OPSET)
+    args = parser.parse_args(argv)
+
+    exporters = {
+        "lama": lambda: export_lama(args.checkpoint, opset=args.opset),
+        "aot": lambda: export_aot(opset=args.opset),
+        "ctd": lambda: export_ctd(opset=args.opset),
+    }
+    names = list(exporters) if args.model == "all" else [args.model]
+    for name in names:
+        print(f"{name}: {exporters[name]()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,263 @@
+"""
+File: modules/ai_backend/onnx_session_profiles.py
+
+Purpose:
+Per-model ONNX Runtime session tuning and the persistent optimized-model cache
+used by `RuntimeFactory` (`paddle_onnx_runtime.py`).
+
+Main responsibilities:
+- `SessionProfile`: intra/inter-op threads, execution mode, graph optimization
+  level, CPU memory arena, memory pattern, thread spinning and IOBinding for one
+  model family; `SESSION_PROFILES` holds the defaults per family (`paddle_det`,
+  `paddle_rec`, `lama`, `aot`, `ctd`);
+- `build_session_options`: `ort.SessionOptions` for a profile and provider
+  (DirectML gets the settings its EP requires);
+- `OptimizedModelCache`: `optimized_model_filepath` targets under
+  `ManhwaStudio_AI_Models/.cache/optimized`, keyed by the model's SHA-256, the
+  ORT version, the provider the session actually runs on, the machine
+  architecture and the persisted optimization level.
+
+Key structures:
+- `SessionProfile`, `SESSION_PROFILES`
+- `OptimizedModelCache`
+
+Notes:
+- Default intra-op threads are half the logical CPUs (at most 8), so two
+  concurrent sessions do not oversubscribe the CPU; `MS_ONNX_INTRA_THREADS`
+  overrides every profile, `MS_ONNX_OPTIMIZED_CACHE=0` disables the cache.
+- Only graphs of providers without compiled nodes (CPU, CUDA) can be saved;
+  other providers (DirectML, MIGraphX with its own cache) skip the cache.
+- Graphs are persisted at `extended` level at most (`PERSISTED_OPTIMIZATION_CAP`):
+  `all`-level layout transforms (NCHWc) depend on the CPU's instruction set, so
+  they are re-applied when the cached graph is loaded instead of being stored.
+- Model digests are remembered per `(path, size, mtime)` in `digests.json`, so
+  a restart does not re-hash unchanged weights.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+
+try:
+    import onnxruntime as ort  # type: ignore
+except Exception:  # pragma: no cover - environment specific
+    ort = None
+
+log = logging.getLogger(__name__)
+
+# ============================================================================
+# ONNX SESSION PROFILES
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `SessionProfile` / `SESSION_PROFILES`: настройки `SessionOptions` по
+#   семействам моделей (потоки, режим исполнения, оптимизации, arena, IOBinding).
+# - `OptimizedModelCache`: кэш оптимизированных графов (`optimized_model_filepath`)
+#   по SHA-256 модели + версии ORT + провайдеру + уровню оптимизации.
+# ============================================================================
+
+INTRA_THREADS_ENV = "MS_ONNX_INTRA_THREADS"
+OPTIMIZED_CACHE_ENV = "MS_ONNX_OPTIMIZED_CACHE"
+OPTIMIZED_DIR_NAME = "optimized"
+DIGESTS_FILENAME = "digests.json"
+MAX_DEFAULT_INTRA_THREADS = 8
+
+# Providers whose optimized graphs serialize without compiled nodes.
+CACHEABLE_PROVIDERS = frozenset({"CPUExecutionProvider", "CUDAExecutionProvider"})
+
+GRAPH_OPTIMIZATION_LEVELS = ("disable", "basic", "extended", "all")
+# Highest level whose optimized graph is portable between CPUs of one architecture.
+PERSISTED_OPTIMIZATION_CAP = "extended"
+EXECUTION_MODES = ("sequential", "parallel")
+
+
+@dataclass(frozen=True)
+class SessionProfile:
+    name: str = "default"
+    # 0 = `default_intra_op_threads()`.
+    intra_op_threads: int = 0
+    inter_op_threads: int = 1
+    execution_mode: str = "sequential"
+    graph_optimization: str = "all"
+    cpu_mem_arena: bool = True
+    # Pre-plans buffers for one input shape; useless (and re-planned) for
+    # models fed with varying spatial sizes.
+    mem_pattern: bool = True
+    # Idle pool threads spin-wait by default, stealing CPU from other sessions.
+    allow_spinning: bool = False
+    # Run through `io_binding()` so ORT allocates outputs once per run on the
+    # provider side (helps GPU providers with large image outputs).
+    io_binding: bool = False
+    optimized_cache: bool = True
+
+    def persisted_level(self) -> str:
+        """Optimization level of the graph written to the cache."""
+        cap = GRAPH_OPTIMIZATION_LEVELS.index(PERSISTED_OPTIMIZATION_CAP)
+        return GRAPH_OPTIMIZATION_LEVELS[min(GRAPH_OPTIMIZATION_LEVELS.index(self.graph_optimization), cap)]
+
+    def cache_tag(self) -> str:
+        return self.persisted_level()
+
+
+SESSION_PROFILES: dict[str, SessionProfile] = {
+    "default": SessionProfile(),
+    "paddle_det": SessionProfile(name="paddle_det", mem_pattern=False),
+    # Small recognizer run on width buckets; leave cores to the detector.
+    "paddle_rec": SessionProfile(name="paddle_rec", intra_op_threads=-2, mem_pattern=False),
+    "lama": SessionProfile(name="lama", mem_pattern=False, io_binding=True),
+    "aot": SessionProfile(name="aot", mem_pattern=False, io_binding=True),
+    "ctd": SessionProfile(name="ctd", mem_pattern=False, io_binding=True),
+}
+
+
+def default_intra_op_threads() -> int:
+    return max(1, min(MAX_DEFAULT_INTRA_THREADS, (os.cpu_count() or 1) // 2))
+
+
+def resolve_intra_op_threads(profile: SessionProfile) -> int:
+    """Env override, else the profile value; 0 = default, negative = default divided by |n|."""
+    raw = os.environ.get(INTRA_THREADS_ENV, "").strip()
+    if raw.isdigit() and int(raw) > 0:
+        return int(raw)
+    if profile.intra_op_threads > 0:
+        return profile.intra_op_threads
+    if profile.intra_op_threads < 0:
+        return max(1, default_intra_op_threads() // -profile.intra_op_threads)
+    return default_intra_op_threads()
+
+
+def resolve_profile(
+    name: str,
+    profiles: dict[str, SessionProfile] | None = None,
+) -> SessionProfile:
+    table = SESSION_PROFILES if profiles is None else profiles
+    profile = table.get(name) or table.get("default") or SessionProfile()
+    if profile.graph_optimization not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown graph optimization level: {profile.graph_optimization!r}")
+    if profile.execution_mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {profile.execution_mode!r}")
+    return profile if profile.name == name else replace(profile, name=name)
+
+
+def optimized_cache_enabled() -> bool:
+    return os.environ.get(OPTIMIZED_CACHE_ENV, "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def build_session_options(
+    profile: SessionProfile, provider: str, *, optimize: bool = True, level: str | None = None
+) -> Any:
+    """`ort.SessionOptions` for `profile`; `optimize=False` loads an already optimized graph.
+
+    `level` overrides the profile's graph optimization level.
+    """
+    options = ort.SessionOptions()
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    options.graph_optimization_level = levels[
+        level or (profile.graph_optimization if optimize else "disable")
+    ]
+    options.intra_op_num_threads = resolve_intra_op_threads(profile)
+    options.inter_op_num_threads = max(1, profile.inter_op_threads)
+    parallel = profile.execution_mode == "parallel"
+    mem_pattern = profile.mem_pattern
+    if provider == "DmlExecutionProvider":
+        # The DirectML EP rejects memory patterns and parallel execution.
+        parallel = False
+        mem_pattern = False
+    options.execution_mode = (
+        ort.ExecutionMode.ORT_PARALLEL if parallel else ort.ExecutionMode.ORT_SEQUENTIAL
+    )
+    options.enable_cpu_mem_arena = profile.cpu_mem_arena
+    options.enable_mem_pattern = mem_pattern
+    spinning = "1" if profile.allow_spinning else "0"
+    options.add_session_config_entry("session.intra_op.allow_spinning", spinning)
+    options.add_session_config_entry("session.inter_op.allow_spinning", spinning)
+    return options
+
+
+def _sanitize(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", value.strip()) or "default"
+
+
+class OptimizedModelCache:
+    """Paths of persisted optimized graphs plus a persistent model-digest index."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._digests: dict[str, dict[str, Any]] | None = None
+
+    def supports(self, provider: str, profile: SessionProfile) -> bool:
+        return (
+            ort is not None
+            and profile.optimized_cache
+            and profile.graph_optimization != "disable"
+            and provider in CACHEABLE_PROVIDERS
+            and optimized_cache_enabled()
+        )
+
+    def path_for(self, model_path: Path, provider: str, profile: SessionProfile) -> Path:
+        digest = self.model_digest(model_path)
+        name = "-".join(
+            (
+                _sanitize(model_path.stem),
+                digest[:16],
+                f"ort{_sanitize(ort.__version__)}",
+                _sanitize(provider),
+                # Extended-level fusions are still per architecture; the
+                # ISA-specific `all` layouts are never persisted.
+                _sanitize(platform.machine() or "cpu"),
+                profile.cache_tag(),
+            )
+        )
+        return self.root / f"{name}.onnx"
+
+    def model_digest(self, model_path: Path) -> str:
+        resolved = Path(model_path).resolve()
+        stat = resolved.stat()
+        key = str(resolved)
+        with self._lock:
+            digests = self._load_digests_locked()
+            entry = digests.get(key)
+            if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                return str(entry["sha256"])
+        sha = hashlib.sha256()
+        with resolved.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        with self._lock:
+            digests = self._load_digests_locked()
+            digests[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+            self._save_digests_locked(digests)
+        return digest
+
+    def _load_digests_locked(self) -> dict[str, dict[str, Any]]:
+        if self._digests is None:
+            try:
+                loaded = json.loads((self.root / DIGESTS_FILENAME).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                loaded = {}
+            self._digests = loaded if isinstance(loaded, dict) else {}
+        return self._digests
+
+    def _save_digests_locked(self, digests: dict[str, dict[str, Any]]) -> None:
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.root / f"{DIGESTS_FILENAME}.tmp"
+            tmp_path.write_text(json.dumps(digests, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp_path, self.root / DIGESTS_FILENAME)
+        except OSError as exc:
+            log.warning("Could not persist ONNX model digests in %s: %s", self.root, exc)
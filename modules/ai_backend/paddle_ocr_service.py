@@ -6,6 +6,10 @@ Main responsibilities:
 - Expose lazy health/warmup/recognition API used by `modules/ai_backend/server.py`.
 - Resolve selected ONNX provider/device from backend settings.
 - Run PP-OCR detector + recognizer through shared ONNX runtime helpers.
+- Recognize many crops in one call with pooled recognizer batches.
+- Coalesce concurrent single-crop requests into batched runs (`micro_batch.py`).
+- `recognize_image_array` / `recognize_images_array` for in-process callers holding
+  decoded RGB arrays; the `*_bytes` methods only decode and delegate.
 
 Notes:
 - The request field `paddle_lang` is kept for backward compatibility, but it now
@@ -16,7 +20,7 @@ Notes:
 from __future__ import annotations
 
 import threading
-from typing import Any
+from typing import Any, Callable, Sequence
 
 import cv2
 import numpy as np
@@ -26,9 +30,13 @@ try:
 except Exception:
     UserConfig = None
 
+from .health_feed import HealthField
+from .image_arrays import check_rgb_array
+from .micro_batch import MicroBatcher
 from .paddle_onnx_runtime import (
     DEFAULT_REC_MODEL_KEY,
     PaddleOnnxRuntime,
+    ProviderSettings,
     RuntimeFactory,
     normalize_model_key,
     resolve_model_paths,
@@ -37,7 +45,15 @@ from .paddle_onnx_runtime import (
 )
 
 
+HEALTH_SOURCE = "ocr.paddleocr"
+
+
 class PaddleOcrService:
+    _model_key = HealthField(HEALTH_SOURCE)
+    _provider = HealthField(HEALTH_SOURCE)
+    _device_id = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(self, runtime_factory: RuntimeFactory) -> None:
         self._lock = threading.Lock()
         self._runtime = PaddleOnnxRuntime(runtime_factory)
@@ -45,6 +61,7 @@ class PaddleOcrService:
         self._provider: str | None = None
         self._device_id: str | None = None
         self._last_error: str | None = None
+        self._micro_batcher = MicroBatcher("paddleocr", self._run_micro_batch)
 
     def health(self) -> dict[str, Any]:
         with self._lock:
@@ -64,14 +81,11 @@ class PaddleOcrService:
                 "models_root": str(resolve_models_root()),
                 "model_exists": model_exists,
                 "last_error": self._last_error,
+                "micro_batch": self._micro_batcher.metrics(),
             }
 
     def warmup(self, *, lang: str = DEFAULT_REC_MODEL_KEY, device: str | None = None) -> None:
-        dummy = np.zeros((16, 16, 3), dtype="uint8")
-        ok, encoded = cv2.imencode(".png", dummy)
-        if not ok:
-            raise RuntimeError("Не удалось закодировать warmup PNG для PaddleOCR ONNX.")
-        self.recognize_image_bytes(encoded.tobytes(), lang=lang, device=device)
+        self.recognize_image_array(np.zeros((16, 16, 3), dtype=np.uint8), lang=lang, device=device)
 
     def recognize_image_bytes(
         self,
@@ -82,30 +96,154 @@ class PaddleOcrService:
         lang: str = DEFAULT_REC_MODEL_KEY,
         device: str | None = None,
     ) -> dict[str, Any]:
-        image_bgr = self._decode_image_bgr(image_bytes)
-        model_key = normalize_model_key(lang)
-        provider_settings = resolve_provider_settings(UserConfig, device)
+        """Recognize one crop; concurrent calls with the same options share a batch."""
+        return self._submit(
+            self._decode_image_bgr(image_bytes), lang, device, join_newlines, reflect_strings
+        )
 
+    def recognize_image_array(
+        self,
+        image_rgb: np.ndarray,
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        lang: str = DEFAULT_REC_MODEL_KEY,
+        device: str | None = None,
+    ) -> dict[str, Any]:
+        """Same as `recognize_image_bytes` for a decoded `(H, W, 3)` uint8 RGB array."""
+        return self._submit(_rgb_to_bgr(image_rgb), lang, device, join_newlines, reflect_strings)
+
+    def _submit(
+        self,
+        image_bgr: np.ndarray,
+        lang: str,
+        device: str | None,
+        join_newlines: bool,
+        reflect_strings: bool,
+    ) -> dict[str, Any]:
+        # Crops are decoded on the caller's thread; the batch only sees BGR arrays.
+        key = (
+            normalize_model_key(lang),
+            None if device is None else str(device),
+            bool(join_newlines),
+            bool(reflect_strings),
+        )
+        return self._micro_batcher.submit(key, image_bgr)
+
+    def _run_micro_batch(
+        self, key: tuple[str, str | None, bool, bool], images_bgr: list[np.ndarray]
+    ) -> list[dict[str, Any]]:
+        model_key, device, join_newlines, reflect_strings = key
+        return self._recognize_images(
+            images_bgr,
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            model_key=model_key,
+            provider_settings=resolve_provider_settings(UserConfig, device),
+        )
+
+    def recognize_images_bytes(
+        self,
+        images_bytes: Sequence[bytes],
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        lang: str = DEFAULT_REC_MODEL_KEY,
+        device: str | None = None,
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `recognize_image_bytes`.
+
+        Line crops of all images share recognizer batches; `on_result(index,
+        result)` is called for every image after the batch finishes.
+        """
+        return self._recognize_many(
+            [self._decode_image_bgr(image_bytes) for image_bytes in images_bytes],
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            lang=lang,
+            device=device,
+            on_result=on_result,
+        )
+
+    def recognize_images_array(
+        self,
+        images_rgb: Sequence[np.ndarray],
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        lang: str = DEFAULT_REC_MODEL_KEY,
+        device: str | None = None,
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `recognize_image_array` (see `recognize_images_bytes`)."""
+        return self._recognize_many(
+            [_rgb_to_bgr(image_rgb) for image_rgb in images_rgb],
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            lang=lang,
+            device=device,
+            on_result=on_result,
+        )
+
+    def _recognize_many(
+        self,
+        images_bgr: list[np.ndarray],
+        *,
+        join_newlines: bool,
+        reflect_strings: bool,
+        lang: str,
+        device: str | None,
+        on_result: Callable[[int, dict[str, Any]], None] | None,
+    ) -> list[dict[str, Any]]:
+        if not images_bgr:
+            return []
+        results = self._recognize_images(
+            images_bgr,
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            model_key=normalize_model_key(lang),
+            provider_settings=resolve_provider_settings(UserConfig, device),
+        )
+        if on_result is not None:
+            for index, result in enumerate(results):
+                on_result(index, result)
+        return results
+
+    def _recognize_images(
+        self,
+        images_bgr: list[np.ndarray],
+        *,
+        join_newlines: bool,
+        reflect_strings: bool,
+        model_key: str,
+        provider_settings: ProviderSettings,
+    ) -> list[dict[str, Any]]:
         with self._lock:
             try:
-                result = self._runtime.recognize(image_bgr, model_key, provider_settings)
-                lines = [
-                    line["text"]
-                    for line in result.get("lines", [])
-                    if isinstance(line, dict) and isinstance(line.get("text"), str)
-                ]
-                if reflect_strings:
-                    lines.reverse()
-                output_text = "\n".join(lines) if join_newlines else " ".join(lines)
+                raw_results = self._runtime.recognize_many(images_bgr, model_key, provider_settings)
+                results: list[dict[str, Any]] = []
+                for result in raw_results:
+                    lines = [
+                        line["text"]
+                        for line in result.get("lines", [])
+                        if isinstance(line, dict) and isinstance(line.get("text"), str)
+                    ]
+                    if reflect_strings:
+                        lines.reverse()
+                    output_text = "\n".join(lines) if join_newlines else " ".join(lines)
+                    results.append(
+                        {
+                            "lines": lines,
+                            "text": output_text.strip(),
+                        }
+                    )
 
                 self._model_key = model_key
                 self._provider = provider_settings.provider
                 self._device_id = provider_settings.device_id
                 self._last_error = None
-                return {
-                    "lines": lines,
-                    "text": output_text.strip(),
-                }
+                return results
             except Exception as exc:
                 self._last_error = str(exc)
                 raise
@@ -117,3 +255,7 @@ class PaddleOcrService:
         if bgr is None:
             raise RuntimeError("PaddleOCR ONNX: cv2.imdecode returned None.")
         return bgr
+
+
+def _rgb_to_bgr(image_rgb: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(check_rgb_array(image_rgb), cv2.COLOR_RGB2BGR)
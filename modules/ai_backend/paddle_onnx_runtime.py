@@ -4,20 +4,32 @@ Shared ONNX Runtime helpers for PaddleOCR recognition and text detection.
 
 Main responsibilities:
 - Resolve PaddleOCR ONNX model files from `ManhwaStudio_AI_Models/ONNX/PaddleOCR`.
-- Build ONNX Runtime sessions for the selected Execution Provider and device id.
+- Build ONNX Runtime sessions for the selected Execution Provider and device id
+  (single-input `run` for PaddleOCR, multi-input `run_feeds` for the exported
+  torch models in `torch_onnx_runtime.py`).
 - Run PP-OCR detection and recognition pipelines without Paddle dependencies.
-- Reuse runtime sessions across backend requests.
+- Pool line crops of several images into shared recognizer batches (`recognize_many`).
+- Reuse runtime sessions across backend requests, together with the parsed
+  configs, decoder and post-processor prepared for them.
 - Configure ONNX Runtime cache directories used by MiGraphX where supported.
+- Build sessions from per-model `SessionProfile`s and reuse persisted optimized
+  graphs (`onnx_session_profiles.py`); runners report start-up / first-run times.
+- Decode CTC recognizer output for a whole batch with NumPy masks.
+- Turn DB detection maps into boxes with the shared `detect_postprocess.py`
+  filters (specks and tiny contours never reach box fitting or unclip).
 
 Key structures:
 - `ProviderSettings`
 - `ResolvedModelPaths`
 - `RuntimeFactory`
+- `PreparedDetModel`, `PreparedRecModel`
 - `PaddleOnnxRuntime`
 
 Notes:
 - No model auto-download is implemented here.
 - The selected provider is always used directly; initialization errors are surfaced.
+- Per-batch/per-candidate tensor statistics are only computed and logged when
+  diagnostics are on (`MS_PADDLE_ONNX_DEBUG=1` or this logger at DEBUG level).
 """
 
 from __future__ import annotations
@@ -28,13 +40,13 @@ import math
 import os
 import re
 import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Optional, Sequence
+from typing import Any, Callable, Optional, Sequence
 
 import cv2
 import numpy as np
-import pyclipper
 
 try:
     import onnxruntime as ort  # type: ignore
@@ -44,7 +56,23 @@ except Exception as exc:  # pragma: no cover - environment specific
 else:
     ORT_IMPORT_ERROR = None
 
-from .model_manager import LoadedModelManager, ModelUsageLease
+from .detect_postprocess import (
+    contour_candidates,
+    drop_small_components,
+    min_area_boxes,
+    polygon_mean,
+    unclip,
+)
+from .model_manager import LoadedModelManager, ModelUsageLease, file_footprint
+from .onnx_session_profiles import (
+    OPTIMIZED_DIR_NAME,
+    OptimizedModelCache,
+    SessionProfile,
+    build_session_options,
+    default_intra_op_threads,
+    optimized_cache_enabled,
+    resolve_profile,
+)
 
 
 log = logging.getLogger(__name__)
@@ -54,6 +82,13 @@ DEFAULT_DET_STRIDE = 32
 DEFAULT_REC_MAX_DYNAMIC_WIDTH = 3200
 DEFAULT_REC_BUCKET_WIDTHS: tuple[int, ...] = (320, 640, 960, 1280, 1600, 1920, 2560, 3200)
 DEFAULT_REC_BATCH_SIZE = 8
+# Upper bound of one pooled recognizer batch on dynamic-batch models; keeps the
+# `[N, 3, 48, W]` input bounded when many crops land in the same width bucket.
+MAX_POOLED_REC_BATCH = 32
+
+# Opt-in switch for tensor statistics / top-k / raw-text diagnostics in the log.
+DIAGNOSTICS_ENV = "MS_PADDLE_ONNX_DEBUG"
+_DIAGNOSTICS_FROM_ENV = os.environ.get(DIAGNOSTICS_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
 
 MODELS_DIR_NAME = "ManhwaStudio_AI_Models"
 ONNX_DIR_NAME = "ONNX"
@@ -125,6 +160,30 @@ class RecognitionCandidate:
     box: np.ndarray
     det_score: float
     crop: np.ndarray
+    image_idx: int = 0
+
+
+@dataclass(frozen=True)
+class PreparedDetModel:
+    """Detector state derived from `config.json`; cached per detector runner."""
+
+    det_cfg: DetConfig
+    det_post: "DBPostProcess"
+
+
+@dataclass(frozen=True)
+class PreparedRecModel:
+    """Everything `recognize_many` needs besides the sessions themselves.
+
+    `rec_cfg` is already adapted to the recognizer input shape, so an entry is
+    only valid for the runners it was built from (see `RuntimeFactory`).
+    """
+
+    det: PreparedDetModel
+    rec_cfg: RecConfig
+    rec_decoder: "CTCLabelDecoder"
+    rec_batch_size: int
+    rec_dynamic_batch: bool
 
 
 class DBPostProcess:
@@ -167,84 +226,39 @@ class DBPostProcess:
         width_scale = float(dest_width) / max(width, 1)
         height_scale = float(dest_height) / max(height, 1)
 
+        # Noise specks cannot reach `min_size`: drop them before tracing, and
+        # skip the rotated-rectangle work for tiny contours (e.g. small holes).
+        bitmap = drop_small_components(bitmap, self.min_size)
         contours, _ = cv2.findContours(
             (bitmap * 255).astype(np.uint8),
             cv2.RETR_LIST,
             cv2.CHAIN_APPROX_SIMPLE,
         )
+        contours = contours[: self.max_candidates]
+        candidates = contour_candidates(contours, self.min_size)
+        mini_boxes, short_sides = min_area_boxes([contours[idx] for idx in candidates])
 
-        boxes: list[np.ndarray] = []
-        scores: list[float] = []
-        for contour in contours[: self.max_candidates]:
-            points, short_side = self._get_mini_boxes(contour)
+        unclipped_boxes: list[np.ndarray] = []
+        unclipped_scores: list[float] = []
+        for points_np, short_side in zip(mini_boxes, short_sides):
             if short_side < self.min_size:
                 continue
-
-            points_np = np.array(points, dtype=np.float32)
-            score = self._box_score_fast(pred, points_np)
+            score = polygon_mean(pred, points_np)
             if score < self.box_thresh:
                 continue
-
-            unclipped = self._unclip(points_np)
+            unclipped = unclip(points_np, self.unclip_ratio)
             if unclipped.size == 0:
                 continue
+            unclipped_boxes.append(unclipped.reshape(-1, 1, 2))
+            unclipped_scores.append(float(score))
 
-            box, short_side = self._get_mini_boxes(unclipped.reshape(-1, 1, 2))
-            if short_side < self.min_size + 2:
-                continue
-
-            box_np = np.array(box, dtype=np.float32)
-            box_np[:, 0] = np.clip(np.round(box_np[:, 0] * width_scale), 0, dest_width)
-            box_np[:, 1] = np.clip(np.round(box_np[:, 1] * height_scale), 0, dest_height)
-            boxes.append(box_np.astype(np.float32))
-            scores.append(float(score))
-
-        return boxes, scores
-
-    def _unclip(self, box: np.ndarray) -> np.ndarray:
-        area = float(cv2.contourArea(box))
-        length = float(cv2.arcLength(box, True))
-        if length < 1e-6:
-            return np.array([], dtype=np.float32)
-        distance = area * self.unclip_ratio / length
-        offset = pyclipper.PyclipperOffset()
-        offset.AddPath(box.tolist(), pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
-        expanded = offset.Execute(distance)
-        if not expanded:
-            return np.array([], dtype=np.float32)
-        return np.array(expanded[0], dtype=np.float32)
-
-    @staticmethod
-    def _get_mini_boxes(contour: np.ndarray) -> tuple[list[np.ndarray], float]:
-        bounding_box = cv2.minAreaRect(contour)
-        points = sorted(list(cv2.boxPoints(bounding_box)), key=lambda item: item[0])
-        if points[1][1] > points[0][1]:
-            index_1, index_4 = 0, 1
-        else:
-            index_1, index_4 = 1, 0
-        if points[3][1] > points[2][1]:
-            index_2, index_3 = 2, 3
-        else:
-            index_2, index_3 = 3, 2
-        box = [points[index_1], points[index_2], points[index_3], points[index_4]]
-        return box, float(min(bounding_box[1]))
-
-    @staticmethod
-    def _box_score_fast(bitmap: np.ndarray, box: np.ndarray) -> float:
-        h, w = bitmap.shape[:2]
-        xmin = max(0, min(math.floor(float(box[:, 0].min())), w - 1))
-        xmax = max(0, min(math.ceil(float(box[:, 0].max())), w - 1))
-        ymin = max(0, min(math.floor(float(box[:, 1].min())), h - 1))
-        ymax = max(0, min(math.ceil(float(box[:, 1].max())), h - 1))
-        if xmax < xmin or ymax < ymin:
-            return 0.0
-
-        mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype=np.uint8)
-        box_local = box.copy()
-        box_local[:, 0] -= xmin
-        box_local[:, 1] -= ymin
-        cv2.fillPoly(mask, box_local.reshape(1, -1, 2).astype(np.int32), 1)
-        return float(cv2.mean(bitmap[ymin : ymax + 1, xmin : xmax + 1], mask)[0])
+        final_boxes, short_sides = min_area_boxes(unclipped_boxes)
+        keep = short_sides >= self.min_size + 2
+        final_boxes = final_boxes[keep]
+        final_boxes[:, :, 0] = np.clip(np.round(final_boxes[:, :, 0] * width_scale), 0, dest_width)
+        final_boxes[:, :, 1] = np.clip(np.round(final_boxes[:, :, 1] * height_scale), 0, dest_height)
+        scores = [score for score, kept in zip(unclipped_scores, keep) if kept]
+        return list(final_boxes.astype(np.float32)), scores
 
 
 class CTCLabelDecoder:
@@ -253,6 +267,7 @@ class CTCLabelDecoder:
         if " " not in characters:
             characters.append(" ")
         self.character = ["blank"] + characters
+        self.character_table = np.asarray(self.character, dtype=object)
 
     def decode_batch(self, pred: np.ndarray) -> list[tuple[str, float]]:
         logits = np.asarray(pred[0] if isinstance(pred, (tuple, list)) else pred)
@@ -260,28 +275,32 @@ class CTCLabelDecoder:
             logits = np.expand_dims(logits, axis=0)
         if logits.ndim != 3:
             raise RuntimeError(f"Unexpected recognizer output shape: {logits.shape}")
-        if float(np.max(logits)) > 1.0 or float(np.min(logits)) < 0.0:
-            logits = _softmax(logits, axis=-1)
-        return [self._decode_logits(sample) for sample in logits]
-
-    def _decode_logits(self, logits: np.ndarray) -> tuple[str, float]:
+        if logits.size == 0:
+            return [("", 0.0) for _ in range(logits.shape[0])]
         indices = np.argmax(logits, axis=-1)
-        probs = np.max(logits, axis=-1)
-        result_chars: list[str] = []
-        confs: list[float] = []
-        prev_idx = -1
-        for idx, prob in zip(indices, probs):
-            idx_i = int(idx)
-            if idx_i == 0 or idx_i == prev_idx:
-                prev_idx = idx_i
-                continue
-            if idx_i < len(self.character):
-                result_chars.append(self.character[idx_i])
-                confs.append(float(prob))
-            prev_idx = idx_i
-        text = "".join(result_chars)
-        score = float(np.mean(confs)) if confs else 0.0
-        return text, score
+        probs = np.take_along_axis(logits, indices[..., None], axis=-1)[..., 0]
+        # The row maxima already give the tensor max, so only the min needs a
+        # full pass to tell raw logits from probabilities.
+        if float(np.max(probs)) > 1.0 or float(np.min(logits)) < 0.0:
+            logits = _softmax(logits, axis=-1)
+            indices = np.argmax(logits, axis=-1)
+            probs = np.take_along_axis(logits, indices[..., None], axis=-1)[..., 0]
+        # Greedy CTC: keep a step when it is not blank, differs from the previous
+        # step (collapse repeats) and maps into the dictionary.
+        keep = indices != 0
+        keep[:, 1:] &= indices[:, 1:] != indices[:, :-1]
+        keep &= indices < len(self.character_table)
+        decoded: list[tuple[str, float]] = []
+        for row_indices, row_probs, row_keep in zip(indices, probs, keep):
+            confs = row_probs[row_keep].astype(np.float64)
+            text = "".join(self.character_table[row_indices[row_keep]])
+            decoded.append((text, float(np.mean(confs)) if confs.size else 0.0))
+        return decoded
+
+
+def _diagnostics_enabled() -> bool:
+    """Whether tensor statistics should be computed for the log at all."""
+    return _DIAGNOSTICS_FROM_ENV or log.isEnabledFor(logging.DEBUG)
 
 
 def _shape_str(array: np.ndarray) -> str:
@@ -329,23 +348,28 @@ class OnnxSessionRunner:
         onnx_path: Path,
         settings: ProviderSettings,
         session_model_path: Path | None = None,
+        profile: SessionProfile | None = None,
+        optimized_cache: OptimizedModelCache | None = None,
     ) -> None:
         if ort is None:
             raise RuntimeError(f"onnxruntime import failed: {ORT_IMPORT_ERROR}")
 
-        session_options = ort.SessionOptions()
-        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.profile = profile or resolve_profile("default")
         resolved_session_path = session_model_path or onnx_path
         attempts = provider_attempts(settings)
         errors: list[str] = []
         self._session = None
+        self.optimized_cache_status = "off"
+        started = time.perf_counter()
 
         for providers in attempts:
             try:
-                self._session = ort.InferenceSession(
-                    str(resolved_session_path),
-                    sess_options=session_options,
-                    providers=providers,
+                self._session, self.optimized_cache_status = _create_inference_session(
+                    Path(resolved_session_path),
+                    settings.provider,
+                    providers,
+                    self.profile,
+                    optimized_cache,
                 )
                 break
             except Exception as exc:
@@ -360,63 +384,178 @@ class OnnxSessionRunner:
                 f"Attempts:\n{details}"
             )
 
+        self.session_ms = (time.perf_counter() - started) * 1000.0
+        self.first_run_ms: float | None = None
+        self.runs = 0
+        self._model_path = Path(resolved_session_path)
         self._lock = threading.Lock()
-        input_meta = self._session.get_inputs()[0]
+        inputs = self._session.get_inputs()
+        input_meta = inputs[0]
         self._input_name = input_meta.name
         self._input_shape = tuple(input_meta.shape)
-        self._output_name = self._session.get_outputs()[0].name
+        self._input_names = [meta.name for meta in inputs]
+        self._output_names = [meta.name for meta in self._session.get_outputs()]
+        self._output_name = self._output_names[0]
         providers = self._session.get_providers()
         self.selected_provider = providers[0] if providers else "unknown"
+        self._device_id = int(settings.device_id) if str(settings.device_id).isdigit() else 0
         log.info(
-            "ONNX Runtime session ready: model=%s requested_provider=%s selected_provider=%s input=%s output=%s input_shape=%s",
+            "ONNX Runtime session ready: model=%s requested_provider=%s selected_provider=%s input=%s output=%s "
+            "input_shape=%s profile=%s optimized_cache=%s session_ms=%.1f",
             resolved_session_path,
             settings.provider,
             self.selected_provider,
             self._input_name,
             self._output_name,
             self._input_shape,
+            self.profile.name,
+            self.optimized_cache_status,
+            self.session_ms,
         )
 
     @property
     def input_shape(self) -> tuple[Any, ...]:
         return self._input_shape
 
+    @property
+    def input_names(self) -> list[str]:
+        return list(self._input_names)
+
+    @property
+    def output_names(self) -> list[str]:
+        return list(self._output_names)
+
     def run(self, x: np.ndarray) -> np.ndarray:
-        log.info(
-            "Running inference: provider=%s input_name=%s %s",
-            self.selected_provider,
-            self._input_name,
-            _array_stats_str(x),
-        )
-        with self._lock:
-            output = self._session.run([self._output_name], {self._input_name: x})[0]
-        output_np = np.asarray(output)
-        log.info(
-            "Inference output: provider=%s output_name=%s %s",
-            self.selected_provider,
-            self._output_name,
-            _array_stats_str(output_np),
-        )
+        diagnostics = _diagnostics_enabled()
+        if diagnostics:
+            log.info(
+                "Running inference: provider=%s input_name=%s %s",
+                self.selected_provider,
+                self._input_name,
+                _array_stats_str(x),
+            )
+        output_np = self._run_locked([self._output_name], {self._input_name: x})[0]
+        if diagnostics:
+            log.info(
+                "Inference output: provider=%s output_name=%s %s",
+                self.selected_provider,
+                self._output_name,
+                _array_stats_str(output_np),
+            )
         return output_np
 
+    def run_feeds(self, feeds: dict[str, np.ndarray]) -> list[np.ndarray]:
+        """Runs a multi-input model; returns every output in `output_names` order."""
+        if _diagnostics_enabled():
+            log.info(
+                "Running inference: provider=%s inputs=%s",
+                self.selected_provider,
+                ", ".join(f"{name}={_shape_str(value)}" for name, value in feeds.items()),
+            )
+        return self._run_locked(self._output_names, feeds)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "model": str(self._model_path),
+            "provider": self.selected_provider,
+            "profile": self.profile.name,
+            "optimized_cache": self.optimized_cache_status,
+            "session_ms": round(self.session_ms, 1),
+            "first_run_ms": None if self.first_run_ms is None else round(self.first_run_ms, 1),
+            "runs": self.runs,
+        }
+
+    def _run_locked(self, output_names: list[str], feeds: dict[str, np.ndarray]) -> list[np.ndarray]:
+        with self._lock:
+            started = time.perf_counter()
+            if self.profile.io_binding:
+                outputs = self._run_with_binding(output_names, feeds)
+            else:
+                outputs = self._session.run(output_names, feeds)
+            if self.first_run_ms is None:
+                self.first_run_ms = (time.perf_counter() - started) * 1000.0
+            self.runs += 1
+        return [np.asarray(output) for output in outputs]
+
+    def _run_with_binding(self, output_names: list[str], feeds: dict[str, np.ndarray]) -> list[Any]:
+        # Outputs are allocated by ORT on the provider device and copied back once.
+        device = "cuda" if self.selected_provider == "CUDAExecutionProvider" else "cpu"
+        binding = self._session.io_binding()
+        for name, value in feeds.items():
+            binding.bind_cpu_input(name, np.ascontiguousarray(value))
+        for name in output_names:
+            binding.bind_output(name, device, self._device_id if device != "cpu" else 0)
+        self._session.run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()
+
 
 @dataclass
 class ManagedOnnxSession:
     runner: OnnxSessionRunner
     lease: ModelUsageLease
+    cache_key: tuple[str, str] = ("", "")
 
     def release(self) -> None:
         self.lease.release()
 
 
 class RuntimeFactory:
-    def __init__(self, model_manager: LoadedModelManager) -> None:
+    """Caches ONNX sessions per `(model path, provider)` and the state prepared for them.
+
+    Prepared entries (parsed configs, decoders, post-processors) are keyed by
+    the caller, e.g. `(model_key, provider)`, and remember which session cache
+    keys they were built from; unloading any of those sessions drops them, so
+    they never outlive the runners whose input shapes they were adapted to.
+
+    Sessions are built from the `SessionProfile` named by the caller
+    (`onnx_session_profiles.py`); optimized graphs persist under
+    `.cache/optimized` (or `optimized_cache_root`) across restarts.
+    """
+
+    def __init__(
+        self,
+        model_manager: LoadedModelManager,
+        profiles: dict[str, SessionProfile] | None = None,
+        optimized_cache_root: Path | None = None,
+    ) -> None:
         self._lock = threading.Lock()
         self._model_manager = model_manager
+        self._profiles = profiles
+        self._optimized_cache_root = optimized_cache_root
+        self._optimized_cache: OptimizedModelCache | None = None
         self._cache: dict[tuple[str, str], OnnxSessionRunner] = {}
+        self._prepared: dict[tuple[str, ...], tuple[frozenset[tuple[str, str]], Any]] = {}
         self._configured_cache_key: str | None = None
 
-    def acquire_runner(self, model_path: Path, settings: ProviderSettings) -> ManagedOnnxSession:
+    def get_prepared(
+        self,
+        key: tuple[str, ...],
+        runners: Sequence[ManagedOnnxSession],
+        build: Callable[[], Any],
+    ) -> Any:
+        """Returns the prepared entry for `key`, building it once from `runners`.
+
+        `build` runs outside the factory lock (it may read config files); the
+        result is only cached while every runner it depends on is still cached.
+        """
+        with self._lock:
+            entry = self._prepared.get(key)
+            if entry is not None:
+                return entry[1]
+        value = build()
+        depends_on = frozenset(runner.cache_key for runner in runners)
+        with self._lock:
+            if all(dep in self._cache for dep in depends_on):
+                entry = self._prepared.setdefault(key, (depends_on, value))
+                return entry[1]
+        return value
+
+    def acquire_runner(
+        self,
+        model_path: Path,
+        settings: ProviderSettings,
+        profile: str = "default",
+    ) -> ManagedOnnxSession:
         key = (str(model_path.resolve()), settings.cache_key())
         model_key = self._manager_key_for(key)
         lease = self._model_manager.begin_model_use(
@@ -433,7 +572,7 @@ class RuntimeFactory:
                         settings.provider,
                         settings.device_id,
                     )
-                    return ManagedOnnxSession(cached, lease)
+                    return ManagedOnnxSession(cached, lease, key)
                 if self._configured_cache_key is None:
                     _configure_onnx_cache_environment(resolve_compiled_cache_root(), settings)
                     self._configured_cache_key = settings.cache_key()
@@ -448,9 +587,17 @@ class RuntimeFactory:
                 runner = OnnxSessionRunner(
                     model_path,
                     settings,
+                    profile=resolve_profile(profile, self._profiles),
+                    optimized_cache=self._get_optimized_cache_locked(),
                 )
                 self._cache[key] = runner
-                lease.mark_loaded(unload_callback=lambda: self._unload_runner_by_key(key))
+                # VRAM held by ORT execution providers is invisible to RSS/torch
+                # sampling, so report the weights' file size as the footprint.
+                on_device = getattr(runner, "selected_provider", "") not in ("", "CPUExecutionProvider")
+                lease.mark_loaded(
+                    unload_callback=lambda: self._unload_runner_by_key(key),
+                    footprint=file_footprint([model_path], on_device=on_device),
+                )
                 log.info(
                     "Created ONNX Runtime session: model=%s provider=%s device=%s cache_key=%s",
                     model_path,
@@ -458,16 +605,40 @@ class RuntimeFactory:
                     settings.device_id,
                     settings.cache_key(),
                 )
-                return ManagedOnnxSession(runner, lease)
+                return ManagedOnnxSession(runner, lease, key)
         except Exception:
             if lease.needs_load:
                 lease.mark_load_failed()
             lease.release()
             raise
 
+    def session_stats(self) -> list[dict[str, Any]]:
+        with self._lock:
+            runners = list(self._cache.values())
+        return [runner.stats() for runner in runners]
+
+    def health(self) -> dict[str, Any]:
+        with self._lock:
+            cache_root = self._optimized_cache.root if self._optimized_cache is not None else None
+        return {
+            "sessions": self.session_stats(),
+            "default_intra_op_threads": default_intra_op_threads(),
+            "optimized_cache_enabled": optimized_cache_enabled(),
+            "optimized_cache_dir": str(cache_root) if cache_root is not None else None,
+        }
+
+    def _get_optimized_cache_locked(self) -> OptimizedModelCache:
+        if self._optimized_cache is None:
+            root = self._optimized_cache_root or resolve_compiled_cache_root() / OPTIMIZED_DIR_NAME
+            self._optimized_cache = OptimizedModelCache(root)
+        return self._optimized_cache
+
     def _unload_runner_by_key(self, cache_key: tuple[str, str]) -> bool:
         with self._lock:
             runner = self._cache.pop(cache_key, None)
+            stale = [key for key, (deps, _value) in self._prepared.items() if cache_key in deps]
+            for key in stale:
+                del self._prepared[key]
         if runner is None:
             return False
         session = getattr(runner, "_session", None)
@@ -510,43 +681,52 @@ class PaddleOnnxRuntime:
         settings: ProviderSettings,
     ) -> dict[str, Any]:
         det_model_path = resolve_det_model_path()
-        det_cfg = parse_det_config(det_model_path.with_name("config.json"))
         det_settings = self._det_provider_settings(settings)
-        managed_runner = self._factory.acquire_runner(det_model_path, det_settings)
+        managed_runner = self._factory.acquire_runner(det_model_path, det_settings, "paddle_det")
         try:
             det_runner = managed_runner.runner
-            det_input, src_h, src_w = preprocess_det_image(image_bgr, det_cfg)
-            log.info(
-                "Paddle detect started: image=%s det_input=%s src_h=%s src_w=%s requested_provider=%s det_provider=%s",
-                _array_stats_str(image_bgr),
-                _array_stats_str(det_input),
-                src_h,
-                src_w,
-                settings.provider,
-                det_runner.selected_provider,
+            prepared_det: PreparedDetModel = self._factory.get_prepared(
+                ("det", str(det_model_path), det_settings.cache_key()),
+                (managed_runner,),
+                lambda: build_prepared_det(det_model_path.with_name("config.json")),
             )
+            det_cfg = prepared_det.det_cfg
+            det_input, src_h, src_w = preprocess_det_image(image_bgr, det_cfg)
+            diagnostics = _diagnostics_enabled()
+            if diagnostics:
+                log.info(
+                    "Paddle detect started: image=%s det_input=%s src_h=%s src_w=%s requested_provider=%s det_provider=%s",
+                    _array_stats_str(image_bgr),
+                    _array_stats_str(det_input),
+                    src_h,
+                    src_w,
+                    settings.provider,
+                    det_runner.selected_provider,
+                )
             det_pred = det_runner.run(det_input)
             if det_pred.ndim != 4:
                 raise RuntimeError(f"Unexpected detector output shape: {det_pred.shape}")
 
-            det_post = DBPostProcess(
-                thresh=det_cfg.thresh,
-                box_thresh=det_cfg.box_thresh,
-                max_candidates=det_cfg.max_candidates,
-                unclip_ratio=det_cfg.unclip_ratio,
-            )
-            boxes, scores = det_post.process_single(det_pred[0], src_h, src_w)
+            boxes, scores = prepared_det.det_post.process_single(det_pred[0], src_h, src_w)
             det_map = np.asarray(det_pred[0, 0])
-            above_thresh = int(np.count_nonzero(det_map > det_cfg.thresh))
-            log.info(
-                "Paddle detect finished: boxes=%s scores=%s det_map=%s thresh=%.3f above_thresh=%s/%s",
-                len(boxes),
-                [round(float(score), 4) for score in scores[:10]],
-                _array_stats_str(det_map),
-                det_cfg.thresh,
-                above_thresh,
-                int(det_map.size),
-            )
+            if diagnostics:
+                log.info(
+                    "Paddle detect finished: boxes=%s scores=%s det_map=%s thresh=%.3f above_thresh=%s/%s",
+                    len(boxes),
+                    [round(float(score), 4) for score in scores[:10]],
+                    _array_stats_str(det_map),
+                    det_cfg.thresh,
+                    int(np.count_nonzero(det_map > det_cfg.thresh)),
+                    int(det_map.size),
+                )
+            else:
+                log.info(
+                    "Paddle detect finished: boxes=%s src_h=%s src_w=%s provider=%s",
+                    len(boxes),
+                    src_h,
+                    src_w,
+                    det_runner.selected_provider,
+                )
             return {
                 "pred_map": np.asarray(det_pred[0, 0]),
                 "boxes": boxes,
@@ -561,45 +741,140 @@ class PaddleOnnxRuntime:
         model_key: str,
         settings: ProviderSettings,
     ) -> dict[str, Any]:
+        return self.recognize_many([image_bgr], model_key, settings)[0]
+
+    def recognize_many(
+        self,
+        images_bgr: Sequence[np.ndarray],
+        model_key: str,
+        settings: ProviderSettings,
+    ) -> list[dict[str, Any]]:
+        """Detects lines on every image, then recognizes all line crops together.
+
+        Crops from all images are pooled into the same width buckets, so a batch
+        of bubbles costs a few recognizer runs instead of a few per bubble.
+        """
         model_paths = resolve_model_paths(model_key)
-        det_cfg = parse_det_config(model_paths.det_config_path)
-        rec_cfg = parse_rec_config(model_paths.rec_dict_path)
         det_settings = self._det_provider_settings(settings)
-        managed_det_runner = self._factory.acquire_runner(model_paths.det_model_path, det_settings)
-        managed_rec_runner = self._factory.acquire_runner(model_paths.rec_model_path, settings)
+        managed_det_runner = self._factory.acquire_runner(model_paths.det_model_path, det_settings, "paddle_det")
+        managed_rec_runner = self._factory.acquire_runner(model_paths.rec_model_path, settings, "paddle_rec")
         try:
             det_runner = managed_det_runner.runner
             rec_runner = managed_rec_runner.runner
-            rec_cfg = adapt_rec_config_to_model_input(rec_cfg, rec_runner.input_shape)
-            rec_batch_size, rec_dynamic_batch = resolve_batch_shape(
-                rec_runner.input_shape,
-                DEFAULT_REC_BATCH_SIZE,
+            prepared: PreparedRecModel = self._factory.get_prepared(
+                ("rec", model_key, settings.cache_key()),
+                (managed_det_runner, managed_rec_runner),
+                lambda: build_prepared_rec(model_paths, rec_runner.input_shape),
             )
-            rec_decoder = CTCLabelDecoder(rec_cfg.character_dict)
-            det_post = DBPostProcess(
-                thresh=det_cfg.thresh,
-                box_thresh=det_cfg.box_thresh,
-                max_candidates=det_cfg.max_candidates,
-                unclip_ratio=det_cfg.unclip_ratio,
+            det_cfg = prepared.det.det_cfg
+            det_post = prepared.det.det_post
+            rec_cfg = prepared.rec_cfg
+            rec_decoder = prepared.rec_decoder
+            rec_batch_size = prepared.rec_batch_size
+            rec_dynamic_batch = prepared.rec_dynamic_batch
+
+            box_counts: list[int] = []
+            candidates: list[RecognitionCandidate] = []
+            candidates_by_image: list[list[RecognitionCandidate]] = []
+            for image_idx, image_bgr in enumerate(images_bgr):
+                image_candidates, box_count = self._collect_rec_candidates(
+                    image_bgr,
+                    image_idx,
+                    det_runner=det_runner,
+                    det_cfg=det_cfg,
+                    det_post=det_post,
+                    log_context=(
+                        settings.provider,
+                        rec_runner.selected_provider,
+                        rec_runner.input_shape,
+                        rec_batch_size,
+                        rec_dynamic_batch,
+                    ),
+                )
+                box_counts.append(box_count)
+                candidates_by_image.append(image_candidates)
+                candidates.extend(image_candidates)
+
+            lines_by_order = self._recognize_candidates_batched(
+                candidates,
+                rec_runner=rec_runner,
+                rec_cfg=rec_cfg,
+                rec_decoder=rec_decoder,
+                rec_batch_size=rec_batch_size,
+                rec_dynamic_batch=rec_dynamic_batch,
             )
 
-            det_input, src_h, src_w = preprocess_det_image(image_bgr, det_cfg)
+            lines_by_image: list[dict[int, dict[str, Any]]] = [{} for _ in box_counts]
+            for (image_idx, sort_idx), line in lines_by_order.items():
+                lines_by_image[image_idx][sort_idx] = line
+
+            results: list[dict[str, Any]] = []
+            for image_idx, box_count in enumerate(box_counts):
+                image_candidates = candidates_by_image[image_idx]
+                image_lines = lines_by_image[image_idx]
+                if not image_lines and image_candidates:
+                    log.warning(
+                        "Batched recognition returned no text for %s candidates; retrying sequentially.",
+                        len(image_candidates),
+                    )
+                    image_lines = self._recognize_candidates_sequential(
+                        image_candidates,
+                        rec_runner=rec_runner,
+                        rec_cfg=rec_cfg,
+                        rec_decoder=rec_decoder,
+                    )
+
+                lines = [image_lines[idx] for idx in sorted(image_lines)]
+                log.info(
+                    "Paddle recognize finished: det_boxes=%s candidates=%s lines=%s text_preview=%s",
+                    box_count,
+                    len(image_candidates),
+                    len(lines),
+                    _preview_text("\n".join(item["text"] for item in lines)),
+                )
+                results.append(
+                    {
+                        "text": "\n".join(item["text"] for item in lines),
+                        "lines": lines,
+                        "det_boxes": box_count,
+                    }
+                )
+            return results
+        finally:
+            managed_rec_runner.release()
+            managed_det_runner.release()
+
+    @staticmethod
+    def _collect_rec_candidates(
+        image_bgr: np.ndarray,
+        image_idx: int,
+        *,
+        det_runner: OnnxSessionRunner,
+        det_cfg: DetConfig,
+        det_post: DBPostProcess,
+        log_context: tuple[Any, ...],
+    ) -> tuple[list[RecognitionCandidate], int]:
+        requested_provider, rec_provider, rec_input_shape, rec_batch_size, rec_dynamic_batch = log_context
+        det_input, src_h, src_w = preprocess_det_image(image_bgr, det_cfg)
+        diagnostics = _diagnostics_enabled()
+        if diagnostics:
             log.info(
                 "Paddle recognize started: image=%s requested_provider=%s det_provider=%s rec_provider=%s det_input=%s rec_input_shape=%s batch_size=%s dynamic_batch=%s",
                 _array_stats_str(image_bgr),
-                settings.provider,
+                requested_provider,
                 det_runner.selected_provider,
-                rec_runner.selected_provider,
+                rec_provider,
                 _array_stats_str(det_input),
-                rec_runner.input_shape,
+                rec_input_shape,
                 rec_batch_size,
                 rec_dynamic_batch,
             )
-            det_pred = det_runner.run(det_input)
-            if det_pred.ndim != 4:
-                raise RuntimeError(f"Unexpected detector output shape: {det_pred.shape}")
-            boxes, det_scores = det_post.process_single(det_pred[0], src_h, src_w)
-            sorted_indices = sort_quad_indices(boxes)
+        det_pred = det_runner.run(det_input)
+        if det_pred.ndim != 4:
+            raise RuntimeError(f"Unexpected detector output shape: {det_pred.shape}")
+        boxes, det_scores = det_post.process_single(det_pred[0], src_h, src_w)
+        sorted_indices = sort_quad_indices(boxes)
+        if diagnostics:
             det_map = np.asarray(det_pred[0, 0])
             log.info(
                 "Recognizer detector result: boxes=%s sorted_indices=%s det_map=%s thresh=%.3f above_thresh=%s/%s",
@@ -611,176 +886,188 @@ class PaddleOnnxRuntime:
                 int(det_map.size),
             )
 
-            candidates: list[RecognitionCandidate] = []
-            for sort_idx, det_idx in enumerate(sorted_indices):
-                box = boxes[det_idx]
-                crop = get_rotate_crop_image(image_bgr, box)
-                if crop.size == 0 or crop.shape[0] < 2 or crop.shape[1] < 2:
-                    log.warning(
-                        "Skipping invalid crop: det_idx=%s sort_idx=%s crop_shape=%s box=%s",
-                        det_idx,
-                        sort_idx,
-                        crop.shape,
-                        box.astype(float).tolist(),
-                    )
-                    continue
-                candidates.append(
-                    RecognitionCandidate(
-                        sort_idx=sort_idx,
-                        det_idx=det_idx,
-                        box=box,
-                        det_score=float(det_scores[det_idx]) if det_idx < len(det_scores) else 0.0,
-                        crop=crop,
-                    )
+        candidates: list[RecognitionCandidate] = []
+        for sort_idx, det_idx in enumerate(sorted_indices):
+            box = boxes[det_idx]
+            crop = get_rotate_crop_image(image_bgr, box)
+            if crop.size == 0 or crop.shape[0] < 2 or crop.shape[1] < 2:
+                log.warning(
+                    "Skipping invalid crop: det_idx=%s sort_idx=%s crop_shape=%s box=%s",
+                    det_idx,
+                    sort_idx,
+                    crop.shape,
+                    box.astype(float).tolist(),
                 )
-                if len(candidates) <= 5:
-                    log.info(
-                        "Prepared candidate: det_idx=%s sort_idx=%s det_score=%.4f crop=%s box=%s",
-                        det_idx,
-                        sort_idx,
-                        float(det_scores[det_idx]) if det_idx < len(det_scores) else 0.0,
-                        _array_stats_str(crop),
-                        box.astype(float).tolist(),
-                    )
-
-            lines_by_order: dict[int, dict[str, Any]] = {}
-            groups: dict[int, list[RecognitionCandidate]] = {}
-            for candidate in candidates:
-                requested_width = plan_rec_input_width(candidate.crop, rec_cfg)
-                bucket_width = self._rec_bucket_width(
-                    requested_width,
-                    rec_cfg,
-                    rec_runner.selected_provider,
+                continue
+            candidates.append(
+                RecognitionCandidate(
+                    sort_idx=sort_idx,
+                    det_idx=det_idx,
+                    box=box,
+                    det_score=float(det_scores[det_idx]) if det_idx < len(det_scores) else 0.0,
+                    crop=crop,
+                    image_idx=image_idx,
                 )
-                groups.setdefault(bucket_width, []).append(candidate)
-
-            use_fixed_batch_capacity = (
-                rec_dynamic_batch
-                and rec_runner.selected_provider == "MIGraphXExecutionProvider"
             )
-            log.info(
-                "Recognition grouping: candidates=%s groups=%s fixed_batch_capacity=%s migraphx_buckets=%s",
-                len(candidates),
-                {width: len(items) for width, items in groups.items()},
-                use_fixed_batch_capacity,
-                rec_runner.selected_provider == "MIGraphXExecutionProvider",
+            if diagnostics and len(candidates) <= 5:
+                log.info(
+                    "Prepared candidate: det_idx=%s sort_idx=%s det_score=%.4f crop=%s box=%s",
+                    det_idx,
+                    sort_idx,
+                    float(det_scores[det_idx]) if det_idx < len(det_scores) else 0.0,
+                    _array_stats_str(crop),
+                    box.astype(float).tolist(),
+                )
+        return candidates, len(boxes)
+
+    def _recognize_candidates_batched(
+        self,
+        candidates: list[RecognitionCandidate],
+        *,
+        rec_runner: OnnxSessionRunner,
+        rec_cfg: RecConfig,
+        rec_decoder: CTCLabelDecoder,
+        rec_batch_size: int,
+        rec_dynamic_batch: bool,
+    ) -> dict[tuple[int, int], dict[str, Any]]:
+        lines_by_order: dict[tuple[int, int], dict[str, Any]] = {}
+        groups: dict[int, list[RecognitionCandidate]] = {}
+        for candidate in candidates:
+            requested_width = plan_rec_input_width(candidate.crop, rec_cfg)
+            bucket_width = self._rec_bucket_width(
+                requested_width,
+                rec_cfg,
+                rec_runner.selected_provider,
             )
-            for bucket_width in sorted(groups):
-                chunk = groups[bucket_width]
+            groups.setdefault(bucket_width, []).append(candidate)
+
+        use_fixed_batch_capacity = (
+            rec_dynamic_batch
+            and rec_runner.selected_provider == "MIGraphXExecutionProvider"
+        )
+        max_chunk = rec_batch_size if use_fixed_batch_capacity else MAX_POOLED_REC_BATCH
+        log.info(
+            "Recognition grouping: candidates=%s groups=%s fixed_batch_capacity=%s migraphx_buckets=%s",
+            len(candidates),
+            {width: len(items) for width, items in groups.items()},
+            use_fixed_batch_capacity,
+            rec_runner.selected_provider == "MIGraphXExecutionProvider",
+        )
+        for bucket_width in sorted(groups):
+            bucket = groups[bucket_width]
+            for chunk_start in range(0, len(bucket), max_chunk):
+                chunk = bucket[chunk_start : chunk_start + max_chunk]
                 batch_capacity = rec_batch_size if use_fixed_batch_capacity else len(chunk)
                 rec_input = build_rec_batch_input(chunk, rec_cfg, bucket_width, batch_capacity)
-                log.info(
-                    "Recognition batch prepared: bucket_width=%s actual_batch=%s batch_capacity=%s input=%s",
-                    bucket_width,
-                    len(chunk),
-                    batch_capacity,
-                    _array_stats_str(rec_input),
-                )
+                diagnostics = _diagnostics_enabled()
+                if diagnostics:
+                    log.info(
+                        "Recognition batch prepared: bucket_width=%s actual_batch=%s batch_capacity=%s input=%s",
+                        bucket_width,
+                        len(chunk),
+                        batch_capacity,
+                        _array_stats_str(rec_input),
+                    )
                 rec_pred = rec_runner.run(rec_input)
                 decoded_batch = rec_decoder.decode_batch(rec_pred)
-                log.info(
+                log.debug(
                     "Recognition batch decoded: bucket_width=%s actual_batch=%s decoded=%s",
                     bucket_width,
                     len(chunk),
                     len(decoded_batch),
                 )
                 for local_idx, (candidate, (text, rec_score)) in enumerate(zip(chunk, decoded_batch)):
-                    _log_topk_for_logits(
-                        rec_pred[local_idx],
-                        rec_decoder,
-                        f"rec-batch det_idx={candidate.det_idx} sort_idx={candidate.sort_idx}",
-                    )
                     cleaned = text.strip()
-                    log.info(
-                        "Decoded candidate: det_idx=%s sort_idx=%s det_score=%.4f rec_score=%.4f raw=%s cleaned=%s",
-                        candidate.det_idx,
-                        candidate.sort_idx,
-                        float(candidate.det_score),
-                        float(rec_score),
-                        repr(text),
-                        repr(cleaned),
-                    )
-                    if not cleaned:
-                        continue
-                    lines_by_order[candidate.sort_idx] = {
-                        "text": cleaned,
-                        "rec_score": float(rec_score),
-                        "det_score": float(candidate.det_score),
-                        "det_idx": int(candidate.det_idx),
-                        "box": candidate.box.astype(float).tolist(),
-                    }
-
-            if not lines_by_order and candidates:
-                log.warning(
-                    "Batched recognition returned no text for %s candidates; retrying sequentially.",
-                    len(candidates),
-                )
-                for candidate in candidates:
-                    requested_width = plan_rec_input_width(candidate.crop, rec_cfg)
-                    rec_input = np.ascontiguousarray(
-                        np.expand_dims(
-                            preprocess_rec_image_to_width(candidate.crop, rec_cfg, requested_width),
-                            axis=0,
+                    if diagnostics:
+                        _log_topk_for_logits(
+                            rec_pred[local_idx],
+                            rec_decoder,
+                            f"rec-batch det_idx={candidate.det_idx} sort_idx={candidate.sort_idx}",
                         )
-                    )
-                    log.info(
-                        "Sequential recognition input: det_idx=%s sort_idx=%s width=%s input=%s",
-                        candidate.det_idx,
-                        candidate.sort_idx,
-                        requested_width,
-                        _array_stats_str(rec_input),
-                    )
-                    rec_pred = rec_runner.run(rec_input)
-                    decoded_batch = rec_decoder.decode_batch(rec_pred)
-                    if not decoded_batch:
-                        log.warning(
-                            "Sequential recognition produced empty decoded batch: det_idx=%s sort_idx=%s",
+                        log.info(
+                            "Decoded candidate: det_idx=%s sort_idx=%s det_score=%.4f rec_score=%.4f raw=%s cleaned=%s",
                             candidate.det_idx,
                             candidate.sort_idx,
+                            float(candidate.det_score),
+                            float(rec_score),
+                            repr(text),
+                            repr(cleaned),
                         )
-                        continue
-                    text, rec_score = decoded_batch[0]
-                    _log_topk_for_logits(
-                        rec_pred[0],
-                        rec_decoder,
-                        f"rec-seq det_idx={candidate.det_idx} sort_idx={candidate.sort_idx}",
-                    )
-                    cleaned = text.strip()
-                    log.info(
-                        "Sequential decoded candidate: det_idx=%s sort_idx=%s det_score=%.4f rec_score=%.4f raw=%s cleaned=%s",
-                        candidate.det_idx,
-                        candidate.sort_idx,
-                        float(candidate.det_score),
-                        float(rec_score),
-                        repr(text),
-                        repr(cleaned),
-                    )
                     if not cleaned:
                         continue
-                    lines_by_order[candidate.sort_idx] = {
-                        "text": cleaned,
-                        "rec_score": float(rec_score),
-                        "det_score": float(candidate.det_score),
-                        "det_idx": int(candidate.det_idx),
-                        "box": candidate.box.astype(float).tolist(),
-                    }
+                    lines_by_order[(candidate.image_idx, candidate.sort_idx)] = _rec_line_payload(
+                        candidate,
+                        cleaned,
+                        rec_score,
+                    )
+        return lines_by_order
 
-            lines = [lines_by_order[idx] for idx in sorted(lines_by_order)]
-            log.info(
-                "Paddle recognize finished: det_boxes=%s candidates=%s lines=%s text_preview=%s",
-                len(boxes),
-                len(candidates),
-                len(lines),
-                _preview_text("\n".join(item["text"] for item in lines)),
+    @staticmethod
+    def _recognize_candidates_sequential(
+        candidates: list[RecognitionCandidate],
+        *,
+        rec_runner: OnnxSessionRunner,
+        rec_cfg: RecConfig,
+        rec_decoder: CTCLabelDecoder,
+    ) -> dict[int, dict[str, Any]]:
+        lines_by_order: dict[int, dict[str, Any]] = {}
+        for candidate in candidates:
+            requested_width = plan_rec_input_width(candidate.crop, rec_cfg)
+            rec_input = np.ascontiguousarray(
+                np.expand_dims(
+                    preprocess_rec_image_to_width(candidate.crop, rec_cfg, requested_width),
+                    axis=0,
+                )
             )
-            return {
-                "text": "\n".join(item["text"] for item in lines),
-                "lines": lines,
-                "det_boxes": len(boxes),
-            }
-        finally:
-            managed_rec_runner.release()
-            managed_det_runner.release()
+            diagnostics = _diagnostics_enabled()
+            if diagnostics:
+                log.info(
+                    "Sequential recognition input: det_idx=%s sort_idx=%s width=%s input=%s",
+                    candidate.det_idx,
+                    candidate.sort_idx,
+                    requested_width,
+                    _array_stats_str(rec_input),
+                )
+            rec_pred = rec_runner.run(rec_input)
+            decoded_batch = rec_decoder.decode_batch(rec_pred)
+            if not decoded_batch:
+                log.warning(
+                    "Sequential recognition produced empty decoded batch: det_idx=%s sort_idx=%s",
+                    candidate.det_idx,
+                    candidate.sort_idx,
+                )
+                continue
+            text, rec_score = decoded_batch[0]
+            cleaned = text.strip()
+            if diagnostics:
+                _log_topk_for_logits(
+                    rec_pred[0],
+                    rec_decoder,
+                    f"rec-seq det_idx={candidate.det_idx} sort_idx={candidate.sort_idx}",
+                )
+                log.info(
+                    "Sequential decoded candidate: det_idx=%s sort_idx=%s det_score=%.4f rec_score=%.4f raw=%s cleaned=%s",
+                    candidate.det_idx,
+                    candidate.sort_idx,
+                    float(candidate.det_score),
+                    float(rec_score),
+                    repr(text),
+                    repr(cleaned),
+                )
+            if not cleaned:
+                continue
+            lines_by_order[candidate.sort_idx] = _rec_line_payload(candidate, cleaned, rec_score)
+        return lines_by_order
+
+
+def _rec_line_payload(candidate: RecognitionCandidate, text: str, rec_score: float) -> dict[str, Any]:
+    return {
+        "text": text,
+        "rec_score": float(rec_score),
+        "det_score": float(candidate.det_score),
+        "det_idx": int(candidate.det_idx),
+        "box": candidate.box.astype(float).tolist(),
+    }
 
 
 def normalize_model_key(raw: str) -> str:
@@ -919,6 +1206,98 @@ def provider_attempts(settings: ProviderSettings) -> list[list[Any]]:
     return attempts
 
 
+def _create_inference_session(
+    model_path: Path,
+    provider: str,
+    providers: list[Any],
+    profile: SessionProfile,
+    optimized_cache: OptimizedModelCache | None,
+) -> tuple[Any, str]:
+    """Creates a session for `profile`; returns it with the optimized-cache status.
+
+    Status: `hit` (loaded the persisted optimized graph), `written` (optimized
+    now and persisted), `off` (cache disabled or unsupported for the provider),
+    `failed` (cache I/O failed; the session itself is fine).
+
+    The graph is persisted at `profile.persisted_level()` and keyed by the
+    provider the session actually got (a CUDA request that fell back to CPU is
+    stored under the CPU key); levels above it are applied on every load.
+    """
+    if optimized_cache is None or not optimized_cache.supports(provider, profile):
+        options = build_session_options(profile, provider)
+        return ort.InferenceSession(str(model_path), sess_options=options, providers=providers), "off"
+
+    try:
+        target = optimized_cache.path_for(model_path, provider, profile)
+    except OSError as exc:
+        log.warning("Optimized ONNX cache unavailable for %s: %s", model_path, exc)
+        options = build_session_options(profile, provider)
+        return ort.InferenceSession(str(model_path), sess_options=options, providers=providers), "failed"
+
+    persisted = profile.persisted_level()
+    # Only the passes above the persisted level (CPU-specific layouts) are left to run.
+    load_optimized = persisted != profile.graph_optimization
+    if target.is_file():
+        try:
+            options = build_session_options(profile, provider, optimize=load_optimized)
+            session = ort.InferenceSession(str(target), sess_options=options, providers=providers)
+        except Exception as exc:
+            log.warning("Dropping unreadable optimized ONNX model %s: %s", target, exc)
+            target.unlink(missing_ok=True)
+        else:
+            if _active_provider(session) == provider:
+                return session, "hit"
+            # Optimized for a provider that is not available now: rebuild from
+            # the source model, but keep the entry for when it is.
+            log.warning(
+                "Optimized ONNX model %s was built for %s, session runs on %s; rebuilding",
+                target,
+                provider,
+                _active_provider(session),
+            )
+            del session
+
+    options = build_session_options(profile, provider, level=persisted)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+    except OSError as exc:
+        log.warning("Optimized ONNX cache directory unavailable %s: %s", target.parent, exc)
+        return ort.InferenceSession(str(model_path), sess_options=options, providers=providers), "failed"
+    # ORT writes the optimized graph while the session initializes; publish it
+    # with a rename so a crash never leaves a truncated cache entry.
+    tmp_path = target.with_name(target.name + ".tmp")
+    options.optimized_model_filepath = str(tmp_path)
+    try:
+        session = ort.InferenceSession(str(model_path), sess_options=options, providers=providers)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    active = _active_provider(session)
+    try:
+        if active != provider:
+            if not optimized_cache.supports(active, profile):
+                tmp_path.unlink(missing_ok=True)
+                return session, "off"
+            target = optimized_cache.path_for(model_path, active, profile)
+        os.replace(tmp_path, target)
+    except OSError as exc:
+        log.warning("Could not persist optimized ONNX model %s: %s", target, exc)
+        tmp_path.unlink(missing_ok=True)
+        return session, "failed"
+    log.info("Saved optimized ONNX model: %s", target)
+    if load_optimized:
+        # The session above stopped at the persisted level; reopen the saved
+        # graph so this process also gets the remaining CPU-specific passes.
+        options = build_session_options(profile, provider)
+        session = ort.InferenceSession(str(target), sess_options=options, providers=providers)
+    return session, "written"
+
+
+def _active_provider(session: Any) -> str:
+    providers = session.get_providers()
+    return str(providers[0]) if providers else ""
+
+
 def provider_spec(provider_name: str, settings: ProviderSettings) -> Any:
     if provider_name in {
         "CUDAExecutionProvider",
@@ -985,6 +1364,34 @@ def parse_rec_config(dict_path: Path | None) -> RecConfig:
     )
 
 
+def build_prepared_det(config_path: Path | None) -> PreparedDetModel:
+    det_cfg = parse_det_config(config_path)
+    return PreparedDetModel(
+        det_cfg=det_cfg,
+        det_post=DBPostProcess(
+            thresh=det_cfg.thresh,
+            box_thresh=det_cfg.box_thresh,
+            max_candidates=det_cfg.max_candidates,
+            unclip_ratio=det_cfg.unclip_ratio,
+        ),
+    )
+
+
+def build_prepared_rec(model_paths: ResolvedModelPaths, rec_input_shape: tuple[Any, ...]) -> PreparedRecModel:
+    rec_cfg = adapt_rec_config_to_model_input(
+        parse_rec_config(model_paths.rec_dict_path),
+        rec_input_shape,
+    )
+    rec_batch_size, rec_dynamic_batch = resolve_batch_shape(rec_input_shape, DEFAULT_REC_BATCH_SIZE)
+    return PreparedRecModel(
+        det=build_prepared_det(model_paths.det_config_path),
+        rec_cfg=rec_cfg,
+        rec_decoder=CTCLabelDecoder(rec_cfg.character_dict),
+        rec_batch_size=rec_batch_size,
+        rec_dynamic_batch=rec_dynamic_batch,
+    )
+
+
 def adapt_rec_config_to_model_input(cfg: RecConfig, input_shape: tuple[Any, ...]) -> RecConfig:
     if len(input_shape) < 4:
         return cfg
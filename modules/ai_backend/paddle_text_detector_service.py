@@ -7,6 +7,10 @@ Main responsibilities:
 - Return polygon blocks and a glyph-shaped binary mask compatible with the
   existing `/textdetector/paddle/detect` endpoint.
 - Read detector weights from `ManhwaStudio_AI_Models/ONNX/PaddleOCR`.
+- Detect ultra-tall strips in overlapping windows (`detect_tiling.py`) when
+  the `tiled_detection` param asks for it.
+- `detect_image_array` for in-process callers holding a decoded RGB array
+  (the glyph mask comes back as an array, not PNG).
 """
 
 from __future__ import annotations
@@ -23,6 +27,9 @@ try:
 except Exception:
     UserConfig = None
 
+from .detect_tiling import TileBlock, detect_strip, normalize_tile_params, should_tile
+from .health_feed import HealthField
+from .image_arrays import check_rgb_array
 from .paddle_onnx_runtime import (
     PaddleOnnxRuntime,
     RuntimeFactory,
@@ -85,7 +92,30 @@ def _build_glyph_mask(source_bgr: np.ndarray, polys: list[np.ndarray]) -> np.nda
     return mask
 
 
+def _boxes_from_tile_blocks(tile_blocks: list[TileBlock]) -> tuple[list[np.ndarray], list[float]]:
+    """Window polygons shifted to page rows; seam-merged blocks become their union rectangle."""
+    boxes: list[np.ndarray] = []
+    scores: list[float] = []
+    for block in tile_blocks:
+        if block.merged:
+            x1, y1, x2, y2 = block.xyxy
+            boxes.append(np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32))
+            scores.append(max(score for _, score in block.payloads))
+            continue
+        box, score = block.payloads[0]
+        boxes.append(box + np.array([0.0, block.payload_tops[0]], dtype=np.float32))
+        scores.append(score)
+    return boxes, scores
+
+
+HEALTH_SOURCE = "text_detector.paddle"
+
+
 class PaddleTextDetectorService:
+    _provider = HealthField(HEALTH_SOURCE)
+    _device_id = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(self, runtime_factory: RuntimeFactory) -> None:
         self._lock = threading.RLock()
         self._runtime = PaddleOnnxRuntime(runtime_factory)
@@ -113,56 +143,93 @@ class PaddleTextDetectorService:
                 "last_error": self._last_error,
             }
 
-    def detect_page(self, page_path: str) -> dict[str, Any]:
-        with self._lock:
-            try:
-                raw = Path(page_path).read_bytes()
-                result = self._detect_from_encoded_bytes(raw)
-                self._last_error = None
-                return result
-            except Exception as exc:
-                self._last_error = str(exc)
-                raise
+    def detect_page(self, page_path: str, *, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        return self.detect_image_bytes(Path(page_path).read_bytes(), params=params)
+
+    def detect_image_bytes(
+        self, image_bytes: bytes, *, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Не удалось декодировать изображение.")
+        payload = self._detect_bgr(image, params)
+        payload["mask_png"] = self._encode_mask_png_bytes(payload.pop("mask_u8"))
+        return payload
+
+    def detect_image_array(
+        self, image_rgb: np.ndarray, *, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """Same as `detect_image_bytes` for a decoded `(H, W, 3)` uint8 RGB array.
+
+        The glyph mask comes back as `mask_u8` (`(H, W)` 0/255) instead of `mask_png`.
+        """
+        check_rgb_array(image_rgb)
+        return self._detect_bgr(cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR), params)
 
-    def detect_image_bytes(self, image_bytes: bytes) -> dict[str, Any]:
+    def _detect_bgr(self, image: np.ndarray, params: dict[str, Any] | None) -> dict[str, Any]:
         with self._lock:
             try:
-                result = self._detect_from_encoded_bytes(image_bytes)
+                result = self._detect_image(image, params)
                 self._last_error = None
                 return result
             except Exception as exc:
                 self._last_error = str(exc)
                 raise
 
-    def _detect_from_encoded_bytes(self, raw_bytes: bytes) -> dict[str, Any]:
-        arr = np.frombuffer(raw_bytes, dtype=np.uint8)
-        image = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if image is None:
-            raise ValueError("Не удалось декодировать изображение.")
-
+    def _detect_image(
+        self, image: np.ndarray, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
         provider_settings = resolve_provider_settings(UserConfig)
-        result = self._runtime.detect(image, provider_settings)
-        boxes = result["boxes"]
+        tile_params = normalize_tile_params(params)
+        img_h, img_w = image.shape[:2]
+        if should_tile(img_w, img_h, tile_params):
+            glyph_mask, tile_blocks, windows = detect_strip(
+                image,
+                lambda crop: self._detect_window(crop, provider_settings),
+                tile_height=tile_params["tile_height"],
+                overlap=tile_params["tile_overlap"],
+            )
+            boxes, scores = _boxes_from_tile_blocks(tile_blocks)
+            tiles = len(windows)
+        else:
+            result = self._runtime.detect(image, provider_settings)
+            boxes = result["boxes"]
+            scores = result["scores"]
+            glyph_mask = _build_glyph_mask(image, boxes)
+            tiles = 1
         polys = [box.astype(float).tolist() for box in boxes]
-        glyph_mask = _build_glyph_mask(image, boxes)
 
         self._provider = provider_settings.provider
         self._device_id = provider_settings.device_id
 
-        img_h, img_w = image.shape[:2]
         return {
             "source_size": [img_w, img_h],
             "blocks": self._collect_blocks(boxes, img_w, img_h),
-            "mask_png": self._encode_mask_png_bytes(glyph_mask),
+            "mask_u8": glyph_mask,
             "polys": [
                 {
                     "points": poly,
                     "score": float(score),
                 }
-                for poly, score in zip(polys, result["scores"])
+                for poly, score in zip(polys, scores)
             ],
+            "tiles": tiles,
         }
 
+    def _detect_window(self, crop: np.ndarray, provider_settings):
+        result = self._runtime.detect(crop, provider_settings)
+        detections = []
+        for box, score in zip(result["boxes"], result["scores"]):
+            box_np = np.asarray(box, dtype=np.float32)
+            xyxy = (
+                float(box_np[:, 0].min()),
+                float(box_np[:, 1].min()),
+                float(box_np[:, 0].max()),
+                float(box_np[:, 1].max()),
+            )
+            detections.append((xyxy, (box_np, float(score))))
+        return _build_glyph_mask(crop, result["boxes"]), detections
+
     @staticmethod
     def _collect_blocks(polys: list[np.ndarray], img_w: int, img_h: int) -> list[dict[str, int]]:
         blocks: list[dict[str, int]] = []
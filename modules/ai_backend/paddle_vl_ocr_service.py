@@ -6,6 +6,7 @@ Main responsibilities:
 - lazy init and health reporting for the PaddleOCR-VL vision-language model;
 - single-image text recognition from raw image bytes with a fixed OCR prompt
   (PaddleOCR-VL needs no separate text detection and no language selection);
+- `recognize_image_array` for in-process callers holding a decoded RGB array;
 - synchronization of the model device with backend `General.ai_device`;
 - cooperation with `LoadedModelManager` for bounded resident model count.
 
@@ -34,16 +35,9 @@ import io
 import threading
 from typing import Any
 
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
-
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import at_least_2px, image_from_array
 from .model_manager import LoadedModelManager
 from .script_constraint import ScriptConstraint, TokenByteIndex, normalize_script
 
@@ -80,6 +74,9 @@ def _clear_torch_cache() -> None:
         pass
 
 
+HEALTH_SOURCE = "ocr.paddleocrvl"
+
+
 class PaddleVlOcrService:
     """PaddleOCR-VL OCR runtime backed by Hugging Face Transformers.
 
@@ -90,6 +87,9 @@ class PaddleVlOcrService:
 
     MODEL_KEY_PREFIX = "paddlevlocr:model"
 
+    _device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(self, model_manager: LoadedModelManager) -> None:
         self._lock = threading.Lock()
         self._model_manager = model_manager
@@ -114,10 +114,7 @@ class PaddleVlOcrService:
         """Force-load the model by recognizing a tiny dummy image."""
         from PIL import Image
 
-        dummy = Image.new("RGB", (32, 32), (255, 255, 255))
-        encoded = io.BytesIO()
-        dummy.save(encoded, format="PNG")
-        self.recognize_image_bytes(encoded.getvalue())
+        self._recognize(Image.new("RGB", (32, 32), (255, 255, 255)))
 
     def recognize_image_bytes(
         self,
@@ -136,7 +133,37 @@ class PaddleVlOcrService:
         digits, and common punctuation. Raises RuntimeError when the model cannot
         load.
         """
-        image = self._decode_image(image_bytes)
+        return self._recognize(
+            self._decode_image(image_bytes),
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            script=script,
+        )
+
+    def recognize_image_array(
+        self,
+        image_rgb: Any,
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        script: str | None = None,
+    ) -> dict[str, Any]:
+        """Same as `recognize_image_bytes` for a decoded `(H, W, 3)` uint8 RGB array."""
+        return self._recognize(
+            at_least_2px(image_from_array(image_rgb)),
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            script=script,
+        )
+
+    def _recognize(
+        self,
+        image: Any,
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        script: str | None = None,
+    ) -> dict[str, Any]:
         normalized_script = normalize_script(script)
         selected_device = _resolve_selected_backend_device(self._device or "cpu")
         model_key = self._model_key(selected_device)
@@ -189,7 +216,7 @@ class PaddleVlOcrService:
         """Run a single generate pass and decode only the newly generated tokens.
 
         When `constraint` is set, generation is hard-restricted to its writing
-        system via a stateful UTF-8 `prefix_allowed_tokens_fn`."""
+        system by the constraint's compiled UTF-8 logits processor."""
         import torch  # type: ignore
 
         messages = [
@@ -209,9 +236,11 @@ class PaddleVlOcrService:
 
         generate_kwargs: dict[str, Any] = {"max_new_tokens": PADDLE_VL_MAX_NEW_TOKENS}
         if constraint is not None:
+            from transformers import LogitsProcessorList
+
             prompt_len = int(inputs["input_ids"].shape[1])
-            generate_kwargs["prefix_allowed_tokens_fn"] = constraint.prefix_fn(
-                prompt_len
+            generate_kwargs["logits_processor"] = LogitsProcessorList(
+                [constraint.logits_processor(prompt_len)]
             )
             generate_kwargs["max_new_tokens"] = PADDLE_VL_CONSTRAINED_MAX_NEW_TOKENS
 
@@ -297,14 +326,7 @@ class PaddleVlOcrService:
         from PIL import Image
 
         with Image.open(io.BytesIO(image_bytes)) as img:
-            rgb = img.convert("RGB")
-            width, height = rgb.size
-            if width >= 2 and height >= 2:
-                return rgb
-
-            resampling = getattr(getattr(Image, "Resampling", Image), "NEAREST")
-            target_size = (max(2, width), max(2, height))
-            return rgb.resize(target_size, resample=resampling)
+            return at_least_2px(img.convert("RGB"))
 
     def _unload_model_key(self, model_key: str) -> bool:
         with self._lock:
@@ -429,52 +451,4 @@ def _format_recognition_lines(
 
 def _resolve_selected_backend_device(fallback: str) -> str:
     """Resolve the configured `General.ai_device` to an available torch device."""
-    fallback_norm = _normalize_backend_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-
-    normalized = _normalize_backend_device(configured, fallback_norm)
-    available = _safe_available_devices()
-
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    return "cpu"
-
-
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    normalized = value.strip().lower()
-    if normalized == "not-selected":
-        return None
-    return normalized or None
-
-
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
-
-
-def _normalize_backend_device(raw: str, fallback: str) -> str:
-    normalized = str(raw or "").strip().lower()
-    if normalized == "cpu" or normalized == "cuda" or normalized.startswith("cuda:"):
-        return normalized
-    if normalized == "mps":
-        return normalized
-    return str(fallback or "cpu").strip().lower() or "cpu"
+    return resolve_backend_device(fallback, accept_mps=True)
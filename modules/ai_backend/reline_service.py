@@ -6,8 +6,11 @@ Reline service adapter for the Python AI backend.
 
 Main responsibilities:
 - resolve local or catalog-backed Reline super-resolution model files;
-- download direct model files or extract model checkpoints from tar.xz archives;
+- download direct model files (resumable, via `model_download.py`) or extract model
+  checkpoints from tar.xz archives;
 - build and run a Reline pipeline for one image file;
+- keep loaded upscale models resident across calls, keyed by (model file, dtype, device)
+  and registered with the shared `LoadedModelManager` for LRU eviction;
 - expose a compact model catalog payload for Rust UI helpers.
 
 Notes:
@@ -19,15 +22,23 @@ Besides the remote catalog (`CATALOG_URL`), a small built-in `EXTRA_MODELS` list
 that the remote catalog does not yet publish. Entries with an empty `url` (e.g. only a Google
 Drive folder exists) resolve from a manually placed local checkpoint and otherwise raise a clear
 download hint pointing at `source`.
+
+`reline.Pipeline.from_json` loads the upscale checkpoint in the `upscale` node constructor, so
+the service builds the pipeline nodes itself from the public `reline.nodes` classes and reuses a
+resident `UpscaleNode`. The node is only ever built through `UpscaleNode(UpscaleOptions(...))`:
+a call with other upscale options (tiler, target scale, tile size) rebuilds it.
 """
 
 from __future__ import annotations
 
+import gc
 import json
 import shutil
 import tarfile
 import tempfile
+import threading
 import traceback
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 from urllib.error import HTTPError, URLError
@@ -36,12 +47,14 @@ from urllib.request import Request, urlopen
 
 from config import MODELS_DIR
 
+from .model_download import DownloadError, download_file
+from .model_manager import LoadedModelManager
+
 CATALOG_URL = "https://mdb.yor.ovh/v1/files"
 MODEL_DIR = Path(MODELS_DIR) / "side_models" / "Reline"
 DOWNLOAD_DIR = MODEL_DIR / ".download"
 MODEL_SUFFIXES = (".pt", ".pth", ".ckpt", ".safetensors")
 ARCHIVE_SUFFIXES = (".tar.xz", ".txz")
-DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 # Built-in models not (yet) present in the remote catalog. Each entry is resolved from a local
 # checkpoint placed in MODEL_DIR. `url` may be empty when only a non-direct source exists (e.g. a
@@ -56,6 +69,18 @@ EXTRA_MODELS: tuple[dict[str, str], ...] = (
     },
 )
 
+# Pipeline node types this service emits -> public `reline.nodes` classes (node, options).
+PIPELINE_NODE_CLASSES: dict[str, tuple[str, str]] = {
+    "file_reader": ("FileReaderNode", "FileReaderOptions"),
+    "upscale": ("UpscaleNode", "UpscaleOptions"),
+    "sharp": ("SharpNode", "SharpOptions"),
+    "halftone": ("HalftoneNode", "HalftoneOptions"),
+    "resize": ("ResizeNode", "ResizeOptions"),
+    "level": ("LevelNode", "LevelOptions"),
+    "cvt_color": ("CvtColorNode", "CvtColorOptions"),
+    "file_writer": ("FileWriterNode", "FileWriterOptions"),
+}
+
 READER_MODES = {"rgb", "gray", "dynamic"}
 TILERS = {"exact", "max", "no_tiling"}
 DTYPES = {"F32", "F16", "BF16"}
@@ -124,15 +149,29 @@ CANNY_TYPES = {"invert", "normal", "unsharp"}
 CVT_TYPES = {"RGB2Gray2020", "RGB2Gray709", "RGB2Gray", "Gray2RGB"}
 
 
+@dataclass
+class _ResidentUpscaler:
+    node: Any
+    model_path: str
+    mtime_ns: int
+    options: dict[str, Any]
+
+
 class RelineService:
-    def __init__(self) -> None:
+    def __init__(self, model_manager: LoadedModelManager | None = None) -> None:
         MODEL_DIR.mkdir(parents=True, exist_ok=True)
         DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._model_manager = model_manager if model_manager is not None else LoadedModelManager()
+        self._upscalers: dict[str, _ResidentUpscaler] = {}
 
     def health(self) -> dict[str, Any]:
+        with self._lock:
+            resident = sorted(self._upscalers)
         return {
             "ready": True,
             "model_dir": str(MODEL_DIR),
+            "resident_models": resident,
         }
 
     def list_models(self) -> list[dict[str, Any]]:
@@ -193,9 +232,11 @@ class RelineService:
                 f"input='{input_path}' output='{result_path}' nodes={len(pipeline_json)}",
                 flush=True,
             )
-            from reline import Pipeline
-
-            Pipeline.from_json(pipeline_json).process_linear(with_tqdm=False)
+            upscale_options = _upscale_node_options(pipeline_json)
+            if upscale_options is None:
+                _run_pipeline(pipeline_json, upscale_node=None)
+            else:
+                self._run_with_resident_upscaler(pipeline_json, upscale_options)
             if not result_path.is_file():
                 raise RuntimeError(f"Reline did not create output file: {result_path}")
 
@@ -212,6 +253,74 @@ class RelineService:
             if cleanup_dir is not None:
                 cleanup_dir.cleanup()
 
+    def unload(self) -> bool:
+        with self._lock:
+            keys = list(self._upscalers)
+        unloaded = False
+        for model_key in keys:
+            unloaded = self._unload_key(model_key) or unloaded
+        return unloaded
+
+    def _run_with_resident_upscaler(
+        self,
+        pipeline_json: list[dict[str, Any]],
+        upscale_options: dict[str, Any],
+    ) -> None:
+        device = _upscale_device()
+        if device == "cpu" and not upscale_options.get("allow_cpu_upscale"):
+            # Reline raises a bare BaseException for this; fail before any model load.
+            raise RuntimeError(
+                "CUDA is not available. Enable upscale.allow_cpu_upscale to upscale on CPU."
+            )
+        model_key = _upscaler_key(upscale_options["model"], upscale_options["dtype"], device)
+        lease = self._model_manager.begin_model_use(
+            model_key,
+            unload_callback=lambda: self._unload_key(model_key),
+        )
+        with self._lock:
+            try:
+                try:
+                    node = self._ensure_upscaler_locked(model_key, upscale_options)
+                except Exception:
+                    if lease.needs_load:
+                        lease.mark_load_failed()
+                    raise
+                if lease.needs_load:
+                    lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
+                _run_pipeline(pipeline_json, upscale_node=node)
+            finally:
+                lease.release()
+
+    def _ensure_upscaler_locked(self, model_key: str, upscale_options: dict[str, Any]) -> Any:
+        model_path = str(upscale_options["model"])
+        mtime_ns = Path(model_path).stat().st_mtime_ns
+        resident = self._upscalers.get(model_key)
+        if resident is not None and resident.mtime_ns == mtime_ns and resident.options == upscale_options:
+            return resident.node
+        if resident is not None:
+            # The checkpoint file was replaced (re-download) or the tiler / scale options
+            # changed; `UpscaleNode` only takes them in its constructor, so rebuild it.
+            self._upscalers.pop(model_key, None)
+            _clear_torch_cache()
+
+        print(
+            f"[AI Backend][reline] loading upscale model key='{model_key}'",
+            flush=True,
+        )
+        node = _create_upscale_node(upscale_options)
+        self._upscalers[model_key] = _ResidentUpscaler(
+            node=node, model_path=model_path, mtime_ns=mtime_ns, options=dict(upscale_options)
+        )
+        return node
+
+    def _unload_key(self, model_key: str) -> bool:
+        with self._lock:
+            if self._upscalers.pop(model_key, None) is None:
+                return False
+            _clear_torch_cache()
+        self._model_manager.mark_unloaded(model_key)
+        return True
+
     def _build_pipeline_json(
         self,
         input_path: Path,
@@ -368,6 +477,58 @@ class RelineService:
         return nodes
 
 
+def _upscale_node_options(pipeline_json: list[dict[str, Any]]) -> dict[str, Any] | None:
+    for item in pipeline_json:
+        if item.get("type") == "upscale":
+            return item["options"]
+    return None
+
+
+def _upscaler_key(model_path: str, dtype: str, device: str) -> str:
+    return f"reline:{device}:{dtype}:{Path(model_path).resolve()}"
+
+
+def _upscale_device() -> str:
+    """Device the Reline upscale node will pick (it uses CUDA whenever available)."""
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _create_upscale_node(upscale_options: dict[str, Any]) -> Any:
+    from reline.nodes import UpscaleNode, UpscaleOptions
+
+    return UpscaleNode(UpscaleOptions(**upscale_options))
+
+
+def _run_pipeline(pipeline_json: list[dict[str, Any]], *, upscale_node: Any) -> None:
+    """Equivalent of `Pipeline.from_json(...).process_linear()` with a resident upscale node."""
+    from reline import Pipeline, nodes as reline_nodes
+
+    nodes = []
+    for item in pipeline_json:
+        if item["type"] == "upscale" and upscale_node is not None:
+            nodes.append(upscale_node)
+            continue
+        node_name, options_name = PIPELINE_NODE_CLASSES[item["type"]]
+        node_cls = getattr(reline_nodes, node_name)
+        options_cls = getattr(reline_nodes, options_name)
+        nodes.append(node_cls(options_cls(**item["options"])))
+    Pipeline(nodes).process_linear(with_tqdm=False)
+
+
+def _clear_torch_cache() -> None:
+    gc.collect()
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            torch.cuda.ipc_collect()
+    except Exception:
+        pass
+
+
 def _resolve_model(options: dict[str, Any]) -> Path:
     model_path_raw = str(options.get("model_path", "") or "").strip()
     if model_path_raw:
@@ -472,26 +633,15 @@ def _download_model(url: str, filename: str) -> Path:
         return final_candidate
 
     DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    partial_path = DOWNLOAD_DIR / f"{safe_filename}.part"
     archive_or_model_path = DOWNLOAD_DIR / safe_filename
-    if partial_path.exists():
-        partial_path.unlink()
 
+    # A leftover `<name>.part` from an interrupted run is resumed, not discarded.
     print(f"[AI Backend][reline] downloading model url='{url}' filename='{safe_filename}'", flush=True)
-    request = Request(url, headers={"User-Agent": "ManhwaStudio/Reline"})
     try:
-        with urlopen(request, timeout=60) as response, partial_path.open("wb") as out:
-            while True:
-                chunk = response.read(DOWNLOAD_CHUNK_SIZE)
-                if not chunk:
-                    break
-                out.write(chunk)
-    except (HTTPError, URLError, TimeoutError, OSError) as exc:
-        if partial_path.exists():
-            partial_path.unlink()
+        download_file(url, archive_or_model_path, headers={"User-Agent": "ManhwaStudio/Reline"})
+    except DownloadError as exc:
         raise RuntimeError(f"Could not download Reline model from {url}: {exc}") from exc
 
-    partial_path.replace(archive_or_model_path)
     if _has_archive_suffix(archive_or_model_path.name):
         return _extract_first_model_from_archive(archive_or_model_path)
 
@@ -5,7 +5,8 @@ Hard script (writing-system) constraint for PaddleOCR-VL generation.
 Purpose:
 Force decoding to stay within a chosen writing system (Korean / Chinese /
 Japanese) plus whitespace, digits, and common punctuation. Implemented as a
-stateful UTF-8 `prefix_allowed_tokens_fn` for `model.generate`.
+UTF-8 automaton compiled once per (tokenizer, script) and applied through a
+logits processor for `model.generate`.
 
 Why stateful UTF-8 is required:
 PaddleOCR-VL uses a SentencePiece tokenizer with byte_fallback. Most CJK
@@ -17,8 +18,11 @@ continuations whose completed codepoints fall inside the allowed Unicode ranges.
 Key types:
 - `TokenByteIndex`: maps each vocab id to the UTF-8 bytes it contributes to the
   decoded text (built once per tokenizer; reused across scripts).
-- `ScriptConstraint`: per-script allow logic with a pending-state cache and a
-  `prefix_allowed_tokens_fn` factory.
+- `ScriptConstraint`: per-script DFA over pending UTF-8 prefixes with the
+  allowed-id set of every state, compiled up front (normal pieces are checked in
+  one vectorized codepoint pass; only byte-fallback tokens change state).
+- `ScriptLogitsProcessor`: masks banned logits to -inf in place with cached
+  per-state boolean masks; also a `prefix_allowed_tokens_fn` factory remains.
 
 Notes:
 - Whitespace, digits, and a common punctuation set are always allowed so real
@@ -32,6 +36,8 @@ from __future__ import annotations
 import re
 from typing import Any, Callable
 
+import numpy as np
+
 # Writing-system Unicode ranges per supported script. Ranges are inclusive.
 _SCRIPT_RANGES: dict[str, list[tuple[int, int]]] = {
     # Hangul syllables + conjoining/compatibility Jamo.
@@ -129,11 +135,13 @@ class TokenByteIndex:
 
 
 class ScriptConstraint:
-    """Stateful UTF-8 allowlist for a single writing system.
+    """Stateful UTF-8 allowlist for a single writing system, compiled to a DFA.
 
-    `prefix_fn(prompt_len)` returns a `prefix_allowed_tokens_fn` suitable for
-    `model.generate`. Allowed-id lists are cached per pending-byte state, so the
-    100k-token scan runs only once per distinct UTF-8 continuation state.
+    Construction compiles the constraint once for the tokenizer: the states are
+    the viable pending UTF-8 prefixes (empty = on a character boundary), each
+    with its allowed-id set and, for byte-level tokens, the next state.
+    `logits_processor(prompt_len)` masks logits in place for `model.generate`;
+    `prefix_fn(prompt_len)` is the older list-based interface.
     """
 
     def __init__(self, index: TokenByteIndex, script: str) -> None:
@@ -141,7 +149,136 @@ class ScriptConstraint:
             raise ValueError(f"Unsupported script: {script!r}")
         self._index = index
         self._ranges = _SCRIPT_RANGES[script]
-        self._cache: dict[bytes, list[int]] = {}
+        self._compile()
+
+    # -- compilation --------------------------------------------------------
+
+    def _compile(self) -> None:
+        """Build the state table, per-state allowed ids and token transitions.
+
+        Normal pieces are complete UTF-8 text, so they can only follow the
+        boundary state and lead back to it; their codepoints are checked in
+        one vectorized pass. Only byte-fallback (and other non-UTF-8) tokens
+        move between pending states, and empty non-special tokens keep the
+        state. Pending states are found by a byte-level walk from the boundary.
+        """
+        index = self._index
+        token_bytes = index.token_bytes
+        vocab = len(token_bytes)
+        special = np.zeros(vocab, dtype=bool)
+        for tid in index.special_ids:
+            if 0 <= tid < vocab:
+                special[tid] = True
+
+        states: dict[bytes, int] = {b"": 0}
+        state_bytes: list[bytes] = [b""]
+        transitions: list[list[int]] = []
+        cursor = 0
+        while cursor < len(state_bytes):
+            pending = state_bytes[cursor]
+            row = [-1] * 256
+            # After a lead byte only continuation bytes can be valid.
+            candidates = range(256) if not pending else range(0x80, 0xC0)
+            for byte in candidates:
+                ok, rest = self._walk(pending + bytes([byte]))
+                if not ok:
+                    continue
+                state = states.get(rest)
+                if state is None:
+                    state = len(state_bytes)
+                    states[rest] = state
+                    state_bytes.append(rest)
+                row[byte] = state
+            transitions.append(row)
+            cursor += 1
+        self._states = states
+        self._state_bytes = state_bytes
+        self._transitions = np.asarray(transitions, dtype=np.int32)
+
+        complete_ids: list[int] = []
+        complete_texts: list[str] = []
+        empty_ids: list[int] = []
+        other_ids: list[int] = []
+        for tid, raw in enumerate(token_bytes):
+            if special[tid]:
+                continue
+            if not raw:
+                empty_ids.append(tid)
+                continue
+            try:
+                text = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                other_ids.append(tid)
+                continue
+            complete_ids.append(tid)
+            complete_texts.append(text)
+
+        boundary_mask = np.zeros(vocab, dtype=bool)
+        if complete_ids:
+            allowed_cp = self._codepoint_table()
+            lengths = np.fromiter((len(t) for t in complete_texts), dtype=np.int64)
+            codepoints = np.frombuffer("".join(complete_texts).encode("utf-32-le"), dtype=np.uint32)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            ok = np.logical_and.reduceat(allowed_cp[codepoints], offsets)
+            boundary_mask[np.asarray(complete_ids, dtype=np.int64)[ok]] = True
+
+        # Next state of every non-UTF-8 token from every state (-1 = banned).
+        other_next = np.full((len(state_bytes), len(other_ids)), -1, dtype=np.int32)
+        for col, tid in enumerate(other_ids):
+            raw = token_bytes[tid]
+            if len(raw) == 1:
+                other_next[:, col] = self._transitions[:, raw[0]]
+                continue
+            for state, pending in enumerate(state_bytes):
+                ok, rest = self._walk(pending + raw)
+                if ok:
+                    other_next[state, col] = states.get(rest, -1)
+
+        other_arr = np.asarray(other_ids, dtype=np.int64)
+        empty_arr = np.asarray(empty_ids, dtype=np.int64)
+        eos = index.eos_id
+        allowed: list[np.ndarray] = []
+        for state in range(len(state_bytes)):
+            if state == 0:
+                mask = boundary_mask.copy()
+            else:
+                mask = np.zeros(vocab, dtype=bool)
+            mask[other_arr[other_next[state] >= 0]] = True
+            mask[empty_arr] = True
+            if eos is not None and 0 <= eos < vocab and (state == 0 or not mask.any()):
+                # EOS only on a complete-character boundary, or as the way out
+                # of a state that would otherwise strand generation.
+                mask[eos] = True
+            allowed.append(np.flatnonzero(mask))
+        self._allowed = allowed
+        self._boundary_ids = allowed[0]
+        self._vocab = vocab
+
+        # Token-level transition used by the logits processor.
+        token_kind = np.zeros(vocab, dtype=np.int8)  # 0 = boundary / special
+        token_kind[empty_arr] = 1  # keeps the state
+        token_kind[other_arr] = 2  # looks up `other_next`
+        token_col = np.full(vocab, -1, dtype=np.int32)
+        token_col[other_arr] = np.arange(len(other_ids), dtype=np.int32)
+        self._token_kind = token_kind
+        self._token_col = token_col
+        self._other_next = other_next
+        self._mask_cache: dict[tuple[int, int, Any], Any] = {}
+
+    def _codepoint_table(self) -> np.ndarray:
+        table = np.zeros(0x110000, dtype=bool)
+        for lo, hi in self._ranges:
+            table[lo : hi + 1] = True
+        table[list(_WHITESPACE | _PUNCTUATION)] = True
+        table[_DIGIT_RANGE[0] : _DIGIT_RANGE[1] + 1] = True
+        table[_FULLWIDTH_DIGITS[0] : _FULLWIDTH_DIGITS[1] + 1] = True
+        return table
+
+    @property
+    def state_count(self) -> int:
+        return len(self._state_bytes)
+
+    # -- UTF-8 walk (compile-time reference) ----------------------------------
 
     def _codepoint_allowed(self, cp: int) -> bool:
         if cp in _WHITESPACE or cp in _PUNCTUATION:
@@ -192,29 +329,14 @@ class ScriptConstraint:
                 return (self._prefix_can_complete(rest), rest)
         return (True, b"")
 
+    # -- runtime --------------------------------------------------------------
+
     def _allowed_ids(self, pending: bytes) -> list[int]:
-        cached = self._cache.get(pending)
-        if cached is not None:
-            return cached
-        index = self._index
-        token_bytes = index.token_bytes
-        special_ids = index.special_ids
-        out: list[int] = []
-        for tid, raw in enumerate(token_bytes):
-            if tid in special_ids:
-                continue
-            ok, _ = self._walk(pending + raw)
-            if ok:
-                out.append(tid)
-        if not pending and index.eos_id is not None:
-            # End-of-sequence is only valid on a complete-character boundary.
-            out.append(index.eos_id)
-        if not out:
-            # Never strand generation with an empty allowlist; allow EOS to stop.
-            if index.eos_id is not None:
-                out.append(index.eos_id)
-        self._cache[pending] = out
-        return out
+        state = self._states.get(pending)
+        if state is None:
+            # Not a viable pending prefix: only EOS can end the sequence.
+            return [self._index.eos_id] if self._index.eos_id is not None else []
+        return self._allowed[state].tolist()
 
     def _advance(self, pending: bytes, raw: bytes) -> bytes:
         """Append an already-accepted token's bytes and return the new trailing
@@ -232,13 +354,48 @@ class ScriptConstraint:
                 return buf[i:]
         return b""
 
+    def next_state(self, state: int, token_id: int) -> int:
+        """DFA transition for an emitted token (banned or unknown tokens reset to
+        the boundary state; they only appear after EOS padding)."""
+        if not 0 <= token_id < self._vocab:
+            return 0
+        kind = self._token_kind[token_id]
+        if kind == 1:
+            return state
+        if kind == 2:
+            nxt = int(self._other_next[state, self._token_col[token_id]])
+            return nxt if nxt >= 0 else 0
+        return 0
+
+    def allowed_mask(self, state: int, width: int | None = None) -> np.ndarray:
+        """Boolean allowed-token mask of length `width` (default: vocab size).
+
+        Ids past the tokenizer vocabulary (padded LM heads) are never allowed."""
+        width = self._vocab if width is None else int(width)
+        mask = np.zeros(width, dtype=bool)
+        ids = self._allowed[state]
+        mask[ids[ids < width]] = True
+        return mask
+
+    def _blocked_tensor(self, state: int, width: int, device: Any):
+        """Cached `~allowed_mask` as a torch bool tensor on `device`."""
+        key = (state, width, device)
+        cached = self._mask_cache.get(key)
+        if cached is None:
+            import torch  # type: ignore
+
+            cached = torch.from_numpy(~self.allowed_mask(state, width)).to(device)
+            self._mask_cache[key] = cached
+        return cached
+
     def prefix_fn(self, prompt_len: int) -> Callable[[int, Any], list[int]]:
         """Build a `prefix_allowed_tokens_fn` that ignores the first `prompt_len`
         tokens (prompt + image placeholders) and constrains only generated text.
 
         Pending UTF-8 state is advanced incrementally per beam (keyed by
         `batch_id`), so each step costs O(new tokens) instead of rescanning the
-        whole continuation, and allowed-id lists are cached per pending state."""
+        whole continuation. Prefer `logits_processor`, which avoids building a
+        Python id list at every step."""
         token_bytes = self._index.token_bytes
         # batch_id -> (consumed_len, pending_bytes)
         state: dict[int, tuple[int, bytes]] = {}
@@ -256,3 +413,51 @@ class ScriptConstraint:
             return self._allowed_ids(pending)
 
         return fn
+
+    def logits_processor(self, prompt_len: int) -> "ScriptLogitsProcessor":
+        """Build a logits processor constraining tokens after `prompt_len`."""
+        return ScriptLogitsProcessor(self, prompt_len)
+
+
+class ScriptLogitsProcessor:
+    """`LogitsProcessor`-compatible callable: sets banned logits to -inf in place.
+
+    The DFA state of every row is derived from its parent sequence's state
+    (previous step, keyed by the generated ids), so beam reordering between
+    steps is handled without rescanning the sequence.
+    """
+
+    def __init__(self, constraint: ScriptConstraint, prompt_len: int) -> None:
+        self._constraint = constraint
+        self._prompt_len = int(prompt_len)
+        self._previous: dict[bytes, int] = {}
+
+    def row_states(self, generated: np.ndarray) -> list[int]:
+        """DFA state per row of the generated-token matrix `[B, T]`."""
+        current: dict[bytes, int] = {}
+        states: list[int] = []
+        for row in np.asarray(generated, dtype=np.int64):
+            key = row.tobytes()
+            state = current.get(key)
+            if state is None:
+                parent = self._previous.get(row[:-1].tobytes()) if row.size else 0
+                if parent is None:
+                    parent = 0
+                    for tid in row[:-1]:
+                        parent = self._constraint.next_state(parent, int(tid))
+                state = self._constraint.next_state(parent, int(row[-1])) if row.size else 0
+                current[key] = state
+            states.append(state)
+        self._previous = current
+        return states
+
+    def __call__(self, input_ids: Any, scores: Any) -> Any:
+        import torch  # type: ignore
+
+        generated = input_ids[:, self._prompt_len :].detach().cpu().numpy()
+        states = self.row_states(generated)
+        width = int(scores.shape[-1])
+        blocked = torch.stack(
+            [self._constraint._blocked_tensor(state, width, scores.device) for state in states]
+        )
+        return scores.masked_fill_(blocked, float("-inf"))
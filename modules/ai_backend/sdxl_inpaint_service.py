@@ -16,6 +16,12 @@ Main responsibilities:
 - normalize generation parameters and map sampler names to diffusers schedulers;
 - dilate/blur the mask, run the pipeline off the GUI thread, and composite the
   result back over the original outside the mask;
+- crop the page to padded mask ROI windows (`inpaint_roi.py`, at least
+  `SDXL_ROI_MIN_WINDOW_PX` per side) so tall pages are not diffused whole;
+- `roi_mode="bucket"`: resize every window to an SDXL-native bucket, diffuse
+  windows that share a bucket together (`roi_batch_size` per call), then resize
+  back and feather-composite them into the page; progress frames carry the
+  window being diffused;
 - expose health/unload hooks and reuse the shared resident-model manager.
 
 Notes:
@@ -27,6 +33,7 @@ from __future__ import annotations
 
 import gc
 import io
+import math
 import threading
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
@@ -34,16 +41,17 @@ from typing import TYPE_CHECKING, Any
 if TYPE_CHECKING:
     import numpy as np
 
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
-
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import check_inpaint_arrays
+from .inpaint_roi import (
+    RoiWindow,
+    fit_window_aspect,
+    inpaint_with_rois,
+    normalize_roi_params,
+    plan_roi_windows,
+    split_window,
+)
 from .lama_inpaint_service import LamaInpaintService
 from .model_manager import LoadedModelManager
 
@@ -70,6 +78,31 @@ SAMPLER_CONFIGS: dict[str, tuple[str, dict[str, Any]]] = {
 
 VALID_MODES = ("nine_channel", "four_channel")
 
+# ROI windows are grown to at least the SDXL-native side so the diffusion never
+# runs on a tiny crop; the default context is wider than for the GAN inpainters.
+SDXL_ROI_MIN_WINDOW_PX = 1024
+SDXL_ROI_CONTEXT_PX = 256
+
+# `roi_mode="native"` diffuses each window at its own size; `"bucket"` resizes
+# it to the closest SDXL training resolution below.
+VALID_ROI_MODES = ("native", "bucket")
+SDXL_BUCKETS = (
+    (1024, 1024),
+    (1152, 896),
+    (896, 1152),
+    (1216, 832),
+    (832, 1216),
+    (1344, 768),
+    (768, 1344),
+    (1536, 640),
+    (640, 1536),
+)
+SDXL_BUCKET_MAX_ASPECT = 1536 / 640
+# Windows longer than the widest bucket are split into pieces overlapping by
+# this much; the later piece is feathered in over half of the overlap.
+SDXL_ROI_SPLIT_OVERLAP_PX = 256
+MAX_ROI_BATCH_SIZE = 8
+
 # Linear SDXL latent -> RGB approximation for fast per-step previews (no VAE
 # decode). Values are the widely used SDXL preview factors; they only need to
 # produce a recognizable thumbnail, not a color-accurate image.
@@ -137,6 +170,11 @@ def normalize_sdxl_params(params: dict[str, Any] | None) -> dict[str, Any]:
     seed = _to_int(merged.get("seed"), -1)
     lama_model = str(merged.get("lama_model", "") or "").strip()
 
+    roi_mode = str(merged.get("roi_mode", "native") or "").strip()
+    if roi_mode not in VALID_ROI_MODES:
+        raise ValueError(f"Неизвестный ROI-режим SDXL: {roi_mode!r}")
+    roi_batch_size = _clamp_int(merged.get("roi_batch_size"), default=2, low=1, high=MAX_ROI_BATCH_SIZE)
+
     if mode == "four_channel" and denoise >= 0.999:
         # Latent blending at strength 1.0 ignores the LaMa prefill (the hole is
         # re-noised to pure noise). Keep the prefill meaningful.
@@ -155,12 +193,71 @@ def normalize_sdxl_params(params: dict[str, Any] | None) -> dict[str, Any]:
         "mask_blur": mask_blur,
         "mask_dilation": mask_dilation,
         "lama_model": lama_model,
+        "roi_mode": roi_mode,
+        "roi_batch_size": roi_batch_size,
+        **normalize_roi_params(merged, default_context_px=SDXL_ROI_CONTEXT_PX),
     }
 
 
+def select_sdxl_bucket(width: int, height: int) -> tuple[int, int]:
+    """The SDXL bucket `(w, h)` whose aspect ratio is closest to `width / height`."""
+    aspect = max(1, int(width)) / max(1, int(height))
+    return min(SDXL_BUCKETS, key=lambda bucket: abs(math.log(bucket[0] / bucket[1] / aspect)))
+
+
+def plan_bucket_windows(
+    mask_u8: np.ndarray, *, context_px: int
+) -> list[tuple[RoiWindow, tuple[int, int]]]:
+    """Plans `(window, bucket)` pairs for `roi_mode="bucket"`.
+
+    Mask ROI windows (never a full-page fallback) are split when longer than the
+    widest bucket, then grown toward their bucket's aspect ratio so the resize
+    to the bucket is close to uniform.
+    """
+    height, width = int(mask_u8.shape[0]), int(mask_u8.shape[1])
+    planned: list[tuple[RoiWindow, tuple[int, int]]] = []
+    windows = plan_roi_windows(
+        mask_u8,
+        context_px=context_px,
+        min_window_px=SDXL_ROI_MIN_WINDOW_PX,
+        full_frame_ratio=math.inf,
+    )
+    for window in windows:
+        for piece in split_window(
+            window, max_aspect=SDXL_BUCKET_MAX_ASPECT, overlap=SDXL_ROI_SPLIT_OVERLAP_PX
+        ):
+            bucket = select_sdxl_bucket(piece.width, piece.height)
+            planned.append(
+                (fit_window_aspect(piece, bucket[0] / bucket[1], width, height), bucket)
+            )
+    return planned
+
+
+def group_bucket_windows(
+    planned: list[tuple[RoiWindow, tuple[int, int]]], batch_size: int
+) -> list[list[int]]:
+    """Window indices per pipeline call: same bucket, at most `batch_size`, in plan order."""
+    by_bucket: dict[tuple[int, int], list[int]] = {}
+    for index, (_window, bucket) in enumerate(planned):
+        by_bucket.setdefault(bucket, []).append(index)
+    groups: list[list[int]] = []
+    for indices in by_bucket.values():
+        for start in range(0, len(indices), max(1, int(batch_size))):
+            groups.append(indices[start : start + batch_size])
+    groups.sort(key=lambda group: group[0])
+    return groups
+
+
+HEALTH_SOURCE = "inpaint.sdxl"
+
+
 class SdxlInpaintService:
     """Lazy-loading wrapper around an SDXL inpaint pipeline for `/inpaint/sdxl`."""
 
+    _active_model_key = HealthField(HEALTH_SOURCE)
+    _active_device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(
         self,
         model_manager: LoadedModelManager,
@@ -199,9 +296,33 @@ class SdxlInpaintService:
         small `H x W x 3` uint8 latent preview (or `None`). It runs on the
         worker thread inside the generation lock.
         """
-        normalized = normalize_sdxl_params(params)
+        normalize_sdxl_params(params)
         image_rgb = self._decode_image_rgb(image_bytes)
         mask_u8 = self._decode_mask(mask_bytes, expected_hw=image_rgb.shape[:2])
+        result = self.inpaint_image_array(
+            image_rgb,
+            mask_u8,
+            params=params,
+            progress_callback=progress_callback,
+        )
+        result["image_png"] = _encode_png_bytes_rgb(result.pop("image_rgb"))
+        return result
+
+    def inpaint_image_array(
+        self,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        *,
+        params: dict[str, Any] | None = None,
+        progress_callback: Any = None,
+    ) -> dict[str, Any]:
+        """Same as `inpaint_image_bytes` for decoded `(H, W, 3)` / `(H, W)` uint8 arrays.
+
+        The inputs may be read-only views (e.g. shared memory); the result dict
+        carries the output as `image_rgb` instead of `image_png`.
+        """
+        normalized = normalize_sdxl_params(params)
+        image_rgb, mask_u8 = check_inpaint_arrays(image_rgb, mask_u8)
 
         device = _resolve_selected_backend_device(self._active_device)
         model_key = self._model_key_for(normalized["model_path"], normalized["mode"], device)
@@ -218,14 +339,41 @@ class SdxlInpaintService:
                     device=device,
                     model_key=model_key,
                 )
-                out_rgb = self._inpaint_locked(
-                    pipe,
-                    image_rgb=image_rgb,
-                    mask_u8=mask_u8,
-                    normalized=normalized,
-                    device=device,
-                    progress_callback=progress_callback,
-                )
+
+                def _run(crop_rgb: np.ndarray, crop_mask: np.ndarray) -> np.ndarray:
+                    return self._inpaint_locked(
+                        pipe,
+                        image_rgb=crop_rgb,
+                        mask_u8=crop_mask,
+                        normalized=normalized,
+                        device=device,
+                        progress_callback=progress_callback,
+                    )
+
+                if normalized["roi_crop"] and normalized["roi_mode"] == "bucket":
+                    out_rgb, windows = self._inpaint_bucketed_locked(
+                        pipe,
+                        image_rgb=image_rgb,
+                        mask_u8=mask_u8,
+                        normalized=normalized,
+                        progress_callback=progress_callback,
+                    )
+                elif normalized["roi_crop"]:
+                    # The context must also hold the dilated + feathered mask,
+                    # because the window is pasted back as a whole.
+                    out_rgb, windows = inpaint_with_rois(
+                        image_rgb,
+                        mask_u8,
+                        _run,
+                        context_px=normalized["roi_context_px"]
+                        + normalized["mask_dilation"]
+                        + 2 * normalized["mask_blur"],
+                        min_window_px=SDXL_ROI_MIN_WINDOW_PX,
+                        composite_mask=False,
+                    )
+                else:
+                    out_rgb = _run(image_rgb, mask_u8)
+                    windows = []
                 if lease.needs_load:
                     lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
                 self._last_error = None
@@ -238,10 +386,11 @@ class SdxlInpaintService:
                 lease.release()
 
         return {
-            "image_png": _encode_png_bytes_rgb(out_rgb),
+            "image_rgb": out_rgb,
             "source_size": [int(image_rgb.shape[1]), int(image_rgb.shape[0])],
             "device": self._active_device,
             "mode": normalized["mode"],
+            "roi_windows": len(windows),
         }
 
     def unload(self) -> bool:
@@ -359,26 +508,9 @@ class SdxlInpaintService:
             "generator": generator,
         }
 
-        # Stream a cheap per-step latent preview back to the caller. The exact
-        # step total is read from the pipeline (strength < 1.0 runs fewer steps).
+        # Stream a cheap per-step latent preview back to the caller.
         if progress_callback is not None:
-
-            def _on_step_end(pipe_inner: Any, step: int, _timestep: Any, cb_kwargs: dict[str, Any]):
-                total = int(getattr(pipe_inner, "_num_timesteps", requested_steps) or requested_steps)
-                preview = None
-                try:
-                    latents = cb_kwargs.get("latents")
-                    if latents is not None:
-                        preview = _latent_preview_rgb(latents)
-                except Exception:
-                    preview = None
-                try:
-                    progress_callback(int(step) + 1, total, preview)
-                except Exception:
-                    pass
-                return cb_kwargs
-
-            pipe_kwargs["callback_on_step_end"] = _on_step_end
+            pipe_kwargs["callback_on_step_end"] = _step_callback(progress_callback, requested_steps)
             pipe_kwargs["callback_on_step_end_tensor_inputs"] = ["latents"]
 
         result = pipe(**pipe_kwargs)
@@ -400,6 +532,119 @@ class SdxlInpaintService:
         composed = generated_rgb * alpha3 + image_rgb.astype(np.float32) * (1.0 - alpha3)
         return np.ascontiguousarray(np.clip(np.round(composed), 0, 255).astype(np.uint8))
 
+    def _inpaint_bucketed_locked(
+        self,
+        pipe: Any,
+        *,
+        image_rgb: np.ndarray,
+        mask_u8: np.ndarray,
+        normalized: dict[str, Any],
+        progress_callback: Any = None,
+    ) -> tuple[np.ndarray, list[RoiWindow]]:
+        """`roi_mode="bucket"`: diffuses bucket-sized window crops and feathers them back.
+
+        Windows sharing a bucket go through the pipeline together, up to
+        `roi_batch_size` per call. Every window is prepared from the original
+        page; results are composited in plan order with the blurred mask alpha,
+        faded in over half the split overlap on edges inside the page.
+        """
+        np = _np()
+        from PIL import Image
+
+        page_h, page_w = image_rgb.shape[:2]
+        planned = plan_bucket_windows(
+            mask_u8,
+            context_px=normalized["roi_context_px"]
+            + normalized["mask_dilation"]
+            + 2 * normalized["mask_blur"],
+        )
+        out = image_rgb.copy()
+        if not planned:
+            return out, []
+
+        scheduler_class, scheduler_kwargs = resolve_scheduler_config(normalized["sampler"])
+        _apply_scheduler(pipe, scheduler_class, scheduler_kwargs)
+        requested_steps = int(normalized["steps"])
+        seed = int(normalized["seed"])
+
+        for group in group_bucket_windows(planned, normalized["roi_batch_size"]):
+            bucket_w, bucket_h = planned[group[0]][1]
+            crops: list[tuple[RoiWindow, np.ndarray, np.ndarray]] = []
+            init_images: list[Any] = []
+            mask_images: list[Any] = []
+            for index in group:
+                window = planned[index][0]
+                rows = slice(window.y0, window.y1)
+                cols = slice(window.x0, window.x1)
+                crop_rgb = np.ascontiguousarray(image_rgb[rows, cols])
+                cond_mask_u8, alpha = _process_mask(
+                    np.ascontiguousarray(mask_u8[rows, cols]),
+                    dilation=normalized["mask_dilation"],
+                    blur=normalized["mask_blur"],
+                )
+                init_rgb = crop_rgb
+                if normalized["mode"] == "four_channel":
+                    init_rgb = self._lama_prefill(
+                        image_rgb=crop_rgb,
+                        cond_mask_u8=cond_mask_u8,
+                        lama_model=normalized["lama_model"],
+                    )
+                init_images.append(
+                    _to_pil_resized(Image.fromarray(init_rgb, mode="RGB"), bucket_w, bucket_h)
+                )
+                mask_images.append(
+                    _to_pil_resized(
+                        Image.fromarray(cond_mask_u8, mode="L"), bucket_w, bucket_h, nearest=True
+                    )
+                )
+                crops.append((window, crop_rgb, alpha))
+
+            batch = len(group)
+            pipe_kwargs: dict[str, Any] = {
+                "prompt": [normalized["positive_prompt"]] * batch,
+                "negative_prompt": [normalized["negative_prompt"]] * batch,
+                "image": init_images,
+                "mask_image": mask_images,
+                "num_inference_steps": requested_steps,
+                "guidance_scale": float(normalized["cfg_scale"]),
+                "strength": float(normalized["denoise_strength"]),
+                "width": bucket_w,
+                "height": bucket_h,
+                # Per-window seeds keep a window's result independent of batching.
+                "generator": _window_generators(seed, group),
+            }
+            if progress_callback is not None:
+                pipe_kwargs["callback_on_step_end"] = _step_callback(
+                    progress_callback,
+                    requested_steps,
+                    {"window": group[0], "windows": len(planned), "batch": batch},
+                )
+                pipe_kwargs["callback_on_step_end_tensor_inputs"] = ["latents"]
+
+            result = pipe(**pipe_kwargs)
+            if len(result.images) != batch:
+                raise RuntimeError(
+                    f"SDXL вернул {len(result.images)} изображений вместо {batch}."
+                )
+            for (window, crop_rgb, alpha), generated in zip(crops, result.images):
+                generated = generated.convert("RGB")
+                if generated.size != (window.width, window.height):
+                    generated = generated.resize((window.width, window.height), Image.LANCZOS)
+                generated_rgb = _match_vae_roundtrip(
+                    np.asarray(generated, dtype=np.float32), crop_rgb, alpha
+                )
+                weight = alpha * _edge_feather(
+                    window, page_w, page_h, SDXL_ROI_SPLIT_OVERLAP_PX // 2
+                )
+                rows = slice(window.y0, window.y1)
+                cols = slice(window.x0, window.x1)
+                weight3 = weight[..., None]
+                composed = generated_rgb * weight3 + out[rows, cols].astype(np.float32) * (
+                    1.0 - weight3
+                )
+                out[rows, cols] = np.clip(np.round(composed), 0, 255).astype(np.uint8)
+        return out, [window for window, _bucket in planned]
+
     def _lama_prefill(
         self,
         *,
@@ -408,18 +653,15 @@ class SdxlInpaintService:
         lama_model: str,
     ) -> np.ndarray:
         np = _np()
-        image_bytes = _encode_png_bytes_rgb(image_rgb)
-        mask_bytes = _encode_png_bytes_gray(cond_mask_u8)
         params: dict[str, Any] = {}
         if lama_model:
             params["model_name"] = lama_model
-        result = self._lama_service.inpaint_image_bytes(
-            image_bytes, mask_bytes, params=params
+        result = self._lama_service.inpaint_image_array(
+            image_rgb, cond_mask_u8, params=params
         )
-        prefilled_png = result.get("image_png", b"")
-        if not prefilled_png:
+        prefilled = result.get("image_rgb")
+        if prefilled is None:
             raise RuntimeError("LaMa-префилл не вернул изображение.")
-        prefilled = _decode_rgb_from_png_bytes(prefilled_png)
         if prefilled.shape[:2] != image_rgb.shape[:2]:
             from PIL import Image
 
@@ -459,6 +701,65 @@ class SdxlInpaintService:
         return np.where(mask > 0, 255, 0).astype(np.uint8)
 
 
+def _step_callback(
+    progress_callback: Any, requested_steps: int, window_info: dict[str, int] | None = None
+) -> Any:
+    """diffusers `callback_on_step_end` forwarding `(step, total, preview[, window_info])`.
+
+    The exact step total is read from the pipeline (strength < 1.0 runs fewer
+    steps). `window_info` (`window`, `windows`, `batch`) is passed only in
+    bucket mode, so existing three-argument callbacks keep working.
+    """
+
+    def _on_step_end(pipe_inner: Any, step: int, _timestep: Any, cb_kwargs: dict[str, Any]):
+        total = int(getattr(pipe_inner, "_num_timesteps", requested_steps) or requested_steps)
+        preview = None
+        try:
+            latents = cb_kwargs.get("latents")
+            if latents is not None:
+                preview = _latent_preview_rgb(latents)
+        except Exception:
+            preview = None
+        try:
+            if window_info is None:
+                progress_callback(int(step) + 1, total, preview)
+            else:
+                progress_callback(int(step) + 1, total, preview, dict(window_info))
+        except Exception:
+            pass
+        return cb_kwargs
+
+    return _on_step_end
+
+
+def _window_generators(seed: int, indices: list[int]) -> Any:
+    if seed < 0:
+        return None
+    torch = _torch()
+    return [torch.Generator(device="cpu").manual_seed(seed + index) for index in indices]
+
+
+def _edge_feather(window: RoiWindow, page_w: int, page_h: int, feather_px: int) -> np.ndarray:
+    """`(h, w)` weights rising from 0 to 1 over `feather_px` on window edges inside the page."""
+    np = _np()
+
+    def ramp(length: int, open_start: bool, open_end: bool) -> np.ndarray:
+        out = np.ones(length, dtype=np.float32)
+        size = min(int(feather_px), length // 4)
+        if size <= 0:
+            return out
+        rise = (np.arange(size, dtype=np.float32) + 1.0) / (size + 1.0)
+        if open_start:
+            out[:size] = rise
+        if open_end:
+            out[-size:] = np.minimum(out[-size:], rise[::-1])
+        return out
+
+    ramp_x = ramp(window.width, window.x0 > 0, window.x1 < page_w)
+    ramp_y = ramp(window.height, window.y0 > 0, window.y1 < page_h)
+    return ramp_y[:, None] * ramp_x[None, :]
+
+
 def _validate_mode_channels(mode: str, in_channels: int) -> None:
     """Enforces that the loaded UNet channel count matches the requested mode."""
     if mode == "nine_channel" and in_channels != 9:
@@ -604,24 +905,6 @@ def _encode_png_bytes_rgb(image_rgb: np.ndarray) -> bytes:
         return buffer.getvalue()
 
 
-def _encode_png_bytes_gray(mask_u8: np.ndarray) -> bytes:
-    from PIL import Image
-
-    np = _np()
-    arr = np.ascontiguousarray(mask_u8.astype(np.uint8))
-    with io.BytesIO() as buffer:
-        Image.fromarray(arr, mode="L").save(buffer, format="PNG")
-        return buffer.getvalue()
-
-
-def _decode_rgb_from_png_bytes(data: bytes) -> np.ndarray:
-    from PIL import Image
-
-    np = _np()
-    with Image.open(io.BytesIO(data)) as img:
-        return np.ascontiguousarray(np.array(img.convert("RGB"), dtype=np.uint8))
-
-
 def _np():
     try:
         import numpy as np  # type: ignore
@@ -687,55 +970,7 @@ def _clamp_float(value: Any, *, default: float, low: float, high: float) -> floa
 
 
 def _resolve_selected_backend_device(fallback: str) -> str:
-    fallback_norm = _normalize_backend_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-    normalized = _normalize_backend_device(configured, fallback_norm)
-    available = _safe_available_devices()
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    if "mps" in available:
-        return "mps"
-    return "cpu"
-
-
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    value = value.strip().lower()
-    if value == "not-selected":
-        return None
-    return value or None
-
-
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
-
-
-def _normalize_backend_device(raw: str, fallback: str) -> str:
-    value = str(raw or "").strip().lower()
-    if value in {"cpu", "mps", "cuda"}:
-        return value
-    if value.startswith("cuda:"):
-        return value
-    return str(fallback or "cpu").strip().lower() or "cpu"
+    return resolve_backend_device(fallback, accept_mps=True, mps_fallback=True)
 
 
 def _clear_torch_cache() -> None:
@@ -9,7 +9,10 @@ Main responsibilities:
 - construct the shared `AppState` (OCR / text detector / inpaint / translation /
   device services) consumed by the IPC handlers in `ipc/handlers/`;
 - maintain a non-blocking health snapshot and publish it as a `health` event on
-  the IPC event bus;
+  the IPC event bus: rebuilt only when a service signals a change through
+  `health_feed.py` (plus a slow heartbeat), sent as a full snapshot the first
+  time and as JSON-patch deltas afterwards to clients that negotiated
+  `health_delta`;
 - expose the backend version metadata for Rust-side compatibility checks.
 
 Transport:
@@ -36,6 +39,7 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+from .device_resolution import DEVICE_RESOLUTION, DeviceListener
 from .device_service import AiDeviceService
 from .ctd_text_detector_service import CtdTextDetectorService
 from .paddle_text_detector_service import PaddleTextDetectorService
@@ -46,6 +50,7 @@ from .lama_inpaint_service import LamaInpaintService
 from .manga_ocr_service import MangaOcrService
 from .machine_translation_service import MachineTranslationService
 from .model_manager import LoadedModelManager
+from .model_preload import ModelPreloader
 from .paddle_ocr_service import PaddleOcrService
 from .paddle_vl_ocr_service import PaddleVlOcrService
 from .paddle_onnx_runtime import RuntimeFactory
@@ -56,9 +61,25 @@ from .surya_ocr_service import SuryaOcrService
 from .surya_text_detector_service import SuryaTextDetectorService
 from .torch_support import is_torch_available
 from .browser.service import BrowserService
-from .ipc.protocol import TOPIC_HEALTH
-
-HEALTH_SNAPSHOT_REFRESH_SECS = 1.0
+from .health_feed import HEALTH_FEED, VOLATILE_KEYS, HealthFeed, diff_health
+from .ipc.protocol import (
+    CAP_HEALTH_DELTA,
+    HEADER_HEALTH_BASE_SEQ,
+    HEADER_HEALTH_PATCH,
+    HEADER_HEALTH_SEQ,
+    METHOD_OCR_MANGA,
+    TOPIC_DEVICE,
+    TOPIC_HEALTH,
+)
+
+HEALTH_HEARTBEAT_ENV = "MS_HEALTH_HEARTBEAT_SECS"
+DEFAULT_HEALTH_HEARTBEAT_SECS = 15.0
+# Lower bound between two snapshot rebuilds, so a burst of notifications (e.g.
+# a download ticking) costs at most one `health()` sweep per second.
+HEALTH_MIN_INTERVAL_SECS = 1.0
+# Short settle window after a notification so related transitions (lease
+# acquired + model loaded) land in one delta.
+HEALTH_COALESCE_SECS = 0.05
 
 # ============================================================================
 # AI BACKEND SERVER
@@ -67,7 +88,14 @@ HEALTH_SNAPSHOT_REFRESH_SECS = 1.0
 # - AppState: shared сервисы OCR/MT/Inpaint/textdetector/device.
 # - `_build_health_snapshot`/`_health_snapshot_worker`: фоновой health-snapshot,
 #   который также публикуется как `health` event на шину IPC, поэтому клиентам не
-#   нужно опрашивать health.
+#   нужно опрашивать health. Воркер просыпается по `HEALTH_FEED` (сервисы и
+#   `LoadedModelManager` сигналят об изменениях) или по heartbeat; клиентам с
+#   cap `health_delta` после первого полного снимка уходят только JSON-patch дельты.
+# - `ModelPreloader` (`model_preload.py`): фоновый прогрев моделей для
+#   `models.preload` и `--warmup-mangaocr`.
+# - `DEVICE_RESOLUTION` (`device_resolution.py`): изменения выбранного/доступных
+#   устройств публикуются как `device` event; счётчики кэша — в health
+#   `activity.device` (вне дельт, см. `VOLATILE_KEYS`).
 # - `run_server`: строит сервисы и запускает framed IPC frame-server на базовом
 #   AF_UNIX-сокете (единственный транспорт). Маршрутизация запросов живёт в
 #   `ipc/handlers/`, а не здесь.
@@ -94,6 +122,8 @@ class AppState:
     machine_translation: MachineTranslationService
     ai_device: AiDeviceService
     browser: BrowserService
+    onnx_runtime: RuntimeFactory
+    model_preloader: ModelPreloader | None = None
     health_snapshot: dict[str, Any] = field(default_factory=dict)
     health_snapshot_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
@@ -114,6 +144,14 @@ def _safe_service_health(service: Any) -> dict[str, Any]:
         return {"status": "error", "error": str(exc)}
 
 
+def _safe_service_activity(service: Any) -> dict[str, Any]:
+    """`service.activity()` per-request counters, isolated like `_safe_service_health`."""
+    try:
+        return service.activity()
+    except Exception as exc:  # noqa: BLE001 - one bad service must not sink the rest
+        return {"status": "error", "error": str(exc)}
+
+
 def _build_health_snapshot(state: AppState) -> dict[str, Any]:
     now_s = time.time()
     return {
@@ -145,6 +183,14 @@ def _build_health_snapshot(state: AppState) -> dict[str, Any]:
         },
         "machine_translation": _safe_service_health(state.machine_translation),
         "model_manager": _safe_service_health(state.model_manager),
+        "onnx_runtime": _safe_service_health(state.onnx_runtime),
+        "device": DEVICE_RESOLUTION.state(),
+        # Per-request counters; in `VOLATILE_KEYS`, so they ride along with
+        # published snapshots but never trigger a publish themselves.
+        "activity": {
+            "model_manager": _safe_service_activity(state.model_manager),
+            "device": DEVICE_RESOLUTION.counters(),
+        },
     }
 
 
@@ -153,6 +199,22 @@ def _set_health_snapshot(state: AppState, payload: dict[str, Any]) -> None:
         state.health_snapshot = payload
 
 
+def _refresh_health_snapshot(state: AppState) -> dict[str, Any]:
+    """Rebuilds and caches the snapshot for an explicit `health` pull.
+
+    The worker only rebuilds after a feed notification (coalesced) or on the
+    heartbeat; a client that asks for health right after a request must not get
+    a snapshot that predates it. Falls back to the cached one if a build fails.
+    """
+    try:
+        snapshot = _build_health_snapshot(state)
+    except Exception:
+        traceback.print_exc()
+        return _get_health_snapshot(state)
+    _set_health_snapshot(state, snapshot)
+    return dict(snapshot)
+
+
 def _get_health_snapshot(state: AppState) -> dict[str, Any]:
     with state.health_snapshot_lock:
         if state.health_snapshot:
@@ -201,7 +263,7 @@ def run_server(
     onnx_runtime_factory = RuntimeFactory(model_manager)
     ai_device_service = AiDeviceService(model_manager)
     # Shared so the SDXL 4-channel prefill reuses the same LaMa model cache.
-    lama_inpaint_service = LamaInpaintService(model_manager)
+    lama_inpaint_service = LamaInpaintService(model_manager, onnx_runtime_factory)
     state = AppState(
         app_version=app_version,
         model_manager=model_manager,
@@ -210,18 +272,19 @@ def run_server(
         paddle_ocr=PaddleOcrService(onnx_runtime_factory),
         paddle_vl_ocr=PaddleVlOcrService(model_manager),
         surya_ocr=SuryaOcrService(model_manager),
-        text_detector_ctd=CtdTextDetectorService(model_manager),
+        text_detector_ctd=CtdTextDetectorService(model_manager, onnx_runtime_factory),
         text_detector_paddle=PaddleTextDetectorService(onnx_runtime_factory),
         text_detector_surya=SuryaTextDetectorService(model_manager),
         lama_inpaint=lama_inpaint_service,
         lama_mpe_inpaint=LamaMpeInpaintService(model_manager),
-        aot_inpaint=AotInpaintService(model_manager),
+        aot_inpaint=AotInpaintService(model_manager, onnx_runtime_factory),
         sdxl_inpaint=SdxlInpaintService(model_manager, lama_inpaint_service),
         flux_fill_inpaint=FluxFillInpaintService(model_manager),
-        reline=RelineService(),
+        reline=RelineService(model_manager),
         machine_translation=MachineTranslationService(),
         ai_device=ai_device_service,
         browser=BrowserService(),
+        onnx_runtime=onnx_runtime_factory,
     )
     _set_health_snapshot(
         state,
@@ -245,6 +308,9 @@ def run_server(
     from .ipc.events import EventBus
 
     event_bus = EventBus()
+    state.model_preloader = ModelPreloader(state, event_bus)
+    device_listener = _device_event_publisher(event_bus)
+    DEVICE_RESOLUTION.add_listener(device_listener)
 
     health_thread = threading.Thread(
         target=_health_snapshot_worker,
@@ -253,7 +319,7 @@ def run_server(
     )
     health_thread.start()
     if warmup_mangaocr:
-        threading.Thread(target=_warmup_safe, args=(state,), daemon=True).start()
+        state.model_preloader.preload([(METHOD_OCR_MANGA, {})])
 
     try:
         if transport == "unix":
@@ -275,7 +341,7 @@ def run_server(
                 socket_path_str,
                 stop_event,
                 backend_version=state.app_version,
-                get_health_snapshot=lambda: _get_health_snapshot(state),
+                get_health_snapshot=lambda: _refresh_health_snapshot(state),
                 events=event_bus,
             )
         elif transport == "ws":
@@ -294,7 +360,7 @@ def run_server(
                 ws_token,
                 stop_event,
                 backend_version=state.app_version,
-                get_health_snapshot=lambda: _get_health_snapshot(state),
+                get_health_snapshot=lambda: _refresh_health_snapshot(state),
                 events=event_bus,
             )
         else:
@@ -305,36 +371,98 @@ def run_server(
         print("\n[AI Backend] Stopping...")
     finally:
         stop_event.set()
+        # Wake the health worker out of its heartbeat wait so it sees the stop.
+        HEALTH_FEED.notify("shutdown")
+        state.model_preloader.shutdown()
+        DEVICE_RESOLUTION.remove_listener(device_listener)
         try:
             state.browser.close()
         except Exception:  # noqa: BLE001 - browser teardown is best-effort
             traceback.print_exc()
 
 
-def _warmup_safe(state: AppState) -> None:
+def _device_event_publisher(event_bus: Any) -> DeviceListener:
+    """Listener for `DEVICE_RESOLUTION`: pushes a `device` event and wakes the health worker."""
+
+    def publish(payload: dict[str, Any]) -> None:
+        event_bus.publish(TOPIC_DEVICE, payload)
+        HEALTH_FEED.notify("device")
+
+    return publish
+
+
+def _health_heartbeat_secs() -> float:
     try:
-        state.manga_ocr.warmup()
-    except Exception:
-        traceback.print_exc()
+        value = float(os.environ.get(HEALTH_HEARTBEAT_ENV, DEFAULT_HEALTH_HEARTBEAT_SECS))
+    except (TypeError, ValueError):
+        return DEFAULT_HEALTH_HEARTBEAT_SECS
+    return value if value > 0 else DEFAULT_HEALTH_HEARTBEAT_SECS
 
 
 def _health_snapshot_worker(
     state: AppState,
     stop_event: threading.Event,
     event_bus: Any | None = None,
+    *,
+    feed: HealthFeed = HEALTH_FEED,
+    heartbeat_s: float | None = None,
+    min_interval_s: float = HEALTH_MIN_INTERVAL_SECS,
+    coalesce_s: float = HEALTH_COALESCE_SECS,
 ) -> None:
+    """Rebuilds and publishes health when `feed` signals a change or the heartbeat expires.
+
+    The first publish is a full snapshot. After that a rebuild that changes
+    nothing publishes nothing; a change goes out as a full snapshot to legacy
+    subscribers and as a `health_patch` delta (against `health_base_seq`) to
+    subscribers that negotiated `health_delta`. The heartbeat re-sends the full
+    snapshot to everyone, which also resynchronises delta clients and covers
+    health fields whose owners do not notify the feed.
+    """
+    heartbeat = _health_heartbeat_secs() if heartbeat_s is None else heartbeat_s
+    previous: dict[str, Any] | None = None
+    seq = 0
+    last_build = float("-inf")
+    last_publish = time.monotonic()
     while not stop_event.is_set():
+        seen = feed.version
+        feed.take_sources()
         try:
             snapshot = _build_health_snapshot(state)
+            last_build = time.monotonic()
             _set_health_snapshot(state, snapshot)
-            # Also push the snapshot to v2 frame clients as a `health` event so
-            # they no longer need to poll. Best-effort; a publish failure (e.g.
-            # a dead subscriber) must never stall the health worker.
-            if event_bus is not None:
-                try:
-                    event_bus.publish(TOPIC_HEALTH, snapshot)
-                except Exception:
-                    traceback.print_exc()
+            heartbeat_due = last_build - last_publish >= heartbeat
+            ops = [] if previous is None else diff_health(previous, snapshot)
+            if previous is None or ops or heartbeat_due:
+                seq += 1
+                # Best-effort; a publish failure (e.g. a dead subscriber) must
+                # never stall the health worker.
+                if event_bus is not None:
+                    try:
+                        _publish_health(event_bus, snapshot, seq, ops, full=previous is None or heartbeat_due)
+                    except Exception:
+                        traceback.print_exc()
+                previous = snapshot
+                last_publish = last_build
         except Exception:
             traceback.print_exc()
-        stop_event.wait(HEALTH_SNAPSHOT_REFRESH_SECS)
+
+        remaining = max(0.0, last_publish + heartbeat - time.monotonic())
+        if feed.wait_for_change(seen, remaining) and not stop_event.is_set():
+            stop_event.wait(max(coalesce_s, last_build + min_interval_s - time.monotonic()))
+
+
+def _publish_health(
+    event_bus: Any, snapshot: dict[str, Any], seq: int, ops: list[dict[str, Any]], *, full: bool
+) -> None:
+    payload = dict(snapshot)
+    payload[HEADER_HEALTH_SEQ] = seq
+    if full:
+        event_bus.publish(TOPIC_HEALTH, payload)
+        return
+    delta = {
+        HEADER_HEALTH_SEQ: seq,
+        HEADER_HEALTH_BASE_SEQ: seq - 1,
+        HEADER_HEALTH_PATCH: ops,
+        **{key: snapshot.get(key) for key in VOLATILE_KEYS},
+    }
+    event_bus.publish(TOPIC_HEALTH, payload, delta=delta, delta_cap=CAP_HEALTH_DELTA)
@@ -6,6 +6,9 @@ Main responsibilities:
 - lazy init and health reporting for Surya foundation/recognition predictors;
 - optional lazy init of Surya text detector for `ocr_with_boxes` mode;
 - OCR recognition from raw image bytes with stable JSON-friendly output;
+- batch recognition of many crops in one predictor call (`recognize_images_bytes`);
+- `recognize_image_array` / `recognize_images_array` for in-process callers
+  holding decoded RGB arrays (no PNG round-trip);
 - synchronization of model device with backend `General.ai_device`;
 - cooperation with `LoadedModelManager` for bounded resident model count.
 
@@ -22,18 +25,11 @@ from __future__ import annotations
 import gc
 import io
 import threading
-from typing import Any
-
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
+from typing import Any, Callable, Sequence
 
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import at_least_2px, image_from_array
 from .model_manager import LoadedModelManager
 
 SURYA_TASK_OCR_WITH_BOXES = "ocr_with_boxes"
@@ -67,10 +63,16 @@ def _clear_torch_cache() -> None:
         pass
 
 
+HEALTH_SOURCE = "ocr.suryaocr"
+
+
 class SuryaOcrService:
     FOUNDATION_MODEL_KEY_PREFIX = "suryaocr:foundation"
     DETECTOR_MODEL_KEY_PREFIX = "suryaocr:detector"
 
+    _device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(self, model_manager: LoadedModelManager) -> None:
         self._lock = threading.Lock()
         self._model_manager = model_manager
@@ -97,13 +99,14 @@ class SuryaOcrService:
     ) -> None:
         from PIL import Image
 
-        dummy = Image.new("RGB", (32, 32), (255, 255, 255))
-        encoded = io.BytesIO()
-        dummy.save(encoded, format="PNG")
-        self.recognize_image_bytes(
-            encoded.getvalue(),
-            task_name=task_name,
+        self._predict_images(
+            [Image.new("RGB", (32, 32), (255, 255, 255))],
+            task_name=_normalize_task_name(task_name),
             recognize_math=recognize_math,
+            sort_lines=False,
+            drop_repeated_text=False,
+            max_sliding_window=None,
+            max_tokens=None,
         )
 
     def recognize_image_bytes(
@@ -119,11 +122,129 @@ class SuryaOcrService:
         max_sliding_window: int | None = None,
         max_tokens: int | None = None,
     ) -> dict[str, Any]:
+        return self._recognize_images(
+            [self._decode_image(image_bytes)],
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            task_name=task_name,
+            recognize_math=recognize_math,
+            sort_lines=sort_lines,
+            drop_repeated_text=drop_repeated_text,
+            max_sliding_window=max_sliding_window,
+            max_tokens=max_tokens,
+        )[0]
+
+    def recognize_image_array(
+        self,
+        image_rgb: Any,
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        task_name: str = SURYA_TASK_OCR_WITHOUT_BOXES,
+        recognize_math: bool = False,
+        sort_lines: bool = False,
+        drop_repeated_text: bool = False,
+        max_sliding_window: int | None = None,
+        max_tokens: int | None = None,
+    ) -> dict[str, Any]:
+        """Same as `recognize_image_bytes` for a decoded `(H, W, 3)` uint8 RGB array."""
+        return self._recognize_images(
+            [at_least_2px(image_from_array(image_rgb))],
+            join_newlines=join_newlines,
+            reflect_strings=reflect_strings,
+            task_name=task_name,
+            recognize_math=recognize_math,
+            sort_lines=sort_lines,
+            drop_repeated_text=drop_repeated_text,
+            max_sliding_window=max_sliding_window,
+            max_tokens=max_tokens,
+        )[0]
+
+    def recognize_images_bytes(
+        self,
+        images_bytes: Sequence[bytes],
+        *,
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+        **options: Any,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `recognize_image_bytes`: all crops go to Surya in one call.
+
+        Surya batches the crops internally (its own recognition batch size), so
+        `on_result(index, result)` fires for every crop after the call returns.
+        `options` are the keyword options of `recognize_image_bytes`.
+        """
+        return self._recognize_images(
+            [self._decode_image(image_bytes) for image_bytes in images_bytes],
+            on_result=on_result,
+            **options,
+        )
+
+    def recognize_images_array(
+        self,
+        images_rgb: Sequence[Any],
+        *,
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+        **options: Any,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `recognize_image_array` (see `recognize_images_bytes`)."""
+        return self._recognize_images(
+            [at_least_2px(image_from_array(image_rgb)) for image_rgb in images_rgb],
+            on_result=on_result,
+            **options,
+        )
+
+    def _recognize_images(
+        self,
+        images: list[Any],
+        *,
+        join_newlines: bool = True,
+        reflect_strings: bool = False,
+        task_name: str = SURYA_TASK_OCR_WITHOUT_BOXES,
+        recognize_math: bool = False,
+        sort_lines: bool = False,
+        drop_repeated_text: bool = False,
+        max_sliding_window: int | None = None,
+        max_tokens: int | None = None,
+        on_result: Callable[[int, dict[str, Any]], None] | None = None,
+    ) -> list[dict[str, Any]]:
         normalized_task = _normalize_task_name(task_name)
-        image = self._decode_image(image_bytes)
+        if not images:
+            return []
+        predictions = self._predict_images(
+            images,
+            task_name=normalized_task,
+            recognize_math=recognize_math,
+            sort_lines=sort_lines,
+            drop_repeated_text=drop_repeated_text,
+            max_sliding_window=max_sliding_window,
+            max_tokens=max_tokens,
+        )
+        results: list[dict[str, Any]] = []
+        for index, prediction in enumerate(predictions):
+            result = self._format_result(
+                prediction,
+                join_newlines=join_newlines,
+                reflect_strings=reflect_strings,
+            )
+            results.append(result)
+            if on_result is not None:
+                on_result(index, result)
+        return results
+
+    def _predict_images(
+        self,
+        images: list[Any],
+        *,
+        task_name: str,
+        recognize_math: bool,
+        sort_lines: bool,
+        drop_repeated_text: bool,
+        max_sliding_window: int | None,
+        max_tokens: int | None,
+    ) -> list[Any]:
         selected_device = _resolve_selected_backend_device(self._device or "cpu")
         foundation_key = self._foundation_model_key(selected_device)
-        detector_needed = normalized_task == SURYA_TASK_OCR_WITH_BOXES
+        detector_needed = task_name == SURYA_TASK_OCR_WITH_BOXES
         detector_key = self._detector_model_key(selected_device)
 
         foundation_lease = self._model_manager.begin_model_use(
@@ -155,11 +276,11 @@ class SuryaOcrService:
                     unload_callback=lambda: self._unload_detector_key(detector_key)
                 )
 
-            result = self._recognize_with_predictors(
-                image=image,
+            return self._recognize_with_predictors(
+                images=images,
                 recognition_predictor=recognition_predictor,
                 detection_predictor=detection_predictor,
-                task_name=normalized_task,
+                task_name=task_name,
                 recognize_math=recognize_math,
                 sort_lines=sort_lines,
                 drop_repeated_text=drop_repeated_text,
@@ -177,12 +298,14 @@ class SuryaOcrService:
                 detector_lease.release()
             foundation_lease.release()
 
+    @staticmethod
+    def _format_result(prediction: Any, *, join_newlines: bool, reflect_strings: bool) -> dict[str, Any]:
         lines = [
             _normalize_surya_text(
                 str(getattr(line, "text", "")),
                 join_newlines=join_newlines,
             ).strip()
-            for line in getattr(result, "text_lines", [])
+            for line in getattr(prediction, "text_lines", [])
             if _normalize_surya_text(
                 str(getattr(line, "text", "")),
                 join_newlines=join_newlines,
@@ -254,7 +377,7 @@ class SuryaOcrService:
     def _recognize_with_predictors(
         self,
         *,
-        image,
+        images: list[Any],
         recognition_predictor,
         detection_predictor,
         task_name: str,
@@ -263,10 +386,9 @@ class SuryaOcrService:
         drop_repeated_text: bool,
         max_sliding_window: int | None,
         max_tokens: int | None,
-    ):
-        image_w, image_h = image.size
+    ) -> list[Any]:
         kwargs: dict[str, Any] = {
-            "task_names": [task_name],
+            "task_names": [task_name] * len(images),
             "sort_lines": sort_lines,
             "math_mode": recognize_math,
             "drop_repeated_text": drop_repeated_text,
@@ -275,28 +397,21 @@ class SuryaOcrService:
         }
         if task_name == SURYA_TASK_OCR_WITH_BOXES:
             kwargs["det_predictor"] = detection_predictor
-            kwargs["highres_images"] = [image]
+            kwargs["highres_images"] = list(images)
         else:
-            kwargs["bboxes"] = [[[0, 0, image_w, image_h]]]
+            kwargs["bboxes"] = [[[0, 0, image.size[0], image.size[1]]] for image in images]
 
-        predictions = recognition_predictor([image], **kwargs)
-        if not predictions:
+        predictions = recognition_predictor(list(images), **kwargs)
+        if not predictions or len(predictions) != len(images):
             raise RuntimeError("Surya OCR returned no predictions.")
-        return predictions[0]
+        return list(predictions)
 
     @staticmethod
     def _decode_image(image_bytes: bytes):
         from PIL import Image
 
         with Image.open(io.BytesIO(image_bytes)) as img:
-            rgb = img.convert("RGB")
-            width, height = rgb.size
-            if width >= 2 and height >= 2:
-                return rgb
-
-            resampling = getattr(getattr(Image, "Resampling", Image), "NEAREST")
-            target_size = (max(2, width), max(2, height))
-            return rgb.resize(target_size, resample=resampling)
+            return at_least_2px(img.convert("RGB"))
 
     def _unload_foundation_key(self, model_key: str) -> bool:
         with self._lock:
@@ -351,52 +466,4 @@ def _normalize_surya_text(raw: str, *, join_newlines: bool) -> str:
 
 
 def _resolve_selected_backend_device(fallback: str) -> str:
-    fallback_norm = _normalize_backend_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-
-    normalized = _normalize_backend_device(configured, fallback_norm)
-    available = _safe_available_devices()
-
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    return "cpu"
-
-
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    normalized = value.strip().lower()
-    if normalized == "not-selected":
-        return None
-    return normalized or None
-
-
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
-
-
-def _normalize_backend_device(raw: str, fallback: str) -> str:
-    normalized = str(raw or "").strip().lower()
-    if normalized == "cpu" or normalized == "cuda" or normalized.startswith("cuda:"):
-        return normalized
-    if normalized == "mps":
-        return normalized
-    return str(fallback or "cpu").strip().lower() or "cpu"
+    return resolve_backend_device(fallback, accept_mps=True)
@@ -6,9 +6,21 @@ Main responsibilities:
 - lazy init and health reporting for Surya detection-only predictor;
 - explicit checkpoint presence check and auto-download for the detector model;
 - low-level heatmap-based text detection without OCR wrappers;
-- return line blocks and a binary mask derived from Surya detector heatmaps;
+- return line blocks and a binary mask derived from Surya detector heatmaps
+  (component filtering shared with PaddleOCR in `detect_postprocess.py`);
 - synchronize model device with backend `General.ai_device`;
+- detect ultra-tall strips in overlapping windows (`detect_tiling.py`) when the
+  `tiled_detection` param asks for it;
+- detect many pages per predictor call (`detect_images_bytes` / `detect_pages`,
+  IPC `textdetector.surya.batch`), reporting each page as soon as it is done;
+- `detect_image_array` / `detect_images_array` for in-process callers holding
+  decoded RGB arrays (masks come back as `mask_u8` arrays, not PNG);
 - cooperate with `LoadedModelManager` for bounded resident model count.
+
+Notes:
+- Input-pixel and heatmap statistics are only computed for the log when
+  diagnostics are on (`MS_SURYA_DETECT_DEBUG=1` or this logger at DEBUG); the
+  non-finite heatmap check always runs.
 """
 
 from __future__ import annotations
@@ -16,26 +28,37 @@ from __future__ import annotations
 import gc
 import io
 import logging
+import os
 import threading
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Sequence
 
 import numpy as np
 
-try:
-    from ai_device import AIDevice
-except Exception:
-    from modules.ai_device import AIDevice
-
-try:
-    from config import UserConfig
-except Exception:
-    UserConfig = None
-
+from .detect_postprocess import outline_points, score_components, select_components
+from .detect_tiling import TileBlock, detect_strip, normalize_tile_params, should_tile
+from .device_resolution import resolve_backend_device
+from .health_feed import HealthField
+from .image_arrays import at_least_2px, image_from_array
 from .model_manager import LoadedModelManager
 
 log = logging.getLogger(__name__)
 
+DIAGNOSTICS_ENV = "MS_SURYA_DETECT_DEBUG"
+_DIAGNOSTICS_FROM_ENV = os.environ.get(DIAGNOSTICS_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
+
+# Pages per predictor call in the batch path when the request sets no
+# `batch_size`; the forward-pass batch then uses Surya's device default.
+DEFAULT_BATCH_PAGES = 8
+MAX_BATCH_SIZE = 64
+
+PageResultCallback = Callable[[int, dict[str, Any]], None]
+
+
+def _diagnostics_enabled() -> bool:
+    """Whether image/heatmap statistics should be computed for the log at all."""
+    return _DIAGNOSTICS_FROM_ENV or log.isEnabledFor(logging.DEBUG)
+
 
 def _clear_torch_cache() -> None:
     try:
@@ -58,9 +81,15 @@ def _clear_torch_cache() -> None:
         pass
 
 
+HEALTH_SOURCE = "text_detector.surya"
+
+
 class SuryaTextDetectorService:
     MODEL_KEY_PREFIX = "surya:detector_only"
 
+    _device = HealthField(HEALTH_SOURCE)
+    _last_error = HealthField(HEALTH_SOURCE)
+
     def __init__(self, model_manager: LoadedModelManager) -> None:
         self._lock = threading.RLock()
         self._model_manager = model_manager
@@ -83,19 +112,37 @@ class SuryaTextDetectorService:
                 "last_error": self._last_error,
             }
 
-    def detect_page(self, page_path: str) -> dict[str, Any]:
+    def detect_page(self, page_path: str, *, params: dict[str, Any] | None = None) -> dict[str, Any]:
         log.info("Surya detect_page start path=%s", page_path)
         raw = Path(page_path).read_bytes()
-        return self.detect_image_bytes(raw)
-
-    def detect_image_bytes(self, image_bytes: bytes) -> dict[str, Any]:
+        return self.detect_image_bytes(raw, params=params)
+
+    def detect_image_bytes(
+        self, image_bytes: bytes, *, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        log.info("Surya detect_image_bytes start bytes=%s", len(image_bytes))
+        payload = self._detect_image(self._decode_image(image_bytes), params)
+        return _with_mask_png(self._ensure_cv2(), payload)
+
+    def detect_image_array(
+        self, image_rgb: np.ndarray, *, params: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """Same as `detect_image_bytes` for a decoded `(H, W, 3)` uint8 RGB array.
+
+        The binary text mask comes back as `mask_u8` (`(H, W)` 0/255) instead of
+        `mask_png`.
+        """
+        return self._detect_image(at_least_2px(image_from_array(image_rgb)), params)
+
+    def _detect_image(self, image_rgb, params: dict[str, Any] | None) -> dict[str, Any]:
         selected_device = _resolve_selected_backend_device(self._device or "cpu")
         model_key = self._model_key(selected_device)
         checkpoint = self._checkpoint_name()
         model_dir = _resolve_checkpoint_local_dir(checkpoint)
         log.info(
-            "Surya detect_image_bytes start bytes=%s device=%s model_key=%s checkpoint=%s model_dir=%s",
-            len(image_bytes),
+            "Surya detect start size=%sx%s device=%s model_key=%s checkpoint=%s model_dir=%s",
+            image_rgb.size[0],
+            image_rgb.size[1],
             selected_device,
             model_key,
             checkpoint,
@@ -108,26 +155,195 @@ class SuryaTextDetectorService:
         try:
             with self._lock:
                 predictor = self._ensure_predictor_locked(selected_device)
-            payload = self._detect_with_predictor(image_bytes, predictor)
+            payload = self._detect_with_predictor(
+                image_rgb, predictor, normalize_tile_params(params)
+            )
             log.info(
-                "Surya detect_image_bytes done device=%s blocks=%s lines=%s mask_png_len=%s",
+                "Surya detect done device=%s blocks=%s lines=%s",
                 selected_device,
                 len(payload.get("blocks", [])),
                 len(payload.get("lines", [])),
-                len(payload.get("mask_png", b"")),
             )
             if lease.needs_load:
                 lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
             self._last_error = None
             return payload
         except Exception as exc:
-            log.exception("Surya detect_image_bytes failed device=%s error=%s", selected_device, exc)
+            log.exception("Surya detect failed device=%s error=%s", selected_device, exc)
+            if lease.needs_load:
+                lease.mark_load_failed()
+            self._last_error = str(exc)
+            raise
+        finally:
+            lease.release()
+
+    def detect_pages(
+        self,
+        page_paths: Sequence[str],
+        *,
+        params: dict[str, Any] | None = None,
+        batch_size: int | None = None,
+        on_result: PageResultCallback | None = None,
+        keep_results: bool = True,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `detect_page`; pages are read one chunk at a time."""
+        paths = [str(path) for path in page_paths]
+        return self._detect_many(
+            len(paths),
+            lambda index: self._decode_image(Path(paths[index]).read_bytes()),
+            params=params,
+            batch_size=batch_size,
+            on_result=on_result,
+            encode_masks=True,
+            keep_results=keep_results,
+        )
+
+    def detect_images_bytes(
+        self,
+        images_bytes: Sequence[bytes],
+        *,
+        params: dict[str, Any] | None = None,
+        batch_size: int | None = None,
+        on_result: PageResultCallback | None = None,
+        keep_results: bool = True,
+    ) -> list[dict[str, Any]]:
+        """Batch variant of `detect_image_bytes`: one lease, batched predictor calls.
+
+        Pages are fed to the predictor `batch_size` at a time (default
+        `DEFAULT_BATCH_PAGES` pages with Surya's own forward-pass batch size);
+        pages that take the tiled path are detected on their own. Every page's
+        payload is passed to `on_result(index, payload)` in input order as soon
+        as it is ready. With `keep_results=False` payloads are only handed to
+        `on_result` and not accumulated (the call returns `[]`), so a long
+        chapter never holds every mask at once.
+        """
+        images = list(images_bytes)
+        return self._detect_many(
+            len(images),
+            lambda index: self._decode_image(images[index]),
+            params=params,
+            batch_size=batch_size,
+            on_result=on_result,
+            encode_masks=True,
+            keep_results=keep_results,
+        )
+
+    def detect_images_array(
+        self,
+        images_rgb: Sequence[np.ndarray],
+        *,
+        params: dict[str, Any] | None = None,
+        batch_size: int | None = None,
+        on_result: PageResultCallback | None = None,
+    ) -> list[dict[str, Any]]:
+        """`detect_images_bytes` for decoded RGB arrays; payloads carry `mask_u8`."""
+        images = list(images_rgb)
+        return self._detect_many(
+            len(images),
+            lambda index: at_least_2px(image_from_array(images[index])),
+            params=params,
+            batch_size=batch_size,
+            on_result=on_result,
+            encode_masks=False,
+        )
+
+    def _detect_many(
+        self,
+        count: int,
+        load_page: Callable[[int], Any],
+        *,
+        params: dict[str, Any] | None,
+        batch_size: int | None,
+        on_result: PageResultCallback | None,
+        encode_masks: bool,
+        keep_results: bool = True,
+    ) -> list[dict[str, Any]]:
+        if batch_size is not None and not 1 <= int(batch_size) <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size должен быть в диапазоне 1..{MAX_BATCH_SIZE}.")
+        tile_params = normalize_tile_params(params)
+        pages_per_call = int(batch_size) if batch_size is not None else DEFAULT_BATCH_PAGES
+        results: list[dict[str, Any]] = []
+        finished = 0
+        if count <= 0:
+            return results
+
+        selected_device = _resolve_selected_backend_device(self._device or "cpu")
+        model_key = self._model_key(selected_device)
+        log.info(
+            "Surya detect batch start pages=%s batch_size=%s device=%s",
+            count,
+            batch_size,
+            selected_device,
+        )
+        lease = self._model_manager.begin_model_use(
+            model_key,
+            unload_callback=lambda: self._unload_key(model_key),
+        )
+        try:
+            with self._lock:
+                predictor = self._ensure_predictor_locked(selected_device)
+            if lease.needs_load:
+                lease.mark_loaded(unload_callback=lambda: self._unload_key(model_key))
+            cv2 = self._ensure_cv2()
+
+            def finish(payload: dict[str, Any]) -> None:
+                nonlocal finished
+                if encode_masks:
+                    payload = _with_mask_png(cv2, payload)
+                index = finished
+                finished += 1
+                if keep_results:
+                    results.append(payload)
+                if on_result is not None:
+                    on_result(index, payload)
+
+            pending: list[Any] = []
+            for index in range(count):
+                image_rgb = load_page(index)
+                image_w, image_h = image_rgb.size
+                if should_tile(image_w, image_h, tile_params):
+                    # Keep input order: flush the open chunk before a tiled page.
+                    self._flush_batch(pending, predictor, batch_size, finish)
+                    pending = []
+                    finish(self._detect_tiled_page(image_rgb, predictor, tile_params))
+                    continue
+                pending.append(image_rgb)
+                if len(pending) >= pages_per_call:
+                    self._flush_batch(pending, predictor, batch_size, finish)
+                    pending = []
+            self._flush_batch(pending, predictor, batch_size, finish)
+            self._last_error = None
+        except Exception as exc:
             if lease.needs_load:
                 lease.mark_load_failed()
             self._last_error = str(exc)
             raise
         finally:
             lease.release()
+        log.info("Surya detect batch done pages=%s", finished)
+        return results
+
+    def _flush_batch(
+        self,
+        images_rgb: list[Any],
+        predictor,
+        batch_size: int | None,
+        finish: Callable[[dict[str, Any]], None],
+    ) -> None:
+        if not images_rgb:
+            return
+        heatmaps = self._predict_heatmaps(images_rgb, predictor, batch_size)
+        for image_rgb, heatmap in zip(images_rgb, heatmaps):
+            blocks, lines, source_mask = self._postprocess_heatmap(heatmap, image_rgb.size)
+            finish(
+                {
+                    "source_size": list(image_rgb.size),
+                    "blocks": blocks,
+                    "lines": lines,
+                    "mask_u8": source_mask,
+                    "tiles": 1,
+                }
+            )
 
     def _ensure_predictor_locked(self, device: str):
         if self._predictor is not None and self._device == device:
@@ -192,56 +408,120 @@ class SuryaTextDetectorService:
                 f"Surya detector checkpoint download finished but manifest is incomplete: {local_dir}"
             )
 
-    def _detect_with_predictor(self, image_bytes: bytes, predictor) -> dict[str, Any]:
-        from surya.common.util import clean_boxes  # type: ignore
-        from surya.common.polygon import PolygonBox  # type: ignore
-        from surya.settings import settings  # type: ignore
-
-        cv2 = self._ensure_cv2()
-        image = self._decode_image(image_bytes)
-        image_rgb = image.convert("RGB")
+    def _detect_with_predictor(
+        self, image_rgb, predictor, tile_params: dict[str, Any]
+    ) -> dict[str, Any]:
         image_w, image_h = image_rgb.size
-        image_np = np.asarray(image_rgb, dtype=np.uint8)
         log.info("Surya predictor input image_size=%sx%s", image_w, image_h)
+
+        if should_tile(image_w, image_h, tile_params):
+            return self._detect_tiled_page(image_rgb, predictor, tile_params)
+        blocks, lines, source_mask = self._detect_rgb(image_rgb, predictor)
+        log.info("Surya final payload blocks=%s lines=%s", len(blocks), len(lines))
+        return {
+            "source_size": [image_w, image_h],
+            "blocks": blocks,
+            "lines": lines,
+            "mask_u8": source_mask,
+            "tiles": 1,
+        }
+
+    def _detect_tiled_page(
+        self, image_rgb, predictor, tile_params: dict[str, Any]
+    ) -> dict[str, Any]:
+        image_w, image_h = image_rgb.size
+        source_mask, tile_blocks, windows = detect_strip(
+            np.asarray(image_rgb, dtype=np.uint8),
+            lambda crop: self._detect_window(crop, predictor),
+            tile_height=tile_params["tile_height"],
+            overlap=tile_params["tile_overlap"],
+        )
+        blocks, lines = _lines_from_tile_blocks(tile_blocks)
         log.info(
-            "Surya predictor input pixels min=%s max=%s mean=%.3f std=%.3f",
-            int(np.min(image_np)),
-            int(np.max(image_np)),
-            float(np.mean(image_np)),
-            float(np.std(image_np)),
+            "Surya tiled detection windows=%s blocks=%s lines=%s",
+            len(windows),
+            len(blocks),
+            len(lines),
         )
+        return {
+            "source_size": [image_w, image_h],
+            "blocks": blocks,
+            "lines": lines,
+            "mask_u8": source_mask,
+            "tiles": len(windows),
+        }
 
-        detection_batches = list(
-            predictor.batch_detection(
-                [image_rgb], batch_size=1, static_cache=settings.DETECTOR_STATIC_CACHE
-            )
-        )
-        if not detection_batches:
+    def _detect_window(self, crop: np.ndarray, predictor):
+        from PIL import Image
+
+        _, lines, mask = self._detect_rgb(Image.fromarray(crop, mode="RGB"), predictor)
+        return mask, [(line["bbox"], line) for line in lines]
+
+    def _detect_rgb(self, image_rgb, predictor) -> tuple[list[dict], list[dict], np.ndarray]:
+        """Detects one RGB PIL image; returns `(blocks, lines, source_mask)`."""
+        heatmap = self._predict_heatmaps([image_rgb], predictor, 1)[0]
+        return self._postprocess_heatmap(heatmap, image_rgb.size)
+
+    def _predict_heatmaps(
+        self, images_rgb: list[Any], predictor, batch_size: int | None
+    ) -> list[np.ndarray]:
+        """Runs the detector on RGB PIL images; returns one float32 heatmap per image."""
+        from surya.settings import settings  # type: ignore
+
+        if _diagnostics_enabled():
+            for image_rgb in images_rgb:
+                image_np = np.asarray(image_rgb, dtype=np.uint8)
+                log.debug(
+                    "Surya predictor input size=%sx%s pixels min=%s max=%s mean=%.3f std=%.3f",
+                    image_rgb.size[0],
+                    image_rgb.size[1],
+                    int(np.min(image_np)),
+                    int(np.max(image_np)),
+                    float(np.mean(image_np)),
+                    float(np.std(image_np)),
+                )
+
+        heatmaps: list[np.ndarray] = []
+        for preds, orig_sizes in predictor.batch_detection(
+            images_rgb, batch_size=batch_size, static_cache=settings.DETECTOR_STATIC_CACHE
+        ):
+            if not preds or not orig_sizes:
+                raise RuntimeError("Surya detector returned empty prediction payload.")
+            for pred in preds:
+                heatmap = pred[0]
+                if heatmap.dtype != np.float32:
+                    heatmap = heatmap.astype(np.float32)
+                heatmaps.append(heatmap)
+        if not heatmaps:
             raise RuntimeError("Surya detector returned no predictions.")
+        if len(heatmaps) != len(images_rgb):
+            raise RuntimeError(
+                f"Surya detector returned {len(heatmaps)} heatmaps for {len(images_rgb)} images."
+            )
+        return heatmaps
 
-        preds, orig_sizes = detection_batches[0]
-        if not preds or not orig_sizes:
-            raise RuntimeError("Surya detector returned empty prediction payload.")
-
-        heatmap = preds[0][0]
-        if heatmap.dtype != np.float32:
-            heatmap = heatmap.astype(np.float32)
-        finite_mask = np.isfinite(heatmap)
-        finite_count = int(np.count_nonzero(finite_mask))
-        total_count = int(heatmap.size)
-        nonfinite_count = total_count - finite_count
-        log.info(
-            "Surya heatmap stats shape=%s dtype=%s min=%.6f max=%.6f mean=%.6f finite=%s/%s nonfinite=%s",
-            tuple(int(v) for v in heatmap.shape),
-            heatmap.dtype,
-            float(np.nanmin(heatmap)),
-            float(np.nanmax(heatmap)),
-            float(np.nanmean(heatmap)),
-            finite_count,
-            total_count,
-            nonfinite_count,
-        )
-        if nonfinite_count > 0:
+    def _postprocess_heatmap(
+        self, heatmap: np.ndarray, image_size: tuple[int, int]
+    ) -> tuple[list[dict], list[dict], np.ndarray]:
+        """Turns one detector heatmap into `(blocks, lines, source_mask)` for `image_size`."""
+        from surya.common.util import clean_boxes  # type: ignore
+        from surya.common.polygon import PolygonBox  # type: ignore
+        from surya.settings import settings  # type: ignore
+
+        cv2 = self._ensure_cv2()
+        image_w, image_h = image_size
+        if _diagnostics_enabled():
+            log.debug(
+                "Surya heatmap stats shape=%s dtype=%s min=%.6f max=%.6f mean=%.6f",
+                tuple(int(v) for v in heatmap.shape),
+                heatmap.dtype,
+                float(np.nanmin(heatmap)),
+                float(np.nanmax(heatmap)),
+                float(np.nanmean(heatmap)),
+            )
+        if not np.isfinite(heatmap).all():
+            total_count = int(heatmap.size)
+            nonfinite_count = total_count - int(np.count_nonzero(np.isfinite(heatmap)))
             raise RuntimeError(
                 "Surya detector returned non-finite heatmap values. "
                 f"device={self._device or 'unknown'} nonfinite={nonfinite_count}/{total_count}"
@@ -256,14 +536,13 @@ class SuryaTextDetectorService:
         )
         log.info(
             "Surya postprocess raw processor_size=%s labels=%s accepted=%s "
-            "text_threshold=%.6f low_text=%.6f max_confidence=%.6f proc_mask_nonzero=%s",
+            "text_threshold=%.6f low_text=%.6f max_confidence=%.6f",
             processor_size,
             debug_stats["label_count"],
             len(boxes),
             debug_stats["text_threshold"],
             debug_stats["low_text"],
             debug_stats["max_confidence"],
-            debug_stats["proc_mask_nonzero"],
         )
 
         polygon_boxes = [
@@ -288,13 +567,13 @@ class SuryaTextDetectorService:
             (image_w, image_h),
             interpolation=cv2.INTER_NEAREST,
         )
-        log.info(
-            "Surya postprocess cleaned_boxes=%s source_mask_nonzero=%s source_mask_size=%sx%s",
-            len(polygon_boxes),
-            int(np.count_nonzero(source_mask)),
-            image_w,
-            image_h,
-        )
+        if _diagnostics_enabled():
+            log.debug(
+                "Surya postprocess cleaned_boxes=%s proc_mask_nonzero=%s source_mask_nonzero=%s",
+                len(polygon_boxes),
+                int(np.count_nonzero(proc_mask)),
+                int(np.count_nonzero(source_mask)),
+            )
 
         lines = []
         blocks = []
@@ -322,28 +601,14 @@ class SuryaTextDetectorService:
                     "confidence": float(box.confidence or 0.0),
                 }
             )
-        log.info("Surya final payload blocks=%s lines=%s", len(blocks), len(lines))
-
-        return {
-            "source_size": [image_w, image_h],
-            "blocks": blocks,
-            "lines": lines,
-            "mask_png": _encode_mask_png_bytes(cv2, source_mask),
-        }
+        return blocks, lines, source_mask
 
     @staticmethod
     def _decode_image(image_bytes: bytes):
         from PIL import Image
 
         with Image.open(io.BytesIO(image_bytes)) as img:
-            rgb = img.convert("RGB")
-            width, height = rgb.size
-            if width >= 2 and height >= 2:
-                return rgb
-
-            resampling = getattr(getattr(Image, "Resampling", Image), "NEAREST")
-            target_size = (max(2, width), max(2, height))
-            return rgb.resize(target_size, resample=resampling)
+            return at_least_2px(img.convert("RGB"))
 
     @staticmethod
     def _ensure_cv2():
@@ -376,6 +641,29 @@ class SuryaTextDetectorService:
         return str(settings.DETECTOR_MODEL_CHECKPOINT)
 
 
+def _lines_from_tile_blocks(tile_blocks: list[TileBlock]) -> tuple[list[dict], list[dict]]:
+    """Window lines shifted to page rows; seam-merged lines become their union rectangle."""
+    blocks: list[dict] = []
+    lines: list[dict] = []
+    for block in tile_blocks:
+        x1, y1, x2, y2 = block.xyxy
+        if block.merged:
+            polygon = [
+                [float(x1), float(y1)],
+                [float(x2), float(y1)],
+                [float(x2), float(y2)],
+                [float(x1), float(y2)],
+            ]
+            confidence = max(float(line.get("confidence", 0.0)) for line in block.payloads)
+        else:
+            line, top = block.payloads[0], block.payload_tops[0]
+            polygon = [[float(x), float(y) + top] for x, y in line["polygon"]]
+            confidence = float(line.get("confidence", 0.0))
+        blocks.append({"x1": x1, "y1": y1, "x2": x2, "y2": y2})
+        lines.append({"polygon": polygon, "bbox": [x1, y1, x2, y2], "confidence": confidence})
+    return blocks, lines
+
+
 def _extract_mask_and_boxes(
     *,
     cv2,
@@ -385,68 +673,64 @@ def _extract_mask_and_boxes(
 ) -> tuple[list[np.ndarray], list[float], np.ndarray, dict[str, float | int]]:
     from surya.detection.heatmap import get_dynamic_thresholds  # type: ignore
 
-    img_h, img_w = linemap.shape
     text_threshold, low_text = get_dynamic_thresholds(linemap, text_threshold, low_text)
-    text_score_comb = (linemap > low_text).astype(np.uint8)
-    label_count, labels, stats, _ = cv2.connectedComponentsWithStats(
-        text_score_comb, connectivity=4
+    det, confidences, binary_mask, label_count = _boxes_from_linemap(
+        cv2, linemap, text_threshold=text_threshold, low_text=low_text
     )
+    max_confidence = max(confidences, default=0.0)
+    if max_confidence > 0:
+        confidences = [confidence / max_confidence for confidence in confidences]
+
+    return det, confidences, binary_mask, {
+        "label_count": label_count,
+        "text_threshold": float(text_threshold),
+        "low_text": float(low_text),
+        "max_confidence": float(max_confidence),
+    }
+
+
+def _boxes_from_linemap(
+    cv2,
+    linemap: np.ndarray,
+    *,
+    text_threshold: float,
+    low_text: float,
+) -> tuple[list[np.ndarray], list[float], np.ndarray, int]:
+    """Surya heatmap -> `(boxes, raw_confidences, binary_mask, label_count)`.
+
+    Size and peak-score filters run on all labels at once; dilation and box
+    fitting only run for the components that pass them.
+    """
+    img_h, img_w = linemap.shape
+    components = score_components(linemap > low_text, linemap, connectivity=4)
+    labels = components.labels
+    survivors = select_components(components, min_area=10, min_max_score=text_threshold)
 
     det: list[np.ndarray] = []
     confidences: list[float] = []
-    max_confidence = 0.0
     binary_mask = np.zeros((img_h, img_w), dtype=np.uint8)
+    stats = components.stats[
+        :, [cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT]
+    ]
 
-    for label_idx in range(1, label_count):
-        size = int(stats[label_idx, cv2.CC_STAT_AREA])
-        if size < 10:
-            continue
-
-        x, y, width, height = [
-            int(value)
-            for value in stats[
-                label_idx,
-                [
-                    cv2.CC_STAT_LEFT,
-                    cv2.CC_STAT_TOP,
-                    cv2.CC_STAT_WIDTH,
-                    cv2.CC_STAT_HEIGHT,
-                ],
-            ]
-        ]
-
-        try:
-            niter = int(np.sqrt(min(width, height)))
-        except ValueError:
-            niter = 0
-
+    for label_idx in survivors.tolist():
+        x, y, width, height = (int(value) for value in stats[label_idx])
+        niter = int(np.sqrt(min(width, height)))
         buffer = 1
         sx = max(0, x - niter - buffer)
         sy = max(0, y - niter - buffer)
         ex = min(img_w, x + width + niter + buffer)
         ey = min(img_h, y + height + niter + buffer)
 
-        component_mask = labels[sy:ey, sx:ex] == label_idx
-        selected_linemap = linemap[sy:ey, sx:ex][component_mask]
-        if selected_linemap.size == 0:
-            continue
-
-        line_max = float(np.max(selected_linemap))
-        if line_max < text_threshold:
-            continue
-
-        segmap = component_mask.astype(np.uint8)
+        segmap = (labels[sy:ey, sx:ex] == label_idx).astype(np.uint8)
         ksize = max(1, buffer + niter)
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (ksize, ksize))
         selected_segmap = cv2.dilate(segmap, kernel)
         binary_mask[sy:ey, sx:ex][selected_segmap > 0] = 255
 
-        y_inds, x_inds = np.nonzero(selected_segmap)
-        x_inds += sx
-        y_inds += sy
-        if x_inds.size == 0 or y_inds.size == 0:
-            continue
-        np_contours = np.column_stack((x_inds, y_inds))
+        # The outline has the same convex hull as the full pixel set; sorted
+        # row-major like `np.nonzero`, it yields the identical min-area box.
+        np_contours = outline_points(selected_segmap) + (sx, sy)
         rectangle = cv2.minAreaRect(np_contours)
         box = cv2.boxPoints(rectangle)
 
@@ -466,19 +750,15 @@ def _extract_mask_and_boxes(
         startidx = box.sum(axis=1).argmin()
         box = np.roll(box, 4 - startidx, 0)
         det.append(box)
-        confidences.append(line_max)
-        max_confidence = max(max_confidence, line_max)
+        confidences.append(float(components.max_score[label_idx]))
 
-    if max_confidence > 0:
-        confidences = [confidence / max_confidence for confidence in confidences]
+    return det, confidences, binary_mask, int(max(0, components.count - 1))
 
-    return det, confidences, binary_mask, {
-        "label_count": int(max(0, label_count - 1)),
-        "text_threshold": float(text_threshold),
-        "low_text": float(low_text),
-        "max_confidence": float(max_confidence),
-        "proc_mask_nonzero": int(np.count_nonzero(binary_mask)),
-    }
+
+def _with_mask_png(cv2, payload: dict[str, Any]) -> dict[str, Any]:
+    """Replaces the payload's `mask_u8` array with its PNG encoding (`mask_png`)."""
+    payload["mask_png"] = _encode_mask_png_bytes(cv2, payload.pop("mask_u8"))
+    return payload
 
 
 def _encode_mask_png_bytes(cv2, mask: np.ndarray) -> bytes:
@@ -510,56 +790,8 @@ def _check_checkpoint_ready(local_dir: str) -> bool:
     return bool(check_manifest(normalized))
 
 
-def _read_configured_device() -> str | None:
-    config_root = getattr(UserConfig, "config", None)
-    if not isinstance(config_root, dict):
-        return None
-    general = config_root.get("General")
-    if not isinstance(general, dict):
-        return None
-    value = general.get("ai_device")
-    if not isinstance(value, str):
-        return None
-    normalized = value.strip().lower()
-    if normalized == "not-selected":
-        return None
-    return normalized or None
-
-
-def _safe_available_devices() -> set[str]:
-    try:
-        return set(AIDevice.detect_available_devices())
-    except Exception:
-        return {"cpu"}
-
-
-def _normalize_backend_device(raw: str, fallback: str) -> str:
-    normalized = str(raw or "").strip().lower()
-    if normalized == "cpu" or normalized == "cuda" or normalized.startswith("cuda:"):
-        return normalized
-    if normalized == "mps":
-        return normalized
-    return str(fallback or "cpu").strip().lower() or "cpu"
-
-
 def _resolve_selected_backend_device(fallback: str) -> str:
-    fallback_norm = _normalize_backend_device(fallback, "cpu")
-    configured = _read_configured_device()
-    if configured is None:
-        configured = fallback_norm
-
-    normalized = _normalize_backend_device(configured, fallback_norm)
-    available = _safe_available_devices()
-
-    if normalized in available:
-        return normalized
-    if normalized.startswith("cuda") and "cuda" in available:
-        return "cuda"
-    if fallback_norm in available:
-        return fallback_norm
-    if "cuda" in available:
-        return "cuda"
-    return "cpu"
+    return resolve_backend_device(fallback, accept_mps=True)
 
 
 def _preferred_detector_dtype(device: str):
@@ -0,0 +1,122 @@
+"""
+File: modules/ai_backend/test_ctd_textmask.py
+
+Purpose:
+Unit tests for the CTD mask refinement (`textdetector/ctd/textmask.py`).
+
+Main responsibilities:
+- verify the label-vectorized `merge_mask_list` is mask-identical to the
+  per-component loop it replaced, in both refine modes;
+- verify the thread-pooled `refine_mask` matches a sequential per-block run.
+
+The `textdetector.ctd` package imports torch, so these tests are skipped where
+torch is not installed; numpy and OpenCV are required as well.
+"""
+
+from __future__ import annotations
+
+import unittest
+from unittest import mock
+
+try:
+    import cv2 as _cv2_for_tests
+    import numpy as _np_for_tests
+
+    from modules.ai_backend.textdetector.ctd import textmask
+    from modules.ai_backend.textdetector.td_utlis import TextBlock
+except Exception:
+    _cv2_for_tests = None
+    _np_for_tests = None
+    textmask = None
+
+
+def _reference_merge(mask_list, pred_mask, refine_mode):
+    """The per-component `merge_mask_list` loop, kept as the behavioural oracle."""
+    cv2, np = _cv2_for_tests, _np_for_tests
+    mask_list = sorted(mask_list, key=lambda x: x[1])
+    element = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3), (1, 1))
+    pred_mask = cv2.erode(pred_mask, element, iterations=1)
+    _, pred_mask = cv2.threshold(pred_mask, 60, 255, cv2.THRESH_BINARY)
+    mask_merged = np.zeros_like(pred_mask)
+
+    def try_merge(labels, label_index, stat):
+        x, y, w, h, _area = stat
+        region = (slice(y, y + h), slice(x, x + w))
+        tmp_merged = np.zeros_like(labels[region], np.uint8)
+        tmp_merged[labels[region] == label_index] = 255
+        tmp_merged = cv2.bitwise_or(mask_merged[region], tmp_merged)
+        xor_merged = cv2.bitwise_xor(tmp_merged, pred_mask[region]).sum()
+        xor_origin = cv2.bitwise_xor(mask_merged[region], pred_mask[region]).sum()
+        if xor_merged < xor_origin:
+            mask_merged[region] = tmp_merged
+
+    for candidate_mask, _xor_sum in mask_list:
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(candidate_mask, 8, cv2.CV_16U)
+        for label_index in range(1, num_labels):
+            if stats[label_index][2] * stats[label_index][3] >= 3:
+                try_merge(labels, label_index, stats[label_index])
+    if refine_mode == textmask.REFINEMASK_INPAINT:
+        mask_merged = cv2.dilate(mask_merged, np.ones((5, 5), np.uint8), iterations=1)
+    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(255 - mask_merged, 8, cv2.CV_16U)
+    sorted_area = np.sort(stats[:, -1])
+    area_thresh = sorted_area[-2] if len(sorted_area) > 1 else sorted_area[-1]
+    for label_index in range(num_labels):
+        if stats[label_index][-1] < area_thresh:
+            try_merge(labels, label_index, stats[label_index])
+    return mask_merged
+
+
+def _synthetic_page(seed: int, height: int = 360, width: int = 240):
+    """Dark glyph-like strokes on a light page, plus a noisy prediction mask."""
+    cv2, np = _cv2_for_tests, _np_for_tests
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 235, np.uint8)
+    truth = np.zeros((height, width), np.uint8)
+    blocks = []
+    for _ in range(6):
+        bx, by = int(rng.integers(10, width - 70)), int(rng.integers(10, height - 50))
+        blocks.append(TextBlock([bx, by, bx + 60, by + 40]))
+        for _ in range(12):
+            x, y = bx + int(rng.integers(0, 55)), by + int(rng.integers(0, 35))
+            w, h = int(rng.integers(1, 6)), int(rng.integers(1, 8))
+            color = tuple(int(c) for c in rng.integers(0, 80, size=3))
+            cv2.rectangle(img, (x, y), (x + w, y + h), color, -1)
+            cv2.rectangle(truth, (x, y), (x + w, y + h), 255, -1)
+    noise = rng.integers(0, 40, size=img.shape, dtype=np.uint8)
+    img = cv2.subtract(img, noise)
+    pred = cv2.GaussianBlur(truth, (5, 5), 0)
+    pred = cv2.add(pred, rng.integers(0, 50, size=pred.shape, dtype=np.uint8))
+    return img, pred, blocks
+
+
+@unittest.skipIf(textmask is None, "torch, numpy and cv2 are required")
+class MergeMaskListTests(unittest.TestCase):
+    def test_matches_per_component_loop(self) -> None:
+        for seed in range(4):
+            img, pred, blocks = _synthetic_page(seed)
+            for blk in blocks:
+                x1, y1, x2, y2 = textmask.enlarge_window(blk.xyxy, img.shape[1], img.shape[0])
+                im = _np_for_tests.ascontiguousarray(img[y1:y2, x1:x2])
+                msk = _np_for_tests.ascontiguousarray(pred[y1:y2, x1:x2])
+                mask_list = textmask.get_topk_masklist(im, msk)
+                mask_list += textmask.get_otsuthresh_masklist(im, msk, per_channel=True)
+                for mode in (textmask.REFINEMASK_INPAINT, textmask.REFINEMASK_ANNOTATION):
+                    expected = _reference_merge(list(mask_list), msk, mode)
+                    actual = textmask.merge_mask_list(list(mask_list), msk, refine_mode=mode)
+                    self.assertTrue(_np_for_tests.array_equal(actual, expected), (seed, blk.xyxy, mode))
+
+
+@unittest.skipIf(textmask is None, "torch, numpy and cv2 are required")
+class RefineMaskTests(unittest.TestCase):
+    def test_parallel_blocks_match_sequential(self) -> None:
+        img, pred, blocks = _synthetic_page(7)
+        with mock.patch.object(textmask, "REFINE_MAX_WORKERS", 1):
+            sequential = textmask.refine_mask(img, pred, blocks)
+        with mock.patch.object(textmask, "REFINE_MAX_WORKERS", 4):
+            parallel = textmask.refine_mask(img, pred, blocks)
+        self.assertTrue(sequential.any())
+        self.assertTrue(_np_for_tests.array_equal(parallel, sequential))
+
+
+if __name__ == "__main__":
+    unittest.main()
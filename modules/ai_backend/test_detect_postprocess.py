@@ -0,0 +1,136 @@
+"""
+File: modules/ai_backend/test_detect_postprocess.py
+
+Purpose:
+Unit tests for the shared detector post-processing (`detect_postprocess.py`)
+and its use by the Surya and PaddleOCR DB detectors.
+
+Coverage:
+- per-label max / mean reductions match a per-label reference;
+- component selection by area and score thresholds;
+- the contour / component size prefilters never drop a contour whose
+  min-area box would pass the short-side check;
+- outline points give the same min-area box as the full pixel set;
+- batched min-area boxes use PaddleOCR's corner order;
+- Surya and Paddle outputs are identical to the per-component loops they
+  replaced (kept in `benchmarks/bench_detect_postprocess.py`).
+"""
+
+from __future__ import annotations
+
+import cv2
+import numpy as np
+import pytest
+
+from modules.ai_backend import detect_postprocess as dp
+from modules.ai_backend.benchmarks.bench_detect_postprocess import (
+    _legacy_mini_box,
+    _legacy_paddle,
+    _legacy_surya,
+    synthetic_heatmap,
+)
+from modules.ai_backend.paddle_onnx_runtime import DBPostProcess
+from modules.ai_backend.surya_text_detector_service import _boxes_from_linemap
+
+
+def _blobs(seed: int = 0, shape: tuple[int, int] = (120, 160)) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    scores = rng.random(shape, dtype=np.float32)
+    return (cv2.GaussianBlur(scores, (5, 5), 1.5) > 0.5).astype(np.uint8), scores
+
+
+def test_label_reductions_match_per_label_reference() -> None:
+    binary, scores = _blobs()
+    components = dp.score_components(binary, scores, connectivity=4, with_mean=True)
+    assert components.count > 10
+    assert components.max_score[0] == -np.inf and components.mean_score[0] == 0.0
+    for label in range(1, components.count):
+        values = scores[components.labels == label]
+        assert components.max_score[label] == values.max()
+        assert components.mean_score[label] == pytest.approx(values.mean(), rel=1e-6)
+
+
+def test_select_components_applies_every_threshold() -> None:
+    binary, scores = _blobs(1)
+    components = dp.score_components(binary, scores, with_mean=True)
+    area = components.stats[:, cv2.CC_STAT_AREA]
+    selected = dp.select_components(components, min_area=5, min_max_score=0.9, min_mean_score=0.5)
+    expected = [
+        label
+        for label in range(1, components.count)
+        if area[label] >= 5
+        and components.max_score[label] >= 0.9
+        and components.mean_score[label] >= 0.5
+    ]
+    assert selected.tolist() == expected
+    with pytest.raises(ValueError):
+        dp.select_components(dp.score_components(binary, scores), min_mean_score=0.5)
+
+
+def test_size_prefilters_only_drop_contours_that_would_fail() -> None:
+    rng = np.random.default_rng(2)
+    bitmap = (rng.random((200, 200)) > 0.8).astype(np.uint8)
+    bitmap[40:60, 30:90] = 1
+    bitmap[120:123, 20:80] = 1
+    contours, _ = cv2.findContours(bitmap * 255, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    kept = set(dp.contour_candidates(contours, 3).tolist())
+    passing = {idx for idx, c in enumerate(contours) if _legacy_mini_box(c)[1] >= 3}
+    assert passing <= kept < set(range(len(contours)))
+
+    def passing_boxes(found) -> list[list[float]]:
+        boxes = [_legacy_mini_box(c) for c in found]
+        return sorted(box.tolist() for box, short_side in boxes if short_side >= 3)
+
+    cleaned = dp.drop_small_components(bitmap, 3)
+    cleaned_contours, _ = cv2.findContours(cleaned * 255, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    assert len(cleaned_contours) < len(contours)
+    assert passing_boxes(cleaned_contours) == passing_boxes(contours)
+
+
+def test_outline_points_give_same_min_area_box_as_all_pixels() -> None:
+    binary, _ = _blobs(3)
+    count, labels, _, _ = cv2.connectedComponentsWithStats(binary, connectivity=4)
+    for label in range(1, count):
+        mask = cv2.dilate((labels == label).astype(np.uint8), np.ones((3, 3), np.uint8))
+        y_inds, x_inds = np.nonzero(mask)
+        full = cv2.boxPoints(cv2.minAreaRect(np.column_stack((x_inds, y_inds))))
+        outline = cv2.boxPoints(cv2.minAreaRect(dp.outline_points(mask)))
+        assert np.array_equal(full, outline), label
+
+
+def test_min_area_boxes_match_paddle_corner_order() -> None:
+    binary, _ = _blobs(4)
+    contours, _ = cv2.findContours(binary * 255, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    boxes, short_sides = dp.min_area_boxes(contours)
+    for contour, box, short_side in zip(contours, boxes, short_sides):
+        expected_box, expected_side = _legacy_mini_box(contour)
+        assert np.array_equal(box, expected_box)
+        assert short_side == pytest.approx(expected_side)
+    empty_boxes, empty_sides = dp.min_area_boxes([])
+    assert empty_boxes.shape == (0, 4, 2) and empty_sides.shape == (0,)
+
+
+@pytest.mark.parametrize("noise_seed", [0, 5])
+def test_surya_boxes_match_per_label_loop(noise_seed: int) -> None:
+    heatmap = synthetic_heatmap(320, 900, seed=noise_seed)
+    boxes, confidences, mask, label_count = _boxes_from_linemap(
+        cv2, heatmap, text_threshold=0.6, low_text=0.35
+    )
+    legacy_boxes, legacy_confidences, legacy_mask, legacy_count = _legacy_surya(heatmap, 0.6, 0.35)
+    assert boxes and label_count == legacy_count
+    assert confidences == legacy_confidences
+    assert np.array_equal(mask, legacy_mask)
+    assert all(np.array_equal(a, b) for a, b in zip(boxes, legacy_boxes))
+    assert len(boxes) == len(legacy_boxes)
+
+
+@pytest.mark.parametrize("noise_seed", [0, 5])
+def test_paddle_boxes_match_per_contour_loop(noise_seed: int) -> None:
+    heatmap = synthetic_heatmap(320, 900, seed=noise_seed)
+    heatmap = np.clip(heatmap - 0.1, 0.0, 1.0)
+    post = DBPostProcess(max_candidates=1_000_000)
+    boxes, scores = post.process_single(heatmap, *heatmap.shape)
+    legacy_boxes, legacy_scores = _legacy_paddle(post, heatmap)
+    assert boxes and scores == legacy_scores
+    assert len(boxes) == len(legacy_boxes)
+    assert all(np.array_equal(a, b) for a, b in zip(boxes, legacy_boxes))
@@ -0,0 +1,150 @@
+"""
+File: modules/ai_backend/test_detect_tiling.py
+
+Purpose:
+Unit tests for the streaming strip-detection engine (`detect_tiling.py`) and
+its use by the Paddle text detector service.
+
+Coverage:
+- window planning (overlap, cores partition the page, short pages);
+- `tiled_detection` param parsing and the auto trigger;
+- with a local (connected-component) fake detector, the tiled mask and blocks
+  match a single full-page pass, including blocks cut by a seam and a block
+  taller than the overlap;
+- the Paddle service stitches window polygons back to page coordinates.
+
+No models are loaded; detectors are replaced by OpenCV component labelling.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from modules.ai_backend import detect_tiling
+from modules.ai_backend.detect_tiling import (
+    detect_strip,
+    normalize_tile_params,
+    plan_strip_windows,
+    should_tile,
+)
+
+
+def _components(image: np.ndarray):
+    """Fake detector: dark pixels are text, each 8-connected component is a block."""
+    gray = image if image.ndim == 2 else image[:, :, 0]
+    mask = np.where(gray < 128, 255, 0).astype(np.uint8)
+    count, _labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = []
+    for label in range(1, count):
+        x, y, w, h = (int(v) for v in stats[label, :4])
+        boxes.append((x, y, x + w, y + h))
+    return mask, boxes
+
+
+def _strip(height: int = 9000, width: int = 600) -> np.ndarray:
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    rng = np.random.default_rng(5)
+    for _ in range(60):
+        x, y = int(rng.integers(100, width - 120)), int(rng.integers(0, height - 60))
+        image[y : y + int(rng.integers(10, 50)), x : x + int(rng.integers(20, 110))] = 0
+    # A block taller than any overlap, crossing several window seams (the
+    # random blocks stay right of it).
+    image[1500:4200, 40:70] = 0
+    return image
+
+
+def test_plan_windows_overlap_and_cores_partition_page() -> None:
+    windows = plan_strip_windows(10_000, 2048, 256)
+    assert windows[0].top == 0 and windows[-1].bottom == 10_000
+    assert all(w.height == 2048 for w in windows)
+    for prev, cur in zip(windows, windows[1:]):
+        assert prev.bottom - cur.top >= 256
+        assert prev.core_bottom == cur.core_top
+        assert cur.top < cur.core_top < prev.bottom
+    assert windows[0].core_top == 0 and windows[-1].core_bottom == 10_000
+    assert plan_strip_windows(1000, 2048, 256) == [detect_tiling.StripWindow(0, 1000, 0, 1000)]
+
+
+def test_tile_params_and_auto_trigger() -> None:
+    params = normalize_tile_params(
+        {"tiled_detection": "yes", "tile_height": 100, "tile_overlap": 10_000}
+    )
+    assert params == {
+        "tiled_detection": detect_tiling.TILE_MODE_ON,
+        "tile_height": detect_tiling.MIN_TILE_HEIGHT,
+        "tile_overlap": detect_tiling.MIN_TILE_HEIGHT // 2,
+    }
+    auto = normalize_tile_params(None)
+    assert should_tile(800, 30_000, auto)
+    assert not should_tile(800, 4_000, auto)  # ordinary tall page keeps one pass
+    assert not should_tile(4_000, 8_000, auto)  # not a narrow strip
+    assert should_tile(800, 4_000, normalize_tile_params({"tiled_detection": True}))
+    assert not should_tile(800, 30_000, normalize_tile_params({"tiled_detection": "off"}))
+
+
+def test_tiled_detection_matches_single_pass() -> None:
+    image = _strip()
+    full_mask, full_boxes = _components(image)
+
+    def detect_fn(crop: np.ndarray):
+        mask, boxes = _components(crop)
+        return mask, [(box, {"box": box}) for box in boxes]
+
+    mask, blocks, windows = detect_strip(image, detect_fn, tile_height=2048, overlap=256)
+    assert len(windows) > 3
+    assert np.array_equal(mask, full_mask)
+    assert sorted(tuple(block.xyxy) for block in blocks) == sorted(full_boxes)
+    tall = [block for block in blocks if block.xyxy[:2] == [40, 1500]]
+    assert len(tall) == 1 and tall[0].merged and tall[0].xyxy == [40, 1500, 70, 4200]
+
+
+def test_detect_strip_rejects_wrong_mask_size() -> None:
+    image = np.zeros((5000, 100, 3), dtype=np.uint8)
+    with pytest.raises(RuntimeError):
+        detect_strip(image, lambda crop: (np.zeros((10, 10), np.uint8), []), tile_height=2048)
+
+
+def test_paddle_service_stitches_window_polygons(monkeypatch) -> None:
+    from modules.ai_backend import paddle_text_detector_service as paddle_mod
+
+    image = _strip(height=7000, width=500)
+
+    class _WindowRuntime:
+        def __init__(self) -> None:
+            self.window_heights: list[int] = []
+
+        def detect(self, crop, _settings):
+            self.window_heights.append(int(crop.shape[0]))
+            _, boxes = _components(crop)
+            polys = [
+                np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+                for x1, y1, x2, y2 in boxes
+            ]
+            return {"boxes": polys, "scores": [0.9] * len(polys)}
+
+    monkeypatch.setattr(
+        paddle_mod,
+        "resolve_provider_settings",
+        lambda _cfg: SimpleNamespace(provider="cpu", device_id="0"),
+    )
+    svc = paddle_mod.PaddleTextDetectorService(SimpleNamespace())
+    runtime = _WindowRuntime()
+    svc._runtime = runtime
+
+    ok, encoded = cv2.imencode(".png", image)
+    assert ok
+    result = svc.detect_image_bytes(encoded.tobytes(), params={"tiled_detection": "on"})
+
+    assert result["tiles"] == len(runtime.window_heights) > 1
+    assert max(runtime.window_heights) == detect_tiling.DEFAULT_TILE_HEIGHT
+    _, full_boxes = _components(image)
+    got = sorted((b["x1"], b["y1"], b["x2"], b["y2"]) for b in result["blocks"])
+    assert got == sorted(full_boxes)
+    for poly in result["polys"]:
+        xs = [p[0] for p in poly["points"]]
+        ys = [p[1] for p in poly["points"]]
+        assert (min(xs), min(ys), max(xs), max(ys)) in full_boxes
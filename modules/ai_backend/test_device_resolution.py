@@ -0,0 +1,142 @@
+"""
+File: modules/ai_backend/test_device_resolution.py
+
+Purpose:
+Unit tests for the shared device-resolution cache (`device_resolution.py`).
+
+Coverage:
+- steady-state requests through the services' `_resolve_selected_backend_device`
+  do zero device probes; the counters report the probes avoided;
+- a config change re-resolves without probing and emits a `config` event;
+- `invalidate` with a fresh device list does not probe, without one the next
+  request probes once; `AiDeviceService.set_device` invalidates;
+- the MPS rules of the former per-service copies are kept;
+- the server listener publishes `device` events and wakes the health worker.
+"""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from modules.ai_backend import device_resolution
+from modules.ai_backend.device_resolution import DeviceResolution, read_configured_device
+from modules.ai_backend.ipc.protocol import TOPIC_DEVICE
+
+
+class _Probe:
+    def __init__(self, devices: list[str]) -> None:
+        self.devices = devices
+        self.calls = 0
+
+    def __call__(self) -> list[str]:
+        self.calls += 1
+        return list(self.devices)
+
+
+def _resolution(devices: list[str], configured: list[str | None]) -> tuple[DeviceResolution, _Probe]:
+    probe = _Probe(devices)
+    return DeviceResolution(probe=probe, read_configured=lambda: configured[0]), probe
+
+
+def test_steady_state_service_requests_do_not_probe(monkeypatch: pytest.MonkeyPatch) -> None:
+    from modules.ai_backend import ctd_text_detector_service, easy_ocr_service, lama_inpaint_service
+
+    resolution, probe = _resolution(["cpu", "cuda", "cuda:0"], ["cuda:0"])
+    monkeypatch.setattr(device_resolution, "DEVICE_RESOLUTION", resolution)
+
+    assert easy_ocr_service._resolve_selected_backend_device("cpu") == "cuda:0"
+    assert probe.calls == 1
+    for _ in range(200):
+        assert lama_inpaint_service._resolve_selected_backend_device("cpu") == "cuda:0"
+        assert ctd_text_detector_service._resolve_selected_backend_device("cuda") == "cuda:0"
+
+    stats = resolution.stats()
+    assert probe.calls == 1
+    assert (stats["resolutions"], stats["probes"], stats["probes_avoided"]) == (401, 1, 400)
+
+
+def test_config_change_re_resolves_without_probe() -> None:
+    configured: list[str | None] = ["cuda"]
+    resolution, probe = _resolution(["cpu", "cuda"], configured)
+    events: list[dict] = []
+    resolution.add_listener(events.append)
+
+    assert resolution.resolve("cpu") == "cuda"
+    configured[0] = "cpu"
+    assert resolution.resolve("cpu") == "cpu"
+    assert resolution.resolve("cpu") == "cpu"
+
+    assert probe.calls == 1
+    assert [(e["reason"], e["configured_device"], e["selected_device"]) for e in events] == [
+        ("startup", "cuda", "cuda"),
+        ("config", "cpu", "cpu"),
+    ]
+
+
+def test_invalidate_reuses_given_devices_or_probes_once() -> None:
+    resolution, probe = _resolution(["cpu"], [None])
+    events: list[dict] = []
+    resolution.add_listener(events.append)
+    assert resolution.resolve("cuda") == "cpu"
+
+    resolution.invalidate("device.set", available=["cpu", "cuda"])
+    assert resolution.resolve("cuda") == "cuda"
+    assert probe.calls == 1
+    assert events[-1]["reason"] == "device.set" and events[-1]["available_devices"] == ["cpu", "cuda"]
+
+    probe.devices = ["cpu"]
+    resolution.invalidate("device.set")
+    assert resolution.resolve("cuda") == "cpu"
+    resolution.resolve("cuda")
+    assert probe.calls == 2
+    assert len(events) == 3
+
+
+def test_mps_rules_match_service_variants() -> None:
+    resolution, _ = _resolution(["cpu", "mps"], ["mps"])
+
+    assert resolution.resolve("cpu") == "cpu"
+    assert resolution.resolve("cpu", accept_mps=True) == "mps"
+    assert resolution.resolve("cuda") == "cpu"
+    assert resolution.resolve("cuda", mps_fallback=True) == "mps"
+
+
+def test_read_configured_device_treats_sentinel_as_unset() -> None:
+    config = MagicMock(config={"General": {"ai_device": " CUDA:1 "}})
+    assert read_configured_device(config) == "cuda:1"
+    config.config["General"]["ai_device"] = "not-selected"
+    assert read_configured_device(config) is None
+
+
+def test_set_device_invalidates_shared_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    from modules.ai_backend import device_service
+    from modules.ai_backend.model_manager import LoadedModelManager
+
+    resolution, probe = _resolution(["cpu"], [None])
+    monkeypatch.setattr(device_service, "UserConfig", None)
+    monkeypatch.setattr(device_service, "DEVICE_RESOLUTION", resolution)
+    monkeypatch.setattr(
+        device_service.AIDevice, "detect_available_devices", MagicMock(return_value=["cpu", "cuda"])
+    )
+    service = device_service.AiDeviceService(LoadedModelManager())
+
+    service.set_device("cuda")
+
+    assert probe.calls == 0
+    assert resolution.available_devices() == ["cpu", "cuda"]
+    assert resolution.stats()["generation"] == 1
+
+
+def test_server_listener_publishes_device_event() -> None:
+    from modules.ai_backend.health_feed import HEALTH_FEED
+    from modules.ai_backend.server import _device_event_publisher
+
+    bus = MagicMock()
+    before = HEALTH_FEED.version
+
+    _device_event_publisher(bus)({"selected_device": "cpu"})
+
+    bus.publish.assert_called_once_with(TOPIC_DEVICE, {"selected_device": "cpu"})
+    assert HEALTH_FEED.version == before + 1
@@ -7,6 +7,8 @@ Unit tests for the v2 IPC per-connection dispatcher
 
 Main responsibilities:
 - hello handshake: success reply and version-mismatch error + close;
+- hello `caps` negotiation: only supported capabilities are granted and they
+  reach handlers as `ctx.transport_caps`;
 - request -> response round-trip via a fake registered handler;
 - cancel flips the per-id cancel event and yields `status:"interrupted"`;
 - multiplexing: two concurrent ids are routed to and answered for the right id.
@@ -31,7 +33,7 @@ from modules.ai_backend.ipc.dispatcher import Dispatcher
 from modules.ai_backend.ipc.events import EventBus
 from modules.ai_backend.ipc.framing import read_frame, write_frame
 from modules.ai_backend.ipc.registry import HandlerContext, Interrupted
-from modules.ai_backend.ipc.protocol import PROTOCOL_VERSION
+from modules.ai_backend.ipc.protocol import CAP_SHM_IMAGE, PROTOCOL_VERSION
 
 BACKEND_VERSION = "9.9.9-test"
 
@@ -150,6 +152,39 @@ def test_hello_version_mismatch(ctx, pool, events) -> None:
         conn.close()
 
 
+def test_hello_caps_negotiation_reaches_handlers(ctx, pool, events) -> None:
+    def caps_handler(ctx_, header, blob, cancel_event):
+        return {"caps": sorted(ctx_.transport_caps)}, b""
+
+    registry.register("test.caps", caps_handler)
+
+    conn = _Conn(ctx, pool, events)
+    try:
+        conn.send(
+            {
+                "v": PROTOCOL_VERSION,
+                "id": 0,
+                "kind": "hello",
+                "caps": [CAP_SHM_IMAGE, "teleport", 7],
+            }
+        )
+        header, _ = conn.recv()
+        assert header["caps"] == [CAP_SHM_IMAGE]
+        conn.send({"v": 1, "id": 3, "kind": "request", "method": "test.caps"})
+        header, _ = conn.recv()
+        assert header["caps"] == [CAP_SHM_IMAGE]
+    finally:
+        conn.close()
+
+
+def test_hello_without_caps_grants_nothing(ctx, pool, events) -> None:
+    conn = _Conn(ctx, pool, events)
+    try:
+        assert _hello(conn)["caps"] == []
+    finally:
+        conn.close()
+
+
 def test_request_response_round_trip(ctx, pool, events) -> None:
     def echo_handler(ctx_, header, blob, cancel_event):
         return {"echoed": header.get("payload"), "blob_len": len(blob)}, b"out:" + blob
@@ -10,12 +10,18 @@ Main responsibilities:
 - reject frames that breach the header/blob size guards;
 - reassemble a frame fed in small chunks (partial reads);
 - treat EOF in the middle of a frame as a fatal error and a clean EOF at a
-  frame boundary as `StreamClosed`.
+  frame boundary as `StreamClosed`;
+- scatter-gather `sendmsg` writes (including partial sends), `writev`
+  writers, and `readinto` reads into one preallocated buffer;
+- the round-trip microbenchmark (`benchmarks/bench_framing.py`): the vectored
+  path allocates no blob copy on write and one buffer on read.
 """
 
 from __future__ import annotations
 
 import io
+import socket
+import threading
 
 import pytest
 
@@ -166,3 +172,97 @@ def test_write_frame_handles_short_writes() -> None:
     got_header, got_blob = read_frame(io.BytesIO(bytes(writer.buf)))
     assert got_header == header
     assert got_blob == blob
+
+
+class _ShortSendSocket:
+    """`sendmsg` that accepts at most 7 bytes per call, across buffer boundaries."""
+
+    def __init__(self) -> None:
+        self.buf = bytearray()
+        self.calls = 0
+
+    def sendmsg(self, buffers) -> int:  # noqa: ANN001 - list of memoryviews
+        self.calls += 1
+        data = b"".join(bytes(b) for b in buffers)[:7]
+        self.buf += data
+        return len(data)
+
+
+def test_write_frame_uses_sendmsg_and_survives_partial_sends() -> None:
+    header = {"v": 1, "id": 4, "kind": "response", "status": "ok"}
+    blob = bytes(range(200))
+    sock = _ShortSendSocket()
+    writer = _ByteAtATimeWriter()
+
+    write_frame(writer, header, blob, sock)
+
+    assert bytes(sock.buf) == encode_frame(header, blob)
+    assert sock.calls > 1
+    assert writer.write_calls == 0 and writer.flushed == 1
+
+
+def test_writev_writer_gets_whole_frame_in_one_call() -> None:
+    calls: list[bytes] = []
+
+    class _VecWriter:
+        def writev(self, parts) -> int:  # noqa: ANN001 - list of memoryviews
+            calls.append(b"".join(parts))
+            return len(calls[-1])
+
+        def write(self, data) -> int:  # noqa: ANN001
+            raise AssertionError("writev writers must not get sequential writes")
+
+        def flush(self) -> None:
+            pass
+
+    header = {"v": 1, "id": 5, "kind": "event", "topic": "health"}
+    write_frame(_VecWriter(), header, b"blob")
+    assert calls == [encode_frame(header, b"blob")]
+
+
+def test_socket_round_trip_reads_blob_into_one_buffer() -> None:
+    header = {"v": 1, "id": 6, "kind": "response", "status": "ok"}
+    blob = bytes(range(256)) * 8192  # 2 MiB: many partial reads on a socketpair
+    srv, cli = socket.socketpair()
+    try:
+        writer = srv.makefile("wb", buffering=0)
+        sender = threading.Thread(target=write_frame, args=(writer, header, blob, srv))
+        sender.start()
+        got_header, got_blob = read_frame(cli.makefile("rb", buffering=0))
+        sender.join(5)
+    finally:
+        srv.close()
+        cli.close()
+    assert got_header == header
+    assert isinstance(got_blob, bytearray) and got_blob == blob
+
+
+def test_readinto_reader_short_reads_are_reassembled() -> None:
+    frame = encode_frame({"v": 1, "id": 8, "kind": "response"}, b"0123456789" * 50)
+
+    class _ShortReadinto(io.RawIOBase):
+        def __init__(self) -> None:
+            self._src = io.BytesIO(frame)
+
+        def readable(self) -> bool:
+            return True
+
+        def readinto(self, b) -> int:  # noqa: ANN001 - writable buffer
+            return self._src.readinto(memoryview(b)[:3])
+
+    header, blob = read_frame(_ShortReadinto())
+    assert header["id"] == 8 and blob == b"0123456789" * 50
+    with pytest.raises(FrameError):
+        read_frame(io.BytesIO(frame[:-1]))  # BytesIO also takes the readinto path
+
+
+def test_round_trip_benchmark_shows_fewer_copies() -> None:
+    from modules.ai_backend.benchmarks import bench_framing as bench
+
+    size = 1 << 20
+    assert bench.write_copies("legacy", size) >= 1.0
+    assert bench.write_copies("vectored", size) < 0.1
+    assert bench.read_copies("vectored", size) < 1.1 < bench.read_copies("legacy", size)
+    for path in bench.PATHS:
+        seconds, received = bench.round_trip(path, size, 4)
+        assert received == [size] * 4 and seconds > 0
@@ -15,7 +15,9 @@ Main responsibilities:
 - response fields match the HTTP shape (`engine`/`lines`/`text`, plus
   `task_name` for surya and `model`/`device` for paddle_onnx);
 - a set `cancel_event` raises `Interrupted`; an empty blob raises `ValueError`;
-  invalid params raise `ValueError`.
+  invalid params raise `ValueError`;
+- the `ocr.*.batch` handlers split the blob by `crop_lens`, stream one
+  `progress` frame per crop, and return all results in input order.
 
 Notes:
 The service methods are mocked (a fake object recording its call), so these
@@ -35,10 +37,14 @@ from modules.ai_backend.ipc import registry
 from modules.ai_backend.ipc.handlers import ocr as ocr_handlers
 from modules.ai_backend.ipc.protocol import (
     METHOD_OCR_EASY,
+    METHOD_OCR_EASY_BATCH,
+    METHOD_OCR_MANGA_BATCH,
     METHOD_OCR_PADDLE,
+    METHOD_OCR_PADDLE_BATCH,
     METHOD_OCR_PADDLE_ONNX,
     METHOD_OCR_PADDLE_VL,
     METHOD_OCR_SURYA,
+    METHOD_OCR_SURYA_BATCH,
 )
 from modules.ai_backend.ipc.registry import HandlerContext, Interrupted
 
@@ -56,6 +62,16 @@ class _FakeOcr:
         self.calls.append((args, kwargs))
         return self._result
 
+    def recognize_images_bytes(self, images: list[bytes], **kwargs: Any) -> list[dict[str, Any]]:
+        on_result = kwargs.pop("on_result")
+        self.calls.append(((images,), kwargs))
+        results = []
+        for index, image in enumerate(images):
+            result = {"lines": [image.decode()], "text": image.decode()}
+            results.append(result)
+            on_result(index, result)
+        return results
+
     @property
     def last_kwargs(self) -> dict[str, Any]:
         return self.calls[-1][1]
@@ -92,6 +108,10 @@ def _canceled() -> threading.Event:
         METHOD_OCR_PADDLE_VL,
         METHOD_OCR_SURYA,
         METHOD_OCR_PADDLE_ONNX,
+        METHOD_OCR_MANGA_BATCH,
+        METHOD_OCR_EASY_BATCH,
+        METHOD_OCR_PADDLE_BATCH,
+        METHOD_OCR_SURYA_BATCH,
     ],
 )
 def test_methods_registered(method: str) -> None:
@@ -425,3 +445,109 @@ def test_paddle_onnx_canceled() -> None:
     with pytest.raises(Interrupted):
         ocr_handlers._handle_ocr_paddle_onnx(ctx, {}, IMG, _canceled())
     assert fake.calls == []
+
+
+# ---------------------------------------------------------------------------
+# ocr.*.batch
+# ---------------------------------------------------------------------------
+
+class _FakeEmitter:
+    def __init__(self) -> None:
+        self.frames: list[tuple[dict[str, Any], bytes]] = []
+
+    def emit(self, fields: dict[str, Any], blob: bytes = b"") -> None:
+        self.frames.append((fields, blob))
+
+
+def _batch_ctx(emitter: _FakeEmitter | None = None, **services: _FakeOcr) -> HandlerContext:
+    state = SimpleNamespace(**services)
+    return HandlerContext(
+        state=state,
+        events=None,
+        get_health_snapshot=lambda: {},
+        progress_emitter=emitter,
+    )
+
+
+def test_manga_batch_splits_crops_and_streams_progress() -> None:
+    fake = _FakeOcr({})
+    emitter = _FakeEmitter()
+    ctx = _batch_ctx(emitter, manga_ocr=fake)
+
+    header, blob = ocr_handlers._handle_ocr_manga_batch(
+        ctx,
+        {"crop_lens": [2, 3, 1], "manga_model": "2025_onnx"},
+        b"aabbbc",
+        _no_cancel(),
+    )
+
+    assert fake.last_image == [b"aa", b"bbb", b"c"]
+    assert fake.last_kwargs == {
+        "join_newlines": True,
+        "reflect_strings": False,
+        "manga_model": "2025_onnx",
+    }
+    assert [fields for fields, _ in emitter.frames] == [
+        {"index": 0, "total": 3, "lines": ["aa"], "text": "aa"},
+        {"index": 1, "total": 3, "lines": ["bbb"], "text": "bbb"},
+        {"index": 2, "total": 3, "lines": ["c"], "text": "c"},
+    ]
+    assert header == {
+        "engine": "mangaocr",
+        "count": 3,
+        "results": [
+            {"lines": ["aa"], "text": "aa"},
+            {"lines": ["bbb"], "text": "bbb"},
+            {"lines": ["c"], "text": "c"},
+        ],
+    }
+    assert blob == b""
+
+
+def test_batch_params_match_single_handlers() -> None:
+    easy, paddle, surya = _FakeOcr({}), _FakeOcr({}), _FakeOcr({})
+    ctx = _batch_ctx(easy_ocr=easy, paddle_ocr=paddle, surya_ocr=surya)
+
+    ocr_handlers._handle_ocr_easy_batch(ctx, {"crop_lens": [1], "easy_langs": " ja "}, b"x", _no_cancel())
+    ocr_handlers._handle_ocr_paddle_batch(ctx, {"crop_lens": [1]}, b"x", _no_cancel())
+    header, _ = ocr_handlers._handle_ocr_surya_batch(
+        ctx,
+        {"crop_lens": [1], "surya_task_name": "OCR_WITH_BOXES", "surya_max_tokens": 5},
+        b"x",
+        _no_cancel(),
+    )
+
+    assert easy.last_kwargs["langs"] == "ja"
+    assert paddle.last_kwargs["lang"] == "korean_v5"
+    assert surya.last_kwargs["task_name"] == "ocr_with_boxes"
+    assert surya.last_kwargs["max_tokens"] == 5
+    assert header["engine"] == "suryaocr"
+    assert header["task_name"] == "ocr_with_boxes"
+
+
+@pytest.mark.parametrize(
+    "crop_lens",
+    [None, [], [2, 3], [4, 0], [True, 3], "4"],
+)
+def test_batch_invalid_crop_lens_errors(crop_lens: Any) -> None:
+    ctx = _batch_ctx(paddle_ocr=_FakeOcr({}))
+    with pytest.raises(ValueError, match="crop_lens"):
+        ocr_handlers._handle_ocr_paddle_batch(ctx, {"crop_lens": crop_lens}, b"abcd", _no_cancel())
+
+
+def test_batch_cancel_stops_after_current_crop() -> None:
+    fake = _FakeOcr({})
+    cancel = threading.Event()
+    emitter = _FakeEmitter()
+    emitter.emit = lambda fields, blob=b"": cancel.set()  # type: ignore[method-assign]
+    ctx = _batch_ctx(emitter, easy_ocr=fake)
+    with pytest.raises(Interrupted):
+        ocr_handlers._handle_ocr_easy_batch(ctx, {"crop_lens": [1, 1]}, b"ab", cancel)
+
+
+def test_batch_canceled_before_start() -> None:
+    fake = _FakeOcr({})
+    ctx = _batch_ctx(manga_ocr=fake)
+    with pytest.raises(Interrupted):
+        ocr_handlers._handle_ocr_manga_batch(ctx, {"crop_lens": [1]}, b"a", _canceled())
+    assert fake.calls == []
@@ -25,6 +25,8 @@ Coverage:
   (``engine``/``source_size``/``device``/``mode``) in the header;
 - request blob split by ``image_len``/``mask_len``; ``params`` passed through;
 - preview is optional (``None`` preview => empty progress blob);
+- bucket ROI mode: a fourth ``window_info`` argument adds
+  ``window``/``windows``/``batch`` to the progress header;
 - no-emitter => no progress, still a correct terminal response;
 - ``inpaint.sdxl.unload`` returns ``{"unloaded": bool}``;
 - error mapping: ValueError / FileNotFoundError / generic Exception propagate
@@ -221,6 +223,26 @@ def test_progress_frame_count_matches_steps() -> None:
     assert all(h["total"] == 7 for h, _ in disp.frames)
 
 
+def test_window_info_is_added_to_progress_header() -> None:
+    class _BucketService(_FakeSdxlService):
+        def inpaint_image_bytes(self, image_bytes, mask_bytes, *, params, progress_callback=None):
+            for window in (0, 2):
+                for step in (1, 2):
+                    progress_callback(step, 2, None, {"window": window, "windows": 3, "batch": 2 - window // 2})
+            return self._result
+
+    emitter, disp = _emitter()
+    ctx = _ctx(_BucketService(), emitter=emitter)
+    handler = get_handler(METHOD_INPAINT_SDXL)
+    handler(ctx, _header({"params": {"roi_mode": "bucket"}}), IMAGE_PNG + MASK_PNG, _no_cancel())
+    assert [(h["window"], h["windows"], h["batch"], h["step"]) for h, _ in disp.frames] == [
+        (0, 3, 2, 1),
+        (0, 3, 2, 2),
+        (2, 3, 1, 1),
+        (2, 3, 1, 2),
+    ]
+
+
 def test_none_preview_yields_empty_progress_blob() -> None:
     svc = _FakeSdxlService(n_steps=2, preview=None)
     emitter, disp = _emitter()
@@ -5,6 +5,7 @@ Unit tests for the v2 IPC text-detector handlers:
     textdetector.ctd    (METHOD_TEXTDETECTOR_CTD)
     textdetector.paddle (METHOD_TEXTDETECTOR_PADDLE)
     textdetector.surya  (METHOD_TEXTDETECTOR_SURYA)
+    textdetector.surya.batch (METHOD_TEXTDETECTOR_SURYA_BATCH)
 
 Strategy
 --------
@@ -20,9 +21,14 @@ instances so no Torch models are loaded.  Tests drive the handlers directly
 5.  Response header fields match the HTTP shape per engine.
 6.  Mask PNG arrives as raw bytes in the response blob (byte-identical to the
     service's ``mask_png`` result).
-7.  ``params`` is forwarded to CTD; paddle/surya take no params.
+7.  ``params`` is forwarded to CTD; paddle/surya only get ``params`` when the
+    header carries them (streaming-detection fields), plus ``tiles`` echo.
 8.  ``FileNotFoundError`` propagates (so the dispatcher turns it into
     ``status:"error"`` with the message).
+9.  The Surya batch method accepts ``page_paths`` or a ``page_lens``-split
+    blob, streams one progress frame (mask PNG as blob) per page and returns
+    only per-page status (no masks, empty blob); it needs a progress stream;
+    cancel stops it.
 """
 
 from __future__ import annotations
@@ -36,13 +42,15 @@ from modules.ai_backend.ipc.handlers.textdetector import (
     _handle_textdetector_ctd,
     _handle_textdetector_paddle,
     _handle_textdetector_surya,
+    _handle_textdetector_surya_batch,
 )
 from modules.ai_backend.ipc.protocol import (
     METHOD_TEXTDETECTOR_CTD,
     METHOD_TEXTDETECTOR_PADDLE,
     METHOD_TEXTDETECTOR_SURYA,
+    METHOD_TEXTDETECTOR_SURYA_BATCH,
 )
-from modules.ai_backend.ipc.registry import METHOD_HANDLERS, HandlerContext
+from modules.ai_backend.ipc.registry import METHOD_HANDLERS, HandlerContext, Interrupted
 
 # ---------------------------------------------------------------------------
 # Helpers / fixtures
@@ -90,6 +98,7 @@ def test_methods_are_registered() -> None:
     assert METHOD_TEXTDETECTOR_CTD in METHOD_HANDLERS
     assert METHOD_TEXTDETECTOR_PADDLE in METHOD_HANDLERS
     assert METHOD_TEXTDETECTOR_SURYA in METHOD_HANDLERS
+    assert METHOD_TEXTDETECTOR_SURYA_BATCH in METHOD_HANDLERS
 
 
 # ===========================================================================
@@ -322,6 +331,28 @@ class TestPaddle:
         )
         assert resp_h["polys"] == [[1, 2], [3, 4]]
 
+    # --- streaming-detection params ---
+
+    def test_params_forwarded_when_present(self) -> None:
+        state = self._state(_make_service_result({"polys": [], "tiles": 5}))
+        ctx = _ctx(state)
+        params = {"tiled_detection": "on", "tile_height": 2048}
+        resp_h, _ = _handle_textdetector_paddle(
+            ctx, {"params": params}, _FAKE_IMAGE_BLOB, _NO_CANCEL
+        )
+        state.text_detector_paddle.detect_image_bytes.assert_called_once_with(
+            _FAKE_IMAGE_BLOB, params=params
+        )
+        assert resp_h["tiles"] == 5
+
+    def test_params_invalid_type_raises(self) -> None:
+        state = self._state()
+        ctx = _ctx(state)
+        with pytest.raises(ValueError, match="params"):
+            _handle_textdetector_paddle(
+                ctx, {"page_path": "/p.png", "params": [1]}, b"", _NO_CANCEL
+            )
+
     # --- neither source ---
 
     def test_neither_source_raises(self) -> None:
@@ -493,3 +524,130 @@ class TestMaskRoundTrip:
             _ctx(self._state_surya()), {"page_path": "/p.png"}, b"", _NO_CANCEL
         )
         assert blob == _MASK_PNG_BYTES
+
+
+# ===========================================================================
+# textdetector.surya.batch
+# ===========================================================================
+
+class _FakeEmitter:
+    def __init__(self) -> None:
+        self.frames: list[tuple[dict, bytes]] = []
+
+    def emit(self, fields: dict, blob: bytes = b"") -> None:
+        self.frames.append((fields, blob))
+
+
+def _fake_batch_detect(pages, *, batch_size=None, on_result=None, keep_results=True, **_kwargs):
+    results = []
+    for index, page in enumerate(pages):
+        result = {
+            "source_size": [10 + index, 20],
+            "blocks": [{"bbox": [0, 0, 1, 1]}] * index,
+            "lines": [],
+            "mask_png": f"mask{index}".encode(),
+            "tiles": 1,
+        }
+        if keep_results:
+            results.append(result)
+        if on_result is not None:
+            on_result(index, result)
+    return results
+
+
+class TestSuryaBatch:
+    def _ctx(self, emitter: _FakeEmitter | None = None) -> tuple[HandlerContext, MagicMock]:
+        emitter = emitter if emitter is not None else _FakeEmitter()
+        state = MagicMock()
+        svc = state.text_detector_surya
+        svc.detect_pages.side_effect = _fake_batch_detect
+        svc.detect_images_bytes.side_effect = _fake_batch_detect
+        ctx = HandlerContext(
+            state=state,
+            events=MagicMock(),
+            get_health_snapshot=lambda: {"ok": True},
+            progress_emitter=emitter,
+        )
+        return ctx, svc
+
+    def test_page_paths_stream_progress_and_return_status_only(self) -> None:
+        emitter = _FakeEmitter()
+        ctx, svc = self._ctx(emitter)
+        header = {"page_paths": [" /a.png", "/b.png"], "batch_size": 4}
+        resp_h, resp_b = _handle_textdetector_surya_batch(ctx, header, b"", _NO_CANCEL)
+
+        args, kwargs = svc.detect_pages.call_args
+        assert args == (["/a.png", "/b.png"],)
+        assert kwargs["batch_size"] == 4 and "params" not in kwargs
+        assert kwargs["keep_results"] is False
+        svc.detect_images_bytes.assert_not_called()
+        assert [(f["index"], f["total"], f["source_size"], b) for f, b in emitter.frames] == [
+            (0, 2, [10, 20], b"mask0"),
+            (1, 2, [11, 20], b"mask1"),
+        ]
+        assert resp_h == {
+            "engine": "surya",
+            "count": 2,
+            "pages": [
+                {"index": 0, "streamed": True, "block_count": 0, "line_count": 0},
+                {"index": 1, "streamed": True, "block_count": 1, "line_count": 0},
+            ],
+        }
+        assert resp_b == b""
+
+    def test_failed_progress_frame_is_reported_per_page(self) -> None:
+        emitter = _FakeEmitter()
+
+        def emit(fields: dict, blob: bytes = b"") -> None:
+            if fields["index"] == 0:
+                raise BrokenPipeError("peer gone")
+            emitter.frames.append((fields, blob))
+
+        emitter.emit = emit  # type: ignore[method-assign]
+        ctx, _ = self._ctx(emitter)
+        resp_h, _ = _handle_textdetector_surya_batch(ctx, {"page_paths": ["/a.png", "/b.png"]}, b"", _NO_CANCEL)
+
+        assert [page["streamed"] for page in resp_h["pages"]] == [False, True]
+
+    def test_requires_progress_stream(self) -> None:
+        ctx, svc = self._ctx()
+        ctx.progress_emitter = None
+        with pytest.raises(ValueError):
+            _handle_textdetector_surya_batch(ctx, {"page_paths": ["/a.png"]}, b"", _NO_CANCEL)
+        svc.detect_pages.assert_not_called()
+
+    def test_blob_split_by_page_lens(self) -> None:
+        ctx, svc = self._ctx()
+        header = {"page_lens": [2, 3], "params": {"tiled_detection": "on"}}
+        _handle_textdetector_surya_batch(ctx, header, b"aabbb", _NO_CANCEL)
+
+        args, kwargs = svc.detect_images_bytes.call_args
+        assert args == ([b"aa", b"bbb"],)
+        assert kwargs["params"] == {"tiled_detection": "on"}
+        assert kwargs["batch_size"] is None
+
+    @pytest.mark.parametrize(
+        "header,blob",
+        [
+            ({}, b""),
+            ({"page_lens": [2, 2]}, b"abc"),
+            ({"page_lens": [0]}, b""),
+            ({"page_paths": []}, b""),
+            ({"page_paths": ["/a.png"]}, b"x"),
+            ({"page_paths": ["/a.png"], "batch_size": 0}, b""),
+        ],
+    )
+    def test_invalid_requests(self, header: dict, blob: bytes) -> None:
+        ctx, _ = self._ctx()
+        with pytest.raises(ValueError):
+            _handle_textdetector_surya_batch(ctx, header, blob, _NO_CANCEL)
+
+    def test_cancel_stops_after_current_page(self) -> None:
+        cancel = threading.Event()
+        emitter = _FakeEmitter()
+        emitter.emit = lambda fields, blob=b"": cancel.set()  # type: ignore[method-assign]
+        ctx, _ = self._ctx(emitter)
+        with pytest.raises(Interrupted):
+            _handle_textdetector_surya_batch(
+                ctx, {"page_paths": ["/a.png", "/b.png"]}, b"", cancel
+            )
@@ -87,8 +87,18 @@ class TestTranslateDeepHappyPath:
             target="en",
             params={"formality": "less"},
             texts=["안녕", "세상"],
+            join_lines=False,
         )
 
+    def test_join_lines_passed_through(self):
+        svc = MagicMock()
+        svc.translate_batch.return_value = _ok_results(1)
+        ctx = _make_ctx(svc)
+
+        _call(METHOD_HANDLERS[METHOD_TRANSLATE_DEEP], ctx, {"texts": ["x"], "join_lines": True})
+
+        assert svc.translate_batch.call_args.kwargs["join_lines"] is True
+
     def test_response_keys(self):
         svc = MagicMock()
         svc.translate_batch.return_value = _ok_results(2)
@@ -290,6 +300,12 @@ class TestTranslateDeepValidation:
         with pytest.raises(ValueError, match="'params' must be an object"):
             _call(METHOD_HANDLERS[METHOD_TRANSLATE_DEEP], ctx, {"params": "bad", "texts": ["x"]})
 
+    def test_non_bool_join_lines_raises_value_error(self):
+        ctx = _make_ctx()
+
+        with pytest.raises(ValueError, match="'join_lines' must be a boolean"):
+            _call(METHOD_HANDLERS[METHOD_TRANSLATE_DEEP], ctx, {"texts": ["x"], "join_lines": "no"})
+
     def test_service_value_error_re_raised(self):
         svc = MagicMock()
         svc.translate_batch.side_effect = ValueError("unknown service: bogus")
@@ -0,0 +1,317 @@
+"""
+File: modules/ai_backend/test_health_feed.py
+
+Purpose:
+Unit tests for change-driven health publishing: `health_feed.py`, the delta
+fan-out in `ipc/events.py` and `server._health_snapshot_worker`.
+
+Coverage:
+- `HealthFeed` wakes a waiter on `notify` and times out when idle;
+- `diff_health` / `apply_health_patch` round-trip, volatile timestamp ignored;
+- `LoadedModelManager` residency transitions notify the feed, while leases on
+  an already resident model only show up in `activity()`, which `diff_health`
+  ignores;
+- `HealthField` notifies only when the assigned value changes, so a service
+  error reaches delta subscribers without waiting for the heartbeat;
+- an explicit `health` pull rebuilds the snapshot instead of serving the
+  worker's cached one;
+- `EventBus.publish` sends a full payload first and deltas afterwards, only to
+  sinks that negotiated `health_delta`;
+- the worker publishes once, stays silent while nothing changes, publishes a
+  delta after a notification and a full snapshot on the heartbeat.
+"""
+
+from __future__ import annotations
+
+import io
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from modules.ai_backend import health_feed, model_manager, paddle_text_detector_service, server
+from modules.ai_backend.health_feed import HealthFeed, HealthField, apply_health_patch, diff_health
+from modules.ai_backend.ipc.events import EventBus, EventSink
+from modules.ai_backend.ipc.framing import FrameWriteLock, read_frame
+from modules.ai_backend.ipc.protocol import CAP_HEALTH_DELTA, TOPIC_HEALTH
+
+
+def test_feed_wakes_waiter_and_times_out_when_idle() -> None:
+    feed = HealthFeed()
+    seen = feed.version
+    assert feed.wait_for_change(seen, 0.01) is False
+
+    threading.Timer(0.05, feed.notify, args=("ocr.mangaocr",)).start()
+    assert feed.wait_for_change(seen, 5.0) is True
+    assert feed.take_sources() == {"ocr.mangaocr"}
+    assert feed.take_sources() == set()
+
+
+def test_diff_round_trip_ignores_snapshot_timestamp() -> None:
+    old = {
+        "ok": True,
+        "snapshot_unix_s": 1.0,
+        "ocr": {"mangaocr": {"loaded": False, "providers": ["cpu"]}, "a/b": {"x~": 1}},
+        "gone": 3,
+    }
+    new = {
+        "ok": True,
+        "snapshot_unix_s": 2.0,
+        "ocr": {"mangaocr": {"loaded": True, "providers": ["cuda", "cpu"]}, "a/b": {"x~": 2}},
+        "added": {"n": 1},
+    }
+
+    ops = diff_health(old, new)
+
+    assert {op["path"] for op in ops} == {
+        "/ocr/mangaocr/loaded",
+        "/ocr/mangaocr/providers",
+        "/ocr/a~1b/x~0",
+        "/gone",
+        "/added",
+    }
+    patched = apply_health_patch(old, ops)
+    assert {k: v for k, v in patched.items() if k != "snapshot_unix_s"} == {
+        k: v for k, v in new.items() if k != "snapshot_unix_s"
+    }
+    assert diff_health(new, {**new, "snapshot_unix_s": 3.0}) == []
+    with pytest.raises(ValueError):
+        apply_health_patch(old, [{"op": "replace", "path": "/missing/x", "value": 1}])
+
+
+def test_model_manager_transitions_notify_feed(monkeypatch) -> None:
+    feed = HealthFeed()
+    monkeypatch.setattr(health_feed, "HEALTH_FEED", feed)
+    manager = model_manager.LoadedModelManager(max_loaded_models=1)
+
+    before = feed.version
+    lease = manager.begin_model_use("ocr.test")
+    lease.mark_loaded(lambda: None)
+    lease.release()
+    manager.mark_unloaded("ocr.test")
+
+    assert feed.version - before >= 3
+    assert feed.take_sources() == {model_manager.HEALTH_SOURCE}
+
+
+def test_requests_on_resident_model_do_not_notify_feed(monkeypatch) -> None:
+    feed = HealthFeed()
+    monkeypatch.setattr(health_feed, "HEALTH_FEED", feed)
+    manager = model_manager.LoadedModelManager(max_loaded_models=1)
+    lease = manager.begin_model_use("ocr.test")
+    lease.mark_loaded(lambda: True)
+    lease.release()
+    health_before = manager.health()
+
+    before = feed.version
+    lease = manager.begin_model_use("ocr.test")
+    busy = {"activity": {"model_manager": manager.activity()}, "mm": manager.health()}
+    lease.release()
+    idle = {"activity": {"model_manager": manager.activity()}, "mm": manager.health()}
+
+    assert feed.version == before
+    assert busy["activity"]["model_manager"] == {"active_model_count": 1, "in_use_models": ["ocr.test"]}
+    assert idle["activity"]["model_manager"] == {"active_model_count": 0, "in_use_models": []}
+    assert busy["mm"] == idle["mm"] == health_before
+    assert diff_health(busy, idle) == []
+
+
+def _sink(caps: frozenset[str] = frozenset()) -> tuple[EventSink, io.BytesIO]:
+    buf = io.BytesIO()
+    return EventSink(buf, FrameWriteLock(), caps=caps), buf
+
+
+def _frames(buf: io.BytesIO) -> list[dict]:
+    reader = io.BytesIO(buf.getvalue())
+    headers = []
+    while reader.tell() < len(reader.getvalue()):
+        headers.append(read_frame(reader)[0])
+    return headers
+
+
+def test_event_bus_sends_deltas_only_to_synced_capable_sinks() -> None:
+    bus = EventBus()
+    legacy, legacy_buf = _sink()
+    capable, capable_buf = _sink(frozenset({CAP_HEALTH_DELTA}))
+    bus.register(legacy)
+    bus.register(capable)
+    delta = {"health_patch": [{"op": "replace", "path": "/ok", "value": False}]}
+
+    bus.publish(TOPIC_HEALTH, {"ok": True}, delta=delta, delta_cap=CAP_HEALTH_DELTA)
+    bus.publish(TOPIC_HEALTH, {"ok": False}, delta=delta, delta_cap=CAP_HEALTH_DELTA)
+
+    assert [("ok" in h, "health_patch" in h) for h in _frames(legacy_buf)] == [(True, False)] * 2
+    assert [("ok" in h, "health_patch" in h) for h in _frames(capable_buf)] == [
+        (True, False),
+        (False, True),
+    ]
+
+
+class _Service:
+    def __init__(self) -> None:
+        self.value = 0
+        self.calls = 0
+
+    def health(self) -> dict:
+        self.calls += 1
+        return {"status": "ok", "value": self.value}
+
+
+class _Bus:
+    def __init__(self) -> None:
+        self.published: list[tuple[dict, dict | None]] = []
+        self.event = threading.Event()
+
+    def publish(self, topic, payload, blob=b"", *, delta=None, delta_cap=None) -> None:
+        assert topic == TOPIC_HEALTH
+        self.published.append((payload, delta))
+        self.event.set()
+
+    def wait(self, count: int, timeout: float = 5.0) -> None:
+        deadline = time.monotonic() + timeout
+        while len(self.published) < count and time.monotonic() < deadline:
+            self.event.wait(0.01)
+            self.event.clear()
+        assert len(self.published) >= count
+
+
+def _state(service: _Service) -> SimpleNamespace:
+    names = (
+        "easy_ocr manga_ocr paddle_ocr paddle_vl_ocr surya_ocr text_detector_ctd "
+        "text_detector_paddle text_detector_surya lama_inpaint lama_mpe_inpaint aot_inpaint "
+        "flux_fill_inpaint reline machine_translation model_manager onnx_runtime"
+    ).split()
+    state = SimpleNamespace(
+        app_version="9.9.9-test", health_snapshot={}, health_snapshot_lock=threading.Lock()
+    )
+    for name in names:
+        setattr(state, name, service)
+    return state
+
+
+def _run_worker(state, bus, feed, heartbeat_s: float) -> tuple[threading.Event, threading.Thread]:
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=server._health_snapshot_worker,
+        args=(state, stop, bus),
+        kwargs={"feed": feed, "heartbeat_s": heartbeat_s, "min_interval_s": 0.0, "coalesce_s": 0.0},
+        daemon=True,
+    )
+    thread.start()
+    return stop, thread
+
+
+def _stop(stop: threading.Event, thread: threading.Thread, feed: HealthFeed) -> None:
+    stop.set()
+    feed.notify("shutdown")
+    thread.join(5.0)
+    assert not thread.is_alive()
+
+
+def test_worker_is_silent_when_idle_and_publishes_delta_on_change() -> None:
+    service, bus, feed = _Service(), _Bus(), HealthFeed()
+    stop, thread = _run_worker(_state(service), bus, feed, heartbeat_s=60.0)
+    try:
+        bus.wait(1)
+        first, first_delta = bus.published[0]
+        assert first_delta is None and first["health_seq"] == 1
+
+        calls = service.calls
+        time.sleep(0.2)
+        assert service.calls == calls and len(bus.published) == 1
+
+        feed.notify("test")  # notified, but nothing actually changed
+        deadline = time.monotonic() + 5.0
+        while service.calls == calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(bus.published) == 1
+
+        service.value = 1
+        feed.notify("test")
+        bus.wait(2)
+        payload, delta = bus.published[1]
+        assert payload["health_seq"] == 2 and payload["ocr"]["mangaocr"]["value"] == 1
+        assert delta["health_base_seq"] == 1 and delta["health_seq"] == 2
+        assert {op["path"] for op in delta["health_patch"]} >= {"/ocr/mangaocr/value"}
+        assert apply_health_patch(first, delta["health_patch"])["ocr"] == payload["ocr"]
+    finally:
+        _stop(stop, thread, feed)
+
+
+def test_worker_heartbeat_resends_full_snapshot() -> None:
+    service, bus, feed = _Service(), _Bus(), HealthFeed()
+    stop, thread = _run_worker(_state(service), bus, feed, heartbeat_s=0.1)
+    try:
+        bus.wait(3)
+        assert all(delta is None for _payload, delta in bus.published)
+        assert [payload["health_seq"] for payload, _delta in bus.published[:3]] == [1, 2, 3]
+    finally:
+        _stop(stop, thread, feed)
+
+
+def test_health_field_notifies_only_on_change(monkeypatch) -> None:
+    feed = HealthFeed()
+    monkeypatch.setattr(health_feed, "HEALTH_FEED", feed)
+
+    class _Svc:
+        _last_error = HealthField("ocr.test")
+
+    svc = _Svc()
+    before = feed.version
+    assert svc._last_error is None
+    svc._last_error = None
+    assert feed.version == before
+
+    svc._last_error = "boom"
+    svc._last_error = "boom"
+    assert feed.version == before + 1
+    svc._last_error = None
+    assert feed.version == before + 2
+    assert feed.take_sources() == {"ocr.test"}
+
+
+class _FailingRuntime:
+    def detect(self, image, settings):
+        raise RuntimeError("det session failed")
+
+
+def test_service_error_reaches_next_delta_without_heartbeat(monkeypatch) -> None:
+    feed, bus = HealthFeed(), _Bus()
+    monkeypatch.setattr(health_feed, "HEALTH_FEED", feed)
+    detector = paddle_text_detector_service.PaddleTextDetectorService(None)
+    detector._runtime = _FailingRuntime()
+    state = _state(_Service())
+    state.text_detector_paddle = detector
+    stop, thread = _run_worker(state, bus, feed, heartbeat_s=60.0)
+    try:
+        bus.wait(1)
+        assert bus.published[0][0]["text_detector"]["paddle"]["last_error"] is None
+
+        with pytest.raises(RuntimeError):
+            detector.detect_image_array(np.zeros((8, 8, 3), dtype=np.uint8))
+        bus.wait(2)
+        payload, delta = bus.published[1]
+        assert payload["text_detector"]["paddle"]["last_error"] == "det session failed"
+        assert {
+            "op": "replace",
+            "path": "/text_detector/paddle/last_error",
+            "value": "det session failed",
+        } in delta["health_patch"]
+    finally:
+        _stop(stop, thread, feed)
+
+
+def test_health_pull_rebuilds_instead_of_serving_cached_snapshot() -> None:
+    service = _Service()
+    state = _state(service)
+    state.health_snapshot = {"ok": True, "snapshot_state": "warming_up"}
+
+    first = server._refresh_health_snapshot(state)
+    service.value = 7
+    second = server._refresh_health_snapshot(state)
+
+    assert "snapshot_state" not in first and first["ocr"]["mangaocr"]["value"] == 0
+    assert second["ocr"]["mangaocr"]["value"] == 7
+    assert server._get_health_snapshot(state)["ocr"]["mangaocr"]["value"] == 7
@@ -49,9 +49,11 @@ def _make_state(*, surya_raises: bool = False) -> SimpleNamespace:
         lama_inpaint=_OkService("lama_v2"),
         lama_mpe_inpaint=_OkService("lama_mpe"),
         aot_inpaint=_OkService("aot"),
+        flux_fill_inpaint=_OkService("flux_fill"),
         reline=_OkService("reline"),
         machine_translation=_OkService("mt"),
         model_manager=_OkService("mm"),
+        onnx_runtime=_OkService("onnx_runtime"),
     )
 
 
@@ -84,6 +86,7 @@ def test_one_raising_service_does_not_kill_snapshot() -> None:
     assert snap["ocr"]["mangaocr"] == {"status": "ok", "name": "mangaocr"}
     assert snap["text_detector"]["ctd"]["status"] == "ok"
     assert snap["inpaint"]["aot"]["status"] == "ok"
+    assert snap["inpaint"]["flux_fill"]["status"] == "ok"
     assert snap["image_processing"]["reline"]["status"] == "ok"
     assert snap["machine_translation"]["status"] == "ok"
     assert snap["model_manager"]["status"] == "ok"
@@ -92,5 +95,6 @@ def test_one_raising_service_does_not_kill_snapshot() -> None:
     assert set(snap.keys()) == {
         "ok", "service", "backend_version", "snapshot_unix_s",
         "is_torch_available", "ocr", "text_detector", "inpaint",
-        "image_processing", "machine_translation", "model_manager",
+        "image_processing", "machine_translation", "model_manager", "onnx_runtime", "device",
+        "activity",
     }
@@ -0,0 +1,55 @@
+"""
+File: modules/ai_backend/test_image_arrays.py
+
+Purpose:
+Unit tests for the shared array-input helpers (`image_arrays.py`).
+
+Coverage:
+- `check_rgb_array` accepts `(H, W, 3)` uint8 and rejects other shapes/dtypes;
+- `image_from_array` wraps the array as a PIL RGB image, `at_least_2px` pads
+  1px sides and leaves larger images untouched;
+- `check_inpaint_arrays` checks the mask shape and binarizes it to 0/255.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+pytest.importorskip("PIL")
+
+from modules.ai_backend.image_arrays import (
+    at_least_2px,
+    check_inpaint_arrays,
+    check_rgb_array,
+    image_from_array,
+)
+
+
+def test_check_rgb_array_rejects_non_rgb_uint8() -> None:
+    rgb = np.zeros((4, 5, 3), dtype=np.uint8)
+    assert check_rgb_array(rgb) is rgb
+    for bad in (np.zeros((4, 5), np.uint8), np.zeros((4, 5, 4), np.uint8), np.zeros((4, 5, 3), np.float32)):
+        with pytest.raises(ValueError, match="RGB"):
+            check_rgb_array(bad)
+
+
+def test_image_from_array_and_min_size() -> None:
+    rgb = np.arange(1 * 3 * 3, dtype=np.uint8).reshape(1, 3, 3)
+
+    image = image_from_array(rgb)
+    assert image.mode == "RGB" and image.size == (3, 1)
+    assert at_least_2px(image).size == (3, 2)
+
+    large = image_from_array(np.zeros((4, 5, 3), np.uint8))
+    assert at_least_2px(large) is large
+
+
+def test_check_inpaint_arrays_binarizes_mask() -> None:
+    rgb = np.zeros((2, 3, 3), dtype=np.uint8)
+    mask = np.array([[0, 1, 7], [0, 0, 255]], dtype=np.uint8)
+
+    _, binary = check_inpaint_arrays(rgb, mask)
+    assert binary.tolist() == [[0, 255, 255], [0, 0, 255]]
+    with pytest.raises(ValueError):
+        check_inpaint_arrays(rgb, np.zeros((3, 2), np.uint8))
@@ -0,0 +1,173 @@
+"""
+File: modules/ai_backend/test_inpaint_roi.py
+
+Purpose:
+Unit tests for the shared mask-ROI cropping engine (`inpaint_roi.py`).
+
+Main responsibilities:
+- verify distant mask components get separate padded windows on a tall strip;
+- verify nearby components are merged into one window;
+- verify the full-page fallback and the empty-mask shortcut;
+- verify `inpaint_with_rois` only feeds crops to the inpaint function and
+  leaves every pixel outside the mask untouched;
+- verify over-long windows are split into equal overlapping pieces and
+  grown toward a target aspect ratio inside the page.
+
+No torch or model weights are required; numpy and OpenCV are.
+"""
+
+from __future__ import annotations
+
+import unittest
+
+from modules.ai_backend import inpaint_roi
+
+try:
+    import cv2 as _cv2_for_tests
+    import numpy as _np_for_tests
+except Exception:
+    _cv2_for_tests = None
+    _np_for_tests = None
+
+
+@unittest.skipIf(_np_for_tests is None or _cv2_for_tests is None, "numpy and cv2 are required")
+class PlanRoiWindowsTests(unittest.TestCase):
+    def test_distant_components_get_separate_windows(self) -> None:
+        np = _np_for_tests
+        mask = np.zeros((30000, 800), dtype=np.uint8)
+        mask[1000:1100, 100:300] = 255
+        mask[20000:20050, 500:700] = 255
+        windows = inpaint_roi.plan_roi_windows(mask, context_px=32, merge_gap_px=16)
+        self.assertEqual(len(windows), 2)
+        first, second = windows
+        self.assertEqual(first.as_list(), [68, 968, 332, 1132])
+        self.assertEqual(second.as_list(), [468, 19968, 732, 20082])
+
+    def test_nearby_components_are_merged(self) -> None:
+        np = _np_for_tests
+        mask = np.zeros((4000, 800), dtype=np.uint8)
+        mask[1000:1050, 100:200] = 255
+        mask[1100:1150, 100:200] = 255
+        windows = inpaint_roi.plan_roi_windows(mask, context_px=16, merge_gap_px=32)
+        self.assertEqual(len(windows), 1)
+        self.assertEqual(windows[0].as_list(), [84, 984, 216, 1166])
+
+    def test_large_coverage_falls_back_to_full_page(self) -> None:
+        np = _np_for_tests
+        mask = np.zeros((200, 200), dtype=np.uint8)
+        mask[20:180, 20:180] = 255
+        windows = inpaint_roi.plan_roi_windows(mask, context_px=32)
+        self.assertEqual([w.as_list() for w in windows], [[0, 0, 200, 200]])
+
+    def test_empty_mask_has_no_windows(self) -> None:
+        np = _np_for_tests
+        mask = np.zeros((64, 64), dtype=np.uint8)
+        self.assertEqual(inpaint_roi.plan_roi_windows(mask), [])
+
+    def test_min_window_is_clamped_to_page(self) -> None:
+        np = _np_for_tests
+        mask = np.zeros((20000, 800), dtype=np.uint8)
+        mask[10000:10010, 10:20] = 255
+        windows = inpaint_roi.plan_roi_windows(mask, context_px=8, min_window_px=1024)
+        self.assertEqual(len(windows), 1)
+        window = windows[0]
+        self.assertEqual((window.width, window.height), (800, 1024))
+        self.assertLessEqual(window.y0, 10000)
+        self.assertGreaterEqual(window.y1, 10010)
+
+
+class WindowGeometryTests(unittest.TestCase):
+    def test_split_window_gives_equal_overlapping_pieces(self) -> None:
+        window = inpaint_roi.RoiWindow(0, 1000, 800, 7000)
+        pieces = inpaint_roi.split_window(window, max_aspect=2.4, overlap=256)
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual({(p.x0, p.x1, p.height) for p in pieces}, {(0, 800, 1920)})
+        self.assertEqual((pieces[0].y0, pieces[-1].y1), (1000, 7000))
+        for prev, nxt in zip(pieces, pieces[1:]):
+            self.assertGreaterEqual(prev.y1 - nxt.y0, 256)
+
+    def test_split_window_keeps_short_windows_and_splits_wide_ones(self) -> None:
+        window = inpaint_roi.RoiWindow(0, 0, 1000, 1200)
+        self.assertEqual(inpaint_roi.split_window(window, max_aspect=2.4, overlap=256), [window])
+        wide = inpaint_roi.split_window(inpaint_roi.RoiWindow(0, 0, 3000, 500), max_aspect=2.4, overlap=100)
+        self.assertEqual({(p.y0, p.y1, p.width) for p in wide}, {(0, 500, 1200)})
+        self.assertEqual(wide[-1].x1, 3000)
+
+    def test_fit_window_aspect_grows_short_side_within_page(self) -> None:
+        fitted = inpaint_roi.fit_window_aspect(inpaint_roi.RoiWindow(100, 0, 500, 1200), 832 / 1216, 1000, 5000)
+        self.assertEqual((fitted.width, fitted.height), (round(1200 * 832 / 1216), 1200))
+        self.assertLessEqual(fitted.x0, 100)
+        self.assertGreaterEqual(fitted.x1, 500)
+        clamped = inpaint_roi.fit_window_aspect(inpaint_roi.RoiWindow(0, 0, 600, 1536), 1.0, 800, 5000)
+        self.assertEqual((clamped.x0, clamped.x1, clamped.height), (0, 800, 1536))
+
+
+@unittest.skipIf(_np_for_tests is None or _cv2_for_tests is None, "numpy and cv2 are required")
+class InpaintWithRoisTests(unittest.TestCase):
+    def test_only_crops_are_inpainted_and_unmasked_pixels_kept(self) -> None:
+        np = _np_for_tests
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 255, size=(6000, 400, 3), dtype=np.uint8)
+        mask = np.zeros((6000, 400), dtype=np.uint8)
+        mask[500:540, 50:120] = 255
+        mask[5000:5030, 200:260] = 255
+        seen_shapes: list[tuple[int, int]] = []
+
+        def fake_inpaint(crop_rgb, crop_mask):
+            seen_shapes.append(crop_rgb.shape[:2])
+            self.assertEqual(crop_rgb.shape[:2], crop_mask.shape[:2])
+            return np.zeros_like(crop_rgb)
+
+        out, windows = inpaint_roi.inpaint_with_rois(image, mask, fake_inpaint, context_px=16)
+        self.assertEqual(len(windows), 2)
+        self.assertEqual(len(seen_shapes), 2)
+        self.assertTrue(all(h * w < 200 * 200 for h, w in seen_shapes))
+        self.assertTrue(np.array_equal(out[mask == 0], image[mask == 0]))
+        self.assertFalse(out[mask > 0].any())
+
+    def test_full_page_fallback_calls_inpaint_once_on_originals(self) -> None:
+        np = _np_for_tests
+        image = np.full((100, 100, 3), 7, dtype=np.uint8)
+        mask = np.full((100, 100), 255, dtype=np.uint8)
+        calls = []
+
+        def fake_inpaint(crop_rgb, crop_mask):
+            calls.append((crop_rgb, crop_mask))
+            return crop_rgb + 1
+
+        out, windows = inpaint_roi.inpaint_with_rois(image, mask, fake_inpaint)
+        self.assertEqual(len(windows), 1)
+        self.assertEqual(len(calls), 1)
+        self.assertIs(calls[0][0], image)
+        self.assertTrue((out == 8).all())
+
+    def test_window_paste_without_mask_composite(self) -> None:
+        np = _np_for_tests
+        image = np.zeros((3000, 300, 3), dtype=np.uint8)
+        mask = np.zeros((3000, 300), dtype=np.uint8)
+        mask[100:110, 100:110] = 255
+        out, windows = inpaint_roi.inpaint_with_rois(
+            image,
+            mask,
+            lambda crop, _mask: np.full_like(crop, 9),
+            context_px=16,
+            composite_mask=False,
+        )
+        window = windows[0]
+        self.assertTrue((out[window.y0 : window.y1, window.x0 : window.x1] == 9).all())
+        self.assertEqual(int(out.sum()), 9 * 3 * window.area)
+
+
+class NormalizeRoiParamsTests(unittest.TestCase):
+    def test_defaults_and_clamping(self) -> None:
+        self.assertEqual(
+            inpaint_roi.normalize_roi_params(None),
+            {"roi_crop": True, "roi_context_px": inpaint_roi.DEFAULT_ROI_CONTEXT_PX},
+        )
+        out = inpaint_roi.normalize_roi_params({"roi_crop": "off", "roi_context_px": 99999})
+        self.assertFalse(out["roi_crop"])
+        self.assertEqual(out["roi_context_px"], inpaint_roi.MAX_ROI_CONTEXT_PX)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+"""
+File: modules/ai_backend/test_manga_ocr_service.py
+
+Purpose:
+Unit tests for the MangaOCR ONNX beam search.
+
+Main responsibilities:
+- verify the KV-cached decoders (`with_past` and `merged`) pick exactly the same
+  tokens as the full-prefix decoder, including past reordering between beams;
+- verify every beam step is a single batched decoder call;
+- verify the vectorized n-gram ban matches the HF `no_repeat_ngram_size` rule.
+
+The decoder sessions are fakes whose logits depend on the whole token history;
+the KV-cache fakes carry that history only through their past tensors.
+"""
+
+from __future__ import annotations
+
+import unittest
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+from modules.ai_backend import manga_ocr_service
+
+try:
+    import numpy as _np_for_tests
+except Exception:
+    _np_for_tests = None
+
+_VOCAB = 11
+_EOS = 2
+_START = 1
+
+
+def _history_logits(history):
+    np = _np_for_tests
+    history = np.asarray(history, dtype=np.float64)
+    rows = []
+    for tokens in history:
+        phase = float(np.dot(tokens, np.arange(1, tokens.shape[0] + 1))) * 0.37
+        logits = np.cos(np.arange(_VOCAB) * (1.1 + 0.13 * tokens.shape[0]) + phase) * 3.0
+        logits[_EOS] += 0.25 * tokens.shape[0] - 2.0
+        rows.append(logits)
+    return np.asarray(rows, dtype=np.float32)[:, None, :]
+
+
+class _Meta(SimpleNamespace):
+    pass
+
+
+class _FakeFullDecoder:
+    def __init__(self, with_present: bool = False) -> None:
+        self.calls = []
+        self._with_present = with_present
+
+    def get_inputs(self):
+        return [_Meta(name="input_ids"), _Meta(name="encoder_hidden_states")]
+
+    def get_outputs(self):
+        outputs = [_Meta(name="logits")]
+        if self._with_present:
+            outputs.append(_Meta(name="present.0.decoder.key"))
+        return outputs
+
+    def run(self, output_names, feeds):
+        input_ids = feeds["input_ids"]
+        self.calls.append(input_ids.shape)
+        assert feeds["encoder_hidden_states"].shape[0] == input_ids.shape[0]
+        outputs = [_history_logits(input_ids)]
+        if self._with_present:
+            outputs.append(input_ids[:, None, :, None].astype(_np_for_tests.float32))
+        return outputs
+
+
+class _FakePastDecoder:
+    def __init__(self, merged: bool = False) -> None:
+        self.calls = []
+        self._merged = merged
+
+    def get_inputs(self):
+        inputs = [
+            _Meta(name="input_ids"),
+            _Meta(name="encoder_hidden_states"),
+            _Meta(name="past_key_values.0.decoder.key", shape=["batch", 1, "past", 1], type="tensor(float)"),
+        ]
+        if self._merged:
+            inputs.append(_Meta(name="use_cache_branch"))
+        return inputs
+
+    def get_outputs(self):
+        return [_Meta(name="logits"), _Meta(name="present.0.decoder.key")]
+
+    def run(self, output_names, feeds):
+        np = _np_for_tests
+        input_ids = feeds["input_ids"]
+        past = feeds["past_key_values.0.decoder.key"]
+        self.calls.append(input_ids.shape)
+        if self._merged and not bool(feeds["use_cache_branch"][0]):
+            history = input_ids
+        else:
+            assert input_ids.shape[1] == 1
+            assert past.shape[0] == input_ids.shape[0]
+            history = np.concatenate([past[:, 0, :, 0].astype(np.int64), input_ids], axis=1)
+        return [_history_logits(history), history[:, None, :, None].astype(np.float32)]
+
+
+def _runtime(decoder_session, past_session=None, *, merged: bool = False):
+    runtime = object.__new__(manga_ocr_service._OnnxMangaOcrRuntime)
+    runtime.generation_config = SimpleNamespace(
+        decoder_start_token_id=_START,
+        eos_token_id=_EOS,
+        max_length=12,
+        num_beams=4,
+        no_repeat_ngram_size=3,
+        length_penalty=1.0,
+        early_stopping=True,
+    )
+    runtime._decoder_lock = nullcontext()
+    runtime._decoder_session = decoder_session
+    runtime._decoder_io = manga_ocr_service._DecoderIoNames.from_session(decoder_session)
+    runtime._decoder_past_session = past_session
+    runtime._decoder_past_io = None
+    runtime._decoder_empty_past = {}
+    runtime.decoder_mode = manga_ocr_service.DECODER_MODE_FULL
+    if merged:
+        runtime._decoder_empty_past = manga_ocr_service._empty_past_shapes(decoder_session)
+        runtime.decoder_mode = manga_ocr_service.DECODER_MODE_MERGED
+    elif past_session is not None:
+        runtime._decoder_past_io = manga_ocr_service._DecoderIoNames.from_session(past_session)
+        runtime.decoder_mode = manga_ocr_service.DECODER_MODE_WITH_PAST
+    return runtime
+
+
+@unittest.skipIf(_np_for_tests is None, "numpy is required")
+class MangaOcrBeamSearchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.encoder_states = _np_for_tests.zeros((1, 5, 4), dtype=_np_for_tests.float32)
+
+    def test_with_past_decoder_matches_full_prefix(self) -> None:
+        full = _FakeFullDecoder()
+        expected = _runtime(full)._generate_token_ids(self.encoder_states)
+
+        first = _FakeFullDecoder(with_present=True)
+        past = _FakePastDecoder()
+        cached = _runtime(first, past)._generate_token_ids(self.encoder_states)
+
+        self.assertEqual(cached, expected)
+        self.assertGreater(len(expected), 2)
+        self.assertEqual(first.calls, [(1, 1)])
+        self.assertEqual(len(past.calls), len(full.calls) - 1)
+        self.assertTrue(all(shape[1] == 1 for shape in past.calls))
+
+    def test_merged_decoder_matches_full_prefix(self) -> None:
+        expected = _runtime(_FakeFullDecoder())._generate_token_ids(self.encoder_states)
+        merged = _FakePastDecoder(merged=True)
+        cached = _runtime(merged, merged, merged=True)._generate_token_ids(self.encoder_states)
+        self.assertEqual(cached, expected)
+
+    def test_full_prefix_decoder_batches_beams_per_step(self) -> None:
+        full = _FakeFullDecoder()
+        _runtime(full)._generate_token_ids(self.encoder_states)
+        self.assertEqual(full.calls[0], (1, 1))
+        for step, shape in enumerate(full.calls[1:], start=2):
+            self.assertEqual(shape, (4, step))
+
+
+@unittest.skipIf(_np_for_tests is None, "numpy is required")
+class RepeatedNgramBanTests(unittest.TestCase):
+    @staticmethod
+    def _brute_force(token_ids, ngram_size):
+        if ngram_size <= 0 or len(token_ids) < ngram_size:
+            return set()
+        prefix = tuple(token_ids[len(token_ids) - ngram_size + 1 :])
+        banned = set()
+        for start in range(len(token_ids) - ngram_size + 1):
+            ngram = tuple(token_ids[start : start + ngram_size])
+            if ngram[:-1] == prefix:
+                banned.add(ngram[-1])
+        return banned
+
+    def test_matches_brute_force(self) -> None:
+        np = _np_for_tests
+        rng = np.random.default_rng(3)
+        for ngram_size in (0, 1, 2, 3, 4):
+            for length in (1, 2, 3, 6, 15):
+                tokens = rng.integers(0, 4, size=(3, length), dtype=np.int64)
+                logprobs = np.zeros((3, 4), dtype=np.float32)
+                manga_ocr_service._ban_repeated_ngrams(logprobs, tokens, ngram_size)
+                for row in range(3):
+                    banned = {int(i) for i in np.nonzero(np.isneginf(logprobs[row]))[0]}
+                    self.assertEqual(
+                        banned,
+                        self._brute_force([int(t) for t in tokens[row]], ngram_size),
+                        (ngram_size, tokens[row].tolist()),
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
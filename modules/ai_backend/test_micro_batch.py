@@ -0,0 +1,191 @@
+"""
+File: modules/ai_backend/test_micro_batch.py
+
+Purpose:
+Unit tests for the cross-request micro-batching scheduler (`micro_batch.py`)
+and its use by the PaddleOCR service.
+
+Coverage:
+- concurrent submits with one key coalesce into one batch, results are routed
+  back to the right caller, and different keys never share a batch;
+- `max_batch` caps a group; `window_ms=0` calls through directly;
+- a failing input only fails its own request; a load error reaches every
+  caller of the group from a single `run_batch` call;
+- queue depth / batch-size metrics, also surfaced in the service health;
+- concurrent `PaddleOcrService.recognize_image_bytes` calls reach the ONNX
+  runtime as one `recognize_many` call.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import cv2
+import numpy as np
+import pytest
+
+from modules.ai_backend.micro_batch import MicroBatcher
+
+
+def _submit_concurrently(batcher: MicroBatcher, calls: list[tuple[Any, Any]]) -> list[Any]:
+    """Submits every `(key, item)` from its own thread; returns results or exceptions."""
+    outcomes: list[Any] = [None] * len(calls)
+    start = threading.Barrier(len(calls))
+
+    def worker(index: int, key: Any, item: Any) -> None:
+        start.wait()
+        try:
+            outcomes[index] = batcher.submit(key, item)
+        except Exception as exc:  # noqa: BLE001 - recorded for the assertion
+            outcomes[index] = exc
+
+    threads = [
+        threading.Thread(target=worker, args=(index, key, item))
+        for index, (key, item) in enumerate(calls)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return outcomes
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.batches: list[tuple[Any, list[Any]]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, key: Any, items: list[Any]) -> list[Any]:
+        with self._lock:
+            self.batches.append((key, list(items)))
+        if "bad" in items:
+            raise ValueError("bad input")
+        return [f"{key}:{item}" for item in items]
+
+
+def test_concurrent_submits_share_one_batch_per_key() -> None:
+    recorder = _Recorder()
+    batcher = MicroBatcher("test", recorder, window_ms=300, max_batch=32)
+    calls = [("a", i) for i in range(6)] + [("b", i) for i in range(3)]
+
+    outcomes = _submit_concurrently(batcher, calls)
+
+    assert outcomes == [f"{key}:{item}" for key, item in calls]
+    sizes = sorted((key, len(items)) for key, items in recorder.batches)
+    assert sizes == [("a", 6), ("b", 3)]
+    metrics = batcher.metrics()
+    assert metrics["batches"] == 2 and metrics["requests"] == 9
+    assert metrics["max_batch_size"] == 6 and metrics["avg_batch_size"] == 4.5
+    assert metrics["queue_depth"] == 0 and metrics["in_flight"] == 0
+
+
+def test_max_batch_caps_group_size() -> None:
+    recorder = _Recorder()
+    batcher = MicroBatcher("test", recorder, window_ms=300, max_batch=4)
+    outcomes = _submit_concurrently(batcher, [("k", i) for i in range(10)])
+
+    assert outcomes == [f"k:{i}" for i in range(10)]
+    assert all(len(items) <= 4 for _, items in recorder.batches)
+    assert sum(len(items) for _, items in recorder.batches) == 10
+
+
+def test_failing_item_only_fails_its_own_request() -> None:
+    recorder = _Recorder()
+    batcher = MicroBatcher("test", recorder, window_ms=300, max_batch=32)
+    outcomes = _submit_concurrently(batcher, [("k", 1), ("k", "bad"), ("k", 3)])
+
+    assert outcomes[0] == "k:1" and outcomes[2] == "k:3"
+    assert isinstance(outcomes[1], ValueError)
+
+
+def test_load_error_fails_the_group_without_per_item_retries() -> None:
+    calls: list[list[Any]] = []
+
+    def broken_load(key: Any, items: list[Any]) -> list[Any]:
+        calls.append(list(items))
+        raise FileNotFoundError("weights missing")
+
+    batcher = MicroBatcher("test", broken_load, window_ms=300, max_batch=32)
+    outcomes = _submit_concurrently(batcher, [("k", i) for i in range(4)])
+
+    assert all(isinstance(outcome, FileNotFoundError) for outcome in outcomes)
+    assert sorted(len(items) for items in calls) == [4]
+
+
+def test_zero_window_calls_through() -> None:
+    recorder = _Recorder()
+    batcher = MicroBatcher("test", recorder, window_ms=0)
+    assert not batcher.enabled
+    assert batcher.submit("k", 1) == "k:1"
+    assert recorder.batches == [("k", [1])]
+    with pytest.raises(ValueError):
+        batcher.submit("k", "bad")
+
+
+def test_result_count_mismatch_is_an_error() -> None:
+    batcher = MicroBatcher("test", lambda key, items: [], window_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.submit("k", 1)
+
+
+def test_queue_depth_reported_while_waiting() -> None:
+    release = threading.Event()
+
+    def slow(key: Any, items: list[Any]) -> list[Any]:
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher("test", slow, window_ms=1, max_batch=8)
+    first = threading.Thread(target=batcher.submit, args=("k", 1))
+    first.start()
+    while batcher.metrics()["in_flight"] == 0:
+        time.sleep(0.001)
+    # The running batch holds the key, so the next group stays queued.
+    second = threading.Thread(target=batcher.submit, args=("k", 2))
+    second.start()
+    while batcher.metrics()["queue_depth"] == 0:
+        time.sleep(0.001)
+    assert batcher.metrics()["in_flight"] == 1
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert batcher.metrics()["queue_depth"] == 0
+
+
+def test_paddle_service_batches_concurrent_single_crops(monkeypatch) -> None:
+    from modules.ai_backend import paddle_ocr_service as paddle_mod
+
+    monkeypatch.setattr(
+        paddle_mod,
+        "resolve_provider_settings",
+        lambda _cfg, _device=None: paddle_mod.ProviderSettings("CPUExecutionProvider"),
+    )
+    monkeypatch.setattr(paddle_mod, "resolve_model_paths", lambda _key: SimpleNamespace(
+        rec_model_path=SimpleNamespace(is_file=lambda: True)
+    ))
+    svc = paddle_mod.PaddleOcrService(SimpleNamespace())
+    svc._micro_batcher = MicroBatcher("paddleocr", svc._run_micro_batch, window_ms=300)
+    calls: list[int] = []
+
+    def recognize_many(images, model_key, settings):
+        calls.append(len(images))
+        return [{"lines": [{"text": f"w{int(img.shape[1])}"}]} for img in images]
+
+    svc._runtime = SimpleNamespace(recognize_many=recognize_many)
+    crops = []
+    for width in (10, 20, 30, 40):
+        ok, encoded = cv2.imencode(".png", np.zeros((8, width, 3), dtype=np.uint8))
+        assert ok
+        crops.append(encoded.tobytes())
+
+    batcher = SimpleNamespace(
+        submit=lambda key, item: svc.recognize_image_bytes(item, lang="korean_v5")
+    )
+    outcomes = _submit_concurrently(batcher, [(None, crop) for crop in crops])
+
+    assert [outcome["text"] for outcome in outcomes] == ["w10", "w20", "w30", "w40"]
+    assert calls == [4]
+    assert svc.health()["micro_batch"]["max_batch_size"] == 4
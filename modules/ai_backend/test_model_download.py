@@ -0,0 +1,366 @@
+"""
+File: modules/ai_backend/test_model_download.py
+
+Purpose:
+Unit tests for the shared model download engine (`model_download.py`) against
+a local `http.server` stand-in for the model hosts.
+
+Coverage:
+- segmented parallel download of several files with monotonic aggregate
+  progress that ends at the plan total;
+- resume of a single-stream `.part` with a `Range` request;
+- a connection dropped mid-segment is retried from the last written byte;
+- drops after progress do not use up the retry budget (single stream and
+  segments);
+- an empty file whose probe gets `416` is fetched with a plain GET;
+- a run killed mid-download leaves segment state, and the next run only
+  fetches the missing bytes;
+- sha256 mismatch removes the partial file and raises `ChecksumError`;
+- servers that ignore `Range` are downloaded from the start;
+- resumed requests carry `If-Range` with the probed `ETag`, and a `.part` of
+  a file that changed on the server (new `ETag`) is discarded, for both the
+  single-stream and the segmented path;
+- the Reline and LaMa-MPE download helpers go through the engine.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.server
+import json
+import re
+import threading
+from pathlib import Path
+
+import pytest
+
+from modules.ai_backend import model_download as md
+
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+class _Server:
+    """Serves in-memory files with `Range` support and scripted failures."""
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+        self.requests: list[tuple[str, str | None]] = []
+        self.served_bytes = 0
+        self.ranges = True
+        # path -> ETag; `If-Range` with any other value gets the full body.
+        self.etags: dict[str, str] = {}
+        self.if_ranges: list[str | None] = []
+        # path -> bytes to send before dropping the connection (once per entry,
+        # applied to the next response longer than that).
+        self.drop_after: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+        self._active = 0
+        self._idle = threading.Condition(self._lock)
+        owner = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *_args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                owner._handle(self)
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/{path}"
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def wait_idle(self, timeout: float = 5.0) -> None:
+        """Waits for handlers still writing to connections the client already dropped."""
+        with self._idle:
+            assert self._idle.wait_for(lambda: self._active == 0, timeout)
+
+    def _handle(self, handler: http.server.BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self._active += 1
+        try:
+            self._serve(handler)
+        finally:
+            with self._idle:
+                self._active -= 1
+                self._idle.notify_all()
+
+    def _serve(self, handler: http.server.BaseHTTPRequestHandler) -> None:
+        path = handler.path.lstrip("/")
+        header = handler.headers.get("Range")
+        if_range = handler.headers.get("If-Range")
+        with self._lock:
+            self.requests.append((path, header))
+            self.if_ranges.append(if_range)
+        data = self.files.get(path)
+        if data is None:
+            handler.send_error(404)
+            return
+        etag = self.etags.get(path)
+        start, end = 0, len(data) - 1
+        fresh = if_range is None or if_range == etag
+        match = _RANGE_RE.fullmatch(header or "") if self.ranges and fresh else None
+        if match and int(match.group(1)) >= len(data):
+            handler.send_error(416)
+            return
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else end, len(data) - 1)
+            handler.send_response(206)
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            handler.send_response(200)
+        body = data[start : end + 1]
+        if etag:
+            handler.send_header("ETag", etag)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        with self._lock:
+            drops = self.drop_after.get(path)
+            # Only bodies longer than the limit (never the 1-byte probe or a
+            # short tail segment) consume a scripted drop.
+            limit = drops.pop(0) if drops and len(body) > drops[0] else None
+        if limit is not None:
+            body = body[:limit]
+        handler.wfile.write(body)
+        with self._lock:
+            self.served_bytes += len(body)
+        if limit is not None:
+            handler.close_connection = True
+
+
+@pytest.fixture()
+def server():
+    srv = _Server()
+    yield srv
+    srv.close()
+
+
+def _payload(size: int, seed: int) -> bytes:
+    period = bytes((i * 31 + seed) % 251 for i in range(251))
+    return (period * (size // 251 + 1))[:size]
+
+
+_FAST = {"segment_size": md.CHUNK_SIZE, "retry_delay_s": 0.0, "timeout_s": 10.0}
+
+
+def test_parallel_segments_and_files_with_aggregate_progress(server, tmp_path: Path) -> None:
+    big = _payload(3 * md.CHUNK_SIZE + 12345, 1)
+    small = _payload(5000, 2)
+    server.files.update({"big.bin": big, "sub/small.bin": small})
+    events: list[tuple[int, int, str]] = []
+    items = [
+        md.DownloadItem(
+            server.url("big.bin"), tmp_path / "big.bin", len(big), hashlib.sha256(big).hexdigest()
+        ),
+        md.DownloadItem(server.url("sub/small.bin"), tmp_path / "sub" / "small.bin", 0),
+    ]
+
+    md.download_files(items, progress=lambda *event: events.append(event), **_FAST)
+
+    assert (tmp_path / "big.bin").read_bytes() == big
+    assert (tmp_path / "sub" / "small.bin").read_bytes() == small
+    assert not list(tmp_path.rglob("*.part*"))
+    segment_requests = [r for p, r in server.requests if p == "big.bin" and r != "bytes=0-0"]
+    assert len(segment_requests) == 4
+    done_values = [done for done, _total, _label in events]
+    assert done_values == sorted(done_values)
+    assert events[-1][0] == events[-1][1] == len(big) + len(small)
+
+
+def test_single_stream_resumes_existing_part(server, tmp_path: Path) -> None:
+    data = _payload(40_000, 3)
+    server.files["model.pth"] = data
+    (tmp_path / "model.pth.part").write_bytes(data[:15_000])
+    events: list[tuple[int, int, str]] = []
+
+    md.download_file(
+        server.url("model.pth"), tmp_path / "model.pth", progress=lambda *e: events.append(e), **_FAST
+    )
+
+    assert (tmp_path / "model.pth").read_bytes() == data
+    assert ("model.pth", "bytes=15000-") in server.requests
+    assert events[0][0] == 15_000 and events[-1][0] == 40_000
+
+
+def test_dropped_segment_retries_from_last_byte(server, tmp_path: Path) -> None:
+    data = _payload(2 * md.CHUNK_SIZE + 777, 4)
+    server.files["w.bin"] = data
+    server.drop_after["w.bin"] = [300_000]  # one full-size segment response
+
+    md.download_file(
+        server.url("w.bin"), tmp_path / "w.bin", sha256=hashlib.sha256(data).hexdigest(), **_FAST
+    )
+
+    assert (tmp_path / "w.bin").read_bytes() == data
+    starts = [int(_RANGE_RE.fullmatch(r).group(1)) for p, r in server.requests if p == "w.bin"]
+    resumed = [start for start in starts if start % md.CHUNK_SIZE]
+    assert len(resumed) == 1 and resumed[0] % md.CHUNK_SIZE == 300_000
+    assert server.served_bytes <= len(data) + 1
+
+
+def test_drops_after_progress_do_not_exhaust_retries(server, tmp_path: Path) -> None:
+    stream = _payload(40_000, 13)
+    segmented = _payload(2 * md.CHUNK_SIZE + 777, 14)
+    server.files.update({"s.bin": stream, "g.bin": segmented})
+    server.drop_after["s.bin"] = [10_000] * 3
+    server.drop_after["g.bin"] = [300_000] * 4
+
+    md.download_file(server.url("s.bin"), tmp_path / "s.bin", retries=1, **_FAST)
+    md.download_file(
+        server.url("g.bin"), tmp_path / "g.bin", retries=1, **{**_FAST, "segment_workers": 2}
+    )
+
+    assert (tmp_path / "s.bin").read_bytes() == stream
+    assert (tmp_path / "g.bin").read_bytes() == segmented
+    assert server.drop_after == {"s.bin": [], "g.bin": []}
+
+
+def test_empty_file_probe_416_falls_back_to_plain_get(server, tmp_path: Path) -> None:
+    server.files["empty.txt"] = b""
+
+    md.download_file(server.url("empty.txt"), tmp_path / "empty.txt", **_FAST)
+
+    assert (tmp_path / "empty.txt").read_bytes() == b""
+    assert server.requests == [("empty.txt", "bytes=0-0"), ("empty.txt", None)]
+
+
+def test_interrupted_segmented_run_resumes_from_state(server, tmp_path: Path) -> None:
+    data = _payload(4 * md.CHUNK_SIZE, 5)
+    server.files["t.bin"] = data
+    server.drop_after["t.bin"] = [200_000] * 4
+    dest = tmp_path / "t.bin"
+
+    with pytest.raises(md.DownloadError):
+        md.download_file(server.url("t.bin"), dest, retries=0, **{**_FAST, "segment_workers": 2})
+
+    state = json.loads((tmp_path / "t.bin.part.json").read_text(encoding="utf-8"))
+    already = sum(state["done"])
+    assert already > 0 and not dest.exists()
+    server.wait_idle()
+    server.served_bytes = 0
+    events: list[tuple[int, int, str]] = []
+
+    md.download_file(server.url("t.bin"), dest, progress=lambda *e: events.append(e), **_FAST)
+
+    assert dest.read_bytes() == data
+    assert server.served_bytes == len(data) - already + 1
+    assert events[0][0] == already
+    assert not (tmp_path / "t.bin.part.json").exists()
+
+
+def test_checksum_mismatch_discards_partial_file(server, tmp_path: Path) -> None:
+    server.files["bad.ckpt"] = _payload(9000, 6)
+
+    with pytest.raises(md.ChecksumError):
+        md.download_file(server.url("bad.ckpt"), tmp_path / "bad.ckpt", sha256="0" * 64, **_FAST)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_server_without_range_support_restarts_from_zero(server, tmp_path: Path) -> None:
+    data = _payload(3 * md.CHUNK_SIZE, 7)
+    server.files["plain.bin"] = data
+    server.ranges = False
+    (tmp_path / "plain.bin.part").write_bytes(b"stale")
+
+    md.download_file(server.url("plain.bin"), tmp_path / "plain.bin", **_FAST)
+
+    assert (tmp_path / "plain.bin").read_bytes() == data
+    assert [r for p, r in server.requests if p == "plain.bin"] == ["bytes=0-0", None]
+
+
+def test_stream_resume_sends_if_range(server, tmp_path: Path) -> None:
+    data = _payload(40_000, 8)
+    server.files["v.bin"] = data
+    server.etags["v.bin"] = '"v1"'
+    server.drop_after["v.bin"] = [10_000]
+    dest = tmp_path / "v.bin"
+
+    with pytest.raises(md.DownloadError, match="оборвалось"):
+        md.download_file(server.url("v.bin"), dest, retries=0, **_FAST)
+
+    state = json.loads((tmp_path / "v.bin.part.json").read_text(encoding="utf-8"))
+    assert state["validator"]["etag"] == '"v1"' and state["done"] is None
+    server.wait_idle()
+    server.requests.clear()
+    server.if_ranges.clear()
+
+    md.download_file(server.url("v.bin"), dest, **_FAST)
+
+    assert dest.read_bytes() == data
+    assert server.requests == [("v.bin", "bytes=0-0"), ("v.bin", "bytes=10000-")]
+    assert server.if_ranges == [None, '"v1"']
+
+
+def test_changed_file_restarts_single_stream(server, tmp_path: Path) -> None:
+    server.files["c.bin"] = _payload(40_000, 9)
+    server.etags["c.bin"] = '"v1"'
+    server.drop_after["c.bin"] = [10_000]
+    dest = tmp_path / "c.bin"
+    with pytest.raises(md.DownloadError):
+        md.download_file(server.url("c.bin"), dest, retries=0, **_FAST)
+    server.wait_idle()
+    new = _payload(40_000, 10)
+    server.files["c.bin"] = new
+    server.etags["c.bin"] = '"v2"'
+    server.requests.clear()
+
+    md.download_file(server.url("c.bin"), dest, **_FAST)
+
+    assert dest.read_bytes() == new
+    assert server.requests == [("c.bin", "bytes=0-0"), ("c.bin", None)]
+
+
+def test_changed_file_restarts_segmented_download(server, tmp_path: Path) -> None:
+    server.files["s.bin"] = _payload(4 * md.CHUNK_SIZE, 11)
+    server.etags["s.bin"] = '"v1"'
+    server.drop_after["s.bin"] = [200_000] * 4
+    dest = tmp_path / "s.bin"
+    with pytest.raises(md.DownloadError):
+        md.download_file(server.url("s.bin"), dest, retries=0, **{**_FAST, "segment_workers": 2})
+    server.wait_idle()
+    new = _payload(4 * md.CHUNK_SIZE, 12)
+    server.files["s.bin"] = new
+    server.etags["s.bin"] = '"v2"'
+    server.served_bytes = 0
+
+    md.download_file(server.url("s.bin"), dest, **_FAST)
+
+    assert dest.read_bytes() == new
+    assert server.served_bytes == len(new) + 1
+
+
+def test_missing_file_is_not_retried(server, tmp_path: Path) -> None:
+    with pytest.raises(md.DownloadError, match="404"):
+        md.download_file(server.url("nope.bin"), tmp_path / "nope.bin", **_FAST)
+    assert len(server.requests) == 1
+
+
+def test_reline_and_lama_mpe_use_the_engine(server, tmp_path: Path, monkeypatch) -> None:
+    from modules.ai_backend import lama_mpe_inpaint_service as lama_mod
+    from modules.ai_backend import reline_service
+
+    data = _payload(6000, 8)
+    server.files["x4.pth"] = data
+    monkeypatch.setattr(reline_service, "MODEL_DIR", tmp_path / "reline")
+    monkeypatch.setattr(reline_service, "DOWNLOAD_DIR", tmp_path / "reline" / ".download")
+    (tmp_path / "reline" / ".download").mkdir(parents=True)
+    (tmp_path / "reline" / ".download" / "x4.pth.part").write_bytes(data[:1000])
+
+    path = reline_service._download_model(server.url("x4.pth"), "x4.pth")
+
+    assert path == tmp_path / "reline" / "x4.pth" and path.read_bytes() == data
+    assert ("x4.pth", "bytes=1000-") in server.requests
+
+    lama_mod._download_file(server.url("x4.pth"), tmp_path / "lama.ckpt", hashlib.sha256(data).hexdigest())
+    assert (tmp_path / "lama.ckpt").read_bytes() == data
+    with pytest.raises(md.ChecksumError):
+        lama_mod._download_file(server.url("x4.pth"), tmp_path / "lama2.ckpt", "f" * 64)
@@ -0,0 +1,135 @@
+"""
+File: modules/ai_backend/test_model_manager.py
+
+Purpose:
+Unit tests for memory-budgeted residency in `LoadedModelManager`.
+
+Coverage:
+- without budgets the count limit still evicts least recently used;
+- under a device budget many small models stay resident while a large idle
+  one is evicted first (size-aware LRU);
+- a known footprint from a previous load is evicted for ahead of reloading;
+- an exceeded host budget never evicts a device-only model (and vice versa);
+- measured footprints come from process growth between lease and load;
+- `health()` reports per-model and total resident bytes.
+"""
+
+from __future__ import annotations
+
+from modules.ai_backend import model_manager as mm
+from modules.ai_backend.model_manager import LoadedModelManager, ModelFootprint
+
+_GIB = 1024**3
+_MIB = 1024**2
+
+
+class _Models:
+    """Records unloads and tells the manager about them like a real service."""
+
+    def __init__(self, manager: LoadedModelManager) -> None:
+        self.manager = manager
+        self.unloaded: list[str] = []
+
+    def load(self, key: str, footprint: ModelFootprint) -> None:
+        lease = self.manager.begin_model_use(key)
+        if lease.needs_load:
+            lease.mark_loaded(lambda: self._unload(key), footprint=footprint)
+        lease.release()
+
+    def _unload(self, key: str) -> bool:
+        self.unloaded.append(key)
+        return True
+
+
+def test_count_limit_without_budgets_evicts_lru() -> None:
+    models = _Models(LoadedModelManager(max_loaded_models=2, host_budget_bytes=0, device_budget_bytes=0))
+    for key in ("a", "b", "c"):
+        models.load(key, ModelFootprint(host_bytes=_MIB))
+    assert models.unloaded == ["a"]
+    assert models.manager.health()["limit_mode"] == "count"
+
+
+def test_device_budget_keeps_small_models_and_evicts_large_first() -> None:
+    manager = LoadedModelManager(max_loaded_models=1, device_budget_bytes=16 * _GIB)
+    models = _Models(manager)
+    models.load("inpaint.flux", ModelFootprint(device_bytes=12 * _GIB))
+    for idx in range(6):
+        models.load(f"ocr.small{idx}", ModelFootprint(device_bytes=100 * _MIB))
+    assert models.unloaded == []
+
+    models.load("inpaint.sdxl", ModelFootprint(device_bytes=7 * _GIB))
+
+    assert models.unloaded == ["inpaint.flux"]
+    health = manager.health()
+    assert health["limit_mode"] == "bytes"
+    assert health["resident_model_count"] == 7
+    assert health["resident_device_bytes"] == 7 * _GIB + 600 * _MIB
+    assert health["models"]["inpaint.sdxl"]["device_bytes"] == 7 * _GIB
+
+
+def test_known_footprint_makes_room_before_reload() -> None:
+    manager = LoadedModelManager(host_budget_bytes=10 * _GIB)
+    models = _Models(manager)
+    models.load("big", ModelFootprint(host_bytes=8 * _GIB))
+    manager.mark_unloaded("big")
+    models.load("mid", ModelFootprint(host_bytes=4 * _GIB))
+
+    lease = manager.begin_model_use("big")
+
+    assert models.unloaded == ["mid"]  # evicted before "big" starts loading
+    lease.mark_load_failed()
+    lease.release()
+
+
+def test_budget_only_evicts_models_holding_the_exceeded_resource() -> None:
+    manager = LoadedModelManager(host_budget_bytes=100 * _MIB)
+    models = _Models(manager)
+    models.load("inpaint.flux", ModelFootprint(device_bytes=12000 * _MIB))
+    models.load("ocr.cpu_a", ModelFootprint(host_bytes=80 * _MIB))
+
+    models.load("ocr.cpu_b", ModelFootprint(host_bytes=50 * _MIB))
+    assert models.unloaded == ["ocr.cpu_a"]
+
+    # Only the device-only model is idle now: nothing on the host side to free.
+    models.load("ocr.cpu_c", ModelFootprint(host_bytes=60 * _MIB))
+    assert models.unloaded == ["ocr.cpu_a", "ocr.cpu_b"]
+    models.load("ocr.cpu_d", ModelFootprint(host_bytes=150 * _MIB))
+    assert "inpaint.flux" not in models.unloaded
+    assert "inpaint.flux" in manager.health()["models"]
+
+
+def test_unknown_footprint_is_still_evictable_under_budget() -> None:
+    manager = LoadedModelManager(device_budget_bytes=1 * _GIB)
+    models = _Models(manager)
+    models.load("ocr.cpu", ModelFootprint(host_bytes=500 * _MIB))
+    models.load("legacy", ModelFootprint())
+    models.load("inpaint.big", ModelFootprint(device_bytes=2 * _GIB))
+
+    assert models.unloaded == ["legacy"]
+
+
+def test_measured_footprint_is_growth_since_lease(monkeypatch) -> None:
+    samples = iter([ModelFootprint(1000, 50), ModelFootprint(4000, 30)])
+    monkeypatch.setattr(mm, "measure_process_footprint", lambda: next(samples))
+    manager = LoadedModelManager()
+
+    lease = manager.begin_model_use("ocr.measured")
+    lease.mark_loaded(lambda: True)
+    lease.release()
+
+    assert manager.health()["models"]["ocr.measured"] == {
+        "host_bytes": 3000,
+        "device_bytes": 0,
+        "loading": False,
+    }
+
+
+def test_budget_env_and_file_footprint(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv(mm.HOST_BUDGET_ENV, "512")
+    monkeypatch.setenv(mm.DEVICE_BUDGET_ENV, "garbage")
+    assert LoadedModelManager().get_memory_budgets() == (512 * _MIB, 0)
+
+    weights = tmp_path / "rec.onnx"
+    weights.write_bytes(b"\0" * 4096)
+    assert mm.file_footprint([weights, tmp_path / "missing"], on_device=True) == ModelFootprint(0, 4096)
+    assert mm.file_footprint([weights], on_device=False) == ModelFootprint(4096, 0)
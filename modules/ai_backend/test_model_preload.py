@@ -0,0 +1,165 @@
+"""
+File: modules/ai_backend/test_model_preload.py
+
+Purpose:
+Unit tests for background model preloading (`model_preload.py`) and the
+`models.preload` IPC handler.
+
+Coverage:
+- queued warmups run in the background and emit `model_load` events
+  queued -> loading -> loaded with batch counters;
+- a key already queued or loading with the same params is not queued twice,
+  while the same key with other params is; unknown keys are reported, and a
+  failing warmup emits `failed` without stopping the queue;
+- the built-in targets warm services through their public entry points with
+  the caller's params;
+- the handler accepts string and `{model, params}` entries plus `next_stage`.
+"""
+
+from __future__ import annotations
+
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from modules.ai_backend.ipc.protocol import (
+    METHOD_INPAINT_LAMA_V2,
+    METHOD_MODELS_PRELOAD,
+    METHOD_OCR_EASY,
+    TOPIC_MODEL_LOAD,
+)
+from modules.ai_backend.ipc.registry import METHOD_HANDLERS, HandlerContext
+from modules.ai_backend.model_preload import PRELOAD_TARGETS, ModelPreloader
+
+
+class _Events:
+    def __init__(self) -> None:
+        self.payloads: list[dict] = []
+        self.lock = threading.Lock()
+
+    def publish(self, topic: str, payload: dict, blob: bytes = b"") -> None:
+        assert topic == TOPIC_MODEL_LOAD
+        with self.lock:
+            self.payloads.append(payload)
+
+    def phases(self, model: str) -> list[str]:
+        return [p["phase"] for p in self.payloads if p["model"] == model]
+
+
+def _drain(preloader: ModelPreloader) -> None:
+    preloader._executor.submit(lambda: None).result(timeout=5.0)
+
+
+def test_preload_runs_in_background_and_reports_progress() -> None:
+    gate = threading.Event()
+    loaded: list[tuple[str, dict]] = []
+
+    def slow(state, params) -> None:
+        gate.wait(5.0)
+        loaded.append(("a", params))
+
+    events = _Events()
+    preloader = ModelPreloader(
+        None, events, targets={"a": slow, "b": lambda s, p: loaded.append(("b", p))}
+    )
+    try:
+        first = preloader.preload([("a", {"device": "cpu"}), ("nope", {})])
+        second = preloader.preload([("a", {"device": "cpu"}), ("b", {})])
+        assert first == {"queued": ["a"], "already_pending": [], "unknown": ["nope"]}
+        assert second == {"queued": ["b"], "already_pending": ["a"], "unknown": []}
+        assert preloader.health()["pending"] == ["a", "b"]
+
+        gate.set()
+        _drain(preloader)
+    finally:
+        preloader.shutdown()
+
+    assert loaded == [("a", {"device": "cpu"}), ("b", {})]
+    assert events.phases("a") == ["queued", "loading", "loaded"]
+    last = events.payloads[-1]
+    assert (last["model"], last["loaded"], last["total"]) == ("b", 2, 2)
+
+
+def test_same_key_with_other_params_is_queued_not_dropped() -> None:
+    gate = threading.Event()
+    loaded: list[dict] = []
+
+    def slow(state, params) -> None:
+        gate.wait(5.0)
+        loaded.append(params)
+
+    preloader = ModelPreloader(None, _Events(), targets={"a": slow})
+    try:
+        first = preloader.preload([("a", {"device": "cpu", "checkpoint": "x"})])
+        same = preloader.preload([("a", {"checkpoint": "x", "device": "cpu"})])
+        other = preloader.preload([("a", {"device": "cuda", "checkpoint": "x"})])
+        assert first["queued"] == ["a"]
+        assert same == {"queued": [], "already_pending": ["a"], "unknown": []}
+        assert other == {"queued": ["a"], "already_pending": [], "unknown": []}
+        assert preloader.health()["pending"] == ["a"]
+
+        gate.set()
+        _drain(preloader)
+    finally:
+        preloader.shutdown()
+
+    assert [params["device"] for params in loaded] == ["cpu", "cuda"]
+    assert preloader.health()["pending"] == []
+
+
+def test_failed_warmup_reports_and_does_not_block_queue() -> None:
+    def broken(state, params) -> None:
+        raise RuntimeError("checkpoint missing")
+
+    events = _Events()
+    preloader = ModelPreloader(None, events, targets={"x": broken, "y": lambda s, p: None})
+    try:
+        preloader.preload([("x", {}), ("y", {})])
+        _drain(preloader)
+    finally:
+        preloader.shutdown()
+
+    failed = [p for p in events.payloads if p["phase"] == "failed"]
+    assert failed and failed[0]["message"] == "checkpoint missing"
+    assert events.phases("y")[-1] == "loaded"
+    assert preloader.health()["last_error"] == {"x": "checkpoint missing"}
+
+
+def test_builtin_targets_call_service_entry_points() -> None:
+    state = SimpleNamespace(easy_ocr=MagicMock(), lama_inpaint=MagicMock())
+
+    PRELOAD_TARGETS[METHOD_OCR_EASY](state, {"langs": "ja", "ignored": 1})
+    PRELOAD_TARGETS[METHOD_INPAINT_LAMA_V2](state, {"checkpoint": "big-lama"})
+
+    state.easy_ocr.warmup.assert_called_once_with(langs="ja")
+    (image, mask), kwargs = state.lama_inpaint.inpaint_image_array.call_args
+    assert image.shape == (64, 64, 3) and mask.shape == (64, 64) and mask.any()
+    assert kwargs == {"params": {"checkpoint": "big-lama"}}
+
+
+def test_handler_queues_models_and_next_stage() -> None:
+    preloader = MagicMock()
+    preloader.preload.return_value = {"queued": ["ocr.manga"], "already_pending": [], "unknown": []}
+    preloader.targets = ["ocr.manga"]
+    ctx = HandlerContext(
+        state=SimpleNamespace(model_preloader=preloader),
+        events=MagicMock(),
+        get_health_snapshot=lambda: {},
+    )
+    handler = METHOD_HANDLERS[METHOD_MODELS_PRELOAD]
+
+    resp, blob = handler(
+        ctx,
+        {"models": ["ocr.manga"], "next_stage": {"model": "inpaint.lama_v2", "params": {"a": 1}}},
+        b"",
+        threading.Event(),
+    )
+
+    assert blob == b"" and resp["queued"] == ["ocr.manga"] and resp["targets"] == ["ocr.manga"]
+    preloader.preload.assert_called_once_with([("ocr.manga", {}), ("inpaint.lama_v2", {"a": 1})])
+    with pytest.raises(ValueError):
+        handler(ctx, {"models": [{"params": {}}]}, b"", threading.Event())
+    with pytest.raises(ValueError):
+        handler(ctx, {}, b"", threading.Event())
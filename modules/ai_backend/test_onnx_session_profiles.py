@@ -0,0 +1,185 @@
+"""
+File: modules/ai_backend/test_onnx_session_profiles.py
+
+Purpose:
+Unit tests for the ONNX Runtime session profiles and the persistent optimized
+model cache (`onnx_session_profiles.py`, `OnnxSessionRunner` / `RuntimeFactory`
+in `paddle_onnx_runtime.py`) plus `benchmarks/bench_ort_session.py`.
+
+Coverage:
+- profile -> `SessionOptions` (threads, execution mode, arena, memory pattern,
+  DirectML overrides, `MS_ONNX_INTRA_THREADS`);
+- the first session writes the optimized graph, a new cache object (restart)
+  loads it, outputs are identical; a corrupt entry is rebuilt; non-cacheable
+  providers and `MS_ONNX_OPTIMIZED_CACHE=0` skip the cache;
+- `all`-level profiles persist an `extended` graph and apply the remaining
+  passes when loading it; a requested provider that falls back to CPU is
+  cached under the CPU key;
+- IOBinding runs match plain runs; `RuntimeFactory` applies the caller's
+  profile and reports session stats.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ort = pytest.importorskip("onnxruntime")
+
+from modules.ai_backend import onnx_session_profiles as profiles
+from modules.ai_backend.model_manager import LoadedModelManager
+from modules.ai_backend.onnx_session_profiles import (
+    OptimizedModelCache,
+    SessionProfile,
+    build_session_options,
+    resolve_profile,
+)
+from modules.ai_backend.paddle_onnx_runtime import (
+    OnnxSessionRunner,
+    ProviderSettings,
+    RuntimeFactory,
+    _create_inference_session,
+)
+
+CPU = ProviderSettings(provider="CPUExecutionProvider")
+
+
+@pytest.fixture()
+def model_path() -> Path:
+    from onnxruntime import datasets
+
+    return Path(datasets.get_example("sigmoid.onnx"))
+
+
+def _sample() -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((3, 4, 5)).astype(np.float32)
+
+
+def test_profile_builds_session_options(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv(profiles.INTRA_THREADS_ENV, raising=False)
+    profile = SessionProfile(intra_op_threads=3, inter_op_threads=2, execution_mode="parallel", mem_pattern=True)
+
+    options = build_session_options(profile, "CPUExecutionProvider")
+    assert options.intra_op_num_threads == 3 and options.inter_op_num_threads == 2
+    assert options.execution_mode == ort.ExecutionMode.ORT_PARALLEL
+    assert options.enable_mem_pattern and options.enable_cpu_mem_arena
+    assert options.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    dml = build_session_options(profile, "DmlExecutionProvider", optimize=False)
+    assert dml.execution_mode == ort.ExecutionMode.ORT_SEQUENTIAL and not dml.enable_mem_pattern
+    assert dml.graph_optimization_level == ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+
+    assert profiles.resolve_intra_op_threads(resolve_profile("default")) == profiles.default_intra_op_threads()
+    monkeypatch.setenv(profiles.INTRA_THREADS_ENV, "5")
+    assert build_session_options(resolve_profile("paddle_rec"), "CPUExecutionProvider").intra_op_num_threads == 5
+    assert resolve_profile("unknown_model").name == "unknown_model"
+    with pytest.raises(ValueError):
+        resolve_profile("x", {"x": SessionProfile(graph_optimization="max")})
+
+
+def test_optimized_graph_is_written_then_reused(model_path: Path, tmp_path: Path) -> None:
+    profile = resolve_profile("default")
+    reference = 1.0 / (1.0 + np.exp(-_sample()))
+
+    cold = OnnxSessionRunner(model_path, CPU, profile=profile, optimized_cache=OptimizedModelCache(tmp_path))
+    assert cold.optimized_cache_status == "written"
+    cached = list(tmp_path.glob("sigmoid-*.onnx"))
+    assert len(cached) == 1 and ort.__version__ in cached[0].name
+    assert (tmp_path / profiles.DIGESTS_FILENAME).is_file()
+
+    # A new cache object reads the digest index from disk, like a restart.
+    warm = OnnxSessionRunner(model_path, CPU, profile=profile, optimized_cache=OptimizedModelCache(tmp_path))
+    assert warm.optimized_cache_status == "hit"
+    np.testing.assert_allclose(warm.run(_sample()), reference, rtol=1e-6)
+    np.testing.assert_array_equal(warm.run(_sample()), cold.run(_sample()))
+    assert warm.stats()["runs"] == 2 and warm.stats()["first_run_ms"] is not None
+
+    cached[0].write_bytes(b"not an onnx model")
+    rebuilt = OnnxSessionRunner(model_path, CPU, profile=profile, optimized_cache=OptimizedModelCache(tmp_path))
+    assert rebuilt.optimized_cache_status == "written"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_all_level_persists_extended_graph_and_optimizes_on_load(model_path: Path, tmp_path: Path) -> None:
+    profile = resolve_profile("default")
+    assert profile.graph_optimization == "all" and profile.persisted_level() == "extended"
+    assert SessionProfile(graph_optimization="basic").persisted_level() == "basic"
+
+    for expected in ("written", "hit"):
+        session, status = _create_inference_session(
+            model_path, "CPUExecutionProvider", ["CPUExecutionProvider"], profile, OptimizedModelCache(tmp_path)
+        )
+        assert status == expected
+        level = session.get_session_options().graph_optimization_level
+        assert level == ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    (cached,) = tmp_path.glob("*.onnx")
+    assert cached.name.endswith("-extended.onnx")
+
+
+def test_provider_fallback_is_cached_under_the_active_provider(model_path: Path, tmp_path: Path) -> None:
+    if "CUDAExecutionProvider" in ort.get_available_providers():
+        pytest.skip("needs a CUDA request that falls back to CPU")
+    cache = OptimizedModelCache(tmp_path)
+
+    with pytest.warns(UserWarning):
+        session, status = _create_inference_session(
+            model_path,
+            "CUDAExecutionProvider",
+            ["CUDAExecutionProvider", "CPUExecutionProvider"],
+            resolve_profile("default"),
+            cache,
+        )
+
+    assert status == "written" and session.get_providers()[0] == "CPUExecutionProvider"
+    (cached,) = tmp_path.glob("*.onnx")
+    assert "CPUExecutionProvider" in cached.name and "CUDA" not in cached.name
+
+
+def test_cache_is_skipped_when_disabled_or_unsupported(
+    model_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = OptimizedModelCache(tmp_path)
+    profile = resolve_profile("default")
+    assert not cache.supports("DmlExecutionProvider", profile)
+    assert not cache.supports("CPUExecutionProvider", SessionProfile(optimized_cache=False))
+
+    monkeypatch.setenv(profiles.OPTIMIZED_CACHE_ENV, "0")
+    runner = OnnxSessionRunner(model_path, CPU, profile=profile, optimized_cache=cache)
+    assert runner.optimized_cache_status == "off"
+    assert not list(tmp_path.glob("*.onnx"))
+
+
+def test_io_binding_matches_plain_run(model_path: Path) -> None:
+    plain = OnnxSessionRunner(model_path, CPU, profile=SessionProfile(io_binding=False))
+    bound = OnnxSessionRunner(model_path, CPU, profile=SessionProfile(io_binding=True))
+
+    np.testing.assert_array_equal(bound.run(_sample()), plain.run(_sample()))
+    (out,) = bound.run_feeds({"x": _sample()})
+    np.testing.assert_array_equal(out, plain.run(_sample()))
+
+
+def test_runtime_factory_applies_profile_and_reports_stats(model_path: Path, tmp_path: Path) -> None:
+    factory = RuntimeFactory(LoadedModelManager(), optimized_cache_root=tmp_path)
+
+    session = factory.acquire_runner(model_path, CPU, "lama")
+    try:
+        assert session.runner.profile.io_binding and session.runner.profile.name == "lama"
+        session.runner.run(_sample())
+    finally:
+        session.release()
+
+    health = factory.health()
+    assert health["optimized_cache_dir"] == str(tmp_path)
+    (stats,) = health["sessions"]
+    assert stats["profile"] == "lama" and stats["optimized_cache"] == "written" and stats["runs"] == 1
+
+
+def test_bench_ort_session_small() -> None:
+    from modules.ai_backend.benchmarks import bench_ort_session
+
+    result = bench_ort_session.compare(repeats=1)
+
+    assert result["cache_status"] == {"after_cold": ["written"], "after_warm": ["hit"]}
+    assert all(result[f"{name}_session_ms"] > 0 for name in bench_ort_session.VARIANTS)
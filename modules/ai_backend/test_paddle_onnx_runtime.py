@@ -0,0 +1,240 @@
+"""
+File: modules/ai_backend/test_paddle_onnx_runtime.py
+
+Purpose:
+Unit tests for the PaddleOCR ONNX recognition pipeline helpers.
+
+Main responsibilities:
+- verify line crops of several images are pooled into shared recognizer
+  batches (bounded by `MAX_POOLED_REC_BATCH`) and every decoded line is routed
+  back to its own image and reading-order slot;
+- verify prepared model state is built once per key and dropped together with
+  the runner sessions it was built from;
+- verify the batched CTC decoder matches the per-timestep reference loop and
+  that tensor statistics are not computed while diagnostics are off.
+
+The recognizer is a fake runner; no ONNX models are required.
+"""
+
+from __future__ import annotations
+
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from modules.ai_backend import paddle_onnx_runtime as runtime_mod
+from modules.ai_backend.model_manager import LoadedModelManager
+
+_CHARS = [chr(ord("a") + idx) for idx in range(26)]
+
+
+class _FakeRecRunner:
+    """Decodes every sample to the letter encoded in its (uniform) crop value."""
+
+    selected_provider = "CPUExecutionProvider"
+
+    def __init__(self) -> None:
+        self.batch_sizes: list[int] = []
+
+    def run(self, rec_input: np.ndarray) -> np.ndarray:
+        self.batch_sizes.append(int(rec_input.shape[0]))
+        logits = np.zeros((rec_input.shape[0], 3, len(_CHARS) + 2), dtype=np.float32)
+        for sample_idx, sample in enumerate(rec_input):
+            pixel = float(sample[0, 0, 0]) * 0.5 + 0.5
+            letter_idx = int(round(pixel * 255.0)) // 8
+            logits[sample_idx, 1, letter_idx + 1] = 1.0
+            logits[sample_idx, 0, 0] = 1.0
+            logits[sample_idx, 2, 0] = 1.0
+        return logits
+
+
+class PooledRecognitionTests(unittest.TestCase):
+    def test_crops_of_all_images_share_batches(self) -> None:
+        cfg = runtime_mod.RecConfig(
+            image_shape=(3, 48, 320),
+            character_dict=_CHARS,
+            dynamic_width=False,
+            max_dynamic_width=320,
+        )
+        candidates = []
+        for image_idx in range(3):
+            for sort_idx in range(14):
+                letter_idx = (image_idx * 14 + sort_idx) % 26
+                crop = np.full((20, 60, 3), letter_idx * 8, dtype=np.uint8)
+                candidates.append(
+                    runtime_mod.RecognitionCandidate(
+                        sort_idx=sort_idx,
+                        det_idx=sort_idx,
+                        box=np.zeros((4, 2), dtype=np.float32),
+                        det_score=0.9,
+                        crop=crop,
+                        image_idx=image_idx,
+                    )
+                )
+
+        rec_runner = _FakeRecRunner()
+        runtime = runtime_mod.PaddleOnnxRuntime(factory=None)  # type: ignore[arg-type]
+        lines = runtime._recognize_candidates_batched(
+            candidates,
+            rec_runner=rec_runner,  # type: ignore[arg-type]
+            rec_cfg=cfg,
+            rec_decoder=runtime_mod.CTCLabelDecoder(cfg.character_dict),
+            rec_batch_size=runtime_mod.DEFAULT_REC_BATCH_SIZE,
+            rec_dynamic_batch=True,
+        )
+
+        self.assertEqual(rec_runner.batch_sizes, [runtime_mod.MAX_POOLED_REC_BATCH, 10])
+        self.assertEqual(len(lines), 42)
+        for image_idx in range(3):
+            for sort_idx in range(14):
+                expected = _CHARS[(image_idx * 14 + sort_idx) % 26]
+                self.assertEqual(lines[(image_idx, sort_idx)]["text"], expected)
+
+
+class _FakeLease:
+    def release(self) -> None:
+        pass
+
+
+class PreparedModelCacheTests(unittest.TestCase):
+    def _factory_with_runners(self, *keys: tuple[str, str]):
+        factory = runtime_mod.RuntimeFactory(LoadedModelManager())
+        managed = []
+        for key in keys:
+            runner = object()
+            factory._cache[key] = runner  # type: ignore[assignment]
+            managed.append(runtime_mod.ManagedOnnxSession(runner, _FakeLease(), key))  # type: ignore[arg-type]
+        return factory, managed
+
+    def test_entry_is_built_once_and_evicted_with_its_runner(self) -> None:
+        det_key = ("det.onnx", "CPUExecutionProvider:0")
+        rec_key = ("rec.onnx", "CPUExecutionProvider:0")
+        factory, managed = self._factory_with_runners(det_key, rec_key)
+        builds: list[int] = []
+
+        def build() -> dict[str, int]:
+            builds.append(1)
+            return {"build": len(builds)}
+
+        key = ("rec", "korean_v5", "CPUExecutionProvider:0")
+        first = factory.get_prepared(key, managed, build)
+        self.assertIs(factory.get_prepared(key, managed, build), first)
+        self.assertEqual(len(builds), 1)
+
+        self.assertTrue(factory._unload_runner_by_key(rec_key))
+        factory._cache[rec_key] = object()  # type: ignore[assignment]
+        rebuilt = factory.get_prepared(key, managed, build)
+        self.assertEqual(rebuilt, {"build": 2})
+
+    def test_entry_is_not_cached_when_runner_is_gone(self) -> None:
+        key = ("det.onnx", "CPUExecutionProvider:0")
+        factory, managed = self._factory_with_runners(key)
+        factory._cache.clear()
+        builds: list[int] = []
+        for _ in range(2):
+            factory.get_prepared(("det",), managed, lambda: builds.append(1))
+        self.assertEqual(len(builds), 2)
+
+    def test_build_prepared_rec_adapts_config_and_tables_characters(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            dict_path = Path(tmp) / "dict.txt"
+            dict_path.write_text("a\nb\nc\n", encoding="utf-8")
+            paths = runtime_mod.ResolvedModelPaths(
+                det_model_path=Path(tmp) / "det.onnx",
+                det_config_path=Path(tmp) / "missing.json",
+                rec_model_path=Path(tmp) / "rec.onnx",
+                rec_dict_path=dict_path,
+            )
+            prepared = runtime_mod.build_prepared_rec(paths, ("batch", 3, 48, 640))
+
+        self.assertEqual(prepared.rec_cfg.image_shape, (3, 48, 640))
+        self.assertFalse(prepared.rec_cfg.dynamic_width)
+        self.assertTrue(prepared.rec_dynamic_batch)
+        self.assertIsInstance(prepared.rec_decoder.character_table, np.ndarray)
+        self.assertEqual(list(prepared.rec_decoder.character_table), ["blank", "a", "b", "c", " "])
+        self.assertEqual(prepared.det.det_post.thresh, prepared.det.det_cfg.thresh)
+
+
+def _reference_ctc(character: list[str], logits: np.ndarray) -> list[tuple[str, float]]:
+    out = []
+    for sample in logits:
+        chars, confs, prev = [], [], -1
+        for idx, prob in zip(np.argmax(sample, axis=-1), np.max(sample, axis=-1)):
+            idx = int(idx)
+            if idx != 0 and idx != prev and idx < len(character):
+                chars.append(character[idx])
+                confs.append(float(prob))
+            prev = idx
+        out.append(("".join(chars), float(np.mean(confs)) if confs else 0.0))
+    return out
+
+
+class CtcDecodeTests(unittest.TestCase):
+    def test_batched_decode_matches_reference_loop(self) -> None:
+        rng = np.random.default_rng(5)
+        decoder = runtime_mod.CTCLabelDecoder(["x", "y", "z"])
+        # Two extra classes beyond the dictionary exercise the out-of-range rule.
+        raw = rng.normal(0.0, 2.0, size=(6, 30, len(decoder.character) + 2)).astype(np.float32)
+        raw[:, ::3, 0] += 4.0
+        raw[:, 5:9, 2] += 6.0
+        probs = runtime_mod._softmax(raw, axis=-1)
+        for logits in (raw, probs):
+            self.assertEqual(
+                decoder.decode_batch(logits),
+                _reference_ctc(decoder.character, probs),
+            )
+
+    def test_single_sample_and_empty_input(self) -> None:
+        decoder = runtime_mod.CTCLabelDecoder(["a"])
+        sample = np.zeros((4, 3), dtype=np.float32)
+        sample[[0, 1, 3], [1, 1, 1]] = 1.0
+        sample[2, 0] = 1.0
+        self.assertEqual(decoder.decode_batch(sample), [("aa", 1.0)])
+        self.assertEqual(decoder.decode_batch(np.zeros((2, 0, 3), np.float32)), [("", 0.0), ("", 0.0)])
+
+
+class DiagnosticsGateTests(unittest.TestCase):
+    def test_statistics_are_skipped_when_diagnostics_are_off(self) -> None:
+        cfg = runtime_mod.RecConfig(
+            image_shape=(3, 48, 320),
+            character_dict=_CHARS,
+            dynamic_width=False,
+            max_dynamic_width=320,
+        )
+        candidate = runtime_mod.RecognitionCandidate(
+            sort_idx=0,
+            det_idx=0,
+            box=np.zeros((4, 2), dtype=np.float32),
+            det_score=0.9,
+            crop=np.full((20, 60, 3), 8, dtype=np.uint8),
+        )
+        runtime = runtime_mod.PaddleOnnxRuntime(factory=None)  # type: ignore[arg-type]
+        kwargs = dict(
+            rec_runner=_FakeRecRunner(),
+            rec_cfg=cfg,
+            rec_decoder=runtime_mod.CTCLabelDecoder(cfg.character_dict),
+            rec_batch_size=runtime_mod.DEFAULT_REC_BATCH_SIZE,
+            rec_dynamic_batch=True,
+        )
+        with mock.patch.object(runtime_mod, "_array_stats_str", wraps=runtime_mod._array_stats_str) as stats, \
+                mock.patch.object(runtime_mod, "_log_topk_for_logits") as topk:
+            with mock.patch.object(runtime_mod, "_DIAGNOSTICS_FROM_ENV", False), \
+                    mock.patch.object(runtime_mod.log, "isEnabledFor", return_value=False):
+                lines = runtime._recognize_candidates_batched([candidate], **kwargs)  # type: ignore[arg-type]
+            self.assertEqual(lines[(0, 0)]["text"], "b")
+            self.assertEqual(stats.call_count, 0)
+            self.assertEqual(topk.call_count, 0)
+
+            with mock.patch.object(runtime_mod, "_DIAGNOSTICS_FROM_ENV", True), \
+                    self.assertLogs(runtime_mod.log, level=logging.INFO):
+                runtime._recognize_candidates_batched([candidate], **kwargs)  # type: ignore[arg-type]
+            self.assertGreater(stats.call_count, 0)
+            self.assertEqual(topk.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
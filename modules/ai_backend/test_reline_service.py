@@ -7,19 +7,24 @@ Unit tests for Reline model catalog and filename resolution.
 Main responsibilities:
 - verify compound archive suffixes map to the same model id as bare model names;
 - verify direct model URLs keep the downloadable filename extension;
-- verify extracted checkpoint files satisfy later catalog-name lookups.
+- verify extracted checkpoint files satisfy later catalog-name lookups;
+- verify the upscale model stays resident across images and is evicted through the shared
+  loaded-model manager.
 """
 
 from __future__ import annotations
 
+import os
 import tempfile
 import tarfile
 import unittest
+from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
 from unittest.mock import patch
 
 from modules.ai_backend import reline_service
+from modules.ai_backend.model_manager import LoadedModelManager
 
 
 class RelineModelResolutionTests(unittest.TestCase):
@@ -168,5 +173,156 @@ class RelineModelResolutionTests(unittest.TestCase):
         )
 
 
+@dataclass(frozen=True)
+class _FakeUpscaleOptions:
+    model: str
+    tiler: str
+    target_scale: int | None = None
+    dtype: str = "F32"
+    exact_tiler_size: int = 256
+    allow_cpu_upscale: bool = False
+
+
+class _FakeUpscaleNode:
+    def __init__(self, options: _FakeUpscaleOptions) -> None:
+        self.options = options
+
+
+class RelineResidentUpscalerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.model_path = root / "2x_test.pth"
+        self.model_path.write_bytes(b"checkpoint")
+        self.image_path = root / "page.png"
+        self.image_path.write_bytes(b"png")
+        self.created: list[_FakeUpscaleNode] = []
+        self.runs: list[object] = []
+
+        def create_node(options: dict) -> _FakeUpscaleNode:
+            node = _FakeUpscaleNode(_FakeUpscaleOptions(**options))
+            self.created.append(node)
+            return node
+
+        def run_pipeline(pipeline_json: list[dict], *, upscale_node: object) -> None:
+            self.runs.append(upscale_node)
+            Path(pipeline_json[-1]["options"]["path"]).write_bytes(b"out")
+
+        for patcher in (
+            patch.object(reline_service, "_upscale_device", return_value="cpu"),
+            patch.object(reline_service, "_create_upscale_node", side_effect=create_node),
+            patch.object(reline_service, "_run_pipeline", side_effect=run_pipeline),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmp.cleanup)
+        self.manager = LoadedModelManager(max_loaded_models=1)
+        self.service = reline_service.RelineService(self.manager)
+
+    def _process(self, name: str, **upscale: object) -> dict:
+        options = {
+            "enabled": True,
+            "model_path": str(self.model_path),
+            "allow_cpu_upscale": True,
+            **upscale,
+        }
+        return self.service.process_image_file(
+            image_path=str(self.image_path),
+            output_path=str(Path(self._tmp.name) / name),
+            params={"upscale": options},
+        )
+
+    def test_model_loaded_once_for_many_images(self) -> None:
+        for index in range(5):
+            self._process(f"out{index}.png", exact_tiler_size=400)
+
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(self.runs, [self.created[0]] * 5)
+        self.assertEqual(self.manager.health()["resident_model_count"], 1)
+        self.assertEqual(len(self.service.health()["resident_models"]), 1)
+
+    def test_changed_upscale_options_rebuild_the_node(self) -> None:
+        self._process("a.png", exact_tiler_size=400)
+        self._process("b.png", exact_tiler_size=512)
+        self._process("c.png", exact_tiler_size=512)
+
+        # Options only go through the `UpscaleNode(UpscaleOptions(...))` constructor.
+        self.assertEqual(len(self.created), 2)
+        self.assertEqual(self.created[1].options.exact_tiler_size, 512)
+        self.assertEqual(self.runs, [self.created[0], self.created[1], self.created[1]])
+        self.assertEqual(len(self.service.health()["resident_models"]), 1)
+
+    def test_dtype_is_part_of_the_key_and_lru_evicts(self) -> None:
+        self._process("a.png", dtype="F32")
+        self._process("b.png", dtype="F16")
+        self._process("c.png", dtype="F16")
+
+        self.assertEqual(len(self.created), 2)
+        # max_loaded_models=1: loading the F16 model evicted the F32 one.
+        resident = self.service.health()["resident_models"]
+        self.assertEqual(len(resident), 1)
+        self.assertIn(":F16:", resident[0])
+
+    def test_replaced_checkpoint_is_reloaded(self) -> None:
+        self._process("a.png")
+        stat = self.model_path.stat()
+        os.utime(self.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self._process("b.png")
+        self.assertEqual(len(self.created), 2)
+
+    def test_cpu_without_opt_in_fails_before_loading(self) -> None:
+        with self.assertRaises(RuntimeError):
+            self._process("a.png", allow_cpu_upscale=False)
+        self.assertEqual(self.created, [])
+        self.assertEqual(self.manager.health()["resident_model_count"], 0)
+
+    def test_unload_releases_manager_entry(self) -> None:
+        self._process("a.png")
+        self.assertTrue(self.service.unload())
+        self.assertEqual(self.manager.health()["resident_model_count"], 0)
+        self._process("b.png")
+        self.assertEqual(len(self.created), 2)
+
+
+def _real_reline_nodes() -> object | None:
+    try:
+        from reline import nodes
+    except Exception:  # not installed (or its torch stack is missing)
+        return None
+    return nodes
+
+
+@unittest.skipIf(_real_reline_nodes() is None, "reline is not installed")
+class RelinePublicApiTests(unittest.TestCase):
+    """Checks the installed `reline` still exposes every class the service builds."""
+
+    def test_pipeline_nodes_map_to_public_classes(self) -> None:
+        reline_nodes = _real_reline_nodes()
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = Path(tmp) / "2x_test.pth"
+            model_path.write_bytes(b"checkpoint")
+            params = {
+                "upscale": {"enabled": True, "model_path": str(model_path)},
+                "sharp": {"enabled": True},
+                "halftone": {"enabled": True},
+                "resize": {"enabled": True, "percent": 50},
+                "level": {"enabled": True},
+                "cvt_color": {"enabled": True},
+            }
+            pipeline_json = reline_service.RelineService()._build_pipeline_json(
+                Path(tmp) / "in.png", Path(tmp) / "out.png", params
+            )
+
+        self.assertEqual(
+            [item["type"] for item in pipeline_json], list(reline_service.PIPELINE_NODE_CLASSES)
+        )
+        for item in pipeline_json:
+            node_name, options_name = reline_service.PIPELINE_NODE_CLASSES[item["type"]]
+            self.assertIn(node_name, reline_nodes.__all__)
+            self.assertIn(options_name, reline_nodes.__all__)
+            # Constructing the options validates every field name the service sends.
+            getattr(reline_nodes, options_name)(**item["options"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -9,7 +9,9 @@ Main responsibilities:
 - verify the stateful UTF-8 allowlist keeps target-script bytes (incl. byte
   fallback), digits, and whitespace while banning other scripts;
 - verify EOS is only allowed on a complete-character boundary;
-- verify incremental pending advancement matches a full walk.
+- verify incremental pending advancement matches a full walk;
+- verify the compiled DFA allows exactly what a per-token UTF-8 walk allows, in
+  every state, and that the logits processor tracks row states across steps.
 
 Notes:
 A lightweight fake byte index stands in for `TokenByteIndex` so these tests need
@@ -18,9 +20,21 @@ no tokenizer or model.
 
 from __future__ import annotations
 
+import random
 import unittest
 
-from modules.ai_backend.script_constraint import ScriptConstraint, normalize_script
+import numpy as np
+
+from modules.ai_backend.script_constraint import (
+    ScriptConstraint,
+    ScriptLogitsProcessor,
+    normalize_script,
+)
+
+try:
+    import torch
+except Exception:  # pragma: no cover - torch is optional in test environments
+    torch = None
 
 
 class _FakeIndex:
@@ -107,5 +121,74 @@ class KoreanConstraintTests(unittest.TestCase):
         self.assertNotIn(1, allowed)
 
 
+def _random_index(seed: int, size: int = 3000) -> _FakeIndex:
+    """Byte-fallback tokens plus random multi-script pieces and a few empty ids."""
+    rng = random.Random(seed)
+    pools = [(0xAC00, 0xD7A3), (0x4E00, 0x9FFF), (0x3040, 0x30FF), (0x20, 0x7E), (0x400, 0x4FF)]
+    token_bytes = [b"", b"", b""] + [bytes([b]) for b in range(256)]
+    token_bytes += [b"\xec\x9a", b"\x83\x88", b"\xe4\xb8\x80\xe4"]  # multi-byte partials
+    while len(token_bytes) < size:
+        lo, hi = rng.choice(pools)
+        text = "".join(chr(rng.randint(lo, hi)) for _ in range(rng.randint(1, 3)))
+        token_bytes.append(text.encode("utf-8"))
+    return _FakeIndex(token_bytes, {0, 1}, 1)
+
+
+def _walk_allowed(constraint: ScriptConstraint, pending: bytes) -> list[int]:
+    """Reference: the original per-token UTF-8 walk over the whole vocabulary."""
+    index = constraint._index
+    out = [
+        tid
+        for tid, raw in enumerate(index.token_bytes)
+        if tid not in index.special_ids and constraint._walk(pending + raw)[0]
+    ]
+    if not pending or not out:
+        out.append(index.eos_id)
+    return sorted(out)
+
+
+class CompiledConstraintTests(unittest.TestCase):
+    def test_states_match_reference_walk(self) -> None:
+        index = _random_index(3)
+        for script in ("korean", "chinese", "japanese"):
+            constraint = ScriptConstraint(index, script)
+            self.assertGreater(constraint.state_count, 1)
+            # Boundary state plus a spread of 1- and 2-byte pending states.
+            for pending in constraint._state_bytes[:: max(1, constraint.state_count // 25)]:
+                self.assertEqual(
+                    constraint._allowed_ids(pending),
+                    _walk_allowed(constraint, pending),
+                    (script, pending),
+                )
+
+    def test_allowed_mask_blocks_padded_vocab(self) -> None:
+        ko = _korean()
+        mask = ko.allowed_mask(0, width=len(_TOKEN_BYTES) + 4)
+        self.assertEqual(np.flatnonzero(mask).tolist(), [0, 2, 3, _EOS])
+
+    def test_processor_states_follow_byte_fallback_and_beam_reorder(self) -> None:
+        ko = _korean()
+        proc = ScriptLogitsProcessor(ko, prompt_len=0)
+        pending_state = ko._states[b"\xec"]
+        self.assertEqual(proc.row_states(np.array([[0], [3]])), [0, pending_state])
+        # Rows swapped between steps (beam reorder): states follow the ids.
+        self.assertEqual(
+            proc.row_states(np.array([[3, 4], [0, 3]])),
+            [ko._states[b"\xec\x83"], pending_state],
+        )
+        # A row with no known parent is replayed from the start.
+        self.assertEqual(proc.row_states(np.array([[3, 4, 5, 0, 3]])), [pending_state])
+
+    @unittest.skipIf(torch is None, "torch is not installed")
+    def test_processor_masks_logits_in_place(self) -> None:
+        ko = _korean()
+        proc = ko.logits_processor(prompt_len=1)
+        scores = torch.zeros((2, len(_TOKEN_BYTES) + 1))
+        out = proc(torch.tensor([[9, 0], [9, 3]]), scores)
+        self.assertIs(out, scores)
+        self.assertEqual(torch.isfinite(scores[0]).nonzero().flatten().tolist(), [0, 2, 3, _EOS])
+        self.assertEqual(torch.isfinite(scores[1]).nonzero().flatten().tolist(), [4])
+
+
 if __name__ == "__main__":
     unittest.main()
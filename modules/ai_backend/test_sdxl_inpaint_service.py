@@ -8,15 +8,19 @@ Main responsibilities:
 - verify mode/model_path/sampler validation raises clear errors;
 - verify numeric clamping of steps/cfg/denoise/mask parameters;
 - verify the four-channel denoise cap keeps the LaMa prefill meaningful;
-- verify sampler names map to the expected diffusers scheduler config.
+- verify sampler names map to the expected diffusers scheduler config;
+- verify `roi_mode="bucket"` planning (bucket choice, splitting, grouping),
+  edge feathering and the batched window loop against a fake pipeline.
 
 These tests cover the pure-Python contract only; they do not load torch,
-diffusers, or any model weights.
+diffusers, or any model weights (the bucket loop needs PIL and OpenCV).
 """
 
 from __future__ import annotations
 
 import unittest
+from types import SimpleNamespace
+from unittest import mock
 
 from modules.ai_backend import sdxl_inpaint_service as svc
 
@@ -78,6 +82,14 @@ class NormalizeSdxlParamsTests(unittest.TestCase):
         out = svc.normalize_sdxl_params(self._base(denoise_strength=1.0))
         self.assertEqual(out["denoise_strength"], 1.0)
 
+    def test_roi_mode_and_batch_size(self) -> None:
+        out = svc.normalize_sdxl_params(self._base())
+        self.assertEqual((out["roi_mode"], out["roi_batch_size"]), ("native", 2))
+        out = svc.normalize_sdxl_params(self._base(roi_mode="bucket", roi_batch_size=99))
+        self.assertEqual((out["roi_mode"], out["roi_batch_size"]), ("bucket", svc.MAX_ROI_BATCH_SIZE))
+        with self.assertRaises(ValueError):
+            svc.normalize_sdxl_params(self._base(roi_mode="tiles"))
+
     def test_seed_default_is_random_sentinel(self) -> None:
         out = svc.normalize_sdxl_params(self._base())
         self.assertEqual(out["seed"], -1)
@@ -147,5 +159,121 @@ class MatchVaeRoundtripTests(unittest.TestCase):
         self.assertTrue(np.allclose(corrected, generated))
 
 
+try:
+    import cv2 as _cv2_for_tests
+    from PIL import Image as _pil_for_tests
+except Exception:
+    _cv2_for_tests = None
+    _pil_for_tests = None
+
+
+class _FakeBucketPipe:
+    """Records batched calls and returns a flat gray image per prompt."""
+
+    def __init__(self) -> None:
+        self.calls: list[dict[str, object]] = []
+
+    def __call__(self, **kwargs: object) -> SimpleNamespace:
+        self.calls.append(kwargs)
+        for step in range(2):
+            kwargs["callback_on_step_end"](SimpleNamespace(_num_timesteps=2), step, None, {})
+        size = (kwargs["width"], kwargs["height"])
+        return SimpleNamespace(
+            images=[_pil_for_tests.new("RGB", size, (128, 128, 128)) for _ in kwargs["prompt"]]
+        )
+
+
+@unittest.skipIf(_np_for_tests is None or _cv2_for_tests is None, "numpy, cv2 and PIL are required")
+class BucketRoiModeTests(unittest.TestCase):
+    def test_select_bucket_by_aspect(self) -> None:
+        self.assertEqual(svc.select_sdxl_bucket(1000, 1000), (1024, 1024))
+        self.assertEqual(svc.select_sdxl_bucket(800, 1900), (640, 1536))
+        self.assertEqual(svc.select_sdxl_bucket(4000, 500), (1536, 640))
+        self.assertEqual(svc.select_sdxl_bucket(850, 1200), (832, 1216))
+
+    def test_tall_window_is_split_and_fitted_to_buckets(self) -> None:
+        np = _np_for_tests
+        mask = np.zeros((12000, 800), dtype=np.uint8)
+        mask[1000:6000, 100:700] = 255
+        mask[10000:10020, 300:320] = 255
+        planned = svc.plan_bucket_windows(mask, context_px=32)
+        self.assertGreater(len(planned), 2)
+        for window, bucket in planned:
+            self.assertLessEqual(window.x1, 800)
+            self.assertLessEqual(window.y1, 12000)
+            aspect = window.width / window.height
+            self.assertLess(abs(np.log(aspect / (bucket[0] / bucket[1]))), 0.2)
+        covered = np.zeros(12000, dtype=bool)
+        for window, _bucket in planned:
+            covered[window.y0 : window.y1] = True
+        self.assertTrue(covered[1000:6000].all() and covered[10000:10020].all())
+
+    def test_groups_share_a_bucket_and_respect_batch_size(self) -> None:
+        a, b = (640, 1536), (1024, 1024)
+        planned = [(None, a), (None, b), (None, a), (None, a), (None, b)]
+        self.assertEqual(svc.group_bucket_windows(planned, 2), [[0, 2], [1, 4], [3]])
+        self.assertEqual(svc.group_bucket_windows(planned, 8), [[0, 2, 3], [1, 4]])
+
+    def test_edge_feather_only_on_edges_inside_page(self) -> None:
+        window = svc.RoiWindow(0, 100, 50, 300)
+        weights = svc._edge_feather(window, 50, 1000, 16)
+        self.assertEqual(weights.shape, (200, 50))
+        self.assertTrue(np_all(weights[16:-16] == 1.0))
+        self.assertLess(weights[0, 0], 0.1)
+        self.assertLess(weights[-1, 0], 0.1)
+        self.assertTrue(np_all(weights[100, :] == 1.0))
+
+    def test_bucketed_loop_batches_windows_and_keeps_unmasked_pixels(self) -> None:
+        np = _np_for_tests
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 255, size=(9000, 700, 3), dtype=np.uint8)
+        mask = np.zeros((9000, 700), dtype=np.uint8)
+        mask[500:520, 100:140] = 255
+        mask[4000:4020, 100:140] = 255
+        mask[8000:8020, 500:540] = 255
+        normalized = svc.normalize_sdxl_params(
+            {
+                "mode": "nine_channel",
+                "model_path": "/m.safetensors",
+                "roi_mode": "bucket",
+                "roi_batch_size": 2,
+                "mask_blur": 0,
+                "mask_dilation": 0,
+            }
+        )
+        progress: list[tuple[int, int, dict[str, int]]] = []
+        service = svc.SdxlInpaintService(mock.Mock(), mock.Mock())
+        pipe = _FakeBucketPipe()
+        with mock.patch.object(svc, "_apply_scheduler"):
+            out, windows = service._inpaint_bucketed_locked(
+                pipe,
+                image_rgb=image,
+                mask_u8=mask,
+                normalized=normalized,
+                progress_callback=lambda step, total, _preview, info: progress.append((step, total, info)),
+            )
+
+        self.assertEqual(len(windows), 3)
+        self.assertEqual([len(call["image"]) for call in pipe.calls], [2, 1])
+        self.assertEqual({(call["width"], call["height"]) for call in pipe.calls}, {(832, 1216)})
+        self.assertIsNone(pipe.calls[0]["generator"])
+        self.assertEqual(
+            progress,
+            [
+                (1, 2, {"window": 0, "windows": 3, "batch": 2}),
+                (2, 2, {"window": 0, "windows": 3, "batch": 2}),
+                (1, 2, {"window": 2, "windows": 3, "batch": 1}),
+                (2, 2, {"window": 2, "windows": 3, "batch": 1}),
+            ],
+        )
+        hole = mask > 0
+        self.assertTrue(np.array_equal(out[~hole], image[~hole]))
+        self.assertFalse(np.array_equal(out[hole], image[hole]))
+
+
+def np_all(values: object) -> bool:
+    return bool(_np_for_tests.all(values))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,209 @@
+"""
+File: modules/ai_backend/test_service_array_api.py
+
+Purpose:
+Unit tests for the in-process `*_array` entry points of the detector, OCR and
+FLUX inpaint services.
+
+Coverage:
+- array and PNG-bytes calls reach the model with the same pixels (RGB arrays
+  are converted to the BGR layout OpenCV-based models expect);
+- detector array results carry the mask as a `mask_u8` array that matches the
+  PNG the bytes path returns;
+- single-crop array and bytes calls of PaddleOCR share one micro-batch;
+- invalid arrays are rejected before any model work.
+
+Model runtimes are replaced by fakes; numpy, OpenCV and PIL are required.
+"""
+
+from __future__ import annotations
+
+import threading
+from types import SimpleNamespace
+from typing import Any
+
+import cv2
+import numpy as np
+import pytest
+
+from modules.ai_backend.micro_batch import MicroBatcher
+from modules.ai_backend.model_manager import LoadedModelManager
+
+
+def _image_rgb(width: int = 24, height: int = 16) -> np.ndarray:
+    rng = np.random.default_rng(width * 1000 + height)
+    return rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+
+
+def _png(image_rgb: np.ndarray) -> bytes:
+    ok, encoded = cv2.imencode(".png", cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR))
+    assert ok
+    return encoded.tobytes()
+
+
+def _decode_gray(png: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(png, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def test_paddle_detector_array_matches_bytes(monkeypatch) -> None:
+    from modules.ai_backend import paddle_text_detector_service as paddle_mod
+
+    monkeypatch.setattr(paddle_mod, "resolve_provider_settings", lambda _cfg: SimpleNamespace(
+        provider="CPUExecutionProvider", device_id="0"
+    ))
+    seen: list[np.ndarray] = []
+
+    def detect(image_bgr, _settings):
+        seen.append(image_bgr.copy())
+        box = np.array([[2, 2], [20, 2], [20, 12], [2, 12]], dtype=np.float32)
+        return {"boxes": [box], "scores": [0.9]}
+
+    svc = paddle_mod.PaddleTextDetectorService(SimpleNamespace())
+    svc._runtime = SimpleNamespace(detect=detect)
+    image = _image_rgb()
+
+    from_bytes = svc.detect_image_bytes(_png(image))
+    from_array = svc.detect_image_array(image)
+
+    assert np.array_equal(seen[0], seen[1])
+    assert np.array_equal(seen[1], image[..., ::-1])
+    assert np.array_equal(_decode_gray(from_bytes.pop("mask_png")), from_array.pop("mask_u8"))
+    assert from_bytes == from_array
+
+
+def test_ctd_detector_array_matches_bytes(monkeypatch) -> None:
+    from modules.ai_backend import ctd_text_detector_service as ctd_mod
+
+    monkeypatch.setattr(ctd_mod, "_resolve_selected_backend_device", lambda _fallback: "cpu")
+    seen: list[np.ndarray] = []
+
+    def detector(image_bgr):
+        seen.append(image_bgr.copy())
+        mask = np.zeros(image_bgr.shape[:2], dtype=np.uint8)
+        mask[4:8, 4:12] = 200
+        return None, mask, []
+
+    svc = ctd_mod.CtdTextDetectorService(LoadedModelManager(max_loaded_models=1))
+    monkeypatch.setattr(svc, "_ensure_detector_locked", lambda _params: detector)
+    image = _image_rgb()
+
+    from_bytes = svc.detect_image_bytes(_png(image), params={"mask dilate size": 0})
+    from_array = svc.detect_image_array(image, params={"mask dilate size": 0})
+
+    assert np.array_equal(seen[0], seen[1])
+    mask = from_array.pop("mask_u8")
+    assert set(np.unique(mask)) == {0, 255}
+    assert np.array_equal(_decode_gray(from_bytes.pop("mask_png")), mask)
+    assert from_bytes == from_array
+
+
+def test_paddle_ocr_array_and_bytes_calls_share_a_micro_batch(monkeypatch) -> None:
+    from modules.ai_backend import paddle_ocr_service as paddle_mod
+
+    monkeypatch.setattr(
+        paddle_mod,
+        "resolve_provider_settings",
+        lambda _cfg, _device=None: paddle_mod.ProviderSettings("CPUExecutionProvider"),
+    )
+    svc = paddle_mod.PaddleOcrService(SimpleNamespace())
+    svc._micro_batcher = MicroBatcher("paddleocr", svc._run_micro_batch, window_ms=300)
+    batches: list[list[np.ndarray]] = []
+
+    def recognize_many(images, _model_key, _settings):
+        batches.append(images)
+        return [{"lines": [{"text": f"w{int(img.shape[1])}"}]} for img in images]
+
+    svc._runtime = SimpleNamespace(recognize_many=recognize_many)
+    image = _image_rgb(30, 8)
+    outcomes: dict[str, Any] = {}
+    calls = {
+        "bytes": lambda: svc.recognize_image_bytes(_png(image)),
+        "array": lambda: svc.recognize_image_array(image),
+    }
+    threads = [
+        threading.Thread(target=lambda name=name, call=call: outcomes.__setitem__(name, call()))
+        for name, call in calls.items()
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert outcomes["bytes"]["text"] == outcomes["array"]["text"] == "w30"
+    assert [len(batch) for batch in batches] == [2]
+    assert np.array_equal(batches[0][0], batches[0][1])
+    with pytest.raises(ValueError):
+        svc.recognize_image_array(image[..., 0])
+
+
+def test_easy_ocr_array_matches_bytes(monkeypatch) -> None:
+    from modules.ai_backend import easy_ocr_service as easy_mod
+
+    seen: list[np.ndarray] = []
+
+    class _Reader:
+        def readtext(self, image_rgb, **_kwargs):
+            seen.append(image_rgb.copy())
+            return [([[0, 0], [1, 0], [1, 1], [0, 1]], "hi", 0.9)]
+
+    svc = easy_mod.EasyOcrService(LoadedModelManager(max_loaded_models=1))
+    monkeypatch.setattr(svc, "_ensure_loaded_locked", lambda _langs: _Reader())
+    image = _image_rgb()
+
+    from_bytes = svc.recognize_image_bytes(_png(image))
+    from_array = svc.recognize_images_array([image])[0]
+
+    assert from_bytes == from_array
+    assert np.array_equal(seen[0], image) and np.array_equal(seen[1], image)
+
+
+def test_surya_ocr_array_matches_bytes(monkeypatch) -> None:
+    from modules.ai_backend import surya_ocr_service as surya_mod
+
+    seen: list[np.ndarray] = []
+
+    def predict(images, **_kwargs):
+        seen.extend(np.asarray(image) for image in images)
+        return [SimpleNamespace(text_lines=[SimpleNamespace(text="line")]) for _ in images]
+
+    svc = surya_mod.SuryaOcrService(LoadedModelManager(max_loaded_models=1))
+    monkeypatch.setattr(svc, "_predict_images", predict)
+    image = _image_rgb()
+
+    from_bytes = svc.recognize_images_bytes([_png(image)], join_newlines=False)
+    from_array = svc.recognize_images_array([image], join_newlines=False)
+
+    assert from_bytes == from_array
+    assert np.array_equal(seen[0], seen[1])
+    tiny = svc.recognize_image_array(_image_rgb(1, 1))
+    assert seen[-1].shape == (2, 2, 3) and tiny == from_array[0]
+
+
+def test_manga_ocr_array_and_bytes_queue_the_same_image(monkeypatch) -> None:
+    from modules.ai_backend import manga_ocr_service as manga_mod
+
+    svc = manga_mod.MangaOcrService(LoadedModelManager(max_loaded_models=1), SimpleNamespace())
+    submitted: list[Any] = []
+    monkeypatch.setattr(
+        svc._micro_batcher, "submit", lambda _key, image: submitted.append(image) or {}
+    )
+    image = _image_rgb()
+
+    svc.recognize_image_bytes(_png(image))
+    svc.recognize_image_array(image)
+
+    assert [item.mode for item in submitted] == ["RGB", "RGB"]
+    assert np.array_equal(np.asarray(submitted[0]), np.asarray(submitted[1]))
+
+
+def test_flux_fill_array_rejects_bad_inputs_before_model_work(monkeypatch) -> None:
+    from modules.ai_backend import flux_fill_inpaint_service as flux_mod
+
+    svc = flux_mod.FluxFillInpaintService(LoadedModelManager(max_loaded_models=1))
+    monkeypatch.setattr(svc, "ensure_model", lambda *_args: pytest.fail("model work started"))
+    image = _image_rgb()
+
+    with pytest.raises(ValueError):
+        svc.inpaint_image_array(image, np.zeros((3, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        svc.inpaint_image_array(image.astype(np.float32), np.zeros(image.shape[:2], dtype=np.uint8))
@@ -0,0 +1,199 @@
+"""
+File: modules/ai_backend/test_shm_transport.py
+
+Purpose:
+Unit tests for the shared-memory raw-pixel transport (`ipc/shm.py`) and the
+inpaint handlers' `image_shm`/`mask_shm`/`result_shm` request path.
+
+Coverage:
+- descriptor validation (format, sizes, stride);
+- zero-copy attach honours offset/stride and canonicalizes BGRA/gray inputs;
+- an inpaint handler feeds the attached pixels to `inpaint_image_array` and
+  either writes the result into `result_shm` (empty response blob) or returns
+  it as a PNG blob;
+- descriptor fields are refused unless `shm_image` was negotiated in hello.
+
+Segments are created by the test itself (standing in for the client); no
+models or torch are required.
+"""
+
+from __future__ import annotations
+
+import io
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from types import SimpleNamespace
+from typing import Any
+
+import numpy as np
+import pytest
+
+from modules.ai_backend.ipc import shm as shm_mod
+from modules.ai_backend.ipc.protocol import (
+    CAP_SHM_IMAGE,
+    METHOD_INPAINT_AOT,
+    METHOD_INPAINT_LAMA_V2,
+)
+from modules.ai_backend.ipc.registry import HandlerContext, get_handler
+
+
+@pytest.fixture
+def segment():
+    created: list[shared_memory.SharedMemory] = []
+
+    def make(size: int) -> shared_memory.SharedMemory:
+        seg = shared_memory.SharedMemory(create=True, size=size)
+        created.append(seg)
+        return seg
+
+    yield make
+    for seg in created:
+        seg.close()
+        if sys.platform != "win32" and sys.version_info < (3, 13):
+            # The backend attach unregisters the name from this process's
+            # resource tracker (it normally lives in another process than the
+            # creator); restore it so `unlink` does not trip the tracker.
+            resource_tracker.register(seg._name, "shared_memory")
+        seg.unlink()
+
+
+def _desc(seg: shared_memory.SharedMemory, *, w: int, h: int, stride: int, fmt: str, offset: int = 0) -> dict[str, Any]:
+    return {"shm_name": seg.name, "offset": offset, "w": w, "h": h, "stride": stride, "format": fmt}
+
+
+def _put(seg: shared_memory.SharedMemory, pixels: np.ndarray, *, stride: int, offset: int = 0) -> None:
+    h, w = pixels.shape[:2]
+    channels = 1 if pixels.ndim == 2 else pixels.shape[2]
+    rows = np.ndarray((h, stride), dtype=np.uint8, buffer=seg.buf, offset=offset)
+    rows[:, : w * channels] = pixels.reshape(h, w * channels)
+    del rows
+
+
+class _ArrayService:
+    """Inverts the image and records what `inpaint_image_array` received."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[np.ndarray, np.ndarray, dict[str, Any]]] = []
+
+    def inpaint_image_array(self, image_rgb, mask_u8, *, params):
+        self.calls.append((image_rgb.copy(), mask_u8.copy(), params))
+        return {
+            "image_rgb": 255 - image_rgb,
+            "source_size": [int(image_rgb.shape[1]), int(image_rgb.shape[0])],
+            "device": "cpu",
+            "inpaint_size": 512,
+        }
+
+
+def _ctx(caps: frozenset[str] = frozenset({CAP_SHM_IMAGE}), **services: Any) -> HandlerContext:
+    return HandlerContext(
+        state=SimpleNamespace(**services),
+        events=None,
+        get_health_snapshot=lambda: {},
+        transport_caps=caps,
+    )
+
+
+def test_parse_descriptor_rejects_bad_fields() -> None:
+    good = {"shm_name": "seg", "offset": 0, "w": 4, "h": 2, "stride": 12, "format": "rgb"}
+    assert shm_mod.parse_descriptor(good, "image_shm").nbytes == 24
+    for patch in (
+        {"format": "yuv"},
+        {"stride": 11},
+        {"w": 0},
+        {"offset": -1},
+        {"shm_name": ""},
+        {"h": True},
+    ):
+        with pytest.raises(ValueError):
+            shm_mod.parse_descriptor({**good, **patch}, "image_shm")
+
+
+def test_attach_honours_offset_stride_and_formats(segment) -> None:
+    rng = np.random.default_rng(1)
+    bgra = rng.integers(0, 255, size=(5, 7, 4), dtype=np.uint8)
+    seg = segment(16 + 5 * 40)
+    _put(seg, bgra, stride=40, offset=16)
+    desc = shm_mod.parse_descriptor(_desc(seg, w=7, h=5, stride=40, fmt="bgra", offset=16), "image_shm")
+
+    with shm_mod.attach_image(desc) as view:
+        assert not view.flags.writeable
+        rgb = shm_mod.to_rgb(view, desc.format)
+        mask = shm_mod.to_mask(view, desc.format)
+    assert np.array_equal(rgb, bgra[:, :, 2::-1])
+    assert np.array_equal(mask, bgra[:, :, 3])
+
+
+def test_attach_rejects_descriptor_past_segment_end(segment) -> None:
+    seg = segment(64)
+    # The mapping is page-rounded, so describe rows starting at its very end.
+    desc = shm_mod.parse_descriptor(
+        _desc(seg, w=8, h=8, stride=8, fmt="gray", offset=seg.size), "mask_shm"
+    )
+    with pytest.raises(ValueError):
+        with shm_mod.attach_image(desc):
+            pass
+
+
+def test_handler_reads_shm_and_writes_result_shm(segment) -> None:
+    rng = np.random.default_rng(2)
+    image = rng.integers(0, 255, size=(6, 9, 3), dtype=np.uint8)
+    mask = np.zeros((6, 9), dtype=np.uint8)
+    mask[2:4, 3:6] = 200
+    image_seg, mask_seg, result_seg = segment(6 * 32), segment(6 * 9), segment(6 * 9 * 4)
+    _put(image_seg, image, stride=32)
+    _put(mask_seg, mask, stride=9)
+
+    svc = _ArrayService()
+    header = {
+        "params": {"inpaint_size": 512},
+        "image_shm": _desc(image_seg, w=9, h=6, stride=32, fmt="rgb"),
+        "mask_shm": _desc(mask_seg, w=9, h=6, stride=9, fmt="gray"),
+        "result_shm": _desc(result_seg, w=9, h=6, stride=36, fmt="rgba"),
+    }
+    resp_header, resp_blob = get_handler(METHOD_INPAINT_AOT)(
+        _ctx(aot_inpaint=svc), header, b"", threading.Event()
+    )
+
+    seen_image, seen_mask, seen_params = svc.calls[0]
+    assert np.array_equal(seen_image, image)
+    assert np.array_equal(seen_mask, mask)
+    assert seen_params == {"inpaint_size": 512}
+    assert resp_blob == b""
+    assert resp_header["source_size"] == [9, 6]
+    written = np.ndarray((6, 9, 4), dtype=np.uint8, buffer=result_seg.buf).copy()
+    assert np.array_equal(written[:, :, :3], 255 - image)
+    assert (written[:, :, 3] == 255).all()
+
+
+def test_handler_without_result_shm_returns_png_blob(segment) -> None:
+    from PIL import Image
+
+    image = np.full((4, 4, 3), 10, dtype=np.uint8)
+    image_seg, mask_seg = segment(48), segment(16)
+    _put(image_seg, image, stride=12)
+    svc = _ArrayService()
+    header = {
+        "image_shm": _desc(image_seg, w=4, h=4, stride=12, fmt="rgb"),
+        "mask_shm": _desc(mask_seg, w=4, h=4, stride=4, fmt="gray"),
+    }
+    _, resp_blob = get_handler(METHOD_INPAINT_LAMA_V2)(
+        _ctx(lama_inpaint=svc), header, b"", threading.Event()
+    )
+    with Image.open(io.BytesIO(resp_blob)) as img:
+        assert np.array_equal(np.asarray(img.convert("RGB")), 255 - image)
+
+
+def test_shm_fields_require_negotiated_capability(segment) -> None:
+    seg = segment(48)
+    header = {
+        "image_shm": _desc(seg, w=4, h=4, stride=12, fmt="rgb"),
+        "mask_shm": _desc(seg, w=4, h=4, stride=12, fmt="rgb"),
+    }
+    svc = _ArrayService()
+    with pytest.raises(ValueError, match=CAP_SHM_IMAGE):
+        get_handler(METHOD_INPAINT_AOT)(
+            _ctx(frozenset(), aot_inpaint=svc), header, b"", threading.Event()
+        )
+    assert svc.calls == []
@@ -0,0 +1,152 @@
+"""
+File: modules/ai_backend/test_surya_text_detector_service.py
+
+Purpose:
+Unit tests for the batched page path of `SuryaTextDetectorService`.
+
+Coverage:
+- pages reach the predictor `batch_size` at a time and results come back in
+  input order, each reported through `on_result` as soon as its chunk is done;
+- a page that takes the tiled path flushes the open chunk and is detected on
+  its own, without reordering results;
+- with `keep_results=False` pages are only streamed and nothing is returned;
+- one model lease covers the whole batch;
+- the array variant returns masks as arrays and the bytes variant as PNG;
+- invalid `batch_size` is rejected before any model work.
+
+Surya is not needed: device resolution, predictor loading, the forward pass and
+heatmap post-processing are replaced by fakes.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import cv2
+import numpy as np
+import pytest
+
+from modules.ai_backend import surya_text_detector_service as surya_mod
+from modules.ai_backend.model_manager import LoadedModelManager
+
+
+def _png(width: int, height: int) -> bytes:
+    ok, encoded = cv2.imencode(".png", np.zeros((height, width, 3), dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+
+@pytest.fixture()
+def service(monkeypatch):
+    monkeypatch.setattr(surya_mod, "_resolve_selected_backend_device", lambda _fallback: "cpu")
+    manager = LoadedModelManager(max_loaded_models=1)
+    svc = surya_mod.SuryaTextDetectorService(manager)
+    svc.calls = []
+    svc.tiled = []
+    svc.loads = 0
+
+    def ensure_predictor(_device: str) -> object:
+        svc.loads += 1
+        return object()
+
+    def predict(images_rgb: list[Any], _predictor, _batch_size) -> list[np.ndarray]:
+        svc.calls.append([image.size for image in images_rgb])
+        return [np.zeros((4, 4), dtype=np.float32) for _ in images_rgb]
+
+    def postprocess(_heatmap, size: tuple[int, int]):
+        width, height = size
+        return [{"bbox": [0, 0, width, height]}], [], np.zeros((height, width), dtype=np.uint8)
+
+    def tiled(image_rgb, _predictor, _tile_params) -> dict[str, Any]:
+        svc.tiled.append(image_rgb.size)
+        return {
+            "source_size": list(image_rgb.size),
+            "blocks": [],
+            "lines": [],
+            "mask_u8": np.zeros((image_rgb.size[1], image_rgb.size[0]), dtype=np.uint8),
+            "tiles": 3,
+        }
+
+    monkeypatch.setattr(svc, "_ensure_predictor_locked", ensure_predictor)
+    monkeypatch.setattr(svc, "_predict_heatmaps", predict)
+    monkeypatch.setattr(svc, "_postprocess_heatmap", postprocess)
+    monkeypatch.setattr(svc, "_detect_tiled_page", tiled)
+    svc.manager = manager
+    return svc
+
+
+def test_pages_are_chunked_by_batch_size_and_streamed_in_order(service) -> None:
+    pages = [_png(10 + index, 20) for index in range(5)]
+    seen: list[tuple[int, list[int]]] = []
+
+    results = service.detect_images_bytes(
+        pages,
+        batch_size=2,
+        on_result=lambda index, payload: seen.append((index, payload["source_size"])),
+    )
+
+    assert service.calls == [[(10, 20), (11, 20)], [(12, 20), (13, 20)], [(14, 20)]]
+    assert [result["source_size"] for result in results] == [[10 + i, 20] for i in range(5)]
+    assert seen == [(i, [10 + i, 20]) for i in range(5)]
+    assert all(result["mask_png"].startswith(b"\x89PNG") for result in results)
+    assert service.loads == 1
+    assert service.manager.health()["resident_model_count"] == 1
+
+
+def test_streaming_without_keeping_results_returns_nothing(service) -> None:
+    pages = [_png(10 + index, 20) for index in range(3)]
+    seen: list[int] = []
+
+    results = service.detect_images_bytes(
+        pages,
+        batch_size=2,
+        on_result=lambda index, payload: seen.append(index),
+        keep_results=False,
+    )
+
+    assert results == []
+    assert seen == [0, 1, 2]
+
+
+def test_tiled_page_flushes_open_chunk_and_keeps_order(service) -> None:
+    pages = [_png(10, 20), _png(11, 20), _png(30, 2000), _png(12, 20)]
+
+    results = service.detect_images_bytes(
+        pages, params={"tiled_detection": "on", "tile_height": 512}, batch_size=8
+    )
+
+    assert service.calls == [[(10, 20), (11, 20)], [(12, 20)]]
+    assert service.tiled == [(30, 2000)]
+    assert [result["tiles"] for result in results] == [1, 1, 3, 1]
+
+
+def test_detect_pages_reads_paths(service, tmp_path) -> None:
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"p{index}.png"
+        path.write_bytes(_png(5 + index, 6))
+        paths.append(str(path))
+
+    results = service.detect_pages(paths)
+
+    assert service.calls == [[(5, 6), (6, 6), (7, 6)]]
+    assert len(results) == 3
+
+
+def test_array_pages_return_mask_arrays(service) -> None:
+    images = [np.zeros((20, 10 + index, 3), dtype=np.uint8) for index in range(3)]
+
+    results = service.detect_images_array(images, batch_size=2)
+
+    assert service.calls == [[(10, 20), (11, 20)], [(12, 20)]]
+    assert [result["mask_u8"].shape for result in results] == [(20, 10), (20, 11), (20, 12)]
+    assert all("mask_png" not in result for result in results)
+    with pytest.raises(ValueError):
+        service.detect_image_array(images[0][..., 0])
+
+
+@pytest.mark.parametrize("batch_size", [0, surya_mod.MAX_BATCH_SIZE + 1])
+def test_invalid_batch_size_is_rejected(service, batch_size: int) -> None:
+    with pytest.raises(ValueError):
+        service.detect_images_bytes([_png(4, 4)], batch_size=batch_size)
+    assert service.loads == 0
@@ -0,0 +1,242 @@
+"""
+File: modules/ai_backend/test_torch_onnx_runtime.py
+
+Purpose:
+Unit tests for the ONNX Runtime path of LaMa-v2, AOT and CTD
+(`torch_onnx_runtime.py`, `onnx_export.py`) plus the CPU benchmark
+(`benchmarks/bench_onnx_runtime.py`).
+
+Coverage:
+- runtime selection (`torch` / `onnx` / `auto`) and the explicit-ONNX /
+  refine errors;
+- with fake runners (no torch, no model files): the LaMa padding/crop matches
+  `InpainterV2`, the AOT service feeds the shared session and composites, the
+  CTD service detects through `CTDModel(net=...)` without torch;
+- with torch installed: exported AOT (random weights) matches the torch path
+  within a uint8 tolerance and is compared for CPU latency; LaMa and CTD
+  parity runs against the real checkpoints when they are on disk.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from modules.ai_backend import torch_onnx_runtime
+from modules.ai_backend.model_manager import LoadedModelManager
+from modules.ai_backend.paddle_onnx_runtime import OnnxSessionRunner, ProviderSettings
+from modules.ai_backend.torch_onnx_runtime import (
+    INPAINT_INPUT_NAMES,
+    LamaOnnxInpainter,
+    pad_to_modulo,
+    select_runtime,
+)
+
+CPU = ProviderSettings(provider="CPUExecutionProvider")
+
+
+class _FakeRunner:
+    selected_provider = "CPUExecutionProvider"
+
+    def __init__(self, fn) -> None:
+        self.fn = fn
+        self.feeds: list[dict[str, np.ndarray]] = []
+
+    def run_feeds(self, feeds: dict[str, np.ndarray]) -> list[np.ndarray]:
+        self.feeds.append(feeds)
+        return self.fn(feeds)
+
+
+class _FakeFactory:
+    def __init__(self, runner: _FakeRunner) -> None:
+        self.runner = runner
+        self.acquired: list[Path] = []
+        self.profiles: list[str] = []
+        self.released = 0
+
+    def acquire_runner(self, model_path: Path, settings: ProviderSettings, profile: str = "default"):
+        self.acquired.append(model_path)
+        self.profiles.append(profile)
+        factory = self
+
+        class _Session:
+            runner = self.runner
+
+            def release(self) -> None:
+                factory.released += 1
+
+        return _Session()
+
+
+def test_select_runtime_rules(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    exported = tmp_path / "model.onnx"
+    missing = tmp_path / "missing.onnx"
+    exported.write_bytes(b"onnx")
+    monkeypatch.setattr(torch_onnx_runtime, "is_torch_available", lambda: True)
+
+    assert select_runtime("torch", exported, "cpu") == "torch"
+    assert select_runtime("onnx", missing, "cuda") == "onnx"
+    assert select_runtime("auto", exported, "cpu") == "onnx"
+    assert select_runtime("auto", exported, "cuda") == "torch"
+    assert select_runtime("auto", missing, "cpu") == "torch"
+    monkeypatch.setattr(torch_onnx_runtime, "is_torch_available", lambda: False)
+    assert select_runtime("auto", exported, "cuda") == "onnx"
+
+    monkeypatch.setenv(torch_onnx_runtime.RUNTIME_ENV, " ONNX ")
+    assert torch_onnx_runtime.configured_runtime() == "onnx"
+    monkeypatch.setenv(torch_onnx_runtime.RUNTIME_ENV, "tensorrt")
+    assert torch_onnx_runtime.configured_runtime() == "auto"
+
+
+def test_lama_inpainter_pads_like_inpainter_v2_and_crops_back() -> None:
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (37, 50, 3), dtype=np.uint8)
+    mask = np.zeros((37, 50), dtype=np.uint8)
+    mask[10:20, 5:30] = 255
+    runner = _FakeRunner(lambda feeds: [feeds["image"]])
+
+    out = LamaOnnxInpainter(runner)(image, mask)  # type: ignore[arg-type]
+
+    feeds = runner.feeds[0]
+    assert feeds["image"].shape == (1, 3, 40, 56) and feeds["mask"].shape == (1, 1, 40, 56)
+    assert set(np.unique(feeds["mask"])) == {0.0, 1.0}
+    # Reflect padding without repeating the edge row/column (F.pad mode="reflect").
+    np.testing.assert_array_equal(feeds["image"][0, :, 37, :50], feeds["image"][0, :, 35, :50])
+    np.testing.assert_array_equal(feeds["image"][0, :, :37, 50], feeds["image"][0, :, :37, 48])
+    expected = (np.clip(image.astype("float32") / 255.0, 0, 1) * 255).astype("uint8")
+    np.testing.assert_array_equal(out, expected)
+    assert pad_to_modulo(feeds["image"], 8) is feeds["image"]
+
+
+def test_aot_service_runs_exported_model_on_shared_session(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    from modules.ai_backend import aot_inpaint_service
+
+    onnx_path = tmp_path / "inpainting.onnx"
+    onnx_path.write_bytes(b"onnx")
+    monkeypatch.setattr(aot_inpaint_service, "aot_onnx_path", lambda: onnx_path)
+    runner = _FakeRunner(lambda feeds: [np.zeros_like(feeds["image"])])
+    factory = _FakeFactory(runner)
+    service = aot_inpaint_service.AotInpaintService(LoadedModelManager(), factory)  # type: ignore[arg-type]
+    image = np.full((160, 200, 3), 200, dtype=np.uint8)
+    mask = np.zeros((160, 200), dtype=np.uint8)
+    mask[40:80, 60:120] = 255
+
+    result = service.inpaint_image_array(image, mask, params={"runtime": "onnx", "roi_crop": False})
+
+    assert result["runtime"] == "onnx"
+    assert factory.acquired == [onnx_path] and factory.profiles == ["aot"] and factory.released == 1
+    image_in, mask_in = (runner.feeds[0][name] for name in INPAINT_INPUT_NAMES)
+    assert image_in.shape == (1, 3, 160, 200) and image_in.dtype == np.float32
+    assert np.all(image_in[0, :, 40:80, 60:120] == 0) and mask_in[0, 0, 50, 70] == 1.0
+    out = result["image_rgb"]
+    assert np.all(out[40:80, 60:120] == 128)  # generator output 0 -> (0 + 1) * 127.5, rounded
+    assert np.all(out[:40] == 200)
+    assert service.health()["last_error"] is None
+
+
+def test_lama_refine_is_torch_only() -> None:
+    from modules.ai_backend.lama_inpaint_service import LamaInpaintService
+
+    service = LamaInpaintService(LoadedModelManager())
+    onnx_refine = service._normalize_params({"refine": True, "runtime": "onnx"})
+    with pytest.raises(ValueError):
+        service._select_runtime(onnx_refine, "cpu", "best.ckpt")
+    auto_refine = service._normalize_params({"refine": True, "runtime": "auto"})
+    assert service._select_runtime(auto_refine, "cpu", "best.ckpt") == "torch"
+
+
+def test_ctd_service_detects_through_onnx_net_without_torch(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    from modules.ai_backend import ctd_text_detector_service
+
+    onnx_path = tmp_path / "comictextdetector.onnx"
+    onnx_path.write_bytes(b"onnx")
+    monkeypatch.setattr(ctd_text_detector_service, "ctd_onnx_path", lambda: onnx_path)
+
+    def net(feeds: dict[str, np.ndarray]) -> list[np.ndarray]:
+        batch = feeds["image"]
+        n, _, h, w = batch.shape
+        mask = np.zeros((n, 1, h, w), dtype=np.float32)
+        mask[..., h // 4 : h // 2, w // 4 : w // 2] = 1.0
+        return [mask, np.zeros((n, 2, h, w), dtype=np.float32)]
+
+    runner = _FakeRunner(net)
+    factory = _FakeFactory(runner)
+    service = ctd_text_detector_service.CtdTextDetectorService(LoadedModelManager(), factory)  # type: ignore[arg-type]
+    image = np.full((600, 400, 3), 255, dtype=np.uint8)
+
+    result = service.detect_image_array(image, params={"runtime": "onnx", "detect_size": 1024})
+
+    assert result["runtime"] == "onnx" and result["blocks"] == []
+    assert result["mask_u8"].shape == (600, 400)
+    batch = runner.feeds[0]["image"]
+    assert batch.shape == (1, 3, 1024, 1024) and batch.dtype == np.float32
+    assert factory.released == 1
+
+
+# ---------------------------------------------------------------------------
+# torch <-> ONNX parity (needs torch; LaMa / CTD also need their checkpoints)
+# ---------------------------------------------------------------------------
+
+
+def test_aot_onnx_parity_and_cpu_latency() -> None:
+    pytest.importorskip("torch")
+    from modules.ai_backend.benchmarks import bench_onnx_runtime as bench
+
+    result = bench.compare(size=256, repeats=3)
+
+    assert result["max_abs_diff"] <= 2 and result["mean_abs_diff"] <= 0.05
+    # ORT runs the same graph with fused kernels; it must not be slower on CPU.
+    assert result["onnx_ms"] <= result["torch_ms"] * 1.25
+
+
+def test_lama_onnx_parity_with_checkpoint(tmp_path: Path) -> None:
+    pytest.importorskip("torch")
+    from modules.ai_backend import onnx_export
+    from modules.ai_backend.benchmarks.bench_onnx_runtime import synthetic_case
+    from modules.ai_backend.lama_inpaint_service import LamaInpaintService
+
+    service = LamaInpaintService(LoadedModelManager())
+    try:
+        checkpoint = service._resolve_checkpoint_name(None)
+    except FileNotFoundError:
+        pytest.skip("LaMa checkpoint is not installed")
+    inpainter = service._load_inpainter_class_locked()(
+        checkpoint_dir=str(service._model_dir), checkpoint_name=checkpoint, device="cpu", refine=False, verbose=False
+    )
+    onnx_path = onnx_export.export_inpaint_module(
+        onnx_export.lama_export_module(inpainter.model, inpainter.model_format), tmp_path / "lama.onnx"
+    )
+    image, mask = synthetic_case(300)
+
+    expected = inpainter(image, mask)
+    actual = LamaOnnxInpainter(OnnxSessionRunner(onnx_path, CPU))(image, mask)
+
+    diff = np.abs(expected.astype(np.int16) - actual.astype(np.int16))
+    assert diff.max() <= 3 and diff.mean() <= 0.1
+
+
+def test_ctd_onnx_parity_with_checkpoint(tmp_path: Path) -> None:
+    pytest.importorskip("torch")
+    from modules.ai_backend import onnx_export
+    from modules.ai_backend.benchmarks.bench_onnx_runtime import synthetic_case
+    from modules.ai_backend.ctd_text_detector_service import MODEL_FILENAME, TEXT_DETECTOR_DIR
+    from modules.ai_backend.textdetector.ctd import CTDModel
+    from modules.ai_backend.torch_onnx_runtime import CtdOnnxNet
+
+    model_path = Path(TEXT_DETECTOR_DIR) / MODEL_FILENAME
+    if not model_path.is_file():
+        pytest.skip("CTD checkpoint is not installed")
+    torch_detector = CTDModel(str(model_path), detect_size=1024, device="cpu")
+    onnx_path = onnx_export.export_ctd_module(torch_detector.net, tmp_path / "ctd.onnx")
+    onnx_detector = CTDModel(
+        str(model_path), detect_size=1024, device="cpu", net=CtdOnnxNet(OnnxSessionRunner(onnx_path, CPU))
+    )
+    image, _ = synthetic_case(768)
+
+    expected_mask, _, _ = torch_detector(image)
+    actual_mask, _, _ = onnx_detector(image)
+
+    diff = np.abs(expected_mask.astype(np.int16) - actual_mask.astype(np.int16))
+    assert diff.max() <= 3 and diff.mean() <= 0.1
@@ -0,0 +1,138 @@
+"""
+File: modules/ai_backend/test_translation_cache.py
+
+Purpose:
+Unit tests for the persistent translation cache (`translation_cache.py`) and
+its use in `MachineTranslationService.translate_batch`, against a local stub
+translator instead of `deep_translator`.
+
+Coverage:
+- identical lines in one batch are translated once;
+- a second service over the same cache file answers from disk with no
+  translator call (and without building a translator);
+- credentials are not part of the key, other params and languages are;
+- failed translations are not cached; hit/miss/dedup counters in `health()`;
+- lines split out of a joined request never answer a per-line request;
+- an unusable cache path falls back to memory.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from modules.ai_backend.machine_translation_service import MachineTranslationService
+from modules.ai_backend.translation_cache import TranslationCache, cache_key, normalize_text
+from modules.ai_backend.translation_executor import ProviderLimits, TranslationExecutor
+
+
+class _StubTranslator:
+    calls: list[str] = []
+    instances = 0
+
+    def __init__(self, source: str, target: str, api_key: str | None = None) -> None:
+        type(self).instances += 1
+        self.target = target
+
+    def translate(self, text: str) -> str:
+        type(self).calls.append(text)
+        if text == "boom":
+            raise RuntimeError("quota exceeded")
+        return f"{self.target}:{text}"
+
+
+@pytest.fixture(autouse=True)
+def _reset_stub():
+    _StubTranslator.calls = []
+    _StubTranslator.instances = 0
+
+
+def _service(cache_path: Path | None) -> MachineTranslationService:
+    # No rate limit and no line joining: these tests count one call per line.
+    fast = ProviderLimits(requests_per_s=1000.0, burst=1000, concurrency=4)
+    return MachineTranslationService(
+        cache=TranslationCache(cache_path),
+        translator_classes=lambda: {"google": _StubTranslator, "deepl": _StubTranslator},
+        executor=TranslationExecutor({"google": fast, "deepl": fast}, backoff_s=0.0),
+    )
+
+
+def _translate(service, texts, **kwargs):
+    options = {"service": "google", "source": "ko", "target": "ru", "params": None}
+    options.update(kwargs)
+    return service.translate_batch(texts=texts, **options)
+
+
+def test_batch_dedup_and_persistent_hits(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite3"
+    first = _service(path)
+
+    results = _translate(first, ["Huh?", "...", " Huh? ", "", "...", "Huh?"])
+
+    assert [r["text"] for r in results] == ["ru:Huh?", "ru:...", "ru:Huh?", "", "ru:...", "ru:Huh?"]
+    assert sorted(_StubTranslator.calls) == ["...", "Huh?"]
+    stats = first.health()["cache"]
+    assert (stats["misses"], stats["hits"], stats["deduplicated"], stats["stores"]) == (2, 0, 3, 2)
+
+    second = _service(path)
+    _StubTranslator.instances = 0
+    again = _translate(second, ["...", "Huh?"])
+
+    assert [r["text"] for r in again] == ["ru:...", "ru:Huh?"]
+    assert len(_StubTranslator.calls) == 2 and _StubTranslator.instances == 0
+    assert second.health()["cache"]["hits"] == 2 and second.health()["cache"]["persistent"]
+
+
+def test_key_covers_languages_and_params_but_not_credentials() -> None:
+    base = cache_key("deepl", "ko", "ru", {"api_key": "a", "formality": "less"}, "Hi")
+    assert base == cache_key("deepl", "ko", "ru", {"api_key": "b", "formality": "less"}, " Hi ")
+    assert base != cache_key("deepl", "ko", "en", {"api_key": "a", "formality": "less"}, "Hi")
+    assert base != cache_key("deepl", "ko", "ru", {"api_key": "a", "formality": "more"}, "Hi")
+    assert base != cache_key("google", "ko", "ru", {"api_key": "a", "formality": "less"}, "Hi")
+    assert normalize_text(" a \t b　\n c ") == "a b\nc"
+
+
+def test_joined_results_do_not_answer_per_line_requests(tmp_path: Path) -> None:
+    joining = ProviderLimits(requests_per_s=1000.0, burst=1000, concurrency=4, join_chars=100)
+    service = MachineTranslationService(
+        cache=TranslationCache(tmp_path / "cache.sqlite3"),
+        translator_classes=lambda: {"google": _StubTranslator},
+        executor=TranslationExecutor({"google": joining}, backoff_s=0.0),
+    )
+
+    joined = _translate(service, ["a", "b"], join_lines=True)
+    # The stub only prefixes the whole request, so the second line comes back untouched.
+    assert [r["text"] for r in joined] == ["ru:a", "b"]
+    assert _StubTranslator.calls == ["a\nb"]
+
+    per_line = _translate(service, ["a", "b"])
+
+    assert [r["text"] for r in per_line] == ["ru:a", "ru:b"]
+    assert sorted(_StubTranslator.calls[1:]) == ["a", "b"]
+    assert _translate(service, ["b"], join_lines=True)[0]["text"] == "b"
+
+
+def test_failures_are_not_cached(tmp_path: Path) -> None:
+    service = _service(tmp_path / "cache.sqlite3")
+
+    first = _translate(service, ["boom", "ok", "boom"])
+    second = _translate(service, ["boom"])
+
+    assert first[0] == first[2] == {"ok": False, "error": "quota exceeded"}
+    assert first[1] == {"ok": True, "text": "ru:ok"}
+    assert second[0]["ok"] is False
+    assert sorted(_StubTranslator.calls) == ["boom", "boom", "ok"]
+
+
+def test_unusable_cache_path_falls_back_to_memory(tmp_path: Path) -> None:
+    blocker = tmp_path / "file"
+    blocker.write_text("not a directory")
+    service = _service(blocker / "cache.sqlite3")
+
+    _translate(service, ["a"])
+    _translate(service, ["a"])
+
+    stats = service.health()["cache"]
+    assert _StubTranslator.calls == ["a"]
+    assert stats["persistent"] is False and stats["error"]
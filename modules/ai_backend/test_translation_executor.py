@@ -0,0 +1,212 @@
+"""
+File: modules/ai_backend/test_translation_executor.py
+
+Purpose:
+Unit tests for concurrent, rate-limited translation (`translation_executor.py`)
+with local stub translators, plus the HTTP-stub benchmark
+(`benchmarks/bench_translate.py`).
+
+Coverage:
+- results come back in input order, with per-line errors kept per line;
+- transient errors are retried with backoff, other errors are not;
+- the token bucket holds requests to the configured rate (fake clock);
+- translator instances are reused per key; per-provider concurrency is bounded;
+- short lines are sent one per request by default; with `join_lines` they are
+  joined into one request and split back, with a per-line fallback when the
+  provider returns a different number of lines;
+- against the HTTP stub, the executor matches the sequential path with fewer
+  requests and translator instances.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from modules.ai_backend.translation_executor import (
+    ProviderLimits,
+    TokenBucket,
+    TranslationExecutor,
+    TranslatorPool,
+    _group_lines,
+)
+
+_FAST = ProviderLimits(requests_per_s=1000.0, burst=1000, concurrency=4, join_chars=100)
+
+
+class TooManyRequests(Exception):
+    """Named like deep_translator's rate-limit error, which counts as retryable."""
+
+
+class _Translator:
+    def __init__(self, log: list[str], fail: dict[str, Exception] | None = None) -> None:
+        self.log = log
+        self.fail = fail or {}
+
+    def translate(self, text: str) -> str:
+        self.log.append(text)
+        error = self.fail.get(text)
+        if error is not None:
+            raise error
+        return "\n".join(f"<{line}>" for line in text.split("\n"))
+
+
+@pytest.fixture
+def executor():
+    ex = TranslationExecutor({"stub": _FAST}, backoff_s=0.0)
+    yield ex
+    ex.shutdown()
+
+
+def test_order_and_per_line_errors(executor: TranslationExecutor) -> None:
+    log: list[str] = []
+    texts = [f"t{i}" for i in range(20)]
+
+    outcomes = executor.translate(
+        "stub", "k", lambda: _Translator(log, {"t7": ValueError("bad input")}), texts, join_lines=False
+    )
+
+    assert outcomes[7] == (False, "bad input")
+    assert [o for i, o in enumerate(outcomes) if i != 7] == [
+        (True, f"<t{i}>") for i in range(20) if i != 7
+    ]
+    assert executor.requests_sent == 20
+
+
+def test_retries_transient_errors_only() -> None:
+    attempts = {"flaky": 0}
+
+    class Flaky:
+        def translate(self, text: str) -> str:
+            if text == "flaky":
+                attempts["flaky"] += 1
+                if attempts["flaky"] < 3:
+                    raise TooManyRequests("slow down")
+                return "ok"
+            raise RuntimeError("quota exceeded")
+
+    ex = TranslationExecutor({"stub": _FAST}, retries=2, backoff_s=0.0)
+    try:
+        outcomes = ex.translate("stub", "k", Flaky, ["flaky", "fatal"], join_lines=False)
+    finally:
+        ex.shutdown()
+
+    assert outcomes == [(True, "ok"), (False, "quota exceeded")]
+    assert attempts["flaky"] == 3 and ex.requests_sent == 4
+
+
+def test_token_bucket_limits_rate(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    sleeps: list[float] = []
+    bucket = TokenBucket(rate_per_s=2.0, burst=2, clock=lambda: now[0])
+
+    def fake_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr("modules.ai_backend.translation_executor.time.sleep", fake_sleep)
+    for _ in range(4):
+        bucket.acquire()
+
+    # Two requests of burst, then one every 0.5 s.
+    assert sleeps == pytest.approx([0.5, 0.5])
+    assert now[0] == pytest.approx(1.0)
+
+
+def test_pool_reuses_instances_per_key() -> None:
+    pool = TranslatorPool(max_keys=2)
+    with pool.lease("a", object) as first:
+        with pool.lease("a", object) as second:
+            assert first is not second
+    with pool.lease("a", object) as again:
+        assert again in (first, second)
+    pool.ensure("b", object)
+    pool.ensure("c", object)
+    with pool.lease("a", object) as evicted:
+        assert evicted not in (first, second)
+    assert pool.created == 5
+
+
+def test_concurrency_is_bounded_per_provider() -> None:
+    limits = ProviderLimits(requests_per_s=1000.0, burst=1000, concurrency=2)
+    lock = threading.Lock()
+    active = [0, 0]  # current, peak
+
+    class Slow:
+        def translate(self, text: str) -> str:
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return text
+
+    ex = TranslationExecutor({"stub": limits}, max_workers=8)
+    try:
+        outcomes = ex.translate("stub", "k", Slow, [str(i) for i in range(12)])
+    finally:
+        ex.shutdown()
+
+    assert [text for _, text in outcomes] == [str(i) for i in range(12)]
+    assert active[1] == 2
+    assert ex.pool.created == 2
+
+
+def test_joins_short_lines_and_falls_back_on_mismatch(executor: TranslationExecutor) -> None:
+    log: list[str] = []
+    outcomes = executor.translate(
+        "stub", "k", lambda: _Translator(log), ["a", "b", "two\nlines", "c"], join_lines=True
+    )
+
+    assert outcomes == [(True, "<a>"), (True, "<b>"), (True, "<two>\n<lines>"), (True, "<c>")]
+    assert sorted(log) == ["a\nb\nc", "two\nlines"]
+
+    class Merging:
+        def translate(self, text: str) -> str:
+            log.append(text)
+            return text.replace("\n", " ")
+
+    log.clear()
+    outcomes = executor.translate("stub", "m", Merging, ["x", "y"], join_lines=True)
+    assert outcomes == [(True, "x"), (True, "y")]
+    assert log == ["x\ny", "x", "y"]
+
+
+def test_lines_are_not_joined_by_default(executor: TranslationExecutor) -> None:
+    log: list[str] = []
+    outcomes = executor.translate("stub", "d", lambda: _Translator(log), ["a", "b"])
+
+    assert outcomes == [(True, "<a>"), (True, "<b>")]
+    assert sorted(log) == ["a", "b"]
+
+
+def test_group_lines_respects_budget() -> None:
+    assert _group_lines(["aa", "bb", "cc"], 5) == [[0, 1], [2]]
+    assert _group_lines(["aa", "bb"], 0) == [[0], [1]]
+    assert _group_lines(["long text", "a"], 4) == [[0], [1]]
+
+
+def test_benchmark_matches_sequential_with_fewer_requests() -> None:
+    from modules.ai_backend.benchmarks import bench_translate as bench
+
+    server = bench.StubServer(latency_s=0.01)
+    bench.HttpStubTranslator.url = server.url
+    try:
+        texts = bench.synthetic_lines(12)
+        _, seq_requests, seq_instances, expected = bench.measure(
+            lambda: bench.run_sequential(texts), server
+        )
+        _, requests, instances, joined = bench.measure(lambda: bench.run_executor(texts), server)
+        _, _, pooled, concurrent = bench.measure(
+            lambda: bench.run_executor(texts, join_lines=False), server
+        )
+    finally:
+        server.close()
+
+    assert joined == concurrent == expected == [f"[{text}]" for text in texts]
+    assert (seq_requests, seq_instances) == (12, 12)
+    assert requests == 1 and instances == 1
+    assert pooled <= bench.BENCH_LIMITS.concurrency
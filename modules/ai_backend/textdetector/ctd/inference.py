@@ -4,13 +4,15 @@ from typing import Callable, List, Tuple, Union
 import cv2
 import einops
 import numpy as np
-import torch
+
+try:
+    import torch
+except ImportError:  # the ONNX backend (`net=`) runs without torch
+    torch = None
 
 from config import TEXT_DETECTOR_DIR
 from ..db_utils import SegDetectorRepresenter
 from ..td_utlis import TextBlock, group_output, letterbox, square_pad_resize
-from ..yolov5.yolov5_utils import non_max_suppression
-from .basemodel import TextDetBase
 from .textmask import REFINEMASK_INPAINT, REFINEMASK_ANNOTATION, refine_mask, refine_undetected_mask
 
 CTD_MODEL_PATH = Path(TEXT_DETECTOR_DIR) / "comictextdetector.pt"
@@ -162,9 +164,9 @@ def preprocess_img(img, detect_size=(1024, 1024), device='cpu', bgr2rgb=True, ha
                 img_in = img_in.half()
     return img_in, ratio, int(dw), int(dh)
 
-def postprocess_mask(img: Union[torch.Tensor, np.ndarray], thresh=None):
+def postprocess_mask(img: Union['torch.Tensor', np.ndarray], thresh=None):
     # img = img.permute(1, 2, 0)
-    if isinstance(img, torch.Tensor):
+    if torch is not None and isinstance(img, torch.Tensor):
         img = img.squeeze_()
         if img.device != 'cpu':
             img = img.detach().cpu()
@@ -179,6 +181,8 @@ def postprocess_mask(img: Union[torch.Tensor, np.ndarray], thresh=None):
     return img.astype(np.uint8)
 
 def postprocess_yolo(det, conf_thresh, nms_thresh, resize_ratio, sort_func=None):
+    from ..yolov5.yolov5_utils import non_max_suppression
+
     det = non_max_suppression(det, conf_thresh, nms_thresh)[0]
     # bbox = det[..., 0:4]
     if det.device != 'cpu':
@@ -197,7 +201,12 @@ class TextDetector:
     lang_list = ['eng', 'ja', 'unknown']
     langcls2idx = {'eng': 0, 'ja': 1, 'unknown': 2}
 
-    def __init__(self, model_path, detect_size=1024, device='cpu', half=False, nms_thresh=0.35, conf_thresh=0.4, det_rearrange_max_batches=4):
+    def __init__(self, model_path, detect_size=1024, device='cpu', half=False, nms_thresh=0.35, conf_thresh=0.4, det_rearrange_max_batches=4, net=None):
+        '''
+        net: prebuilt network returning `(blks, mask, lines)` for an NCHW float32
+            batch, e.g. `CtdOnnxNet` from `torch_onnx_runtime.py`. When given, the
+            torch checkpoint is not loaded and `backend` is 'onnx'.
+        '''
         super(TextDetector, self).__init__()
 
         self.net: TextDetBase = None
@@ -210,18 +219,28 @@ class TextDetector:
         self.nms_thresh = nms_thresh
         self.seg_rep = SegDetectorRepresenter(thresh=0.3)
 
-        self.backend = 'torch'
-        self.load_model(model_path)
+        if net is not None:
+            self.net = net
+            self.backend = 'onnx'
+        else:
+            self.backend = 'torch'
+            self.load_model(model_path)
 
         self.det_rearrange_max_batches = det_rearrange_max_batches
 
     def load_model(self, model_path: Union[str, Path]):
+        from .basemodel import TextDetBase
+
         self.net = TextDetBase(model_path, device=self.device, act='leaky', half=self.half)
         self.backend = 'torch'
 
     def set_device(self, device: str):
         if self.device == device:
             return
+        if self.backend != 'torch':
+            # ONNX sessions are bound to a provider; the service builds a new detector.
+            self.device = device
+            return
         if not CTD_MODEL_PATH.exists():
             raise FileNotFoundError(f'CTD model not found: {CTD_MODEL_PATH}')
         self.device = device
@@ -230,15 +249,22 @@ class TextDetector:
     def det_batch_forward_ctd(self, batch: np.ndarray, device: str) -> Tuple[np.ndarray, np.ndarray]:
         
         batch = einops.rearrange(batch.astype(np.float32) / 255., 'n h w c -> n c h w')
+        if self.backend != 'torch':
+            _, mask, lines = self.net(np.ascontiguousarray(batch))
+            return lines, mask
         batch = torch.from_numpy(batch).to(device)
         _, mask, lines = self.net(batch)
         mask = mask.cpu().numpy()
         lines = lines.cpu().numpy()
         return lines, mask
 
-    @torch.no_grad()
     def __call__(self, img, refine_mode=REFINEMASK_INPAINT, keep_undetected_mask=False) -> Tuple[np.ndarray, np.ndarray, List[TextBlock]]:
-        
+        if self.backend != 'torch':
+            return self._detect(img, refine_mode, keep_undetected_mask)
+        with torch.no_grad():
+            return self._detect(img, refine_mode, keep_undetected_mask)
+
+    def _detect(self, img, refine_mode, keep_undetected_mask) -> Tuple[np.ndarray, np.ndarray, List[TextBlock]]:
         detect_size = self.detect_size
         im_h, im_w = img.shape[:2]
         lines_map, mask = det_rearrange_forward(img, self.det_batch_forward_ctd, detect_size, self.det_rearrange_max_batches, self.device)
@@ -246,10 +272,15 @@ class TextDetector:
         resize_ratio = [1, 1]
         if lines_map is None:
             img_in, ratio, dw, dh = preprocess_img(img, bgr2rgb=False, detect_size=detect_size, device=self.device, half=self.half, to_tensor=self.backend=='torch')
+            if self.backend != 'torch':
+                # Same layout as the torch tensor: HWC to CHW, BGR to RGB, [0, 1].
+                img_in = np.ascontiguousarray(img_in.transpose((2, 0, 1))[::-1][None]).astype(np.float32) / 255
             blks, mask, lines_map = self.net(img_in)
             mask = mask.squeeze()
             resize_ratio = (im_w / (detect_size - dw), im_h / (detect_size - dh))
-            blks = postprocess_yolo(blks, self.conf_thresh, self.nms_thresh, resize_ratio)
+            if blks is not None:
+                # Block boxes are regrouped from `lines` below; the ONNX export drops them.
+                blks = postprocess_yolo(blks, self.conf_thresh, self.nms_thresh, resize_ratio)
             mask = mask[..., :mask.shape[0]-dh, :mask.shape[1]-dw]
             lines_map = lines_map[..., :lines_map.shape[2]-dh, :lines_map.shape[3]-dw]
 
@@ -1,4 +1,7 @@
-from typing import List
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 import cv2
 import numpy as np
 from ..td_utlis import TextBlock, enlarge_window, union_area
@@ -11,6 +14,11 @@ LANG_JPN = 1
 REFINEMASK_INPAINT = 0
 REFINEMASK_ANNOTATION = 1
 
+# Worker threads for per-block refinement in `refine_mask` (shared, created lazily).
+REFINE_MAX_WORKERS = max(1, min(8, os.cpu_count() or 1))
+_REFINE_POOL: Optional[ThreadPoolExecutor] = None
+_REFINE_POOL_LOCK = threading.Lock()
+
 def get_topk_color(color_list, bins, k=3, color_var=10, bin_tol=0.001):
     idx = np.argsort(bins * -1)
     color_list, bins = color_list[idx], bins[idx]
@@ -68,6 +76,18 @@ def get_topk_masklist(im_grey, pred_mask):
         mask_list.append([threshed, xor_sum])
     return mask_list
 
+def _labels_improving_xor(labels: np.ndarray, num_labels: int, mask_merged: np.ndarray, gain: np.ndarray) -> np.ndarray:
+    """Per label: would OR-ing it into `mask_merged` lower the xor with the prediction?"""
+    unset = mask_merged == 0
+    delta = np.bincount(labels[unset], weights=gain[unset], minlength=num_labels)
+    return delta[:num_labels] < 0
+
+
+def _merge_labels(mask_merged: np.ndarray, labels: np.ndarray, accept: np.ndarray) -> None:
+    if accept.any():
+        mask_merged[accept[labels]] = 255
+
+
 def merge_mask_list(mask_list, pred_mask, blk: TextBlock = None, pred_thresh=30, text_window=None, filter_with_lines=False, refine_mode=REFINEMASK_INPAINT):
     mask_list.sort(key=lambda x: x[1])
     linemask = None
@@ -87,23 +107,17 @@ def merge_mask_list(mask_list, pred_mask, blk: TextBlock = None, pred_thresh=30,
         _, pred_mask = cv2.threshold(pred_mask, 60, 255, cv2.THRESH_BINARY)
     connectivity = 8
     mask_merged = np.zeros_like(pred_mask)
+    # OR-ing a component into mask_merged only changes its own not-yet-set pixels,
+    # each by xor(255, p) - xor(0, p) = 255 - 2p, so the per-component
+    # "xor_merged < xor_origin" test is a bincount of that gain over the labels.
+    # Components of one labelling are disjoint, so they can be decided together.
+    gain = 255 - 2 * pred_mask.astype(np.int64)
     for ii, (candidate_mask, xor_sum) in enumerate(mask_list):
         num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(candidate_mask, connectivity, cv2.CV_16U)
-        for label_index, stat, centroid in zip(range(num_labels), stats, centroids):
-            if label_index != 0: # skip background label
-                x, y, w, h, area = stat
-                if w * h < 3:
-                    continue
-                x1, y1, x2, y2 = x, y, x+w, y+h
-                label_local = labels[y1: y2, x1: x2]
-                label_cordinates = np.where(label_local==label_index)
-                tmp_merged = np.zeros_like(label_local, np.uint8)
-                tmp_merged[label_cordinates] = 255
-                tmp_merged = cv2.bitwise_or(mask_merged[y1: y2, x1: x2], tmp_merged)
-                xor_merged = cv2.bitwise_xor(tmp_merged, pred_mask[y1: y2, x1: x2]).sum()
-                xor_origin = cv2.bitwise_xor(mask_merged[y1: y2, x1: x2], pred_mask[y1: y2, x1: x2]).sum()
-                if xor_merged < xor_origin:
-                    mask_merged[y1: y2, x1: x2] = tmp_merged
+        accept = _labels_improving_xor(labels, num_labels, mask_merged, gain)
+        accept[0] = False  # skip background label
+        accept &= stats[:, cv2.CC_STAT_WIDTH] * stats[:, cv2.CC_STAT_HEIGHT] >= 3
+        _merge_labels(mask_merged, labels, accept)
 
     if refine_mode == REFINEMASK_INPAINT:
         mask_merged = cv2.dilate(mask_merged, np.ones((5, 5), np.uint8), iterations=1)
@@ -114,19 +128,9 @@ def merge_mask_list(mask_list, pred_mask, blk: TextBlock = None, pred_thresh=30,
         area_thresh = sorted_area[-2]
     else:
         area_thresh = sorted_area[-1]
-    for label_index, stat, centroid in zip(range(num_labels), stats, centroids):
-        x, y, w, h, area = stat
-        if area < area_thresh:
-            x1, y1, x2, y2 = x, y, x+w, y+h
-            label_local = labels[y1: y2, x1: x2]
-            label_cordinates = np.where(label_local==label_index)
-            tmp_merged = np.zeros_like(label_local, np.uint8)
-            tmp_merged[label_cordinates] = 255
-            tmp_merged = cv2.bitwise_or(mask_merged[y1: y2, x1: x2], tmp_merged)
-            xor_merged = cv2.bitwise_xor(tmp_merged, pred_mask[y1: y2, x1: x2]).sum()
-            xor_origin = cv2.bitwise_xor(mask_merged[y1: y2, x1: x2], pred_mask[y1: y2, x1: x2]).sum()
-            if xor_merged < xor_origin:
-                mask_merged[y1: y2, x1: x2] = tmp_merged
+    accept = _labels_improving_xor(labels, num_labels, mask_merged, gain)
+    accept &= stats[:, -1] < area_thresh
+    _merge_labels(mask_merged, labels, accept)
     return mask_merged
 
 
@@ -154,16 +158,37 @@ def refine_undetected_mask(img: np.ndarray, mask_pred: np.ndarray, mask_refined:
     return mask_refined
 
 
+def _refine_block(img: np.ndarray, pred_mask: np.ndarray, blk: TextBlock, refine_mode: int):
+    # bx1, by1, bx2, by2 = expand_textwindow(img.shape, blk.xyxy, expand_r=16)
+    bx1, by1, bx2, by2 = enlarge_window(blk.xyxy, img.shape[1], img.shape[0])
+    im = np.ascontiguousarray(img[by1: by2, bx1: bx2])
+    msk = np.ascontiguousarray(pred_mask[by1: by2, bx1: bx2])
+    mask_list = get_topk_masklist(im, msk)
+    mask_list += get_otsuthresh_masklist(im, msk, per_channel=False)
+    mask_merged = merge_mask_list(mask_list, msk, blk=blk, text_window=[bx1, by1, bx2, by2], refine_mode=refine_mode)
+    return (bx1, by1, bx2, by2), mask_merged
+
+
+def _refine_pool() -> ThreadPoolExecutor:
+    global _REFINE_POOL
+    with _REFINE_POOL_LOCK:
+        if _REFINE_POOL is None:
+            _REFINE_POOL = ThreadPoolExecutor(
+                max_workers=REFINE_MAX_WORKERS,
+                thread_name_prefix="ctd-refine",
+            )
+        return _REFINE_POOL
+
+
 def refine_mask(img: np.ndarray, pred_mask: np.ndarray, blk_list: List[TextBlock], refine_mode: int = REFINEMASK_INPAINT) -> np.ndarray:
     mask_refined = np.zeros_like(pred_mask)
-    for blk in blk_list:
-        # bx1, by1, bx2, by2 = expand_textwindow(img.shape, blk.xyxy, expand_r=16)
-        bx1, by1, bx2, by2 = enlarge_window(blk.xyxy, img.shape[1], img.shape[0])
-        im = np.ascontiguousarray(img[by1: by2, bx1: bx2])
-        msk = np.ascontiguousarray(pred_mask[by1: by2, bx1: bx2])
-        mask_list = get_topk_masklist(im, msk)
-        mask_list += get_otsuthresh_masklist(im, msk, per_channel=False)
-        mask_merged = merge_mask_list(mask_list, msk, blk=blk, text_window=[bx1, by1, bx2, by2], refine_mode=refine_mode)
+    if len(blk_list) > 1 and REFINE_MAX_WORKERS > 1:
+        # OpenCV releases the GIL, so blocks refine in parallel; the OR below is
+        # order-independent, so the result matches the sequential loop exactly.
+        refined_blocks = _refine_pool().map(lambda blk: _refine_block(img, pred_mask, blk, refine_mode), blk_list)
+    else:
+        refined_blocks = (_refine_block(img, pred_mask, blk, refine_mode) for blk in blk_list)
+    for (bx1, by1, bx2, by2), mask_merged in refined_blocks:
         mask_refined[by1: by2, bx1: bx2] = cv2.bitwise_or(mask_refined[by1: by2, bx1: bx2], mask_merged)
     return mask_refined
 
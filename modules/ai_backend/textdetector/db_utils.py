@@ -3,10 +3,18 @@ import numpy as np
 import pyclipper
 from shapely.geometry import Polygon
 from collections import namedtuple
-import torch
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import torch
+except ImportError:  # the CTD ONNX backend runs without torch
+    torch = None
+
+
+def _is_tensor(value) -> bool:
+    return torch is not None and isinstance(value, torch.Tensor)
+
 
 def iou_rotate(box_a, box_b, method='union'):
     rect_a = cv2.minAreaRect(box_a)
@@ -56,7 +64,7 @@ class SegDetectorRepresenter():
         boxes_batch = []
         scores_batch = []
         # print(pred.size())
-        batch_size = pred.size(0) if isinstance(pred, torch.Tensor) else pred.shape[0]
+        batch_size = pred.size(0) if _is_tensor(pred) else pred.shape[0]
 
         if height is None:
             height = pred.shape[1]
@@ -131,7 +139,7 @@ class SegDetectorRepresenter():
         '''
 
         assert len(_bitmap.shape) == 2
-        if isinstance(pred, torch.Tensor):
+        if _is_tensor(pred):
             bitmap = _bitmap.cpu().numpy()  # The first channel
             pred = pred.cpu().detach().numpy()
         else:
@@ -0,0 +1,191 @@
+"""
+File: modules/ai_backend/torch_onnx_runtime.py
+
+Purpose:
+ONNX Runtime execution of the models that ship as PyTorch checkpoints (LaMa-v2,
+AOT, Comic Text Detector). Sessions come from the shared `RuntimeFactory` and use
+the same `General.ai_onnx_provider` / `ai_onnx_device_id` selection as PaddleOCR.
+
+Main responsibilities:
+- choose the runtime of a request: `torch`, `onnx` or `auto` (request param
+  `runtime`, default from `MS_TORCH_MODELS_RUNTIME`);
+- resolve the exported `.onnx` files in `ManhwaStudio_AI_Models/ONNX/{LaMa,AOT,
+  ComicTextDetector}` (written by `onnx_export.py`);
+- NumPy pre/post-processing that reproduces the torch paths step by step, so the
+  services only swap the network call.
+
+Key structures:
+- `select_runtime`, `onnx_session`
+- `LamaOnnxInpainter`, `aot_onnx_forward`, `CtdOnnxNet`
+
+Notes:
+- `auto` runs ONNX when the exported file exists and the request would run on
+  CPU (or torch is not installed); GPU torch installs keep the torch path.
+- This module never imports torch. LaMa refine mode optimizes features with
+  gradients and stays torch-only.
+"""
+
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+try:
+    from config import AOT_ONNX_DIR, LAMA_ONNX_DIR, TEXT_DETECTOR_ONNX_DIR
+except Exception:
+    _ONNX_MODELS_DIR = Path(__file__).resolve().parents[2] / "ManhwaStudio_AI_Models" / "ONNX"
+    LAMA_ONNX_DIR = str(_ONNX_MODELS_DIR / "LaMa")
+    AOT_ONNX_DIR = str(_ONNX_MODELS_DIR / "AOT")
+    TEXT_DETECTOR_ONNX_DIR = str(_ONNX_MODELS_DIR / "ComicTextDetector")
+
+try:
+    from config import UserConfig
+except Exception:
+    UserConfig = None
+
+from .paddle_onnx_runtime import OnnxSessionRunner, RuntimeFactory, resolve_provider_settings
+from .torch_support import is_torch_available
+
+# ============================================================================
+# TORCH MODELS ON ONNX RUNTIME
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - выбор runtime (`torch` / `onnx` / `auto`) для LaMa-v2, AOT и CTD;
+# - пути к экспортированным `.onnx` (см. `onnx_export.py`);
+# - NumPy-пре/постобработка, повторяющая torch-пути, поверх сессий
+#   `RuntimeFactory` (общий выбор Execution Provider с PaddleOCR).
+# ============================================================================
+
+RUNTIME_ENV = "MS_TORCH_MODELS_RUNTIME"
+RUNTIME_TORCH = "torch"
+RUNTIME_ONNX = "onnx"
+RUNTIME_AUTO = "auto"
+RUNTIMES = (RUNTIME_TORCH, RUNTIME_ONNX, RUNTIME_AUTO)
+
+# Graph I/O names shared with `onnx_export.py`.
+INPAINT_INPUT_NAMES = ("image", "mask")
+INPAINT_OUTPUT_NAME = "output"
+CTD_INPUT_NAME = "image"
+CTD_OUTPUT_NAMES = ("mask", "lines")
+
+LAMA_PAD_MODULO = 8
+AOT_ONNX_FILENAME = "inpainting.onnx"
+CTD_ONNX_FILENAME = "comictextdetector.onnx"
+
+
+def normalize_runtime(value: Any, default: str = RUNTIME_AUTO) -> str:
+    normalized = str(value or "").strip().lower()
+    return normalized if normalized in RUNTIMES else default
+
+
+def configured_runtime() -> str:
+    """Default runtime of the services: `MS_TORCH_MODELS_RUNTIME`, else `auto`."""
+    return normalize_runtime(os.environ.get(RUNTIME_ENV))
+
+
+def select_runtime(requested: str, onnx_path: Path, device: str) -> str:
+    """Resolves `requested` (`torch` / `onnx` / `auto`) to `torch` or `onnx`."""
+    if requested == RUNTIME_TORCH:
+        return RUNTIME_TORCH
+    if requested == RUNTIME_ONNX:
+        return RUNTIME_ONNX
+    if not onnx_path.is_file():
+        return RUNTIME_TORCH
+    if str(device).strip().lower() == "cpu" or not is_torch_available():
+        return RUNTIME_ONNX
+    return RUNTIME_TORCH
+
+
+def lama_onnx_path(checkpoint_name: str) -> Path:
+    """Export of `Torch/LaMa/models/<checkpoint_name>` (`best.ckpt` -> `best.ckpt.onnx`)."""
+    return Path(str(LAMA_ONNX_DIR)) / f"{checkpoint_name}.onnx"
+
+
+def aot_onnx_path() -> Path:
+    return Path(str(AOT_ONNX_DIR)) / AOT_ONNX_FILENAME
+
+
+def ctd_onnx_path() -> Path:
+    return Path(str(TEXT_DETECTOR_ONNX_DIR)) / CTD_ONNX_FILENAME
+
+
+def require_onnx_model(path: Path, model: str) -> Path:
+    if not path.is_file():
+        raise FileNotFoundError(
+            f"Не найдена ONNX-модель {model}: {path}. "
+            f"Экспортируйте её: python -m modules.ai_backend.onnx_export {model.lower()}"
+        )
+    return path
+
+
+@contextmanager
+def onnx_session(factory: RuntimeFactory, model_path: Path, profile: str) -> Iterator[OnnxSessionRunner]:
+    """Leases the cached session for `model_path` with the configured ONNX provider and `profile`."""
+    session = factory.acquire_runner(model_path, resolve_provider_settings(UserConfig), profile)
+    try:
+        yield session.runner
+    finally:
+        session.release()
+
+
+def pad_to_modulo(batch: np.ndarray, modulo: int) -> np.ndarray:
+    """NCHW reflect padding on the bottom/right, like `pad_tensor_to_modulo`."""
+    height, width = batch.shape[2:]
+    pad_h = -height % modulo
+    pad_w = -width % modulo
+    if pad_h == 0 and pad_w == 0:
+        return batch
+    return np.pad(batch, ((0, 0), (0, 0), (0, pad_h), (0, pad_w)), mode="reflect")
+
+
+class LamaOnnxInpainter:
+    """`InpainterV2` standard mode on an ONNX session: `(img, mask) -> uint8 RGB`."""
+
+    def __init__(self, runner: OnnxSessionRunner, modulo: int = LAMA_PAD_MODULO) -> None:
+        self._runner = runner
+        self._modulo = modulo
+
+    def __call__(self, img: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        height, width = img.shape[:2]
+        image = (img.astype("float32") / 255.0).transpose(2, 0, 1)[None]
+        mask_f = (mask > 0).astype("float32")[None, None]
+        image_name, mask_name = INPAINT_INPUT_NAMES
+        result = self._runner.run_feeds(
+            {
+                image_name: np.ascontiguousarray(pad_to_modulo(image, self._modulo)),
+                mask_name: np.ascontiguousarray(pad_to_modulo(mask_f, self._modulo)),
+            }
+        )[0][0]
+        result = np.clip(result[:, :height, :width], 0, 1).transpose(1, 2, 0)
+        return (result * 255).astype("uint8")
+
+
+def aot_onnx_forward(runner: OnnxSessionRunner) -> Callable[[np.ndarray, np.ndarray], np.ndarray]:
+    """`AOTGenerator` forward on an ONNX session: NCHW image in [-1, 1] + mask -> NCHW output."""
+    image_name, mask_name = INPAINT_INPUT_NAMES
+
+    def forward(img: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        return runner.run_feeds({image_name: img, mask_name: mask})[0]
+
+    return forward
+
+
+class CtdOnnxNet:
+    """Stands in for `TextDetBase` in `CTDModel(net=...)`: `(None, mask, lines)` per batch.
+
+    The export keeps the segmentation and DB heads only; the YOLO block boxes are
+    unused by the detector (blocks are regrouped from the line map).
+    """
+
+    def __init__(self, runner: OnnxSessionRunner) -> None:
+        self._runner = runner
+
+    def __call__(self, batch: np.ndarray) -> tuple[None, np.ndarray, np.ndarray]:
+        mask, lines = self._runner.run_feeds(
+            {CTD_INPUT_NAME: np.ascontiguousarray(batch, dtype=np.float32)}
+        )[:2]
+        return None, mask, lines
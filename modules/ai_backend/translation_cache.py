@@ -0,0 +1,198 @@
+"""
+File: modules/ai_backend/translation_cache.py
+
+Purpose:
+Persistent, content-addressed cache of machine translations, so repeated
+lines ("...", "Huh?", sound effects) and re-translated chapters do not cost a
+network round trip per line.
+
+Main responsibilities:
+- derive a cache key from (service, source language, target language,
+  translator params without credentials, normalized text);
+- store and look up translations in a SQLite file under the shared
+  `ManhwaStudio_AI_Models/.cache` directory;
+- count hits, misses, stores and in-batch duplicates for the health snapshot.
+
+Key structures:
+- `TranslationCache`
+- `normalize_text`, `cache_key`
+
+Notes:
+- Normalization is NFC + trimmed outer whitespace + collapsed runs of spaces
+  and tabs inside a line; line breaks are kept because they change how a
+  bubble is translated.
+- Credentials (`api_key`, `region`, proxies, ...) are never part of the key;
+  other params (e.g. the ChatGPT `model`) are, since they change the output.
+- Only successful translations are stored. A broken or unwritable cache file
+  disables the disk layer and the service keeps translating uncached.
+- `MS_TRANSLATION_CACHE_PATH` overrides the file location; `off` disables it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import traceback
+import unicodedata
+from pathlib import Path
+from typing import Any, Iterable
+
+# ============================================================================
+# TRANSLATION CACHE
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `normalize_text` / `cache_key`: content-addressed ключ перевода.
+# - `TranslationCache`: SQLite-хранилище переводов + счётчики hit/miss.
+# ============================================================================
+
+CACHE_PATH_ENV = "MS_TRANSLATION_CACHE_PATH"
+CACHE_FILE_NAME = "translation_cache.sqlite3"
+# Translator params that identify the account, not the translation.
+_SECRET_PARAMS = frozenset({"api_key", "region", "proxies", "secret", "token"})
+_INLINE_SPACE_RE = re.compile(r"[ \t\u00a0\u3000]+")
+
+
+def normalize_text(text: str) -> str:
+    normalized = unicodedata.normalize("NFC", str(text or ""))
+    lines = (_INLINE_SPACE_RE.sub(" ", line).strip() for line in normalized.strip().splitlines())
+    return "\n".join(lines)
+
+
+def cache_key(
+    service: str, source: str, target: str, params: dict[str, Any] | None, text: str
+) -> str:
+    variant = {
+        key: value for key, value in sorted((params or {}).items()) if key not in _SECRET_PARAMS
+    }
+    material = json.dumps(
+        [service, source, target, variant, normalize_text(text)],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def default_cache_path() -> Path | None:
+    override = os.environ.get(CACHE_PATH_ENV, "").strip()
+    if override.lower() in {"0", "off", "false", "no"}:
+        return None
+    if override:
+        return Path(override)
+    from .paddle_onnx_runtime import resolve_compiled_cache_root
+
+    return resolve_compiled_cache_root() / CACHE_FILE_NAME
+
+
+class TranslationCache:
+    """Thread-safe translation store; `path=None` (or a broken file) keeps entries in memory."""
+
+    def __init__(self, path: Path | None) -> None:
+        self._lock = threading.Lock()
+        self._path = path
+        self._conn: sqlite3.Connection | None = None
+        self._memory: dict[str, str] = {}
+        self._disk_error: str | None = None
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._deduplicated = 0
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, str]:
+        """Returns the cached translation for every known key and counts hits/misses."""
+        wanted = list(dict.fromkeys(keys))
+        with self._lock:
+            found = {key: self._memory[key] for key in wanted if key in self._memory}
+            missing = [key for key in wanted if key not in found]
+            conn = self._connection_locked() if missing else None
+            if conn is not None:
+                try:
+                    for start in range(0, len(missing), 500):
+                        chunk = missing[start : start + 500]
+                        marks = ",".join("?" * len(chunk))
+                        rows = conn.execute(
+                            f"SELECT key, text FROM translations WHERE key IN ({marks})", chunk
+                        ).fetchall()
+                        found.update(rows)
+                except sqlite3.Error as exc:
+                    self._disable_disk_locked(exc)
+            self._hits += len(found)
+            self._misses += len(wanted) - len(found)
+            return found
+
+    def put_many(self, entries: dict[str, str]) -> None:
+        if not entries:
+            return
+        with self._lock:
+            self._stores += len(entries)
+            conn = self._connection_locked()
+            if conn is None:
+                # No usable disk layer: keep this session's translations in memory.
+                self._memory.update(entries)
+                return
+            now = time.time()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO translations (key, text, created_unix_s) "
+                        "VALUES (?, ?, ?)",
+                        [(key, text, now) for key, text in entries.items()],
+                    )
+            except sqlite3.Error as exc:
+                self._disable_disk_locked(exc)
+                self._memory.update(entries)
+
+    def count_deduplicated(self, count: int) -> None:
+        with self._lock:
+            self._deduplicated += count
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "path": None if self._path is None else str(self._path),
+                "persistent": self._path is not None and self._disk_error is None,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "deduplicated": self._deduplicated,
+                "error": self._disk_error,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection_locked(self) -> sqlite3.Connection | None:
+        if self._conn is not None or self._path is None or self._disk_error is not None:
+            return self._conn
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, created_unix_s REAL NOT NULL)"
+            )
+            conn.commit()
+        except (OSError, sqlite3.Error) as exc:
+            self._disable_disk_locked(exc)
+            return None
+        self._conn = conn
+        return conn
+
+    def _disable_disk_locked(self, exc: BaseException) -> None:
+        traceback.print_exc()
+        self._disk_error = f"{type(exc).__name__}: {exc}"
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
@@ -0,0 +1,266 @@
+"""
+File: modules/ai_backend/translation_executor.py
+
+Purpose:
+Concurrent execution of the remote calls behind `translate.deep`. After the
+cache and in-batch dedup (`translation_cache.py`), the remaining lines used to
+go out strictly one after another; this runs them with bounded concurrency
+while staying within each provider's rate limits.
+
+Main responsibilities:
+- `TokenBucket`: per-provider request rate limit (requests/s + burst);
+- `TranslatorPool`: reuses translator instances per (provider, options)
+  instead of building one per call;
+- `TranslationExecutor.translate(...)`: groups lines (with `join_lines=True`,
+  joining several short single-line texts into one request where the
+  provider handles newlines), runs the groups on a shared worker pool with per-provider concurrency,
+  retries transient failures with exponential backoff, and returns one
+  outcome per input line, in order.
+
+Key structures:
+- `ProviderLimits`, `PROVIDER_LIMITS`
+- `TokenBucket`, `TranslatorPool`, `TranslationExecutor`
+
+Notes:
+- Joining is opt-in: a provider may translate a line differently with
+  neighbours as context, so the default is one request per line. A joined
+  request is split back on newlines; if the provider returns a different
+  number of lines, that group is re-sent line by line.
+- Lines that contain a newline themselves are never joined.
+- Retryable failures are connection / timeout errors and the provider's
+  "too many requests" / request errors; anything else fails its line at once.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+# ============================================================================
+# TRANSLATION EXECUTOR
+# ----------------------------------------------------------------------------
+# Что в файле:
+# - `TokenBucket`: лимит запросов в секунду на провайдера.
+# - `TranslatorPool`: переиспользование экземпляров переводчиков.
+# - `TranslationExecutor`: параллельный перевод с ретраями, склейкой строк и
+#   сохранением порядка результатов.
+# ============================================================================
+
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    requests_per_s: float
+    burst: int
+    concurrency: int
+    # Max characters of one joined request; 0 disables joining for the provider.
+    join_chars: int = 0
+
+
+PROVIDER_LIMITS: dict[str, ProviderLimits] = {
+    "google": ProviderLimits(requests_per_s=5.0, burst=5, concurrency=4, join_chars=1800),
+    "microsoft": ProviderLimits(requests_per_s=5.0, burst=5, concurrency=4, join_chars=1800),
+    "yandex": ProviderLimits(requests_per_s=5.0, burst=5, concurrency=4, join_chars=1800),
+    "deepl": ProviderLimits(requests_per_s=3.0, burst=3, concurrency=3, join_chars=1800),
+    "chatgpt": ProviderLimits(requests_per_s=1.0, burst=2, concurrency=2),
+}
+DEFAULT_LIMITS = ProviderLimits(requests_per_s=2.0, burst=2, concurrency=2)
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_S = 0.5
+_POOL_MAX_KEYS = 8
+_RETRYABLE_ERROR_NAMES = frozenset({"TooManyRequests", "RequestError", "ServerException"})
+
+Outcome = tuple[bool, str]  # (ok, translated text or error message)
+
+
+class TokenBucket:
+    """Classic token bucket: `acquire()` blocks until one request may be sent."""
+
+    def __init__(self, rate_per_s: float, burst: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self._rate = max(1e-6, float(rate_per_s))
+        self._capacity = max(1.0, float(burst))
+        self._tokens = self._capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait_s = (1.0 - self._tokens) / self._rate
+            time.sleep(wait_s)
+
+
+class TranslatorPool:
+    """Idle translator instances per (provider, options) key, most recent keys kept."""
+
+    def __init__(self, max_keys: int = _POOL_MAX_KEYS) -> None:
+        self._lock = threading.Lock()
+        self._idle: OrderedDict[Any, deque[Any]] = OrderedDict()
+        self._max_keys = max_keys
+        self.created = 0
+
+    def ensure(self, key: Any, factory: Callable[[], Any]) -> None:
+        """Builds one instance for `key` unless one is idle; factory errors propagate."""
+        with self.lease(key, factory):
+            pass
+
+    @contextmanager
+    def lease(self, key: Any, factory: Callable[[], Any]) -> Iterator[Any]:
+        with self._lock:
+            idle = self._idle.get(key)
+            translator = idle.popleft() if idle else None
+        if translator is None:
+            translator = factory()
+            with self._lock:
+                self.created += 1
+        try:
+            yield translator
+        finally:
+            with self._lock:
+                self._idle.setdefault(key, deque()).append(translator)
+                self._idle.move_to_end(key)
+                while len(self._idle) > self._max_keys:
+                    self._idle.popitem(last=False)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    return isinstance(exc, (OSError, TimeoutError)) or type(exc).__name__ in _RETRYABLE_ERROR_NAMES
+
+
+class TranslationExecutor:
+    """Runs translation requests concurrently under per-provider limits."""
+
+    def __init__(
+        self,
+        limits: dict[str, ProviderLimits] | None = None,
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        retries: int = DEFAULT_RETRIES,
+        backoff_s: float = DEFAULT_BACKOFF_S,
+    ) -> None:
+        self._limits = PROVIDER_LIMITS if limits is None else limits
+        self._workers = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
+        self._retries = max(0, int(retries))
+        self._backoff_s = max(0.0, float(backoff_s))
+        self._lock = threading.Lock()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self.pool = TranslatorPool()
+        self.requests_sent = 0
+
+    def translate(
+        self,
+        provider: str,
+        pool_key: Any,
+        factory: Callable[[], Any],
+        texts: list[str],
+        *,
+        join_lines: bool = False,
+    ) -> list[Outcome]:
+        """Translates `texts`; returns `(ok, text_or_error)` per input, in input order.
+
+        `join_lines` sends several short lines as one request for providers with
+        a `join_chars` budget.
+        """
+        limits = self._limits.get(provider, DEFAULT_LIMITS)
+        groups = _group_lines(texts, limits.join_chars if join_lines else 0)
+        futures: list[tuple[list[int], Future]] = [
+            (
+                indexes,
+                self._workers.submit(
+                    self._run_group, provider, limits, pool_key, factory, [texts[i] for i in indexes]
+                ),
+            )
+            for indexes in groups
+        ]
+        outcomes: list[Outcome] = [(False, "")] * len(texts)
+        for indexes, future in futures:
+            for index, outcome in zip(indexes, future.result()):
+                outcomes[index] = outcome
+        return outcomes
+
+    def shutdown(self) -> None:
+        self._workers.shutdown(wait=False, cancel_futures=True)
+
+    def _run_group(
+        self,
+        provider: str,
+        limits: ProviderLimits,
+        pool_key: Any,
+        factory: Callable[[], Any],
+        lines: list[str],
+    ) -> list[Outcome]:
+        if len(lines) == 1:
+            return [self._call(provider, limits, pool_key, factory, lines[0])]
+        joined = self._call(provider, limits, pool_key, factory, "\n".join(lines))
+        if joined[0]:
+            parts = joined[1].split("\n")
+            if len(parts) == len(lines):
+                return [(True, part.strip()) for part in parts]
+        # Failed, or the provider merged/split lines: fall back to one request per line.
+        return [self._call(provider, limits, pool_key, factory, line) for line in lines]
+
+    def _call(
+        self,
+        provider: str,
+        limits: ProviderLimits,
+        pool_key: Any,
+        factory: Callable[[], Any],
+        text: str,
+    ) -> Outcome:
+        bucket, slots = self._provider_state(provider, limits)
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                with slots, self.pool.lease(pool_key, factory) as translator:
+                    with self._lock:
+                        self.requests_sent += 1
+                    translated = translator.translate(text)
+                return True, "" if translated is None else str(translated)
+            except Exception as exc:  # noqa: BLE001 - per-line error, reported to the caller
+                if attempt >= self._retries or not _is_retryable(exc):
+                    return False, str(exc) or type(exc).__name__
+            time.sleep(self._backoff_s * (2**attempt))
+            attempt += 1
+
+    def _provider_state(
+        self, provider: str, limits: ProviderLimits
+    ) -> tuple[TokenBucket, threading.BoundedSemaphore]:
+        with self._lock:
+            bucket = self._buckets.get(provider)
+            if bucket is None:
+                bucket = self._buckets[provider] = TokenBucket(limits.requests_per_s, limits.burst)
+                self._slots[provider] = threading.BoundedSemaphore(max(1, limits.concurrency))
+            return bucket, self._slots[provider]
+
+
+def _group_lines(texts: list[str], join_chars: int) -> list[list[int]]:
+    """Index groups to send as one request each; multi-line texts always go alone."""
+    groups: list[list[int]] = []
+    current: list[int] = []
+    size = 0
+    for index, text in enumerate(texts):
+        if join_chars <= 0 or "\n" in text or len(text) >= join_chars:
+            groups.append([index])
+            continue
+        if current and size + 1 + len(text) > join_chars:
+            groups.append(current)
+            current, size = [], 0
+        size += len(text) + (1 if current else 0)
+        current.append(index)
+    if current:
+        groups.append(current)
+    return groups